@@ -109,8 +109,10 @@ function computeHash(content: string): string {
 
 // Load chunks from the latest processed file
 async function loadChunks(): Promise<ProcessedChunk[]> {
-  const files = readdirSync(PROCESSED_DIR).filter((f) =>
-    f.startsWith("processed_chunks_")
+  const files = readdirSync(PROCESSED_DIR).filter(
+    (f) =>
+      f.startsWith("processed_chunks_") &&
+      (f.endsWith(".json") || f.endsWith(".jsonl"))
   );
   if (files.length === 0) {
     throw new Error("No processed chunks file found");
@@ -121,6 +123,12 @@ async function loadChunks(): Promise<ProcessedChunk[]> {
 
   const filePath = join(PROCESSED_DIR, latestFile);
   const content = readFileSync(filePath, "utf-8");
+  if (latestFile.endsWith(".jsonl")) {
+    return content
+      .split("\n")
+      .filter((line) => line.trim())
+      .map((line) => JSON.parse(line) as ProcessedChunk);
+  }
   return JSON.parse(content) as ProcessedChunk[];
 }
 
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Recall-versus-dimension report for embedding reduction.
+
+Embeds the evaluation queries from tests/test_queries.py, searches the
+collection's stored vectors at full width and reduced to each dimension
+(Matryoshka truncation and PCA fitted on the corpus), and reports how much
+of the full-width top k each dimension keeps, next to the keyword recall
+of the chunks it retrieves.
+
+Usage:
+    python scripts/reduction_report.py                     # Both methods, default dimensions
+    python scripts/reduction_report.py --method pca --dims 128 256 512
+    python scripts/reduction_report.py --difficulty basic --k 5
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+import numpy as np
+from rich.console import Console
+from rich.table import Table
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.embeddings.reduction import REDUCTION_METHODS, EmbeddingReducer, recall_by_dimension
+from src.embeddings.vectordb import REDUCTION_SAMPLE_SIZE, VectorDB
+from tests.test_queries import TEST_QUERIES, get_queries_by_difficulty
+from tests.test_retrieval import RetrievalMetrics
+
+console = Console()
+
+
+def load_corpus(db: VectorDB, page_size: int = 5000) -> tuple[np.ndarray, list[str]]:
+    """Stored embeddings and documents of the whole collection."""
+    embeddings, documents = [], []
+    offset = 0
+    while True:
+        page = db.collection.get(
+            include=["embeddings", "documents"], limit=page_size, offset=offset
+        )
+        embeddings.extend(page["embeddings"])
+        documents.extend(page["documents"])
+        if len(page["ids"]) < page_size:
+            break
+        offset += page_size
+    return np.asarray(embeddings, dtype=np.float32), documents
+
+
+def keyword_recall(top_k: list[list[int]], documents: list[str], queries: list[dict]) -> float:
+    """Mean keyword recall of the retrieved chunks over the queries."""
+    return float(np.mean([
+        RetrievalMetrics.keyword_recall([documents[i] for i in rows], query["expected_keywords"])
+        for rows, query in zip(top_k, queries)
+    ]))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Report retrieval recall versus embedding dimension"
+    )
+    parser.add_argument(
+        "--collection",
+        type=str,
+        default="arbbuilder",
+        help="ChromaDB collection name (default: arbbuilder)",
+    )
+    parser.add_argument(
+        "--method",
+        type=str,
+        choices=REDUCTION_METHODS,
+        nargs="+",
+        default=list(REDUCTION_METHODS),
+        help="Reduction method(s) to evaluate (default: all)",
+    )
+    parser.add_argument(
+        "--dims",
+        type=int,
+        nargs="+",
+        default=[64, 128, 256, 384, 512, 768, 1024, 1536],
+        help="Dimensions to evaluate (those below the stored width are used)",
+    )
+    parser.add_argument(
+        "--k",
+        type=int,
+        default=10,
+        help="Results per query (default: 10)",
+    )
+    parser.add_argument(
+        "--difficulty",
+        type=str,
+        choices=["basic", "intermediate", "advanced"],
+        help="Only use queries of this difficulty",
+    )
+    parser.add_argument(
+        "--output",
+        type=Path,
+        default=project_root / "tests" / "reduction_report.json",
+        help="JSON report path (default: tests/reduction_report.json)",
+    )
+
+    args = parser.parse_args()
+
+    db = VectorDB(collection_name=args.collection)
+    corpus, documents = load_corpus(db)
+    if not len(corpus):
+        console.print(f"[red]Collection {db.collection_name} is empty[/red]")
+        sys.exit(1)
+    if db.reducer is not None:
+        console.print(
+            f"[yellow]Stored vectors are already reduced ({db.reducer.spec}); "
+            f"recall is relative to that width[/yellow]"
+        )
+
+    queries = get_queries_by_difficulty(args.difficulty) if args.difficulty else TEST_QUERIES
+    query_embeddings = np.asarray(db.embed_queries([q["query"] for q in queries]), dtype=np.float32)
+
+    width = corpus.shape[1]
+    k = min(args.k, len(corpus))
+    rng = np.random.default_rng(0)
+    sample = corpus[rng.permutation(len(corpus))[:REDUCTION_SAMPLE_SIZE]]
+
+    # Full-width (cosine) search is the reference every dimension is compared with
+    scores = query_embeddings @ corpus.T
+    query_norms = np.linalg.norm(query_embeddings, axis=1, keepdims=True)
+    scores /= query_norms * np.linalg.norm(corpus, axis=1)
+    exact = np.argsort(-scores, axis=1)[:, :k].tolist()
+    rows = [{
+        "method": "full",
+        "dimension": width,
+        f"recall@{k}": 1.0,
+        "keyword_recall": keyword_recall(exact, documents, queries),
+        "bytes_per_vector": width * 4,
+    }]
+
+    for method in args.method:
+        # PCA can't have more components than sample vectors
+        limit = width - 1 if method == "matryoshka" else min(width - 1, len(sample))
+        dims = sorted(d for d in set(args.dims) if d <= limit)
+        if not dims:
+            console.print(f"[yellow]No dimensions to evaluate for {method}[/yellow]")
+            continue
+        reducer = EmbeddingReducer.fit(f"{method}:{dims[-1]}", sample)
+        for row in recall_by_dimension(corpus, query_embeddings, reducer, dims, k=k):
+            top_k = row.pop("top_k")
+            rows.append({
+                "method": method,
+                **row,
+                "keyword_recall": keyword_recall(top_k, documents, queries),
+            })
+
+    table = Table(
+        title=f"Recall vs dimension: {db.collection_name} "
+        f"({len(corpus)} chunks, {len(queries)} queries)"
+    )
+    table.add_column("Method")
+    table.add_column("Dim", justify="right")
+    table.add_column("Bytes/vector", justify="right")
+    table.add_column(f"Recall@{k} vs full", justify="right")
+    table.add_column("Keyword recall", justify="right")
+    for row in rows:
+        table.add_row(
+            row["method"],
+            str(row["dimension"]),
+            str(row["bytes_per_vector"]),
+            f"{row[f'recall@{k}']:.3f}",
+            f"{row['keyword_recall']:.3f}",
+        )
+    console.print(table)
+
+    report = {
+        "collection": db.collection_name,
+        "embedding": db.embedding_info,
+        "chunks": len(corpus),
+        "queries": len(queries),
+        "k": k,
+        "results": rows,
+    }
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    console.print(f"[green]Report written to {args.output}[/green]")
+
+
+if __name__ == "__main__":
+    main()
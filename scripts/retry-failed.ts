@@ -38,10 +38,15 @@ async function retryFailed() {
   }
 
   // Load chunks
-  const files = readdirSync(PROCESSED_DIR).filter(f => f.startsWith("processed_chunks_"));
+  const files = readdirSync(PROCESSED_DIR).filter(
+    f => f.startsWith("processed_chunks_") && (f.endsWith(".json") || f.endsWith(".jsonl"))
+  );
   const latestFile = files.sort().reverse()[0];
   const filePath = join(PROCESSED_DIR, latestFile);
-  const allChunks = JSON.parse(readFileSync(filePath, "utf-8")) as ProcessedChunk[];
+  const content = readFileSync(filePath, "utf-8");
+  const allChunks = (latestFile.endsWith(".jsonl")
+    ? content.split("\n").filter(line => line.trim()).map(line => JSON.parse(line))
+    : JSON.parse(content)) as ProcessedChunk[];
 
   // Filter to just failed ones
   const failedChunks = allChunks.filter(c => FAILED_IDS.includes(c.id));
@@ -1,4 +1,27 @@
 # Embeddings Module
-from .embedder import EmbeddingClient, EmbeddingAPIError
-from .vectordb import VectorDB, ingest_from_file
-from .reranker import Reranker
+from .cache import EmbeddingCache
+from .cascade import RetrievalCascade
+from .embedder import (
+    AsyncEmbeddingClient,
+    EmbeddingAPIError,
+    EmbeddingClient,
+    create_embedding_client,
+)
+from .local_embedder import LocalEmbeddingClient
+from .reranker import CrossEncoderReranker, Reranker
+from .vectordb import VectorDB, ingest_from_file, ingest_from_file_async
+
+__all__ = [
+    "EmbeddingCache",
+    "RetrievalCascade",
+    "AsyncEmbeddingClient",
+    "EmbeddingAPIError",
+    "EmbeddingClient",
+    "create_embedding_client",
+    "LocalEmbeddingClient",
+    "CrossEncoderReranker",
+    "Reranker",
+    "VectorDB",
+    "ingest_from_file",
+    "ingest_from_file_async",
+]
@@ -0,0 +1,174 @@
+"""
+Corpus-wide BM25 keyword index for ARBuilder.
+
+The index is built from the whole collection at ingest time, so IDF
+statistics reflect the corpus rather than a handful of candidates. Postings
+are stored in CSR layout (see postings.py), with term frequencies as
+uint16, and persisted as a single .npz file.
+"""
+
+import math
+import re
+from functools import lru_cache
+from typing import Iterable
+
+import numpy as np
+
+from .postings import PostingsIndex
+
+DEFAULT_K1 = 1.5
+DEFAULT_B = 0.75
+
+# Longer "words" are hashes, addresses or encoded blobs, not search terms
+MAX_TERM_LENGTH = 64
+
+_WORD_PATTERN = re.compile(r"[A-Za-z0-9_]+")
+_IDENTIFIER_PART_PATTERN = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|[0-9]+")
+
+
+@lru_cache(maxsize=100_000)
+def _split_identifier(word: str) -> tuple[str, ...]:
+    """Split an identifier into lowercase snake_case/camelCase parts (without the whole)."""
+    parts = [
+        part.lower()
+        for piece in word.split("_")
+        for part in _IDENTIFIER_PART_PATTERN.findall(piece)
+        if len(part) > 1
+    ]
+    return tuple(parts) if len(parts) > 1 else ()
+
+
+def tokenize(text: str) -> list[str]:
+    """
+    Split text into lowercase search terms.
+
+    Identifiers are kept whole and also split into their snake_case and
+    camelCase parts, so `balanceOf` matches "balanceof" as well as
+    "balance". Short tokens such as `fn` or `U256` are kept.
+    """
+    terms = []
+    for word in _WORD_PATTERN.findall(text):
+        if len(word) > MAX_TERM_LENGTH:
+            continue
+        terms.append(word.lower())
+        terms.extend(_split_identifier(word))
+    return terms
+
+
+class BM25Index(PostingsIndex):
+    """
+    Inverted index with BM25 (Okapi) scoring.
+
+    Postings of term t are postings_docs[offsets[t]:offsets[t + 1]] (sorted
+    document indices) with matching term frequencies in postings_tf.
+    """
+
+    def __init__(
+        self,
+        doc_ids: list[str],
+        vocab: dict[str, int],
+        offsets: np.ndarray,
+        postings_docs: np.ndarray,
+        postings_tf: np.ndarray,
+        doc_lengths: np.ndarray,
+        k1: float = DEFAULT_K1,
+        b: float = DEFAULT_B,
+    ):
+        """
+        Initialize from built arrays; use build() or load() to create one.
+
+        Args:
+            doc_ids: Document id for each document index.
+            vocab: Mapping of term to term index.
+            offsets: Start of each term's postings (len(vocab) + 1 entries).
+            postings_docs: Document indices of all postings (uint32).
+            postings_tf: Term frequencies of all postings (uint16).
+            doc_lengths: Number of terms in each document (uint32).
+            k1: Term frequency saturation parameter.
+            b: Length normalization parameter.
+        """
+        super().__init__(doc_ids, vocab, offsets, postings_docs)
+        self.postings_tf = postings_tf
+        self.doc_lengths = doc_lengths
+        self.k1 = k1
+        self.b = b
+
+        avg_length = float(doc_lengths.mean()) if len(doc_lengths) else 1.0
+        # Per-document part of the BM25 denominator
+        self._length_norm = (
+            k1 * (1 - b + b * doc_lengths / max(avg_length, 1e-9))
+        ).astype(np.float32)
+
+    @classmethod
+    def build(
+        cls,
+        documents: Iterable[tuple[str, str]],
+        k1: float = DEFAULT_K1,
+        b: float = DEFAULT_B,
+    ) -> "BM25Index":
+        """
+        Build an index from (doc_id, text) pairs.
+
+        Args:
+            documents: Documents to index, streamed.
+            k1: Term frequency saturation parameter.
+            b: Length normalization parameter.
+
+        Returns:
+            The built index.
+        """
+        doc_ids, vocab, offsets, postings_docs, tfs, doc_lengths = cls._collect_postings(
+            documents, tokenize
+        )
+        return cls(
+            doc_ids=doc_ids,
+            vocab=vocab,
+            offsets=offsets,
+            postings_docs=postings_docs,
+            postings_tf=np.minimum(tfs, 0xFFFF).astype(np.uint16),
+            doc_lengths=doc_lengths,
+            k1=k1,
+            b=b,
+        )
+
+    def _query_terms(self, query: str) -> list[tuple[int, float]]:
+        """Term indices of the distinct query terms present in the index, with their IDF."""
+        terms = []
+        for term in dict.fromkeys(tokenize(query)):
+            if term in self.vocab:
+                term_index = self.vocab[term]
+                df = self.offsets[term_index + 1] - self.offsets[term_index]
+                idf = math.log(1 + (len(self.doc_ids) - df + 0.5) / (df + 0.5))
+                terms.append((term_index, idf))
+        return terms
+
+    def _posting_scores(self, query_weight: float, postings: slice | np.ndarray) -> np.ndarray:
+        tf = self.postings_tf[postings].astype(np.float32)
+        length_norm = self._length_norm[self.postings_docs[postings]]
+        return query_weight * tf * (self.k1 + 1) / (tf + length_norm)
+
+    def _arrays(self) -> dict[str, np.ndarray]:
+        return {
+            "postings_tf": self.postings_tf,
+            "doc_lengths": self.doc_lengths,
+            "params": np.array([self.k1, self.b]),
+        }
+
+    @classmethod
+    def _from_arrays(cls, data) -> dict:
+        k1, b = data["params"].tolist()
+        return {
+            "postings_tf": data["postings_tf"],
+            "doc_lengths": data["doc_lengths"],
+            "k1": k1,
+            "b": b,
+        }
+
+    def get_stats(self) -> dict:
+        """Get index statistics."""
+        return {
+            "documents": len(self.doc_ids),
+            "terms": len(self.vocab),
+            "postings": int(len(self.postings_docs)),
+            "avg_doc_length": float(self.doc_lengths.mean()) if len(self.doc_lengths) else 0.0,
+        }
@@ -0,0 +1,553 @@
+"""
+Embedding caches for ARBuilder.
+
+Embeddings are content-addressed by (model, sha256 of text) and stored as
+float32 blobs in a SQLite file, so re-ingesting an unchanged corpus does not
+hit the embedding API again. Query embeddings are additionally kept in a
+small in-process LRU cache with a TTL, and retrieval results can be reused
+for near-paraphrased queries via a semantic cache. LLM rerank scores are
+cached per (model, query, document).
+"""
+
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import time
+from array import array
+from collections import OrderedDict
+from pathlib import Path
+from threading import Lock
+from typing import Any, Callable, Hashable, Optional
+
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Get project root (assuming this file is in src/embeddings/)
+_PROJECT_ROOT = Path(__file__).parent.parent.parent
+EMBEDDING_CACHE_PATH = Path(
+    os.getenv("EMBEDDING_CACHE_PATH", _PROJECT_ROOT / "data" / "embedding_cache.sqlite")
+)
+DEFAULT_MAX_ENTRIES = 500_000
+
+DEFAULT_QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", "1024"))
+DEFAULT_QUERY_CACHE_TTL = float(os.getenv("QUERY_CACHE_TTL", "3600"))
+
+DEFAULT_RERANK_CACHE_SIZE = int(os.getenv("RERANK_CACHE_SIZE", "8192"))
+
+DEFAULT_SEMANTIC_CACHE_SIZE = int(os.getenv("SEMANTIC_CACHE_SIZE", "512"))
+DEFAULT_SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95"))
+
+_WHITESPACE_PATTERN = re.compile(r"\s+")
+
+# SQLite limits the number of bound parameters per statement
+_SQLITE_MAX_PARAMS = 900
+
+# Cache hits record their access time in memory; the buffered times are
+# written once this many are pending or this many seconds have passed (and
+# always before eviction and on close)
+_ACCESS_FLUSH_SIZE = 10_000
+_ACCESS_FLUSH_INTERVAL = 60.0
+
+
+def hash_text(text: str) -> str:
+    """Compute the content hash used as cache key for a text."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def normalize_query(text: str) -> str:
+    """Normalize query text for caching (collapse and strip whitespace)."""
+    return _WHITESPACE_PATTERN.sub(" ", text).strip()
+
+
+def _to_blob(vector: list[float]) -> bytes:
+    return array("f", vector).tobytes()
+
+
+def _from_blob(blob: bytes) -> list[float]:
+    values = array("f")
+    values.frombytes(blob)
+    return values.tolist()
+
+
+class EmbeddingCache:
+    """
+    SQLite-backed embedding cache with LRU eviction.
+
+    Safe to share between threads; all access goes through a single
+    connection guarded by a lock. Lookups buffer the access times of their
+    hits instead of writing them right away (see flush).
+    """
+
+    def __init__(
+        self,
+        path: Optional[Path] = None,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+    ):
+        """
+        Initialize the cache.
+
+        Args:
+            path: SQLite file path. Defaults to EMBEDDING_CACHE_PATH.
+            max_entries: Maximum number of cached embeddings before the least
+                recently used entries are evicted.
+        """
+        self.path = Path(path or EMBEDDING_CACHE_PATH)
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = Lock()
+        # (model, text_hash) -> last access time not yet written
+        self._pending_access: dict[tuple[str, str], float] = {}
+        self._last_flush = time.monotonic()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embeddings (
+                model TEXT NOT NULL,
+                text_hash TEXT NOT NULL,
+                dim INTEGER NOT NULL,
+                vector BLOB NOT NULL,
+                last_access REAL NOT NULL,
+                PRIMARY KEY (model, text_hash)
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_embeddings_last_access ON embeddings (last_access)"
+        )
+        self._conn.commit()
+
+    def get(self, model: str, text: str) -> Optional[list[float]]:
+        """Get a cached embedding, or None on a miss."""
+        return self.get_many(model, [text])[0]
+
+    def get_many(self, model: str, texts: list[str]) -> list[Optional[list[float]]]:
+        """
+        Look up embeddings for several texts.
+
+        Args:
+            model: Embedding model name.
+            texts: Texts to look up.
+
+        Returns:
+            List aligned with texts, holding the embedding or None on a miss.
+        """
+        hashes = [hash_text(text) for text in texts]
+        found: dict[str, list[float]] = {}
+        now = time.time()
+
+        with self._lock:
+            unique = list(dict.fromkeys(hashes))
+            for start in range(0, len(unique), _SQLITE_MAX_PARAMS):
+                group = unique[start:start + _SQLITE_MAX_PARAMS]
+                placeholders = ",".join("?" * len(group))
+                rows = self._conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings "
+                    f"WHERE model = ? AND text_hash IN ({placeholders})",
+                    [model, *group],
+                ).fetchall()
+                for text_hash, blob in rows:
+                    found[text_hash] = _from_blob(blob)
+
+            for text_hash in found:
+                self._pending_access[(model, text_hash)] = now
+            if (
+                len(self._pending_access) >= _ACCESS_FLUSH_SIZE
+                or time.monotonic() - self._last_flush >= _ACCESS_FLUSH_INTERVAL
+            ):
+                self._flush_access()
+                self._conn.commit()
+
+            results = [found.get(h) for h in hashes]
+            hit_count = sum(1 for r in results if r is not None)
+            self.hits += hit_count
+            self.misses += len(results) - hit_count
+
+        return results
+
+    def put(self, model: str, text: str, embedding: list[float]):
+        """Store a single embedding."""
+        self.put_many(model, [text], [embedding])
+
+    def put_many(self, model: str, texts: list[str], embeddings: list[list[float]]):
+        """
+        Store embeddings for several texts, evicting old entries if needed.
+
+        Args:
+            model: Embedding model name.
+            texts: Texts that were embedded.
+            embeddings: Embedding vectors aligned with texts.
+        """
+        if len(texts) != len(embeddings):
+            raise ValueError(
+                f"Got {len(texts)} texts but {len(embeddings)} embeddings"
+            )
+
+        now = time.time()
+        rows = [
+            (model, hash_text(text), len(vector), _to_blob(vector), now)
+            for text, vector in zip(texts, embeddings)
+        ]
+
+        with self._lock:
+            # Eviction has to see recent hits
+            self._flush_access()
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings "
+                "(model, text_hash, dim, vector, last_access) VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._evict()
+            self._conn.commit()
+
+    def flush(self):
+        """Write the buffered access times of cache hits."""
+        with self._lock:
+            self._flush_access()
+            self._conn.commit()
+
+    def _flush_access(self):
+        """Write buffered access times without committing. Caller holds the lock."""
+        if self._pending_access:
+            self._conn.executemany(
+                "UPDATE embeddings SET last_access = ? WHERE model = ? AND text_hash = ?",
+                [(now, model, h) for (model, h), now in self._pending_access.items()],
+            )
+            self._pending_access.clear()
+        self._last_flush = time.monotonic()
+
+    def _evict(self):
+        """Drop least recently used entries above max_entries. Caller holds the lock."""
+        count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        overflow = count - self.max_entries
+        if overflow <= 0:
+            return
+
+        self._conn.execute(
+            "DELETE FROM embeddings WHERE rowid IN ("
+            "SELECT rowid FROM embeddings ORDER BY last_access ASC LIMIT ?)",
+            (overflow,),
+        )
+        self.evictions += overflow
+        logger.debug(f"Evicted {overflow} embeddings from cache")
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def get_stats(self) -> dict:
+        """Get cache statistics."""
+        lookups = self.hits + self.misses
+        return {
+            "path": str(self.path),
+            "entries": len(self),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+        }
+
+    def clear(self):
+        """Remove all cached embeddings."""
+        with self._lock:
+            self._pending_access.clear()
+            self._conn.execute("DELETE FROM embeddings")
+            self._conn.commit()
+
+    def close(self):
+        """Write buffered access times and close the SQLite connection."""
+        with self._lock:
+            if self._pending_access:
+                self._flush_access()
+                self._conn.commit()
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class QueryEmbeddingCache:
+    """
+    In-process LRU cache of query embeddings with a TTL.
+
+    Keyed on (model, normalized query text). Entries expire ttl seconds
+    after they were stored; the least recently used entry is dropped once
+    max_entries is exceeded. Safe to share between threads.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = DEFAULT_QUERY_CACHE_SIZE,
+        ttl: float = DEFAULT_QUERY_CACHE_TTL,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Initialize the cache.
+
+        Args:
+            max_entries: Maximum number of cached query embeddings.
+            ttl: Seconds an embedding stays valid.
+            clock: Time source (monotonic seconds).
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._clock = clock
+        self._entries: OrderedDict[tuple[str, str], tuple[float, list[float]]] = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, model: str, text: str) -> Optional[list[float]]:
+        """Get a cached query embedding, or None on a miss or expired entry."""
+        key = (model, normalize_query(text))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._clock() - entry[0] < self.ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, model: str, text: str, embedding: list[float]):
+        """Store a query embedding, evicting the least recently used if full."""
+        key = (model, normalize_query(text))
+        with self._lock:
+            self._entries[key] = (self._clock(), embedding)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def get_stats(self) -> dict:
+        """Get cache statistics."""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self),
+            "max_entries": self.max_entries,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def clear(self):
+        """Remove all cached query embeddings."""
+        with self._lock:
+            self._entries.clear()
+
+
+class RerankScoreCache:
+    """
+    In-process LRU cache of LLM rerank scores with a TTL.
+
+    Keyed on (model, hash of the normalized query, hash of the document),
+    so candidates that come back for a repeated query are not re-scored.
+    Safe to share between threads.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = DEFAULT_RERANK_CACHE_SIZE,
+        ttl: float = DEFAULT_QUERY_CACHE_TTL,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Initialize the cache.
+
+        Args:
+            max_entries: Maximum number of cached scores.
+            ttl: Seconds a score stays valid.
+            clock: Time source (monotonic seconds).
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._clock = clock
+        self._entries: OrderedDict[tuple[str, str, str], tuple[float, float]] = OrderedDict()
+        self._lock = Lock()
+
+    @staticmethod
+    def _keys(model: str, query: str, documents: list[str]) -> list[tuple[str, str, str]]:
+        query_hash = hash_text(normalize_query(query))
+        return [(model, query_hash, hash_text(doc)) for doc in documents]
+
+    def get_many(self, model: str, query: str, documents: list[str]) -> list[Optional[float]]:
+        """Get cached scores aligned with documents (None for misses and expired entries)."""
+        scores = []
+        now = self._clock()
+        with self._lock:
+            for key in self._keys(model, query, documents):
+                entry = self._entries.get(key)
+                if entry is not None and now - entry[0] < self.ttl:
+                    self._entries.move_to_end(key)
+                    scores.append(entry[1])
+                    continue
+                if entry is not None:
+                    del self._entries[key]
+                scores.append(None)
+            hits = sum(score is not None for score in scores)
+            self.hits += hits
+            self.misses += len(scores) - hits
+        return scores
+
+    def put_many(self, model: str, query: str, documents: list[str], scores: list[float]):
+        """Store scores of documents for a query, evicting the least recently used if full."""
+        now = self._clock()
+        with self._lock:
+            for key, score in zip(self._keys(model, query, documents), scores):
+                self._entries[key] = (now, score)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def get_stats(self) -> dict:
+        """Get cache statistics."""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self),
+            "max_entries": self.max_entries,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def clear(self):
+        """Remove all cached scores."""
+        with self._lock:
+            self._entries.clear()
+
+
+class SemanticResultCache:
+    """
+    In-process cache of results keyed by query-embedding similarity.
+
+    A lookup hits when a cached query with the same key (e.g. filter and
+    result count) has an embedding within `threshold` cosine similarity of
+    the new query, so paraphrases of a question share results. All entries
+    are dropped when the revision of the underlying data changes.
+    """
+
+    def __init__(
+        self,
+        threshold: float = DEFAULT_SEMANTIC_CACHE_THRESHOLD,
+        max_entries: int = DEFAULT_SEMANTIC_CACHE_SIZE,
+    ):
+        """
+        Initialize the cache.
+
+        Args:
+            threshold: Minimum cosine similarity between query embeddings
+                for a cached result to be reused.
+            max_entries: Maximum number of cached results; the least
+                recently used is dropped first.
+        """
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._revision: Optional[Hashable] = None
+        self._next_id = 0
+        # entry id -> (key, unit-length query embedding, value)
+        self._entries: OrderedDict[int, tuple[Hashable, np.ndarray, Any]] = OrderedDict()
+        self._lock = Lock()
+
+    @staticmethod
+    def _unit(embedding: list[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        return vector / max(float(np.linalg.norm(vector)), 1e-12)
+
+    def validate(self, revision: Hashable):
+        """Drop all entries if the data revision differs from the cached one."""
+        with self._lock:
+            if revision != self._revision:
+                if self._entries:
+                    self.invalidations += 1
+                self._entries.clear()
+                self._revision = revision
+
+    def get(self, key: Hashable, embedding: list[float]) -> Optional[Any]:
+        """
+        Find a cached result for a similar query.
+
+        Args:
+            key: Exact-match part of the lookup.
+            embedding: Query embedding.
+
+        Returns:
+            The result of the most similar cached query, or None.
+        """
+        query = self._unit(embedding)
+        with self._lock:
+            candidates = [
+                (entry_id, vector)
+                for entry_id, (entry_key, vector, _) in self._entries.items()
+                if entry_key == key and vector.shape == query.shape
+            ]
+            if candidates:
+                similarities = np.stack([vector for _, vector in candidates]) @ query
+                best = int(np.argmax(similarities))
+                if similarities[best] >= self.threshold:
+                    entry_id = candidates[best][0]
+                    self._entries.move_to_end(entry_id)
+                    self.hits += 1
+                    return self._entries[entry_id][2]
+            self.misses += 1
+            return None
+
+    def put(self, key: Hashable, embedding: list[float], value: Any):
+        """Store the result of a query."""
+        vector = self._unit(embedding)
+        with self._lock:
+            self._entries[self._next_id] = (key, vector, value)
+            self._next_id += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def get_stats(self) -> dict:
+        """Get cache statistics."""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self),
+            "max_entries": self.max_entries,
+            "threshold": self.threshold,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "invalidations": self.invalidations,
+        }
+
+    def clear(self):
+        """Remove all cached results."""
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,274 @@
+"""
+Multi-stage retrieval cascade for ARBuilder.
+
+Retrieval runs as a sequence of stages, each more expensive than the last
+and applied to fewer candidates:
+
+1. "ann": approximate nearest-neighbour vector search, over an adaptive
+   candidate pool (see VectorDB.candidate_pool).
+2. "fusion": BM25 (and sparse symbol) hits fused with the vector ranking.
+3. "cross_encoder": local cross-encoder reordering, if one is configured.
+4. "llm": LLM reranking, if enabled.
+
+Every stage has a latency budget in milliseconds and a candidate cutoff
+(the most candidates it reorders and passes on). A stage that runs out of
+budget is abandoned and the cascade returns the best ranking so far, so a
+query takes at most about the sum of the budgets.
+"""
+
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from dataclasses import dataclass
+from functools import partial
+from typing import Callable, Optional
+
+import numpy as np
+from dotenv import load_dotenv
+
+from .fusion import top_indices
+from .reranker import CROSS_ENCODER_CANDIDATES, CrossEncoderReranker, Reranker
+from .vectordb import HYBRID_FUSION, VectorDB
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+CASCADE_STAGES = ("ann", "fusion", "cross_encoder", "llm")
+
+
+def parse_stage_settings(value: str) -> dict[str, float]:
+    """
+    Parse per-stage settings such as "cross_encoder=200,llm=2000".
+
+    Raises:
+        ValueError: If a stage name or value is invalid.
+    """
+    settings = {}
+    for item in value.split(","):
+        if not item.strip():
+            continue
+        name, _, setting = item.partition("=")
+        name = name.strip()
+        if name not in CASCADE_STAGES:
+            raise ValueError(
+                f"Unknown cascade stage: {name!r} (expected one of {', '.join(CASCADE_STAGES)})"
+            )
+        settings[name] = float(setting)
+    return settings
+
+
+# Latency budget per stage, in milliseconds (0 disables a stage). The ann
+# stage includes embedding the query.
+CASCADE_BUDGETS_MS = {
+    "ann": 500.0,
+    "fusion": 100.0,
+    "cross_encoder": 300.0,
+    "llm": 3000.0,
+    **parse_stage_settings(os.getenv("CASCADE_BUDGETS_MS", "")),
+}
+# Most candidates each stage passes on (for ann, the largest candidate pool;
+# unset: the adaptive pool decides). Never fewer than the results requested.
+CASCADE_CUTOFFS = {
+    "cross_encoder": CROSS_ENCODER_CANDIDATES,
+    "llm": 10,
+    **{
+        name: int(cutoff)
+        for name, cutoff in parse_stage_settings(os.getenv("CASCADE_CUTOFFS", "")).items()
+    },
+}
+# Whether get_stylus_context ends the cascade with LLM reranking ("true"/"false")
+CASCADE_LLM_RERANK = os.getenv("CASCADE_LLM_RERANK", "false").lower() == "true"
+# Threads running the budgeted stages. An abandoned stage keeps its thread
+# until it finishes, so a few spare threads keep later queries on time.
+CASCADE_WORKERS = 4
+
+_executor = ThreadPoolExecutor(max_workers=CASCADE_WORKERS, thread_name_prefix="cascade")
+
+
+@dataclass
+class CascadeStage:
+    """A cascade stage's latency budget and candidate cutoff."""
+
+    name: str
+    budget_ms: float
+    cutoff: Optional[int] = None
+
+
+def _select(results: dict, order: list[int]) -> dict:
+    """Query results reordered (and cut) to the given candidate positions."""
+    selected = {}
+    for key, value in results.items():
+        if isinstance(value, list) and value and isinstance(value[0], list):
+            value = [[value[0][i] for i in order]]
+        selected[key] = value
+    return selected
+
+
+class RetrievalCascade:
+    """
+    Retrieval in budgeted stages, from cheap ANN search to LLM reranking.
+
+    Results are Chroma-shaped (ids, documents, metadatas, distances), with
+    a 0-1 "relevance" per result from the last stage that ranked it and a
+    "cascade" trace: each stage's status ("ok", "timeout", "over_budget",
+    "error", "skipped" or "disabled"), time, budget and candidates.
+    """
+
+    def __init__(
+        self,
+        vectordb: VectorDB,
+        cross_encoder: Optional[CrossEncoderReranker] = None,
+        llm_reranker: Optional[Reranker] = None,
+        budgets_ms: Optional[dict[str, float]] = None,
+        cutoffs: Optional[dict[str, int]] = None,
+        executor: Optional[ThreadPoolExecutor] = None,
+    ):
+        """
+        Initialize the cascade.
+
+        Args:
+            vectordb: Database to search.
+            cross_encoder: Local cross-encoder for the cross_encoder stage.
+            llm_reranker: LLM reranker for the llm stage.
+            budgets_ms: Budget per stage name. Defaults to CASCADE_BUDGETS_MS.
+            cutoffs: Candidate cutoff per stage name. Defaults to CASCADE_CUTOFFS.
+            executor: Executor running the budgeted stages. Defaults to a
+                shared one with CASCADE_WORKERS threads.
+        """
+        self.vectordb = vectordb
+        self.cross_encoder = cross_encoder
+        self.llm_reranker = llm_reranker
+        budgets_ms = {**CASCADE_BUDGETS_MS, **(budgets_ms or {})}
+        cutoffs = {**CASCADE_CUTOFFS, **(cutoffs or {})}
+        self.stages = [
+            CascadeStage(name, budgets_ms[name], cutoffs.get(name)) for name in CASCADE_STAGES
+        ]
+        self.executor = executor or _executor
+
+    def _enabled(self, stage: CascadeStage) -> bool:
+        if stage.budget_ms <= 0:
+            return False
+        if stage.name == "cross_encoder":
+            return self.cross_encoder is not None
+        if stage.name == "llm":
+            return self.llm_reranker is not None
+        return True
+
+    def _run_budgeted(self, stage: CascadeStage, fn: Callable):
+        """Run a stage on the executor, returning (status, value) within its budget."""
+        future = self.executor.submit(fn)
+        try:
+            return "ok", future.result(timeout=stage.budget_ms / 1000)
+        except FutureTimeoutError:
+            # A running stage can't be interrupted; its result is ignored
+            future.cancel()
+            return "timeout", None
+        except Exception as e:
+            logger.error(f"Cascade stage {stage.name} failed: {e}")
+            return "error", None
+
+    def search(self, query_text: str, n_results: int = 5, where: Optional[dict] = None) -> dict:
+        """
+        Retrieve and rank results for a query through the cascade.
+
+        Args:
+            query_text: Query text.
+            n_results: Number of results to return.
+            where: Metadata filter.
+
+        Returns:
+            Query results with "relevance", "candidate_pool" and "cascade".
+        """
+        ann, *budgeted = self.stages
+        trace = []
+
+        # There is nothing to fall back on before ANN search, so it always
+        # runs to completion; past its budget, the cascade stops there
+        start = time.perf_counter()
+        pool = self.vectordb.candidate_pool(
+            query_text,
+            n_results,
+            where,
+            max_pool=max(n_results, ann.cutoff) if ann.cutoff else None,
+        )
+        embedding, vector_results = pool.pop("embedding"), pool.pop("results")
+        candidates = min(pool["size"], len(vector_results["ids"][0]))
+        best = _select(vector_results, list(range(candidates)))
+        best["relevance"] = [[max(0.0, 1.0 - d / 2.0) for d in best["distances"][0]]]
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        stopped = elapsed_ms > ann.budget_ms
+        trace.append({
+            "stage": ann.name,
+            "status": "over_budget" if stopped else "ok",
+            "elapsed_ms": round(elapsed_ms, 1),
+            "budget_ms": ann.budget_ms,
+            "candidates": len(best["ids"][0]),
+        })
+
+        for stage in budgeted:
+            if not self._enabled(stage):
+                trace.append({"stage": stage.name, "status": "disabled"})
+                continue
+            if stopped or not best["ids"][0]:
+                trace.append({"stage": stage.name, "status": "skipped"})
+                continue
+            cutoff = max(n_results, stage.cutoff) if stage.cutoff else None
+            documents = best["documents"][0][:cutoff]
+
+            if stage.name == "fusion":
+                fn = partial(
+                    self.vectordb.fuse_candidates,
+                    query_text, embedding, vector_results, cutoff or pool["size"], where,
+                )
+            elif stage.name == "cross_encoder":
+                fn = partial(self.cross_encoder.score, query_text, documents)
+            else:
+                fn = partial(self.llm_reranker.score, query_text, documents)
+
+            start = time.perf_counter()
+            status, value = self._run_budgeted(stage, fn)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+
+            if status == "ok" and stage.name == "fusion":
+                best = value
+                fused_scores = best.get("fused_scores", [[]])[0]
+                best["relevance"] = (
+                    [[min(1.0, score * 30) for score in fused_scores]]
+                    if HYBRID_FUSION == "rrf"
+                    else [[max(0.0, 1.0 - d / 2.0) for d in best["distances"][0]]]
+                )
+            elif status == "ok":
+                scores = np.asarray(value, dtype=np.float64)
+                # LLM scores are 0-10, cross-encoder scores 0-1
+                relevance = scores / 10.0 if stage.name == "llm" else scores
+                order = top_indices(scores).tolist()
+                best = _select(best, order)
+                best["relevance"] = [relevance[order].tolist()]
+            elif status == "timeout":
+                logger.warning(
+                    f"Cascade stage {stage.name} ran out of its {stage.budget_ms:.0f}ms budget, "
+                    f"returning the best results so far"
+                )
+                stopped = True
+
+            trace.append({
+                "stage": stage.name,
+                "status": status,
+                "elapsed_ms": round(elapsed_ms, 1),
+                "budget_ms": stage.budget_ms,
+                "candidates": len(best["ids"][0]),
+            })
+
+        best = _select(best, list(range(min(n_results, len(best["ids"][0])))))
+        best["candidate_pool"] = pool
+        best["cascade"] = trace
+        logger.info(f"Cascade for {query_text[:60]!r}: " + ", ".join(
+            f"{entry['stage']} {entry['status']}"
+            + (f" {entry['elapsed_ms']:.0f}ms/{entry['budget_ms']:.0f}ms ({entry['candidates']})"
+               if "elapsed_ms" in entry else "")
+            for entry in trace
+        ))
+        return best
@@ -1,27 +1,42 @@
 """
 Embedding generation for ARBuilder using OpenRouter API.
+
+Local CPU models (see local_embedder) implement the same EmbeddingBackend
+interface; create_embedding_client picks one from DEFAULT_EMBEDDING.
 """
 
+import asyncio
 import logging
 import os
 import time
-from typing import Optional
+from abc import ABC, abstractmethod
+from typing import AsyncIterator, Optional
 
 import httpx
+import tiktoken
 from dotenv import load_dotenv
 from tenacity import (
+    before_sleep_log,
     retry,
+    retry_if_exception_type,
     stop_after_attempt,
     wait_exponential,
-    retry_if_exception_type,
-    before_sleep_log,
 )
 
+from .cache import EmbeddingCache
+
 load_dotenv()
 
 OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
 DEFAULT_EMBEDDING_MODEL = os.getenv("DEFAULT_EMBEDDING", "google/gemini-embedding-001")
 
+# Request packing limits: each request carries at most this many tokens/items
+DEFAULT_MAX_BATCH_TOKENS = int(os.getenv("EMBEDDING_MAX_BATCH_TOKENS", "8192"))
+DEFAULT_MAX_BATCH_ITEMS = 100
+MIN_BATCH_TOKENS = 512
+
+_encoding: Optional[tiktoken.Encoding] = None
+
 # Configure logging
 logger = logging.getLogger(__name__)
 
@@ -29,7 +44,12 @@ logger = logging.getLogger(__name__)
 class EmbeddingAPIError(Exception):
     """Custom exception for embedding API errors."""
 
-    def __init__(self, message: str, status_code: Optional[int] = None, response_body: Optional[str] = None):
+    def __init__(
+        self,
+        message: str,
+        status_code: Optional[int] = None,
+        response_body: Optional[str] = None,
+    ):
         super().__init__(message)
         self.status_code = status_code
         self.response_body = response_body
@@ -43,7 +63,121 @@ class EmbeddingAPIError(Exception):
         return " | ".join(parts)
 
 
-class EmbeddingClient:
+class EmbeddingPayloadTooLargeError(EmbeddingAPIError):
+    """Raised when a batch is rejected (413) or times out and should be split."""
+
+
+def count_tokens(texts: list[str]) -> list[int]:
+    """Count tokens per text with tiktoken (cl100k_base)."""
+    global _encoding
+    if _encoding is None:
+        _encoding = tiktoken.get_encoding("cl100k_base")
+    return [len(tokens) for tokens in _encoding.encode_ordinary_batch(texts)]
+
+
+def pack_batches(
+    token_counts: list[int],
+    max_tokens: int = DEFAULT_MAX_BATCH_TOKENS,
+    max_items: int = DEFAULT_MAX_BATCH_ITEMS,
+) -> list[tuple[int, int]]:
+    """
+    Pack consecutive texts into request batches under a token and item ceiling.
+
+    Texts larger than max_tokens on their own get a batch of their own.
+
+    Args:
+        token_counts: Token count per text.
+        max_tokens: Maximum total tokens per batch.
+        max_items: Maximum number of texts per batch.
+
+    Returns:
+        List of (start, end) index ranges, in order.
+    """
+    ranges = []
+    start = 0
+    batch_tokens = 0
+
+    for i, tokens in enumerate(token_counts):
+        if i > start and (batch_tokens + tokens > max_tokens or i - start >= max_items):
+            ranges.append((start, i))
+            start = i
+            batch_tokens = 0
+        batch_tokens += tokens
+
+    if start < len(token_counts):
+        ranges.append((start, len(token_counts)))
+
+    return ranges
+
+
+class EmbeddingBackend(ABC):
+    """
+    Interface of the synchronous embedding clients.
+
+    Implementations expose the model name (the cache and collection
+    metadata key), their EmbeddingCache (or None) as cache, and the token
+    budget ingestion packs batches by as max_batch_tokens.
+    """
+
+    model: str
+    cache: Optional[EmbeddingCache]
+    max_batch_tokens: int
+
+    @abstractmethod
+    def embed(self, text: str) -> list[float]:
+        """Generate embedding for a single text."""
+
+    @abstractmethod
+    def embed_batch(
+        self,
+        texts: list[str],
+        batch_size: int = DEFAULT_MAX_BATCH_ITEMS,
+        token_counts: Optional[list[int]] = None,
+    ) -> list[list[float]]:
+        """Generate embeddings for a batch of texts."""
+
+    def get_dimension(self) -> int:
+        """Get the embedding dimension by running a test embedding."""
+        return len(self.embed("test"))
+
+    def get_cache_stats(self) -> Optional[dict]:
+        """Get embedding cache statistics, or None if caching is disabled."""
+        return self.cache.get_stats() if self.cache is not None else None
+
+    def close(self):
+        """Release resources held by the client."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def create_embedding_client(model: Optional[str] = None, **kwargs) -> EmbeddingBackend:
+    """
+    Create the embedding client for a model.
+
+    Local models ("onnx:<model dir>" or "sentence-transformers:<name>") run
+    in-process on CPU; any other model is served by OpenRouter.
+
+    Args:
+        model: Embedding model. Defaults to the DEFAULT_EMBEDDING env var.
+        **kwargs: Passed to the client (cache, use_cache, ...).
+
+    Returns:
+        A LocalEmbeddingClient or an EmbeddingClient.
+    """
+    from .local_embedder import LocalEmbeddingClient, parse_local_model
+
+    model = model or DEFAULT_EMBEDDING_MODEL
+    if parse_local_model(model):
+        local_kwargs = {k: v for k, v in kwargs.items() if k in ("cache", "use_cache")}
+        return LocalEmbeddingClient(model, **local_kwargs)
+    return EmbeddingClient(model=model, **kwargs)
+
+
+class EmbeddingClient(EmbeddingBackend):
     """
     Client for generating embeddings via OpenRouter API.
     """
@@ -53,6 +187,9 @@ class EmbeddingClient:
         api_key: Optional[str] = None,
         model: Optional[str] = None,
         base_url: str = "https://openrouter.ai/api/v1",
+        cache: Optional[EmbeddingCache] = None,
+        use_cache: bool = True,
+        max_batch_tokens: int = DEFAULT_MAX_BATCH_TOKENS,
     ):
         """
         Initialize the embedding client.
@@ -61,14 +198,22 @@ class EmbeddingClient:
             api_key: OpenRouter API key. Defaults to env var.
             model: Embedding model to use. Defaults to env var.
             base_url: OpenRouter API base URL.
+            cache: Embedding cache to use. Defaults to the on-disk cache.
+            use_cache: Whether to cache embeddings on disk.
+            max_batch_tokens: Token budget per request. Shrinks automatically
+                when the provider rejects or times out on a batch.
         """
         self.api_key = api_key or OPENROUTER_API_KEY
         self.model = model or DEFAULT_EMBEDDING_MODEL
         self.base_url = base_url
+        self.max_batch_tokens = max_batch_tokens
 
         if not self.api_key:
             raise ValueError("OPENROUTER_API_KEY is required")
 
+        self.cache = (cache if cache is not None else EmbeddingCache()) if use_cache else None
+        self._owns_cache = cache is None
+
         self.client = httpx.Client(
             base_url=self.base_url,
             headers={
@@ -85,6 +230,13 @@ class EmbeddingClient:
         # Retry on rate limits (429) and server errors (5xx)
         return status_code == 429 or status_code >= 500
 
+    def _shrink_batch_budget(self, batch_tokens: int):
+        """Halve the per-request token budget after a rejected batch."""
+        new_budget = max(MIN_BATCH_TOKENS, min(self.max_batch_tokens, batch_tokens) // 2)
+        if new_budget < self.max_batch_tokens:
+            logger.info(f"Shrinking embedding batch budget to {new_budget} tokens")
+            self.max_batch_tokens = new_budget
+
     def _parse_embedding_response(self, data: dict, expected_count: int = 1) -> list[list[float]]:
         """
         Parse embedding response with validation.
@@ -107,14 +259,14 @@ class EmbeddingClient:
 
         if "data" not in data:
             raise EmbeddingAPIError(
-                f"Invalid response format: missing 'data' field",
+                "Invalid response format: missing 'data' field",
                 response_body=str(data)[:500]
             )
 
         embeddings_data = data["data"]
         if not isinstance(embeddings_data, list) or len(embeddings_data) == 0:
             raise EmbeddingAPIError(
-                f"Invalid response format: 'data' is empty or not a list",
+                "Invalid response format: 'data' is empty or not a list",
                 response_body=str(data)[:500]
             )
 
@@ -135,13 +287,15 @@ class EmbeddingClient:
     @retry(
         stop=stop_after_attempt(5),
         wait=wait_exponential(multiplier=1, min=2, max=30),
-        retry=retry_if_exception_type((httpx.HTTPStatusError, httpx.TimeoutException, EmbeddingAPIError)),
+        retry=retry_if_exception_type(
+            (httpx.HTTPStatusError, httpx.TimeoutException, EmbeddingAPIError)
+        ),
         before_sleep=before_sleep_log(logger, logging.WARNING),
         reraise=True,
     )
-    def embed(self, text: str) -> list[float]:
+    def _embed_single(self, text: str) -> list[float]:
         """
-        Generate embedding for a single text.
+        Generate embedding for a single text via the API, bypassing the cache.
 
         Args:
             text: Text to embed.
@@ -180,7 +334,7 @@ class EmbeddingClient:
                 )
             else:
                 raise EmbeddingAPIError(
-                    f"Non-retryable API error",
+                    "Non-retryable API error",
                     status_code=response.status_code,
                     response_body=response_text
                 )
@@ -189,11 +343,37 @@ class EmbeddingClient:
             data = response.json()
         except Exception as e:
             logger.error(f"Failed to parse embedding response as JSON: {e}")
-            raise EmbeddingAPIError(f"Invalid JSON response: {e}", response_body=response.text[:500])
+            raise EmbeddingAPIError(
+                f"Invalid JSON response: {e}", response_body=response.text[:500]
+            )
 
         embeddings = self._parse_embedding_response(data, expected_count=1)
         return embeddings[0]
 
+    def embed(self, text: str) -> list[float]:
+        """
+        Generate embedding for a single text.
+
+        Args:
+            text: Text to embed.
+
+        Returns:
+            Embedding vector as list of floats.
+
+        Raises:
+            EmbeddingAPIError: If embedding generation fails after retries.
+        """
+        if self.cache is not None:
+            cached = self.cache.get(self.model, text)
+            if cached is not None:
+                return cached
+
+        embedding = self._embed_single(text)
+
+        if self.cache is not None:
+            self.cache.put(self.model, text, embedding)
+        return embedding
+
     def _embed_batch_single(self, batch: list[str], batch_index: int) -> list[list[float]]:
         """
         Generate embeddings for a single batch with retry logic.
@@ -221,12 +401,16 @@ class EmbeddingClient:
                 logger.warning(
                     f"Timeout on batch {batch_index}, attempt {attempt + 1}/{max_retries}: {e}"
                 )
+                if len(batch) > 1:
+                    raise EmbeddingPayloadTooLargeError(f"Timeout on batch {batch_index}")
                 if attempt < max_retries - 1:
                     delay = base_delay * (2 ** attempt)
                     logger.info(f"Retrying batch {batch_index} in {delay}s...")
                     time.sleep(delay)
                     continue
-                raise EmbeddingAPIError(f"Timeout after {max_retries} attempts on batch {batch_index}")
+                raise EmbeddingAPIError(
+                    f"Timeout after {max_retries} attempts on batch {batch_index}"
+                )
 
             # Handle HTTP errors
             if response.status_code != 200:
@@ -236,6 +420,13 @@ class EmbeddingClient:
                     f"status={response.status_code}, response={response_text}"
                 )
 
+                if response.status_code == 413:
+                    raise EmbeddingPayloadTooLargeError(
+                        f"Payload too large on batch {batch_index}",
+                        status_code=413,
+                        response_body=response_text,
+                    )
+
                 if self._is_retryable_error(response.status_code) and attempt < max_retries - 1:
                     # Exponential backoff with extra delay for rate limits
                     delay = base_delay * (2 ** attempt)
@@ -277,19 +468,69 @@ class EmbeddingClient:
                     continue
                 raise
 
-        raise EmbeddingAPIError(f"Failed to process batch {batch_index} after {max_retries} attempts")
+        raise EmbeddingAPIError(
+            f"Failed to process batch {batch_index} after {max_retries} attempts"
+        )
+
+    def _embed_adaptive(
+        self,
+        batch: list[str],
+        token_counts: list[int],
+        batch_index: int,
+    ) -> list[list[float]]:
+        """
+        Embed a batch, splitting it in half whenever it is too large.
+
+        Args:
+            batch: List of texts to embed.
+            token_counts: Token count per text.
+            batch_index: Index of this batch (for logging).
+
+        Returns:
+            List of embedding vectors.
+        """
+        batch_tokens = sum(token_counts)
+        if len(batch) > 1 and batch_tokens > self.max_batch_tokens:
+            # Budget shrank after this batch was packed
+            ranges = pack_batches(token_counts, self.max_batch_tokens, len(batch))
+            return [
+                embedding
+                for start, end in ranges
+                for embedding in self._embed_adaptive(
+                    batch[start:end], token_counts[start:end], batch_index
+                )
+            ]
+
+        try:
+            return self._embed_batch_single(batch, batch_index)
+        except EmbeddingPayloadTooLargeError:
+            if len(batch) == 1:
+                raise
+            self._shrink_batch_budget(batch_tokens)
+            mid = len(batch) // 2
+            logger.info(f"Splitting batch {batch_index} into {mid} + {len(batch) - mid} texts")
+            return (
+                self._embed_adaptive(batch[:mid], token_counts[:mid], batch_index)
+                + self._embed_adaptive(batch[mid:], token_counts[mid:], batch_index)
+            )
 
     def embed_batch(
         self,
         texts: list[str],
-        batch_size: int = 50,  # Reduced from 100 for better rate limit handling
+        batch_size: int = DEFAULT_MAX_BATCH_ITEMS,
+        token_counts: Optional[list[int]] = None,
     ) -> list[list[float]]:
         """
         Generate embeddings for a batch of texts.
 
+        Cached embeddings are filled in locally; only cache misses are sent
+        to the API. Requests are packed up to max_batch_tokens and batch_size.
+
         Args:
             texts: List of texts to embed.
-            batch_size: Number of texts per API call (default: 50).
+            batch_size: Maximum number of texts per API call (default: 100).
+            token_counts: Token count per text (e.g. chunk "token_count").
+                Counted with tiktoken when not provided.
 
         Returns:
             List of embedding vectors.
@@ -297,41 +538,466 @@ class EmbeddingClient:
         Raises:
             EmbeddingAPIError: If embedding generation fails after retries.
         """
-        all_embeddings = []
-        total_batches = (len(texts) + batch_size - 1) // batch_size
+        if self.cache is None:
+            return self._embed_uncached(texts, batch_size, token_counts)
 
-        logger.info(f"Processing {len(texts)} texts in {total_batches} batches (batch_size={batch_size})")
+        results = self.cache.get_many(self.model, texts)
+        miss_indices = [i for i, r in enumerate(results) if r is None]
 
-        for i in range(0, len(texts), batch_size):
-            batch = texts[i:i + batch_size]
-            batch_index = i // batch_size + 1
+        if miss_indices:
+            logger.info(
+                f"Embedding cache: {len(texts) - len(miss_indices)} hits, "
+                f"{len(miss_indices)} misses"
+            )
+            miss_texts = [texts[i] for i in miss_indices]
+            miss_counts = [token_counts[i] for i in miss_indices] if token_counts else None
+            embeddings = self._embed_uncached(miss_texts, batch_size, miss_counts)
+            self.cache.put_many(self.model, miss_texts, embeddings)
+            for i, embedding in zip(miss_indices, embeddings):
+                results[i] = embedding
+        else:
+            logger.info(f"Embedding cache: all {len(texts)} texts cached")
+
+        return results
+
+    def _embed_uncached(
+        self,
+        texts: list[str],
+        batch_size: int = DEFAULT_MAX_BATCH_ITEMS,
+        token_counts: Optional[list[int]] = None,
+    ) -> list[list[float]]:
+        """
+        Generate embeddings for a batch of texts via the API.
+
+        Args:
+            texts: List of texts to embed.
+            batch_size: Maximum number of texts per API call.
+            token_counts: Token count per text. Counted when not provided.
 
+        Returns:
+            List of embedding vectors.
+
+        Raises:
+            EmbeddingAPIError: If embedding generation fails after retries.
+        """
+        all_embeddings = []
+        counts = token_counts or count_tokens(texts)
+        ranges = pack_batches(counts, self.max_batch_tokens, batch_size)
+        total_batches = len(ranges)
+
+        logger.info(
+            f"Processing {len(texts)} texts in {total_batches} batches "
+            f"(max_tokens={self.max_batch_tokens}, max_items={batch_size})"
+        )
+
+        for batch_index, (start, end) in enumerate(ranges, start=1):
             try:
-                embeddings = self._embed_batch_single(batch, batch_index)
+                embeddings = self._embed_adaptive(texts[start:end], counts[start:end], batch_index)
                 all_embeddings.extend(embeddings)
-                logger.debug(f"Batch {batch_index}/{total_batches} completed: {len(embeddings)} embeddings")
+                logger.debug(
+                    f"Batch {batch_index}/{total_batches} completed: {len(embeddings)} embeddings"
+                )
             except EmbeddingAPIError as e:
                 logger.error(f"Failed to process batch {batch_index}/{total_batches}: {e}")
                 raise
 
-            # Rate limiting between batches
-            if i + batch_size < len(texts):
-                time.sleep(1.0)  # Increased from 0.5 for better rate limit handling
-
         logger.info(f"Successfully generated {len(all_embeddings)} embeddings")
         return all_embeddings
 
-    def get_dimension(self) -> int:
-        """Get the embedding dimension by running a test embedding."""
-        test_embedding = self.embed("test")
-        return len(test_embedding)
-
     def close(self):
-        """Close the HTTP client."""
+        """Close the HTTP client and the cache (if owned by this client)."""
         self.client.close()
+        if self.cache is not None and self._owns_cache:
+            self.cache.close()
 
-    def __enter__(self):
+
+def _parse_retry_after(response: httpx.Response) -> Optional[float]:
+    """Parse a Retry-After header given in seconds, if present."""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        return None
+
+
+class AsyncRateLimiter:
+    """
+    Token-bucket rate limiter with adaptive refill rate.
+
+    The refill rate backs off multiplicatively on 429 responses (honouring
+    Retry-After when given) and recovers additively on successful requests,
+    so throughput converges on whatever the provider actually allows.
+    """
+
+    def __init__(
+        self,
+        rate: float = 5.0,
+        burst: int = 5,
+        min_rate: float = 0.2,
+        max_rate: float = 50.0,
+    ):
+        """
+        Initialize the rate limiter.
+
+        Args:
+            rate: Initial requests per second.
+            burst: Maximum number of tokens that can accumulate.
+            min_rate: Lower bound for the adaptive rate.
+            max_rate: Upper bound for the adaptive rate.
+        """
+        self.rate = rate
+        self.burst = burst
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float):
+        elapsed = now - self._updated
+        self._tokens = min(self.burst, self._tokens + elapsed * self.rate)
+        self._updated = now
+
+    async def acquire(self):
+        """Wait until a request may be sent."""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._blocked_until:
+                    await asyncio.sleep(self._blocked_until - now)
+                    continue
+
+                self._refill(now)
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    def on_success(self):
+        """Additively increase the rate after a successful request."""
+        self.rate = min(self.max_rate, self.rate + 0.1)
+
+    def on_rate_limited(self, retry_after: Optional[float] = None):
+        """Back off after a 429 response."""
+        self.rate = max(self.min_rate, self.rate / 2)
+        self._tokens = 0.0
+        pause = retry_after if retry_after is not None else 1.0 / self.rate
+        self._blocked_until = max(self._blocked_until, time.monotonic() + pause)
+        logger.info(f"Rate limited. Pausing {pause:.1f}s, rate now {self.rate:.2f} req/s")
+
+
+class AsyncEmbeddingClient:
+    """
+    Async client for generating embeddings via OpenRouter API.
+
+    Bounds in-flight requests with a semaphore and paces them with an
+    adaptive token-bucket limiter instead of fixed sleeps.
+    """
+
+    _is_retryable_error = EmbeddingClient._is_retryable_error
+    _parse_embedding_response = EmbeddingClient._parse_embedding_response
+    _shrink_batch_budget = EmbeddingClient._shrink_batch_budget
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        model: Optional[str] = None,
+        base_url: str = "https://openrouter.ai/api/v1",
+        cache: Optional[EmbeddingCache] = None,
+        use_cache: bool = True,
+        max_concurrency: int = 4,
+        rate_limiter: Optional[AsyncRateLimiter] = None,
+        max_retries: int = 5,
+        max_batch_tokens: int = DEFAULT_MAX_BATCH_TOKENS,
+    ):
+        """
+        Initialize the async embedding client.
+
+        Args:
+            api_key: OpenRouter API key. Defaults to env var.
+            model: Embedding model to use. Defaults to env var.
+            base_url: OpenRouter API base URL.
+            cache: Embedding cache to use. Defaults to the on-disk cache.
+            use_cache: Whether to cache embeddings on disk.
+            max_concurrency: Maximum number of in-flight requests.
+            rate_limiter: Rate limiter to use. Defaults to a new limiter.
+            max_retries: Attempts per batch before giving up.
+            max_batch_tokens: Token budget per request. Shrinks automatically
+                when the provider rejects or times out on a batch.
+        """
+        self.api_key = api_key or OPENROUTER_API_KEY
+        self.model = model or DEFAULT_EMBEDDING_MODEL
+        self.base_url = base_url
+        self.max_retries = max_retries
+        self.max_batch_tokens = max_batch_tokens
+
+        if not self.api_key:
+            raise ValueError("OPENROUTER_API_KEY is required")
+
+        self.cache = (cache if cache is not None else EmbeddingCache()) if use_cache else None
+        self._owns_cache = cache is None
+        self.rate_limiter = rate_limiter or AsyncRateLimiter()
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+        self.client = httpx.AsyncClient(
+            base_url=self.base_url,
+            headers={
+                "Authorization": f"Bearer {self.api_key}",
+                "Content-Type": "application/json",
+                "HTTP-Referer": "https://github.com/arbbuilder",
+                "X-Title": "ARBuilder",
+            },
+            timeout=60.0,
+        )
+
+    async def _post_batch(self, batch: list[str], batch_index: int) -> list[list[float]]:
+        """
+        Send a single batch to the API with retries.
+
+        Args:
+            batch: List of texts to embed.
+            batch_index: Index of this batch (for logging).
+
+        Returns:
+            List of embedding vectors.
+
+        Raises:
+            EmbeddingAPIError: If the batch fails after all retries.
+        """
+        base_delay = 2
+
+        for attempt in range(self.max_retries):
+            last_attempt = attempt == self.max_retries - 1
+            await self.rate_limiter.acquire()
+
+            try:
+                async with self._semaphore:
+                    response = await self.client.post(
+                        "/embeddings",
+                        json={"model": self.model, "input": batch},
+                    )
+            except httpx.TimeoutException as e:
+                logger.warning(
+                    f"Timeout on batch {batch_index}, attempt {attempt + 1}/{self.max_retries}: {e}"
+                )
+                if len(batch) > 1:
+                    raise EmbeddingPayloadTooLargeError(f"Timeout on batch {batch_index}")
+                if last_attempt:
+                    raise EmbeddingAPIError(
+                        f"Timeout after {self.max_retries} attempts on batch {batch_index}"
+                    )
+                await asyncio.sleep(base_delay * (2 ** attempt))
+                continue
+            except httpx.TransportError as e:
+                # Dropped connections and protocol errors are usually transient
+                logger.warning(
+                    f"Connection error on batch {batch_index}, "
+                    f"attempt {attempt + 1}/{self.max_retries}: {type(e).__name__}: {e}"
+                )
+                if last_attempt:
+                    raise EmbeddingAPIError(
+                        f"Connection error after {self.max_retries} attempts on batch "
+                        f"{batch_index}: {type(e).__name__}: {e}"
+                    )
+                await asyncio.sleep(base_delay * (2 ** attempt))
+                continue
+
+            if response.status_code == 429:
+                self.rate_limiter.on_rate_limited(_parse_retry_after(response))
+                if last_attempt:
+                    raise EmbeddingAPIError(
+                        f"Rate limited on batch {batch_index}",
+                        status_code=429,
+                        response_body=response.text[:500],
+                    )
+                continue
+
+            if response.status_code != 200:
+                response_text = response.text[:500] if response.text else "No response body"
+                logger.warning(
+                    f"Batch {batch_index} API error (attempt {attempt + 1}/{self.max_retries}): "
+                    f"status={response.status_code}, response={response_text}"
+                )
+                if response.status_code == 413:
+                    raise EmbeddingPayloadTooLargeError(
+                        f"Payload too large on batch {batch_index}",
+                        status_code=413,
+                        response_body=response_text,
+                    )
+                if self._is_retryable_error(response.status_code) and not last_attempt:
+                    await asyncio.sleep(base_delay * (2 ** attempt))
+                    continue
+                raise EmbeddingAPIError(
+                    f"API error on batch {batch_index}",
+                    status_code=response.status_code,
+                    response_body=response_text,
+                )
+
+            try:
+                embeddings = self._parse_embedding_response(response.json(), len(batch))
+                if len(embeddings) != len(batch):
+                    raise EmbeddingAPIError(
+                        f"Expected {len(batch)} embeddings, got {len(embeddings)}"
+                    )
+            except (ValueError, EmbeddingAPIError) as e:
+                logger.warning(f"Batch {batch_index} parse error (attempt {attempt + 1}): {e}")
+                if last_attempt:
+                    raise EmbeddingAPIError(
+                        f"Invalid response on batch {batch_index}: {e}",
+                        response_body=response.text[:500],
+                    )
+                await asyncio.sleep(base_delay * (2 ** attempt))
+                continue
+
+            self.rate_limiter.on_success()
+            return embeddings
+
+        raise EmbeddingAPIError(
+            f"Failed to process batch {batch_index} after {self.max_retries} attempts"
+        )
+
+    async def _embed_adaptive(
+        self,
+        batch: list[str],
+        token_counts: list[int],
+        batch_index: int,
+    ) -> list[list[float]]:
+        """Embed a batch, splitting it whenever it is over budget or rejected as too large."""
+        batch_tokens = sum(token_counts)
+        if len(batch) > 1 and batch_tokens > self.max_batch_tokens:
+            ranges = pack_batches(token_counts, self.max_batch_tokens, len(batch))
+        else:
+            try:
+                return await self._post_batch(batch, batch_index)
+            except EmbeddingPayloadTooLargeError:
+                if len(batch) == 1:
+                    raise
+                self._shrink_batch_budget(batch_tokens)
+                mid = len(batch) // 2
+                logger.info(f"Splitting batch {batch_index} into {mid} + {len(batch) - mid} texts")
+                ranges = [(0, mid), (mid, len(batch))]
+
+        parts = await asyncio.gather(*[
+            self._embed_adaptive(batch[start:end], token_counts[start:end], batch_index)
+            for start, end in ranges
+        ])
+        return [embedding for part in parts for embedding in part]
+
+    async def embed_batch(
+        self,
+        texts: list[str],
+        batch_size: int = DEFAULT_MAX_BATCH_ITEMS,
+        token_counts: Optional[list[int]] = None,
+    ) -> list[list[float]]:
+        """
+        Generate embeddings for a list of texts, sending batches concurrently.
+
+        Args:
+            texts: List of texts to embed.
+            batch_size: Maximum number of texts per API call.
+            token_counts: Token count per text. Counted when not provided.
+
+        Returns:
+            List of embedding vectors aligned with texts.
+
+        Raises:
+            EmbeddingAPIError: If any batch fails after retries.
+        """
+        counts = token_counts or count_tokens(texts)
+        ranges = pack_batches(counts, self.max_batch_tokens, batch_size)
+        results = []
+        async for _, embeddings in self.embed_batches(
+            [texts[start:end] for start, end in ranges],
+            [counts[start:end] for start, end in ranges],
+        ):
+            if isinstance(embeddings, Exception):
+                raise embeddings
+            results.extend(embeddings)
+        return results
+
+    async def embed_batches(
+        self,
+        batches: list[list[str]],
+        token_counts: Optional[list[list[int]]] = None,
+    ) -> AsyncIterator[tuple[int, list[list[float]] | Exception]]:
+        """
+        Embed several batches concurrently, yielding results in batch order.
+
+        Each batch result is yielded as soon as it and all earlier batches are
+        done, so consumers can stream results into storage while later
+        batches are still in flight. A failed batch yields its exception
+        (usually EmbeddingAPIError) instead of embeddings; the remaining
+        batches are unaffected.
+
+        Args:
+            batches: Batches of texts to embed.
+            token_counts: Token counts per text for each batch. Counted when
+                not provided; used to split batches that exceed the budget.
+
+        Yields:
+            Tuples of (batch index, embeddings or exception).
+        """
+        if token_counts is None:
+            token_counts = [count_tokens(batch) for batch in batches]
+
+        tasks = [
+            asyncio.create_task(self._embed_cached(batch, counts, i + 1))
+            for i, (batch, counts) in enumerate(zip(batches, token_counts))
+        ]
+        try:
+            for i, task in enumerate(tasks):
+                try:
+                    embeddings = await task
+                except Exception as e:
+                    logger.error(f"Embedding failed on batch {i + 1}: {type(e).__name__}: {e}")
+                    embeddings = e
+                yield i, embeddings
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _embed_cached(
+        self,
+        batch: list[str],
+        token_counts: list[int],
+        batch_index: int,
+    ) -> list[list[float]]:
+        """Embed a batch, filling cache hits locally and sending only misses."""
+        if self.cache is None:
+            return await self._embed_adaptive(batch, token_counts, batch_index)
+
+        results = self.cache.get_many(self.model, batch)
+        miss_indices = [i for i, r in enumerate(results) if r is None]
+        if not miss_indices:
+            return results
+
+        miss_texts = [batch[i] for i in miss_indices]
+        miss_counts = [token_counts[i] for i in miss_indices]
+        embeddings = await self._embed_adaptive(miss_texts, miss_counts, batch_index)
+        if len(embeddings) != len(miss_texts):
+            raise EmbeddingAPIError(
+                f"Batch {batch_index}: expected {len(miss_texts)} embeddings, got {len(embeddings)}"
+            )
+        self.cache.put_many(self.model, miss_texts, embeddings)
+        for i, embedding in zip(miss_indices, embeddings):
+            results[i] = embedding
+        return results
+
+    def get_cache_stats(self) -> Optional[dict]:
+        """Get embedding cache statistics, or None if caching is disabled."""
+        return self.cache.get_stats() if self.cache is not None else None
+
+    async def aclose(self):
+        """Close the HTTP client and the cache (if owned by this client)."""
+        await self.client.aclose()
+        if self.cache is not None and self._owns_cache:
+            self.cache.close()
+
+    async def __aenter__(self):
         return self
 
-    def __exit__(self, exc_type, exc_val, exc_tb):
-        self.close()
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.aclose()
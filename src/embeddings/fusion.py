@@ -0,0 +1,122 @@
+"""
+Rank fusion for ARBuilder.
+
+Fuses any number of retrieval signals (vector, BM25, sparse symbols, ...)
+over one candidate set. Each signal is a score array aligned with the
+candidates, higher is better, NaN where the retriever didn't return the
+candidate; everything is computed on (signals x candidates) arrays, so an
+extra retriever costs microseconds.
+
+Methods:
+- "rrf": Reciprocal Rank Fusion, sum of weight / (k + rank).
+- "combsum": weighted sum of min-max normalized scores.
+- "zscore": weighted sum of standardized scores.
+"""
+
+from typing import Optional, Sequence
+
+import numpy as np
+
+FUSION_METHODS = ("rrf", "combsum", "zscore")
+
+
+def ranking_scores(ranking: Sequence[int], n: int) -> np.ndarray:
+    """
+    Scores for a ranked list of candidate indices (best first).
+
+    Args:
+        ranking: Candidate indices, best first.
+        n: Number of candidates.
+
+    Returns:
+        Scores preserving the ranking's order, NaN for unranked candidates.
+    """
+    scores = np.full(n, np.nan)
+    ranking = np.asarray(ranking, dtype=np.int64)
+    scores[ranking] = np.arange(len(ranking), 0, -1, dtype=np.float64)
+    return scores
+
+
+def ranks(scores: np.ndarray) -> np.ndarray:
+    """
+    1-based ranks by descending score, per row.
+
+    Ties keep candidate order; missing (NaN) candidates get rank 0.
+
+    Args:
+        scores: Scores, one row per signal (or a single row).
+
+    Returns:
+        int64 ranks shaped like scores.
+    """
+    scores = np.asarray(scores, dtype=np.float64)
+    matrix = np.atleast_2d(scores)
+    missing = np.isnan(matrix)
+    order = np.argsort(-np.where(missing, -np.inf, matrix), axis=1, kind="stable")
+    result = np.empty(matrix.shape, dtype=np.int64)
+    positions = np.broadcast_to(np.arange(1, matrix.shape[1] + 1), matrix.shape)
+    np.put_along_axis(result, order, positions, axis=1)
+    result[missing] = 0
+    return result.reshape(scores.shape)
+
+
+def fuse(
+    scores: Sequence[np.ndarray],
+    method: str = "rrf",
+    weights: Optional[Sequence[float]] = None,
+    rrf_k: int = 60,
+) -> np.ndarray:
+    """
+    Fuse retrieval signals into one score per candidate.
+
+    Args:
+        scores: One score array per signal, aligned with the candidates
+            (higher is better, NaN where the signal has no score).
+        method: "rrf", "combsum" or "zscore".
+        weights: Weight per signal. Defaults to 1 each.
+        rrf_k: RRF constant (higher gives lower ranks more weight).
+
+    Returns:
+        float64 fused scores (higher is better). A candidate missing from
+        every signal scores lowest.
+    """
+    matrix = np.atleast_2d(np.asarray(scores, dtype=np.float64))
+    weights = np.ones(len(matrix)) if weights is None else np.asarray(weights, dtype=np.float64)
+    if weights.shape != (len(matrix),):
+        raise ValueError(f"Expected {len(matrix)} fusion weights, got {len(weights)}")
+    missing = np.isnan(matrix)
+
+    if method == "rrf":
+        contributions = np.where(missing, 0.0, 1.0 / (rrf_k + ranks(matrix)))
+    elif method == "combsum":
+        low = np.min(np.where(missing, np.inf, matrix), axis=1, keepdims=True)
+        high = np.max(np.where(missing, -np.inf, matrix), axis=1, keepdims=True)
+        spread = np.where(high > low, high - low, 1.0)
+        # A signal with one distinct value gives each of its candidates 1
+        normalized = np.where(high > low, (matrix - low) / spread, 1.0)
+        contributions = np.where(missing, 0.0, normalized)
+    elif method == "zscore":
+        counts = np.maximum((~missing).sum(axis=1, keepdims=True), 1)
+        filled = np.where(missing, 0.0, matrix)
+        mean = filled.sum(axis=1, keepdims=True) / counts
+        squares = (np.where(missing, 0.0, matrix - mean) ** 2).sum(axis=1, keepdims=True)
+        std = np.sqrt(squares / counts)
+        z = np.where(std > 0, (filled - mean) / np.where(std > 0, std, 1.0), 0.0)
+        # Missing candidates rank with the signal's worst candidate
+        floor = np.min(np.where(missing, np.inf, z), axis=1, keepdims=True)
+        contributions = np.where(missing, np.where(np.isfinite(floor), floor, 0.0), z)
+    else:
+        raise ValueError(
+            f"Unknown fusion method: {method} (expected one of {', '.join(FUSION_METHODS)})"
+        )
+
+    fused = weights @ contributions
+    # Candidates no signal returned go last
+    fused[missing.all(axis=0)] = -np.inf
+    return fused
+
+
+def top_indices(fused: np.ndarray, top_k: Optional[int] = None) -> np.ndarray:
+    """Candidate indices by descending fused score (ties keep candidate order)."""
+    order = np.argsort(-fused, kind="stable")
+    return order if top_k is None else order[:top_k]
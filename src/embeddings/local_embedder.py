@@ -0,0 +1,324 @@
+"""
+Local CPU embedding backends for ARBuilder.
+
+Embeds text in-process, without network calls, using either ONNX Runtime
+(a directory with model.onnx and tokenizer.json, e.g. an exported
+sentence-transformers model) or sentence-transformers. Selected through
+DEFAULT_EMBEDDING with a backend prefix:
+
+    DEFAULT_EMBEDDING=onnx:/models/bge-small-en-v1.5
+    DEFAULT_EMBEDDING=sentence-transformers:BAAI/bge-small-en-v1.5
+"""
+
+import asyncio
+import logging
+import os
+from pathlib import Path
+from typing import AsyncIterator, Callable, Optional
+
+import numpy as np
+
+from .cache import EmbeddingCache
+from .embedder import DEFAULT_MAX_BATCH_TOKENS, EmbeddingBackend
+
+# ONNX Runtime support is optional
+try:
+    import onnxruntime
+    from tokenizers import Tokenizer
+    HAS_ONNXRUNTIME = True
+except ImportError:
+    HAS_ONNXRUNTIME = False
+
+# sentence-transformers support is optional
+try:
+    from sentence_transformers import SentenceTransformer
+    HAS_SENTENCE_TRANSFORMERS = True
+except ImportError:
+    HAS_SENTENCE_TRANSFORMERS = False
+
+LOCAL_BACKENDS = ("onnx", "sentence-transformers")
+
+# Texts encoded per forward pass
+DEFAULT_LOCAL_BATCH_SIZE = int(os.getenv("LOCAL_EMBEDDING_BATCH_SIZE", "32"))
+# Longer inputs are truncated (the limit of most BERT-style encoders)
+DEFAULT_MAX_SEQ_LENGTH = 512
+
+logger = logging.getLogger(__name__)
+
+
+def parse_local_model(model: str) -> Optional[tuple[str, str]]:
+    """
+    Split a local model spec into (backend, model name or path).
+
+    Returns:
+        None if the model is not a local one (i.e. served by OpenRouter).
+    """
+    backend, sep, name = model.partition(":")
+    if sep and backend in LOCAL_BACKENDS and name:
+        return backend, name
+    return None
+
+
+class OnnxEncoder:
+    """
+    Sentence encoder running an ONNX model with ONNX Runtime.
+
+    Token embeddings are mean-pooled over the attention mask and
+    L2-normalized; models exported with pooling built in are used as is.
+    """
+
+    def __init__(
+        self,
+        model_dir: Path,
+        session=None,
+        tokenizer=None,
+        max_seq_length: int = DEFAULT_MAX_SEQ_LENGTH,
+    ):
+        """
+        Initialize the encoder.
+
+        Args:
+            model_dir: Directory with model.onnx and tokenizer.json.
+            session: ONNX Runtime session. Defaults to one on model.onnx.
+            tokenizer: Tokenizer. Defaults to tokenizer.json.
+            max_seq_length: Maximum tokens per text.
+        """
+        model_dir = Path(model_dir)
+        if session is None or tokenizer is None:
+            if not HAS_ONNXRUNTIME:
+                raise ImportError(
+                    "onnxruntime and tokenizers are required for onnx: embedding models "
+                    "(pip install onnxruntime tokenizers)"
+                )
+        if session is None:
+            options = onnxruntime.SessionOptions()
+            options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+            session = onnxruntime.InferenceSession(
+                str(model_dir / "model.onnx"),
+                sess_options=options,
+                providers=["CPUExecutionProvider"],
+            )
+        if tokenizer is None:
+            tokenizer = Tokenizer.from_file(str(model_dir / "tokenizer.json"))
+
+        tokenizer.enable_truncation(max_length=max_seq_length)
+        tokenizer.enable_padding()
+        self.session = session
+        self.tokenizer = tokenizer
+        self._input_names = {i.name for i in session.get_inputs()}
+
+    def __call__(self, texts: list[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(texts)
+        input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        inputs = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self._input_names:
+            inputs["token_type_ids"] = np.array([e.type_ids for e in encodings], dtype=np.int64)
+
+        feeds = {k: v for k, v in inputs.items() if k in self._input_names}
+        output = self.session.run(None, feeds)[0]
+        if output.ndim == 3:
+            # (batch, tokens, dim) token embeddings: mean over real tokens
+            mask = attention_mask[:, :, None].astype(np.float32)
+            output = (output * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+
+        norms = np.linalg.norm(output, axis=1, keepdims=True)
+        return (output / np.maximum(norms, 1e-12)).astype(np.float32)
+
+
+class SentenceTransformerEncoder:
+    """Sentence encoder running a sentence-transformers model on CPU."""
+
+    def __init__(self, model_name: str):
+        if not HAS_SENTENCE_TRANSFORMERS:
+            raise ImportError(
+                "sentence-transformers is required for sentence-transformers: embedding "
+                "models (pip install sentence-transformers)"
+            )
+        self.model = SentenceTransformer(model_name, device="cpu")
+
+    def __call__(self, texts: list[str]) -> np.ndarray:
+        return self.model.encode(texts, normalize_embeddings=True, convert_to_numpy=True)
+
+
+class LocalEmbeddingClient(EmbeddingBackend):
+    """
+    Client for generating embeddings with a local CPU model.
+
+    Drop-in replacement for EmbeddingClient: same methods, same on-disk
+    cache, no API key or network access needed.
+    """
+
+    def __init__(
+        self,
+        model: str,
+        cache: Optional[EmbeddingCache] = None,
+        use_cache: bool = True,
+        batch_size: int = DEFAULT_LOCAL_BATCH_SIZE,
+        encoder: Optional[Callable[[list[str]], np.ndarray]] = None,
+    ):
+        """
+        Initialize the local embedding client.
+
+        Args:
+            model: Local model spec, "onnx:<model dir>" or
+                "sentence-transformers:<model name>".
+            cache: Embedding cache to use. Defaults to the on-disk cache.
+            use_cache: Whether to cache embeddings on disk.
+            batch_size: Texts per forward pass.
+            encoder: Callable mapping texts to an embedding matrix. Defaults
+                to the encoder for the model's backend.
+        """
+        parsed = parse_local_model(model)
+        if parsed is None:
+            raise ValueError(
+                f"Not a local embedding model: {model} "
+                f"(expected one of {', '.join(b + ':' for b in LOCAL_BACKENDS)})"
+            )
+        self.model = model
+        self.batch_size = batch_size
+        # Only used by callers that pack ingestion batches by token budget
+        self.max_batch_tokens = DEFAULT_MAX_BATCH_TOKENS
+
+        self.cache = (cache if cache is not None else EmbeddingCache()) if use_cache else None
+        self._owns_cache = cache is None
+
+        if encoder is None:
+            backend, name = parsed
+            encoder = OnnxEncoder(name) if backend == "onnx" else SentenceTransformerEncoder(name)
+        self.encoder = encoder
+        self._dimension: Optional[int] = None
+
+    def _encode(
+        self, texts: list[str], token_counts: Optional[list[int]] = None
+    ) -> list[list[float]]:
+        """
+        Embed texts in forward passes of batch_size, bypassing the cache.
+
+        Texts are grouped by length before batching, so each forward pass
+        pads to a similar length, and the embeddings are returned in input
+        order.
+
+        Args:
+            texts: Texts to embed.
+            token_counts: Token count per text. Character lengths are used
+                when not provided.
+        """
+        lengths = token_counts if token_counts else [len(text) for text in texts]
+        order = np.argsort(lengths, kind="stable")
+        embeddings: list[Optional[list[float]]] = [None] * len(texts)
+        for start in range(0, len(texts), self.batch_size):
+            indices = order[start:start + self.batch_size]
+            vectors = np.asarray(self.encoder([texts[i] for i in indices])).tolist()
+            for i, vector in zip(indices, vectors):
+                embeddings[i] = vector
+        return embeddings
+
+    def embed(self, text: str) -> list[float]:
+        """
+        Generate embedding for a single text.
+
+        Args:
+            text: Text to embed.
+
+        Returns:
+            Embedding vector as list of floats.
+        """
+        return self.embed_batch([text])[0]
+
+    def embed_batch(
+        self,
+        texts: list[str],
+        batch_size: Optional[int] = None,
+        token_counts: Optional[list[int]] = None,
+    ) -> list[list[float]]:
+        """
+        Generate embeddings for a batch of texts.
+
+        Args:
+            texts: List of texts to embed.
+            batch_size: Unused; forward passes use the client's batch_size.
+            token_counts: Token count per text (e.g. chunk "token_count"),
+                used to batch texts of similar length together.
+
+        Returns:
+            List of embedding vectors.
+        """
+        if self.cache is None:
+            return self._encode(texts, token_counts)
+
+        results = self.cache.get_many(self.model, texts)
+        miss_indices = [i for i, r in enumerate(results) if r is None]
+        if miss_indices:
+            miss_texts = [texts[i] for i in miss_indices]
+            miss_counts = [token_counts[i] for i in miss_indices] if token_counts else None
+            embeddings = self._encode(miss_texts, miss_counts)
+            self.cache.put_many(self.model, miss_texts, embeddings)
+            for i, embedding in zip(miss_indices, embeddings):
+                results[i] = embedding
+        return results
+
+    def get_dimension(self) -> int:
+        """Get the embedding dimension by running a test embedding."""
+        if self._dimension is None:
+            self._dimension = len(self._encode(["test"])[0])
+        return self._dimension
+
+    def get_cache_stats(self) -> Optional[dict]:
+        """Get embedding cache statistics, or None if caching is disabled."""
+        return self.cache.get_stats() if self.cache is not None else None
+
+    def close(self):
+        """Close the cache (if owned by this client)."""
+        if self.cache is not None and self._owns_cache:
+            self.cache.close()
+
+
+class AsyncLocalEmbeddingClient:
+    """
+    Async adapter over a LocalEmbeddingClient for concurrent ingestion.
+
+    Batches are encoded one at a time in a worker thread (the model itself
+    uses every core), keeping the event loop free for storage writes.
+    """
+
+    def __init__(self, client: LocalEmbeddingClient):
+        self.client = client
+        self.model = client.model
+        self.cache = client.cache
+
+    async def embed_batches(
+        self,
+        batches: list[list[str]],
+        token_counts: Optional[list[list[int]]] = None,
+    ) -> AsyncIterator[tuple[int, list[list[float]] | Exception]]:
+        """
+        Embed several batches, yielding results in batch order.
+
+        Mirrors AsyncEmbeddingClient.embed_batches: a failed batch yields
+        its exception instead of embeddings.
+
+        Args:
+            batches: Lists of texts to embed.
+            token_counts: Token counts per text for each batch, passed on
+                to embed_batch.
+
+        Yields:
+            Tuples of (batch index, embeddings or exception).
+        """
+        for i, batch in enumerate(batches):
+            counts = token_counts[i] if token_counts else None
+            try:
+                yield i, await asyncio.to_thread(
+                    self.client.embed_batch, batch, token_counts=counts
+                )
+            except Exception as e:
+                logger.error(f"Local embedding failed on batch {i + 1}: {e}")
+                yield i, e
+
+    def get_cache_stats(self) -> Optional[dict]:
+        """Get embedding cache statistics, or None if caching is disabled."""
+        return self.client.get_cache_stats()
+
+    async def aclose(self):
+        """Nothing to release; the wrapped client stays open."""
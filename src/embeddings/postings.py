@@ -0,0 +1,212 @@
+"""
+Inverted index storage shared by ARBuilder's keyword indexes.
+
+Postings are kept in CSR layout as flat NumPy arrays: the postings of term
+t are postings_docs[offsets[t]:offsets[t + 1]] (sorted document indices,
+uint32), with a matching per-posting value array defined by the subclass
+(term frequencies for BM25, vector weights for sparse symbols). An index
+is persisted as a single .npz file.
+"""
+
+import json
+import os
+from array import array
+from collections import Counter
+from pathlib import Path
+from typing import Callable, Iterable, Optional
+
+import numpy as np
+
+
+class PostingsIndex:
+    """
+    Base class for inverted indexes scored term by term.
+
+    Subclasses build their postings with _collect_postings(), and define
+    how a query maps to weighted terms (_query_terms) and how a posting is
+    scored for a term (_posting_scores), plus the arrays they persist.
+    """
+
+    def __init__(
+        self,
+        doc_ids: list[str],
+        vocab: dict[str, int],
+        offsets: np.ndarray,
+        postings_docs: np.ndarray,
+    ):
+        """
+        Initialize the shared postings arrays.
+
+        Args:
+            doc_ids: Document id for each document index.
+            vocab: Mapping of term to term index.
+            offsets: Start of each term's postings (len(vocab) + 1 entries).
+            postings_docs: Document indices of all postings (uint32).
+        """
+        self.doc_ids = doc_ids
+        self.vocab = vocab
+        self.offsets = offsets
+        self.postings_docs = postings_docs
+
+        self._id_to_index = {doc_id: i for i, doc_id in enumerate(doc_ids)}
+
+    def __len__(self) -> int:
+        return len(self.doc_ids)
+
+    @staticmethod
+    def _collect_postings(
+        documents: Iterable[tuple[str, str]],
+        terms: Callable[[str], list[str]],
+    ) -> tuple[list[str], dict[str, int], np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Invert (doc_id, text) pairs into CSR postings.
+
+        Args:
+            documents: Documents to index, streamed.
+            terms: Function extracting the terms of a text.
+
+        Returns:
+            doc_ids, vocab, offsets, postings_docs (uint32), term
+            frequencies of the postings (uint32) and the number of terms in
+            each document (uint32).
+        """
+        doc_ids = []
+        vocab: dict[str, int] = {}
+        term_docs: list[array] = []
+        term_tfs: list[array] = []
+        doc_lengths = array("I")
+
+        for doc_index, (doc_id, text) in enumerate(documents):
+            doc_ids.append(doc_id)
+            counts = Counter(terms(text or ""))
+            for term, tf in counts.items():
+                term_index = vocab.setdefault(term, len(vocab))
+                if term_index == len(term_docs):
+                    term_docs.append(array("I"))
+                    term_tfs.append(array("I"))
+                term_docs[term_index].append(doc_index)
+                term_tfs[term_index].append(tf)
+            doc_lengths.append(sum(counts.values()))
+
+        offsets = np.zeros(len(vocab) + 1, dtype=np.int64)
+        np.cumsum([len(docs) for docs in term_docs], out=offsets[1:])
+
+        return (
+            doc_ids,
+            vocab,
+            offsets,
+            np.frombuffer(b"".join(d.tobytes() for d in term_docs), dtype=np.uint32),
+            np.frombuffer(b"".join(t.tobytes() for t in term_tfs), dtype=np.uint32),
+            np.frombuffer(doc_lengths.tobytes(), dtype=np.uint32),
+        )
+
+    def _query_terms(self, query: str) -> list[tuple[int, float]]:
+        """(term index, query weight) of the distinct query terms present in the index."""
+        raise NotImplementedError
+
+    def _posting_scores(self, query_weight: float, postings: slice | np.ndarray) -> np.ndarray:
+        """Scores of the given postings (a slice or posting indices) for one query term."""
+        raise NotImplementedError
+
+    def score_all(self, query: str) -> np.ndarray:
+        """
+        Score every document against a query.
+
+        Returns:
+            float32 array of scores, indexed like doc_ids.
+        """
+        scores = np.zeros(len(self.doc_ids), dtype=np.float32)
+        for term_index, query_weight in self._query_terms(query):
+            postings = slice(self.offsets[term_index], self.offsets[term_index + 1])
+            # Postings hold each document at most once, so += is safe
+            scores[self.postings_docs[postings]] += self._posting_scores(query_weight, postings)
+        return scores
+
+    def score_ids(self, query: str, ids: list[str]) -> list[float]:
+        """
+        Score specific documents against a query.
+
+        Args:
+            query: Search query.
+            ids: Document ids; ids missing from the index score 0.
+
+        Returns:
+            Scores aligned with ids.
+        """
+        indices = np.array([self._id_to_index.get(i, -1) for i in ids], dtype=np.int64)
+        scores = np.zeros(len(ids), dtype=np.float32)
+        known = indices >= 0
+
+        for term_index, query_weight in self._query_terms(query):
+            start, end = self.offsets[term_index], self.offsets[term_index + 1]
+            docs = self.postings_docs[start:end]
+            positions = np.minimum(np.searchsorted(docs, indices[known]), len(docs) - 1)
+            hit = docs[positions] == indices[known]
+            term_scores = np.zeros(hit.shape, dtype=np.float32)
+            term_scores[hit] = self._posting_scores(query_weight, start + positions[hit])
+            scores[known] += term_scores
+
+        return scores.tolist()
+
+    def search(self, query: str, top_k: int = 10) -> list[tuple[str, float]]:
+        """
+        Retrieve the best matching documents.
+
+        Args:
+            query: Search query.
+            top_k: Maximum number of results.
+
+        Returns:
+            (doc_id, score) pairs for documents matching at least one query
+            term, best first.
+        """
+        scores = self.score_all(query)
+        matched = np.flatnonzero(scores > 0)
+        if len(matched) > top_k:
+            matched = matched[np.argpartition(-scores[matched], top_k - 1)[:top_k]]
+        matched = matched[np.argsort(-scores[matched], kind="stable")]
+        return [(self.doc_ids[i], float(scores[i])) for i in matched]
+
+    def _arrays(self) -> dict[str, np.ndarray]:
+        """Subclass arrays written by save() next to the shared postings."""
+        raise NotImplementedError
+
+    @classmethod
+    def _from_arrays(cls, data) -> dict:
+        """Constructor arguments of a subclass, read from a loaded .npz file."""
+        raise NotImplementedError
+
+    def save(self, path: Path):
+        """Write the index to an .npz file (atomically replacing an old one)."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.name}.tmp")
+
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f,
+                doc_ids=np.frombuffer(json.dumps(self.doc_ids).encode("utf-8"), dtype=np.uint8),
+                vocab=np.frombuffer(json.dumps(list(self.vocab)).encode("utf-8"), dtype=np.uint8),
+                offsets=self.offsets,
+                postings_docs=self.postings_docs,
+                **self._arrays(),
+            )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: Path):
+        """Load an index written by save()."""
+        with np.load(path) as data:
+            terms = json.loads(data["vocab"].tobytes().decode("utf-8"))
+            return cls(
+                doc_ids=json.loads(data["doc_ids"].tobytes().decode("utf-8")),
+                vocab={term: i for i, term in enumerate(terms)},
+                offsets=data["offsets"],
+                postings_docs=data["postings_docs"],
+                **cls._from_arrays(data),
+            )
+
+    @classmethod
+    def load_if_exists(cls, path: Path) -> Optional["PostingsIndex"]:
+        """Load an index, or return None if the file doesn't exist."""
+        return cls.load(path) if Path(path).exists() else None
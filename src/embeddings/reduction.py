@@ -0,0 +1,205 @@
+"""
+Embedding dimensionality reduction for ARBuilder.
+
+Stored vectors can be reduced at ingest time, trading a little recall for
+less memory and faster distance computations:
+
+- "matryoshka:<dim>" keeps the first dim components, for models trained
+  with Matryoshka representation learning (e.g. gemini-embedding-001).
+- "pca:<dim>" projects onto the top principal components, fitted on a
+  sample of the corpus.
+
+Vectors are re-normalized after reduction. The fitted reducer is persisted
+next to the collection and applied to queries the same way.
+"""
+
+import os
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+REDUCTION_METHODS = ("matryoshka", "pca")
+
+
+def parse_reduction(spec: str) -> tuple[str, int]:
+    """
+    Parse a reduction spec such as "pca:256".
+
+    Raises:
+        ValueError: If the spec is malformed.
+    """
+    method, _, dimension = spec.partition(":")
+    if method not in REDUCTION_METHODS or not dimension.isdigit() or int(dimension) < 1:
+        raise ValueError(
+            f"Invalid embedding reduction: {spec!r} (expected matryoshka:<dim> or pca:<dim>)"
+        )
+    return method, int(dimension)
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+class EmbeddingReducer:
+    """
+    Maps full-width embeddings to fewer dimensions.
+
+    Both methods are nested: the first d outputs of a reducer are the
+    reducer for d dimensions (see truncated()).
+    """
+
+    def __init__(
+        self,
+        method: str,
+        dimension: int,
+        mean: Optional[np.ndarray] = None,
+        components: Optional[np.ndarray] = None,
+    ):
+        """
+        Initialize a reducer; use fit() or load() to create one.
+
+        Args:
+            method: "matryoshka" or "pca".
+            dimension: Output dimension.
+            mean: PCA mean of the normalized sample (input width).
+            components: PCA components, one per row (dimension x input width).
+        """
+        if method not in REDUCTION_METHODS:
+            raise ValueError(f"Unknown reduction method: {method}")
+        if method == "pca" and (mean is None or components is None):
+            raise ValueError("PCA reduction needs a fitted mean and components")
+        self.method = method
+        self.dimension = dimension
+        self.mean = mean
+        self.components = components
+
+    @property
+    def spec(self) -> str:
+        return f"{self.method}:{self.dimension}"
+
+    @classmethod
+    def fit(cls, spec: str, sample: Optional[np.ndarray] = None) -> "EmbeddingReducer":
+        """
+        Create a reducer from a spec, fitting PCA on a sample of embeddings.
+
+        Args:
+            spec: "matryoshka:<dim>" or "pca:<dim>".
+            sample: Corpus embeddings (required for PCA, at least dim rows).
+
+        Returns:
+            The reducer.
+        """
+        method, dimension = parse_reduction(spec)
+        if method == "matryoshka":
+            return cls(method, dimension)
+
+        if sample is None or len(sample) < dimension:
+            raise ValueError(
+                f"PCA to {dimension} dimensions needs at least {dimension} sample embeddings"
+            )
+        sample = _normalize(np.asarray(sample, dtype=np.float32))
+        if dimension > sample.shape[1]:
+            raise ValueError(
+                f"Cannot reduce {sample.shape[1]}-dimensional embeddings to {dimension}"
+            )
+
+        mean = sample.mean(axis=0)
+        # Rows of vt are the principal axes, by decreasing variance
+        _, _, vt = np.linalg.svd(sample - mean, full_matrices=False)
+        return cls(method, dimension, mean=mean, components=vt[:dimension].astype(np.float32))
+
+    def truncated(self, dimension: int) -> "EmbeddingReducer":
+        """The same reducer with fewer output dimensions."""
+        if dimension > self.dimension:
+            raise ValueError(f"Cannot extend a {self.dimension}-dimensional reducer to {dimension}")
+        components = self.components[:dimension] if self.components is not None else None
+        return EmbeddingReducer(self.method, dimension, mean=self.mean, components=components)
+
+    def transform(self, embeddings) -> np.ndarray:
+        """
+        Reduce embeddings.
+
+        Args:
+            embeddings: Full-width embeddings (n x width), or one embedding.
+
+        Returns:
+            float32 array of L2-normalized reduced embeddings (n x dimension).
+        """
+        vectors = np.atleast_2d(np.asarray(embeddings, dtype=np.float32))
+        if self.method == "matryoshka":
+            if vectors.shape[1] < self.dimension:
+                raise ValueError(
+                    f"Cannot truncate {vectors.shape[1]}-dimensional embeddings to {self.dimension}"
+                )
+            return _normalize(vectors[:, :self.dimension])
+        reduced = (_normalize(vectors) - self.mean) @ self.components.T
+        return _normalize(reduced).astype(np.float32)
+
+    def save(self, path: Path):
+        """Write the reducer to an .npz file (atomically replacing an old one)."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.name}.tmp")
+        arrays = {"spec": np.frombuffer(self.spec.encode("utf-8"), dtype=np.uint8)}
+        if self.method == "pca":
+            arrays.update(mean=self.mean, components=self.components)
+        with open(tmp_path, "wb") as f:
+            np.savez(f, **arrays)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: Path) -> "EmbeddingReducer":
+        """Load a reducer written by save()."""
+        with np.load(path) as data:
+            method, dimension = parse_reduction(data["spec"].tobytes().decode("utf-8"))
+            if method == "matryoshka":
+                return cls(method, dimension)
+            return cls(method, dimension, mean=data["mean"], components=data["components"])
+
+    @classmethod
+    def load_if_exists(cls, path: Path) -> Optional["EmbeddingReducer"]:
+        """Load a reducer, or return None if the file doesn't exist."""
+        return cls.load(path) if Path(path).exists() else None
+
+
+def recall_by_dimension(
+    corpus: np.ndarray,
+    queries: np.ndarray,
+    reducer: EmbeddingReducer,
+    dimensions: list[int],
+    k: int = 10,
+) -> list[dict]:
+    """
+    Measure how well reduced vectors preserve full-width nearest neighbours.
+
+    Args:
+        corpus: Full-width corpus embeddings.
+        queries: Full-width query embeddings.
+        reducer: Reducer with at least max(dimensions) dimensions.
+        dimensions: Output dimensions to evaluate.
+        k: Neighbours per query.
+
+    Returns:
+        One dict per dimension: dimension, recall@k against the full-width
+        top k, bytes per float32 vector, and the top k rows per query.
+    """
+    k = min(k, len(corpus))
+    full_corpus = _normalize(np.asarray(corpus, dtype=np.float32))
+    full_queries = _normalize(np.asarray(queries, dtype=np.float32))
+    exact = np.argsort(-(full_queries @ full_corpus.T), axis=1)[:, :k]
+
+    report = []
+    for dimension in dimensions:
+        truncated = reducer.truncated(dimension)
+        scores = truncated.transform(queries) @ truncated.transform(corpus).T
+        found = np.argsort(-scores, axis=1)[:, :k]
+        recall = np.mean([len(set(e) & set(f)) / k for e, f in zip(exact.tolist(), found.tolist())])
+        report.append({
+            "dimension": dimension,
+            f"recall@{k}": float(recall),
+            "bytes_per_vector": dimension * 4,
+            "top_k": found.tolist(),
+        })
+    return report
@@ -1,25 +1,60 @@
 """
 Reranking module for ARBuilder.
-Uses LLM-based reranking for improved retrieval quality.
+Uses LLM-based or local cross-encoder reranking for improved retrieval quality.
 """
 
+import asyncio
+import json
+import logging
 import os
-from typing import Optional
+import re
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional, Sequence
 
 import httpx
+import numpy as np
 from dotenv import load_dotenv
 from tenacity import retry, stop_after_attempt, wait_exponential
 
+from .bm25_index import BM25Index
+from .cache import RerankScoreCache
+from .fusion import fuse, ranks, top_indices
+from .local_embedder import HAS_ONNXRUNTIME, HAS_SENTENCE_TRANSFORMERS, parse_local_model
+
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
 DEFAULT_MODEL = os.getenv("DEFAULT_MODEL", "deepseek/deepseek-chat")
 
+# Documents scored per LLM request, and requests in flight at once
+RERANK_GROUP_SIZE = int(os.getenv("RERANK_GROUP_SIZE", "5"))
+RERANK_CONCURRENCY = int(os.getenv("RERANK_CONCURRENCY", "8"))
+
+# Local cross-encoder for reranking, "onnx:<model dir>" or
+# "sentence-transformers:<model name>" (unset: no cross-encoder)
+CROSS_ENCODER_MODEL = os.getenv("CROSS_ENCODER_MODEL") or None
+# Query-document pairs scored per forward pass
+CROSS_ENCODER_BATCH_SIZE = int(os.getenv("CROSS_ENCODER_BATCH_SIZE", "32"))
+# Tokenized documents kept for reuse across calls
+CROSS_ENCODER_CACHE_SIZE = 10000
+# Fused candidates reordered by the cross-encoder in hybrid reranking
+CROSS_ENCODER_CANDIDATES = int(os.getenv("CROSS_ENCODER_CANDIDATES", "30"))
+
 
 class Reranker:
     """
     LLM-based reranker for improving retrieval quality.
     Uses a language model to score relevance of retrieved documents.
+
+    Candidates are split into small groups scored by concurrent requests,
+    so latency is bounded by one small request rather than one large one.
+    Scores from different requests are calibrated against an anchor
+    document included in every group, and cached per (model, query,
+    document) so repeated candidates are free.
     """
 
     def __init__(
@@ -27,6 +62,10 @@ class Reranker:
         api_key: Optional[str] = None,
         model: Optional[str] = None,
         base_url: str = "https://openrouter.ai/api/v1",
+        group_size: int = RERANK_GROUP_SIZE,
+        max_concurrency: int = RERANK_CONCURRENCY,
+        score_cache: Optional[RerankScoreCache] = None,
+        use_score_cache: bool = True,
     ):
         """
         Initialize the reranker.
@@ -35,15 +74,26 @@ class Reranker:
             api_key: OpenRouter API key.
             model: Model to use for reranking.
             base_url: API base URL.
+            group_size: Documents scored per request.
+            max_concurrency: Maximum in-flight scoring requests.
+            score_cache: Cache of scores. Defaults to a new RerankScoreCache.
+            use_score_cache: Whether to reuse scores of repeated candidates.
         """
         self.api_key = api_key or OPENROUTER_API_KEY
         self.model = model or DEFAULT_MODEL
         self.base_url = base_url
+        self.group_size = max(1, group_size)
+        self.max_concurrency = max_concurrency
 
         if not self.api_key:
             raise ValueError("OPENROUTER_API_KEY is required")
 
-        self.client = httpx.Client(
+        self.score_cache = (
+            (score_cache if score_cache is not None else RerankScoreCache())
+            if use_score_cache else None
+        )
+
+        self.client = httpx.AsyncClient(
             base_url=self.base_url,
             headers={
                 "Authorization": f"Bearer {self.api_key}",
@@ -53,38 +103,33 @@ class Reranker:
             },
             timeout=60.0,
         )
-
-    @retry(
-        stop=stop_after_attempt(3),
-        wait=wait_exponential(multiplier=1, min=2, max=10),
-    )
-    def rerank(
-        self,
-        query: str,
-        documents: list[str],
-        top_k: int = 5,
-    ) -> list[dict]:
-        """
-        Rerank documents based on relevance to query.
-
-        Args:
-            query: The search query.
-            documents: List of document texts to rerank.
-            top_k: Number of top results to return.
-
-        Returns:
-            List of dicts with 'index', 'document', and 'score'.
-        """
-        if not documents:
-            return []
-
-        # Build the reranking prompt
+        # The async client runs on one background event loop for its whole
+        # life, so connections are reused across (synchronous) calls
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[threading.Thread] = None
+        self._loop_lock = threading.Lock()
+
+    def _run(self, coro):
+        """Run a coroutine on the reranker's event loop and wait for its result."""
+        with self._loop_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._loop_thread = threading.Thread(
+                    target=self._loop.run_forever, name="reranker-loop", daemon=True
+                )
+                self._loop_thread.start()
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    @staticmethod
+    def _build_prompt(query: str, documents: list[str]) -> str:
+        """Build the scoring prompt for one group of documents."""
         docs_text = "\n\n".join([
             f"[Document {i+1}]\n{doc[:1500]}"  # Truncate long docs
             for i, doc in enumerate(documents)
         ])
 
-        prompt = f"""You are a relevance scoring assistant. Given a query and a list of documents, score each document's relevance to the query on a scale of 0-10.
+        return f"""You are a relevance scoring assistant. Given a query and a list of documents,
+score each document's relevance to the query on a scale of 0-10.
 
 Query: {query}
 
@@ -101,48 +146,150 @@ For each document, provide a relevance score (0-10) where:
 Respond with ONLY a JSON array of scores in order, like: [7, 3, 9, 5, ...]
 No explanations, just the JSON array."""
 
-        response = self.client.post(
+    @staticmethod
+    def _parse_scores(content: str, count: int) -> list[Optional[float]]:
+        """Parse a JSON score array; unparseable or missing scores are None."""
+        try:
+            # Find array in response, falling back to the whole content
+            match = re.search(r'\[[\d\s,\.]+\]', content)
+            scores = [float(score) for score in json.loads(match.group() if match else content)]
+        except (json.JSONDecodeError, TypeError, ValueError):
+            return [None] * count
+        return (scores + [None] * count)[:count]
+
+    @retry(
+        stop=stop_after_attempt(3),
+        wait=wait_exponential(multiplier=1, min=2, max=10),
+    )
+    async def _score_group(self, query: str, documents: list[str]) -> list[Optional[float]]:
+        """Score one group of documents with a single request."""
+        response = await self.client.post(
             "/chat/completions",
             json={
                 "model": self.model,
-                "messages": [{"role": "user", "content": prompt}],
+                "messages": [{"role": "user", "content": self._build_prompt(query, documents)}],
                 "temperature": 0,
-                "max_tokens": 200,
+                # A few tokens per score
+                "max_tokens": 16 + 8 * len(documents),
             },
         )
         response.raise_for_status()
         data = response.json()
-
-        # Parse scores from response
         content = data["choices"][0]["message"]["content"].strip()
+        return self._parse_scores(content, len(documents))
 
-        try:
-            # Try to extract JSON array from response
-            import json
-            import re
+    async def _score_groups(
+        self, query: str, groups: list[list[str]]
+    ) -> list[list[Optional[float]] | BaseException]:
+        """Score groups concurrently; a failed group yields its exception."""
+        semaphore = asyncio.Semaphore(self.max_concurrency)
 
-            # Find array in response
-            match = re.search(r'\[[\d\s,\.]+\]', content)
-            if match:
-                scores = json.loads(match.group())
-            else:
-                # Fallback: try parsing whole content
-                scores = json.loads(content)
+        async def score(group):
+            async with semaphore:
+                return await self._score_group(query, group)
+
+        return await asyncio.gather(*(score(group) for group in groups), return_exceptions=True)
+
+    def score(self, query: str, documents: list[str]) -> list[float]:
+        """
+        Relevance scores (0-10) of documents, aligned with documents.
+
+        Uncached documents are scored in groups of group_size. The first
+        document is the anchor: it is added to every group it isn't in, and
+        each group's scores are shifted so the anchor gets the same score
+        everywhere (its cached score, if any). Documents whose score could
+        not be parsed get a neutral 5 and are not cached.
+
+        Raises:
+            httpx.HTTPError: If every scoring request failed.
+        """
+        if not documents:
+            return []
+
+        scores: list[Optional[float]] = (
+            self.score_cache.get_many(self.model, query, documents)
+            if self.score_cache is not None else [None] * len(documents)
+        )
+        missing = [i for i, score in enumerate(scores) if score is None]
+        if not missing:
+            return scores
+
+        groups = [
+            missing[start:start + self.group_size]
+            for start in range(0, len(missing), self.group_size)
+        ]
+        # Groups are only calibrated when their scores get mixed with others
+        anchor = 0
+        calibrate = len(groups) > 1 or len(missing) < len(documents)
+        requests = [
+            ([anchor] + group if calibrate and anchor not in group else group)
+            for group in groups
+        ]
+        responses = self._run(
+            self._score_groups(query, [[documents[i] for i in r] for r in requests])
+        )
+        failures = [r for r in responses if isinstance(r, BaseException)]
+        if len(failures) == len(responses):
+            raise failures[0]
+
+        raw = [
+            dict(zip(request, response)) if not isinstance(response, BaseException) else {}
+            for request, response in zip(requests, responses)
+        ]
+        for error in failures:
+            logger.warning(f"Rerank request failed, using neutral scores for its group: {error}")
+
+        # The anchor's reference score: cached, or from the group it belongs to
+        reference = scores[anchor]
+        if reference is None:
+            reference = next((r[anchor] for r in raw if r.get(anchor) is not None), None)
+
+        scored = {}
+        for group, group_raw in zip(groups, raw):
+            offset = 0.0
+            if calibrate and reference is not None and group_raw.get(anchor) is not None:
+                offset = reference - group_raw[anchor]
+            for i in group:
+                if group_raw.get(i) is not None:
+                    scored[i] = min(10.0, max(0.0, group_raw[i] + offset))
+
+        if self.score_cache is not None and scored:
+            self.score_cache.put_many(
+                self.model, query, [documents[i] for i in scored], list(scored.values())
+            )
+        for i in missing:
+            # Default middle score
+            scores[i] = scored.get(i, 5.0)
+        return scores
 
-            # Ensure we have enough scores
-            while len(scores) < len(documents):
-                scores.append(5)  # Default middle score
+    def rerank(
+        self,
+        query: str,
+        documents: list[str],
+        top_k: int = 5,
+    ) -> list[dict]:
+        """
+        Rerank documents based on relevance to query.
+
+        Args:
+            query: The search query.
+            documents: List of document texts to rerank.
+            top_k: Number of top results to return.
+
+        Returns:
+            List of dicts with 'index', 'document', and 'score'.
+        """
+        if not documents:
+            return []
 
-        except (json.JSONDecodeError, ValueError):
-            # If parsing fails, use equal scores
-            scores = [5] * len(documents)
+        scores = self.score(query, documents)
 
         # Create scored results
         results = [
             {
                 "index": i,
                 "document": doc,
-                "score": float(scores[i]) if i < len(scores) else 5.0,
+                "score": float(scores[i]),
             }
             for i, doc in enumerate(documents)
         ]
@@ -191,9 +338,20 @@ No explanations, just the JSON array."""
 
         return final_results
 
+    def get_cache_stats(self) -> Optional[dict]:
+        """Get score cache statistics, or None if caching is disabled."""
+        return self.score_cache.get_stats() if self.score_cache is not None else None
+
     def close(self):
-        """Close the HTTP client."""
-        self.client.close()
+        """Close the HTTP client and stop the event loop."""
+        with self._loop_lock:
+            loop, self._loop = self._loop, None
+        if loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self.client.aclose(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        self._loop_thread.join()
+        loop.close()
 
     def __enter__(self):
         return self
@@ -206,24 +364,50 @@ class BM25Reranker:
     """
     Simple BM25-based reranker for keyword matching.
     Lighter weight alternative to LLM reranking.
+
+    With a corpus index and document ids, scores come straight from the
+    index (corpus-wide IDF); otherwise a temporary index is built over the
+    given documents.
     """
 
-    def __init__(self, k1: float = 1.5, b: float = 0.75):
+    def __init__(self, k1: float = 1.5, b: float = 0.75, index: Optional[BM25Index] = None):
         """
         Initialize BM25 reranker.
 
         Args:
             k1: Term frequency saturation parameter.
             b: Length normalization parameter.
+            index: Prebuilt corpus BM25 index.
         """
         self.k1 = k1
         self.b = b
+        self.index = index
+
+    def score(
+        self, query: str, documents: list[str], ids: Optional[list[str]] = None
+    ) -> np.ndarray:
+        """
+        BM25 scores of documents, aligned with documents.
+
+        Args:
+            query: The search query.
+            documents: Documents to score.
+            ids: Document ids, used to look documents up in the corpus index.
+
+        Returns:
+            Array of BM25 scores.
+        """
+        if self.index is not None and ids is not None:
+            return np.asarray(self.index.score_ids(query, ids), dtype=np.float64)
+        index = BM25Index.build(enumerate(documents), k1=self.k1, b=self.b)
+        return np.asarray(index.score_all(query), dtype=np.float64)
 
     def rerank(
         self,
         query: str,
         documents: list[str],
         top_k: int = 5,
+        ids: Optional[list[str]] = None,
     ) -> list[dict]:
         """
         Rerank documents using BM25 scoring.
@@ -232,21 +416,12 @@ class BM25Reranker:
             query: The search query.
             documents: List of documents to rerank.
             top_k: Number of top results to return.
+            ids: Document ids, used to look documents up in the corpus index.
 
         Returns:
             List of reranked results.
         """
-        from rank_bm25 import BM25Okapi
-
-        # Tokenize
-        query_tokens = query.lower().split()
-        doc_tokens = [doc.lower().split() for doc in documents]
-
-        # Create BM25 index
-        bm25 = BM25Okapi(doc_tokens)
-
-        # Get scores
-        scores = bm25.get_scores(query_tokens)
+        scores = self.score(query, documents, ids)
 
         # Create results
         results = [
@@ -264,30 +439,268 @@ class BM25Reranker:
         return results[:top_k]
 
 
+class CrossEncoderReranker:
+    """
+    Local cross-encoder reranker, running on CPU without network calls.
+
+    Scores each (query, document) pair jointly with a small reranking model
+    (e.g. cross-encoder/ms-marco-MiniLM-L-6-v2), in batches of similar
+    length. Drop-in replacement for Reranker, including as HybridReranker's
+    llm_reranker.
+
+    With ONNX Runtime (a directory with model.onnx and tokenizer.json),
+    documents are tokenized once and reused across calls, so candidates
+    seen before only cost the forward pass.
+    """
+
+    def __init__(
+        self,
+        model: Optional[str] = None,
+        session=None,
+        tokenizer=None,
+        batch_size: int = CROSS_ENCODER_BATCH_SIZE,
+        max_seq_length: int = 512,
+        cache_size: int = CROSS_ENCODER_CACHE_SIZE,
+    ):
+        """
+        Initialize the cross-encoder reranker.
+
+        Args:
+            model: Model spec, "onnx:<model dir>" or
+                "sentence-transformers:<model name>". Defaults to the
+                CROSS_ENCODER_MODEL environment variable.
+            session: ONNX Runtime session. Defaults to one on model.onnx.
+            tokenizer: Tokenizer with the model's pair template. Defaults
+                to tokenizer.json.
+            batch_size: Pairs per forward pass.
+            max_seq_length: Maximum tokens per pair (longest part truncated first).
+            cache_size: Tokenized documents kept for reuse.
+        """
+        self.model = model or CROSS_ENCODER_MODEL
+        if not self.model:
+            raise ValueError("CROSS_ENCODER_MODEL is required")
+        parsed = parse_local_model(self.model)
+        if parsed is None:
+            raise ValueError(
+                f"Not a local cross-encoder: {self.model} "
+                f"(expected onnx:<model dir> or sentence-transformers:<model name>)"
+            )
+        backend, name = parsed
+        self.batch_size = batch_size
+        self.cache_size = cache_size
+        self._documents: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        # sentence-transformers tokenizes internally, so nothing is reused
+        self._predictor = None
+        if backend == "sentence-transformers" and session is None:
+            if not HAS_SENTENCE_TRANSFORMERS:
+                raise ImportError(
+                    "sentence-transformers is required for sentence-transformers: cross-encoders "
+                    "(pip install sentence-transformers)"
+                )
+            from sentence_transformers import CrossEncoder
+            self._predictor = CrossEncoder(name, device="cpu", max_length=max_seq_length)
+            return
+
+        if session is None or tokenizer is None:
+            if not HAS_ONNXRUNTIME:
+                raise ImportError(
+                    "onnxruntime and tokenizers are required for onnx: cross-encoders "
+                    "(pip install onnxruntime tokenizers)"
+                )
+            import onnxruntime
+            from tokenizers import Tokenizer
+        if session is None:
+            options = onnxruntime.SessionOptions()
+            options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+            session = onnxruntime.InferenceSession(
+                str(Path(name) / "model.onnx"),
+                sess_options=options,
+                providers=["CPUExecutionProvider"],
+            )
+        if tokenizer is None:
+            tokenizer = Tokenizer.from_file(str(Path(name) / "tokenizer.json"))
+
+        # Pairs are truncated when assembled and padded per batch
+        tokenizer.no_padding()
+        tokenizer.enable_truncation(max_length=max_seq_length)
+        self.session = session
+        self.tokenizer = tokenizer
+        self._input_names = {i.name for i in session.get_inputs()}
+
+    def _encode_documents(self, documents: list[str]) -> list:
+        """Tokenize documents (without special tokens), reusing earlier encodings."""
+        encodings = [None] * len(documents)
+        missing = []
+        with self._lock:
+            for i, doc in enumerate(documents):
+                encoding = self._documents.get(doc)
+                if encoding is None:
+                    missing.append(i)
+                else:
+                    self._documents.move_to_end(doc)
+                    encodings[i] = encoding
+            self.hits += len(documents) - len(missing)
+            self.misses += len(missing)
+
+        if missing:
+            new = self.tokenizer.encode_batch(
+                [documents[i] for i in missing], add_special_tokens=False
+            )
+            with self._lock:
+                for i, encoding in zip(missing, new):
+                    encodings[i] = encoding
+                    self._documents[documents[i]] = encoding
+                while len(self._documents) > self.cache_size:
+                    self._documents.popitem(last=False)
+        return encodings
+
+    def _run(self, pairs: list) -> np.ndarray:
+        """Relevance of a batch of assembled pairs."""
+        width = max(len(pair.ids) for pair in pairs)
+        # Padding positions are masked out, so the pad id doesn't matter
+        input_ids = np.zeros((len(pairs), width), dtype=np.int64)
+        attention_mask = np.zeros_like(input_ids)
+        token_type_ids = np.zeros_like(input_ids)
+        for row, pair in enumerate(pairs):
+            input_ids[row, :len(pair.ids)] = pair.ids
+            attention_mask[row, :len(pair.ids)] = 1
+            token_type_ids[row, :len(pair.ids)] = pair.type_ids
+
+        inputs = {
+            "input_ids": input_ids,
+            "attention_mask": attention_mask,
+            "token_type_ids": token_type_ids,
+        }
+        feeds = {k: v for k, v in inputs.items() if k in self._input_names}
+        logits = self.session.run(None, feeds)[0]
+        return self._relevance(logits)
+
+    @staticmethod
+    def _relevance(logits: np.ndarray) -> np.ndarray:
+        """Map model outputs to 0-1 relevance (one logit, or relevant-class softmax)."""
+        logits = np.asarray(logits, dtype=np.float32)
+        if logits.ndim == 2 and logits.shape[1] == 2:
+            shifted = np.exp(logits - logits.max(axis=1, keepdims=True))
+            return shifted[:, 1] / shifted.sum(axis=1)
+        return 1 / (1 + np.exp(-logits.reshape(len(logits), -1)[:, 0]))
+
+    def score(self, query: str, documents: list[str]) -> np.ndarray:
+        """
+        Relevance of each document to the query.
+
+        Args:
+            query: The search query.
+            documents: Document texts.
+
+        Returns:
+            float32 array of relevance scores in [0, 1], aligned with documents.
+        """
+        if not documents:
+            return np.zeros(0, dtype=np.float32)
+        if self._predictor is not None:
+            logits = self._predictor.predict(
+                [(query, doc) for doc in documents],
+                batch_size=self.batch_size,
+                convert_to_numpy=True,
+            )
+            return self._relevance(logits)
+
+        query_encoding = self.tokenizer.encode(query, add_special_tokens=False)
+        pairs = [
+            self.tokenizer.post_process(query_encoding, encoding, add_special_tokens=True)
+            for encoding in self._encode_documents(documents)
+        ]
+        # Batch pairs of similar length together to minimize padding
+        order = np.argsort([len(pair.ids) for pair in pairs], kind="stable")
+        scores = np.empty(len(pairs), dtype=np.float32)
+        for start in range(0, len(order), self.batch_size):
+            batch = order[start:start + self.batch_size]
+            scores[batch] = self._run([pairs[i] for i in batch])
+        return scores
+
+    def rerank(
+        self,
+        query: str,
+        documents: list[str],
+        top_k: int = 5,
+    ) -> list[dict]:
+        """
+        Rerank documents based on relevance to query.
+
+        Args:
+            query: The search query.
+            documents: List of document texts to rerank.
+            top_k: Number of top results to return.
+
+        Returns:
+            List of dicts with 'index', 'document', and 'score' (0-1).
+        """
+        scores = self.score(query, documents)
+        results = [
+            {"index": i, "document": doc, "score": float(scores[i])}
+            for i, doc in enumerate(documents)
+        ]
+        results.sort(key=lambda x: x["score"], reverse=True)
+        return results[:top_k]
+
+    def get_cache_stats(self) -> dict:
+        """Reuse statistics of tokenized documents."""
+        total = self.hits + self.misses
+        return {
+            "size": len(self._documents),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
 class HybridReranker:
     """
     Combines vector similarity, BM25, and optional LLM reranking.
-    Uses Reciprocal Rank Fusion (RRF) for combining scores.
+    Uses Reciprocal Rank Fusion (RRF) for combining scores by default;
+    weighted CombSUM and z-score fusion are also available (see fusion.py),
+    and callers can fuse in more signals.
+
+    The final reranker may be the LLM Reranker or a local
+    CrossEncoderReranker.
     """
 
     def __init__(
         self,
         use_llm: bool = False,
-        llm_reranker: Optional[Reranker] = None,
+        llm_reranker: Optional[Reranker | CrossEncoderReranker] = None,
         rrf_k: int = 60,
+        bm25_index: Optional[BM25Index] = None,
+        rerank_candidates: Optional[int] = None,
+        fusion: str = "rrf",
+        weights: Optional[dict[str, float]] = None,
     ):
         """
         Initialize hybrid reranker.
 
         Args:
             use_llm: Whether to use LLM for final reranking.
-            llm_reranker: LLM reranker instance.
+            llm_reranker: LLM reranker or cross-encoder instance.
             rrf_k: RRF constant (default 60).
+            bm25_index: Corpus BM25 index to score documents from.
+            rerank_candidates: Top fused results passed to the final
+                reranker. Defaults to top_k; a cross-encoder is cheap enough
+                to reorder every candidate.
+            fusion: Fusion method, "rrf", "combsum" or "zscore".
+            weights: Weight per signal name ("vector", "bm25", or a name
+                passed in signals). Defaults to 1 each.
         """
-        self.bm25_reranker = BM25Reranker()
+        self.bm25_reranker = BM25Reranker(index=bm25_index)
         self.use_llm = use_llm
         self.llm_reranker = llm_reranker
         self.rrf_k = rrf_k
+        self.rerank_candidates = rerank_candidates
+        self.fusion = fusion
+        self.weights = weights or {}
 
     def rerank(
         self,
@@ -295,65 +708,63 @@ class HybridReranker:
         documents: list[str],
         vector_distances: list[float],
         top_k: int = 5,
+        ids: Optional[list[str]] = None,
+        signals: Optional[dict[str, Sequence[float]]] = None,
     ) -> list[dict]:
         """
-        Hybrid reranking using RRF.
+        Hybrid reranking by rank fusion.
 
         Args:
             query: The search query.
             documents: List of documents.
             vector_distances: Original vector search distances.
             top_k: Number of results to return.
+            ids: Document ids, used to score from the corpus BM25 index.
+            signals: More scores to fuse in, by name (e.g. "sparse"),
+                aligned with documents. Higher is better; NaN where the
+                retriever didn't return the document.
 
         Returns:
-            Reranked results.
+            Reranked results, with each signal's rank as "<name>_rank" and
+            the fused score as "fused_score" (also "rrf_score" for RRF).
         """
-        n = len(documents)
-
-        # Get BM25 rankings
-        bm25_results = self.bm25_reranker.rerank(query, documents, top_k=n)
-        bm25_ranks = {r["index"]: i + 1 for i, r in enumerate(bm25_results)}
-
-        # Get vector rankings (lower distance = better rank)
-        vector_sorted = sorted(range(n), key=lambda i: vector_distances[i])
-        vector_ranks = {idx: rank + 1 for rank, idx in enumerate(vector_sorted)}
-
-        # Compute RRF scores
-        rrf_scores = {}
-        for i in range(n):
-            rrf_scores[i] = (
-                1 / (self.rrf_k + vector_ranks[i]) +
-                1 / (self.rrf_k + bm25_ranks[i])
-            )
-
-        # Sort by RRF score
-        sorted_indices = sorted(rrf_scores.keys(), key=lambda i: rrf_scores[i], reverse=True)
-
-        results = [
-            {
-                "index": idx,
-                "document": documents[idx],
-                "vector_rank": vector_ranks[idx],
-                "bm25_rank": bm25_ranks[idx],
-                "rrf_score": rrf_scores[idx],
-            }
-            for idx in sorted_indices[:top_k]
-        ]
+        # One row per signal, higher is better
+        names = ["vector", "bm25", *(signals or {})]
+        scores = np.vstack([
+            -np.asarray(vector_distances, dtype=np.float64),
+            self.bm25_reranker.score(query, documents, ids),
+            *(np.asarray(values, dtype=np.float64) for values in (signals or {}).values()),
+        ])
+        weights = [self.weights.get(name, 1.0) for name in names]
+        fused = fuse(scores, method=self.fusion, weights=weights, rrf_k=self.rrf_k)
+        signal_ranks = ranks(scores)
+
+        use_llm = self.use_llm and self.llm_reranker is not None
+        n_candidates = max(top_k, self.rerank_candidates or 0) if use_llm else top_k
+        results = []
+        for idx in top_indices(fused, n_candidates).tolist():
+            result = {"index": idx, "document": documents[idx]}
+            result.update({
+                f"{name}_rank": int(signal_ranks[row, idx]) for row, name in enumerate(names)
+            })
+            result["fused_score"] = float(fused[idx])
+            if self.fusion == "rrf":
+                result["rrf_score"] = result["fused_score"]
+            results.append(result)
 
-        # Optional LLM reranking on top results
-        if self.use_llm and self.llm_reranker:
+        # Optional LLM / cross-encoder reranking on top results
+        if use_llm:
             top_docs = [r["document"] for r in results]
             llm_results = self.llm_reranker.rerank(query, top_docs, top_k=top_k)
 
-            # Merge LLM scores
-            for i, llm_r in enumerate(llm_results):
-                orig_idx = results[llm_r["index"]]["index"]
-                results[i] = {
+            # Merge scores (llm_results is already sorted by score)
+            results = [
+                {
                     **results[llm_r["index"]],
                     "llm_score": llm_r["score"],
                     "final_rank": i + 1,
                 }
-
-            results = sorted(results, key=lambda x: x.get("llm_score", 0), reverse=True)
+                for i, llm_r in enumerate(llm_results)
+            ]
 
         return results
@@ -0,0 +1,162 @@
+"""
+Sparse code-symbol vectors for ARBuilder.
+
+A deterministic, learned-sparse-style channel next to the dense embeddings:
+every chunk is mapped to a sparse vector over the code symbols it contains
+(macros such as `sol_storage!`, attributes such as `#[entrypoint]`, paths,
+and identifiers such as `StorageMap`), weighted by log term frequency times
+IDF and L2-normalized. Unlike the BM25 index, symbols are kept whole, so
+`sol_storage!` never matches prose about "storage".
+
+Vectors are stored as an inverted index in CSR layout (see postings.py),
+with weights as float32, and persisted as a single .npz file. Queries are
+scored with a sparse dot product, computed locally.
+"""
+
+import math
+import re
+from typing import Iterable
+
+import numpy as np
+
+from .postings import PostingsIndex
+
+# Longer symbols are hashes, addresses or encoded blobs
+MAX_SYMBOL_LENGTH = 64
+
+_SYMBOL_PATTERN = re.compile(
+    r"#!?\[\s*([A-Za-z_][A-Za-z0-9_]*)"  # attribute: #[entrypoint(...)] -> #[entrypoint]
+    r"|([A-Za-z_][A-Za-z0-9_]*(?:::[A-Za-z_][A-Za-z0-9_]*)+)"  # path: alloy_primitives::U256
+    r"|([A-Za-z_][A-Za-z0-9_]*!)"  # macro: sol_storage!
+    r"|([A-Za-z_][A-Za-z0-9_]*)"  # identifier
+)
+
+
+def _is_code_identifier(word: str) -> bool:
+    """Whether a bare word looks like code rather than prose (snake_case, camelCase, digits)."""
+    return (
+        "_" in word.strip("_")
+        or any(c.isdigit() for c in word)
+        or any(c.isupper() for c in word[1:])
+    )
+
+
+def code_symbols(text: str) -> list[str]:
+    """
+    Extract the code symbols of a text.
+
+    Attributes, macros and paths are kept with their punctuation; macros
+    also yield their bare name and paths their last segment
+    (`alloy_primitives::U256` gives `U256`).
+    Identifiers count when they look like code. Prose words are ignored,
+    as are single-letter symbols.
+    """
+    symbols = []
+    for attribute, path, macro, word in _SYMBOL_PATTERN.findall(text):
+        if attribute:
+            symbols.append(f"#[{attribute}]")
+        elif path:
+            symbols.append(path)
+            last = path.rsplit("::", 1)[1]
+            if len(last) > 1:
+                symbols.append(last)
+        elif macro:
+            symbols.extend((macro, macro[:-1]))
+        elif len(word) > 1 and _is_code_identifier(word):
+            symbols.append(word)
+    return [symbol for symbol in symbols if len(symbol) <= MAX_SYMBOL_LENGTH]
+
+
+class SparseIndex(PostingsIndex):
+    """
+    Inverted index of L2-normalized sparse code-symbol vectors.
+
+    Postings of symbol t are postings_docs[offsets[t]:offsets[t + 1]]
+    (sorted document indices) with matching weights in postings_weights.
+    """
+
+    def __init__(
+        self,
+        doc_ids: list[str],
+        vocab: dict[str, int],
+        offsets: np.ndarray,
+        postings_docs: np.ndarray,
+        postings_weights: np.ndarray,
+        idf: np.ndarray,
+    ):
+        """
+        Initialize from built arrays; use build() or load() to create one.
+
+        Args:
+            doc_ids: Document id for each document index.
+            vocab: Mapping of symbol to symbol index.
+            offsets: Start of each symbol's postings (len(vocab) + 1 entries).
+            postings_docs: Document indices of all postings (uint32).
+            postings_weights: Document vector weights of all postings (float32).
+            idf: IDF of each symbol (float32).
+        """
+        super().__init__(doc_ids, vocab, offsets, postings_docs)
+        self.postings_weights = postings_weights
+        self.idf = idf
+
+    @classmethod
+    def build(cls, documents: Iterable[tuple[str, str]]) -> "SparseIndex":
+        """
+        Build an index from (doc_id, text) pairs.
+
+        Args:
+            documents: Documents to index, streamed.
+
+        Returns:
+            The built index.
+        """
+        doc_ids, vocab, offsets, postings_docs, tfs, _ = cls._collect_postings(
+            documents, code_symbols
+        )
+
+        n_docs = len(doc_ids)
+        df = np.diff(offsets).astype(np.float32)
+        idf = np.log(1 + (n_docs - df + 0.5) / (df + 0.5)).astype(np.float32)
+
+        # Weight (1 + log tf) * idf, then normalize each document vector
+        weights = (1 + np.log(tfs.astype(np.float32))) * np.repeat(idf, np.diff(offsets))
+        norms = np.zeros(n_docs, dtype=np.float32)
+        np.add.at(norms, postings_docs, weights * weights)
+        weights = weights / np.sqrt(np.maximum(norms[postings_docs], 1e-12))
+
+        return cls(
+            doc_ids=doc_ids,
+            vocab=vocab,
+            offsets=offsets,
+            postings_docs=postings_docs,
+            postings_weights=weights.astype(np.float32),
+            idf=idf,
+        )
+
+    def _query_terms(self, query: str) -> list[tuple[int, float]]:
+        """Symbol indices of the distinct query symbols and their normalized weights."""
+        terms = [self.vocab[s] for s in dict.fromkeys(code_symbols(query)) if s in self.vocab]
+        if not terms:
+            return []
+        weights = self.idf[terms]
+        norm = math.sqrt(float(weights @ weights))
+        return list(zip(terms, (weights / max(norm, 1e-12)).tolist()))
+
+    def _posting_scores(self, query_weight: float, postings: slice | np.ndarray) -> np.ndarray:
+        # Cosine of the sparse vectors, one query symbol at a time
+        return query_weight * self.postings_weights[postings]
+
+    def _arrays(self) -> dict[str, np.ndarray]:
+        return {"postings_weights": self.postings_weights, "idf": self.idf}
+
+    @classmethod
+    def _from_arrays(cls, data) -> dict:
+        return {"postings_weights": data["postings_weights"], "idf": data["idf"]}
+
+    def get_stats(self) -> dict:
+        """Get index statistics."""
+        return {
+            "documents": len(self.doc_ids),
+            "symbols": len(self.vocab),
+            "postings": int(len(self.postings_docs)),
+        }
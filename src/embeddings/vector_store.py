@@ -0,0 +1,813 @@
+"""
+Vector store backends for ARBuilder.
+
+VectorDB searches through a VectorStore. ChromaVectorStore wraps the ChromaDB
+collection, which ingestion writes to and which stays the source of truth.
+PartitionedVectorStore routes queries filtered on a partition key (e.g.
+source) to a store holding only that partition's vectors, so selective
+filters don't shrink the candidate set of a global nearest-neighbour search.
+QuantizedVectorStore is a read-only export of it for serving: vectors are
+unit-normalized and stored as int8 (with a per-vector scale) or float16 in
+memory-mapped files, metadata is kept in columnar arrays, and an optional
+IVF (inverted file) index limits how many vectors a query scans. Both return
+results in ChromaDB's layout.
+"""
+
+import hashlib
+import json
+import logging
+import re
+import shutil
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any, Iterable, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+VECTOR_DTYPES = ("int8", "float16")
+DEFAULT_NPROBE = 8
+# Collections smaller than this are searched brute force by default
+IVF_MIN_VECTORS = 10_000
+FORMAT_VERSION = 1
+
+# Rows scored per block, bounding temporary float32 memory
+_SCORE_BLOCK = 65536
+_KMEANS_SAMPLES_PER_LIST = 64
+_MASK_CACHE_SIZE = 32
+_MANIFEST = "manifest.json"
+
+# (id, embedding, document, metadata)
+Record = tuple[str, list[float], str, Optional[dict]]
+
+
+class VectorStore(ABC):
+    """Read interface that VectorDB searches through."""
+
+    @abstractmethod
+    def count(self) -> int:
+        """Number of stored vectors."""
+
+    @abstractmethod
+    def query(
+        self,
+        query_embedding: list[float],
+        n_results: int = 10,
+        where: Optional[dict] = None,
+        where_document: Optional[dict] = None,
+    ) -> dict:
+        """
+        Find the nearest vectors to a query embedding.
+
+        Args:
+            query_embedding: Query vector.
+            n_results: Number of results to return.
+            where: Metadata filter (ChromaDB syntax).
+            where_document: Document content filter (ChromaDB syntax).
+
+        Returns:
+            ChromaDB-style results with ids, documents, metadatas and
+            (cosine) distances for the single query.
+        """
+
+    def query_many(
+        self,
+        query_embeddings: list[list[float]],
+        n_results: int = 10,
+        where: Optional[dict] = None,
+        where_document: Optional[dict] = None,
+    ) -> list[dict]:
+        """
+        Find the nearest vectors for several query embeddings.
+
+        Returns:
+            One ChromaDB-style result (as from query()) per embedding.
+        """
+        return [
+            self.query(embedding, n_results, where, where_document)
+            for embedding in query_embeddings
+        ]
+
+    @abstractmethod
+    def get(
+        self,
+        ids: list[str],
+        where: Optional[dict] = None,
+        include: Iterable[str] = ("documents", "metadatas"),
+    ) -> dict:
+        """
+        Fetch records by id.
+
+        Args:
+            ids: Record ids; unknown ids are skipped.
+            where: Metadata filter (ChromaDB syntax).
+            include: Fields to return ("documents", "metadatas", "embeddings").
+
+        Returns:
+            ChromaDB-style get results.
+        """
+
+
+class ChromaVectorStore(VectorStore):
+    """VectorStore backed by a ChromaDB collection."""
+
+    def __init__(self, collection):
+        """
+        Initialize the store.
+
+        Args:
+            collection: ChromaDB collection (cosine space).
+        """
+        self.collection = collection
+
+    def count(self) -> int:
+        return self.collection.count()
+
+    def query(
+        self,
+        query_embedding: list[float],
+        n_results: int = 10,
+        where: Optional[dict] = None,
+        where_document: Optional[dict] = None,
+    ) -> dict:
+        return self.query_many([query_embedding], n_results, where, where_document)[0]
+
+    def query_many(
+        self,
+        query_embeddings: list[list[float]],
+        n_results: int = 10,
+        where: Optional[dict] = None,
+        where_document: Optional[dict] = None,
+    ) -> list[dict]:
+        # One request for all embeddings, split into per-query results
+        results = self.collection.query(
+            query_embeddings=query_embeddings,
+            n_results=n_results,
+            where=where,
+            where_document=where_document,
+            include=["documents", "metadatas", "distances"],
+        )
+        fields = ("ids", "documents", "metadatas", "distances")
+        return [
+            {field: [results[field][i]] for field in fields} for i in range(len(query_embeddings))
+        ]
+
+    def get(
+        self,
+        ids: list[str],
+        where: Optional[dict] = None,
+        include: Iterable[str] = ("documents", "metadatas"),
+    ) -> dict:
+        return self.collection.get(ids=ids, where=where, include=list(include))
+
+
+class PartitionedVectorStore(VectorStore):
+    """
+    VectorStore that routes partition-key filters to per-partition stores.
+
+    A query whose `where` requires `key == value` for a partition key is
+    answered by that partition's store with the remaining conditions;
+    everything else goes to the base store.
+    """
+
+    def __init__(self, base: VectorStore, partitions: dict[tuple[str, Any], VectorStore]):
+        """
+        Initialize the store.
+
+        Args:
+            base: Store holding every vector.
+            partitions: Store per (metadata key, value) pair.
+        """
+        self.base = base
+        self.partitions = partitions
+        self.partition_keys = {key for key, _ in partitions}
+
+    def count(self) -> int:
+        return self.base.count()
+
+    def route(self, where: Optional[dict]) -> tuple[VectorStore, Optional[dict]]:
+        """Pick the store to search and the filter left to apply there."""
+        partition, rest = split_partition_filter(where, self.partition_keys)
+        if partition in self.partitions:
+            return self.partitions[partition], rest
+        return self.base, where
+
+    def query(
+        self,
+        query_embedding: list[float],
+        n_results: int = 10,
+        where: Optional[dict] = None,
+        where_document: Optional[dict] = None,
+    ) -> dict:
+        store, where = self.route(where)
+        return store.query(query_embedding, n_results, where, where_document)
+
+    def query_many(
+        self,
+        query_embeddings: list[list[float]],
+        n_results: int = 10,
+        where: Optional[dict] = None,
+        where_document: Optional[dict] = None,
+    ) -> list[dict]:
+        store, where = self.route(where)
+        return store.query_many(query_embeddings, n_results, where, where_document)
+
+    def get(
+        self,
+        ids: list[str],
+        where: Optional[dict] = None,
+        include: Iterable[str] = ("documents", "metadatas"),
+    ) -> dict:
+        return self.base.get(ids, where, include)
+
+
+def _equality(key: str, condition: Any) -> Optional[Any]:
+    """Value that `{key: condition}` requires the key to equal, if any."""
+    if isinstance(condition, dict):
+        if len(condition) == 1 and "$eq" in condition:
+            return condition["$eq"]
+        return None
+    return condition
+
+
+def split_partition_filter(
+    where: Optional[dict], partition_keys: Iterable[str]
+) -> tuple[Optional[tuple[str, Any]], Optional[dict]]:
+    """
+    Extract an equality condition on a partition key from a metadata filter.
+
+    Args:
+        where: Metadata filter (ChromaDB syntax).
+        partition_keys: Keys that have partitions.
+
+    Returns:
+        ((key, value), remaining filter or None), or (None, where) if the
+        filter doesn't pin a partition key.
+    """
+    if not where:
+        return None, where
+    partition_keys = set(partition_keys)
+
+    if "$and" in where and len(where) == 1:
+        clauses = where["$and"]
+        for i, clause in enumerate(clauses):
+            if len(clause) == 1:
+                (key, condition), = clause.items()
+                value = _equality(key, condition)
+                if key in partition_keys and value is not None:
+                    rest = clauses[:i] + clauses[i + 1:]
+                    if not rest:
+                        return (key, value), None
+                    return (key, value), rest[0] if len(rest) == 1 else {"$and": rest}
+        return None, where
+
+    for key, condition in where.items():
+        value = _equality(key, condition)
+        if key in partition_keys and value is not None:
+            rest = {k: v for k, v in where.items() if k != key}
+            return (key, value), rest or None
+    return None, where
+
+
+def partition_collection_name(collection_name: str, key: str, value: Any) -> str:
+    """
+    ChromaDB-safe collection name for one partition of a collection.
+
+    The name is readable ("<collection>--<key>--<value>") when every part is
+    already a slug without "--", so no two partitions can share it. Anything
+    else (values that need escaping, long names) gets a digest of the whole
+    (collection, key, value), which is unique per parent collection.
+    """
+    parts = (collection_name, key, str(value))
+    if all(re.fullmatch(r"[A-Za-z0-9]+(?:[_-][A-Za-z0-9]+)*", part) for part in parts):
+        name = "--".join(parts)
+        if len(name) <= 63:
+            return name
+    # Versions of one model share their first 40 characters, so the full
+    # collection name goes into the digest
+    digest = hashlib.sha1(f"{collection_name}|{key}={value}".encode("utf-8")).hexdigest()[:12]
+    return f"{collection_name[:40]}--p{digest}"
+
+
+def _map_array(path: Path, dtype: str, shape: tuple) -> np.ndarray:
+    """Memory-map a raw array file (empty files can't be mapped)."""
+    if int(np.prod(shape)) == 0:
+        return np.zeros(shape, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r", shape=shape)
+
+
+class _StringArray:
+    """Strings stored as one UTF-8 blob plus offsets."""
+
+    def __init__(self, blob: np.ndarray, offsets: np.ndarray):
+        self.blob = blob
+        self.offsets = offsets
+
+    @staticmethod
+    def write(path: Path, strings: Iterable[str]) -> int:
+        """Write strings as a blob at path and offsets at <stem>_offsets.npy."""
+        offsets = [0]
+        with open(path, "wb") as f:
+            for string in strings:
+                offsets.append(offsets[-1] + f.write(string.encode("utf-8")))
+        np.save(_offsets_path(path), np.asarray(offsets, dtype=np.int64))
+        return len(offsets) - 1
+
+    @classmethod
+    def load(cls, path: Path) -> "_StringArray":
+        offsets = np.load(_offsets_path(path), mmap_mode="r")
+        return cls(_map_array(path, "uint8", (int(offsets[-1]),)), offsets)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index: int) -> str:
+        start, end = self.offsets[index], self.offsets[index + 1]
+        return bytes(self.blob[start:end]).decode("utf-8")
+
+
+def _offsets_path(path: Path) -> Path:
+    return path.with_name(f"{path.stem}_offsets.npy")
+
+
+def _column_kind(values: list) -> str:
+    """Pick the storage kind of a metadata column from its values."""
+    present = [v for v in values if v is not None]
+    if present and all(isinstance(v, bool) for v in present):
+        return "bool"
+    if present and all(isinstance(v, int) and not isinstance(v, bool) for v in present):
+        return "int"
+    if present and all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in present):
+        return "float"
+    return "str"
+
+
+def _as_number(value: Any) -> Optional[float]:
+    if isinstance(value, (int, float)):
+        return float(value)
+    return None
+
+
+class _Column:
+    """
+    One metadata key across all rows.
+
+    Strings are dictionary-encoded (int32 codes, -1 for missing); numbers
+    and booleans are float64 (NaN for missing).
+    """
+
+    def __init__(self, key: str, kind: str, data: np.ndarray, dictionary: Optional[_StringArray]):
+        self.key = key
+        self.kind = kind
+        self.data = data
+        self.dictionary = dictionary
+        self._codes: Optional[dict[str, int]] = None
+
+    def value(self, row: int) -> Any:
+        if self.kind == "str":
+            code = int(self.data[row])
+            return self.dictionary[code] if code >= 0 else None
+        value = float(self.data[row])
+        if np.isnan(value):
+            return None
+        if self.kind == "bool":
+            return bool(value)
+        return int(value) if self.kind == "int" else value
+
+    def _code(self, value: Any) -> int:
+        if self._codes is None:
+            self._codes = {self.dictionary[i]: i for i in range(len(self.dictionary))}
+        return self._codes.get(value, -2) if isinstance(value, str) else -2
+
+    def mask(self, op: str, operand: Any) -> np.ndarray:
+        """Rows matching `key op operand`; rows missing the key never match."""
+        if self.kind == "str":
+            present = self.data >= 0
+            if op in ("$eq", "$ne"):
+                hit = self.data == self._code(operand)
+            elif op in ("$in", "$nin"):
+                hit = np.isin(self.data, [self._code(v) for v in operand])
+            else:
+                raise ValueError(f"Operator {op} is not supported on string metadata '{self.key}'")
+            return present & ~hit if op in ("$ne", "$nin") else hit
+
+        present = ~np.isnan(self.data)
+        if op in ("$in", "$nin"):
+            numbers = [n for n in map(_as_number, operand) if n is not None]
+            hit = np.isin(self.data, numbers)
+            return present & ~hit if op == "$nin" else hit
+
+        number = _as_number(operand)
+        if number is None:
+            if op in ("$eq", "$ne"):
+                return present if op == "$ne" else np.zeros(len(self.data), dtype=bool)
+            raise ValueError(f"Operator {op} needs a number, got {operand!r}")
+        comparisons = {
+            "$eq": np.equal,
+            "$ne": np.not_equal,
+            "$gt": np.greater,
+            "$gte": np.greater_equal,
+            "$lt": np.less,
+            "$lte": np.less_equal,
+        }
+        if op not in comparisons:
+            raise ValueError(f"Unsupported metadata operator: {op}")
+        return present & comparisons[op](self.data, number)
+
+
+def _spherical_kmeans(data: np.ndarray, k: int, iterations: int = 10, seed: int = 0) -> np.ndarray:
+    """Cluster unit vectors by cosine similarity; returns unit centroids (k x dim)."""
+    rng = np.random.default_rng(seed)
+    centroids = data[rng.choice(len(data), k, replace=False)].copy()
+    for _ in range(iterations):
+        assign = np.argmax(data @ centroids.T, axis=1)
+        one_hot = np.zeros((k, len(data)), dtype=np.float32)
+        one_hot[assign, np.arange(len(data))] = 1.0
+        sums = one_hot @ data
+        norms = np.linalg.norm(sums, axis=1)
+        empty = norms == 0
+        # Re-seed empty lists with random points
+        sums[empty] = data[rng.choice(len(data), int(empty.sum()))]
+        centroids = sums / np.linalg.norm(sums, axis=1, keepdims=True)
+    return centroids.astype(np.float32)
+
+
+class QuantizedVectorStore(VectorStore):
+    """
+    Read-only vector store of quantized, memory-mapped vectors.
+
+    Opening a store only maps its files, so startup cost does not grow with
+    the collection. Scores are cosine similarities computed blockwise with
+    vectorized dot products, either over all (filtered) rows or over the
+    rows of the IVF lists closest to the query.
+    """
+
+    def __init__(self, path: Path, nprobe: int = DEFAULT_NPROBE):
+        """
+        Open a store written by build().
+
+        Args:
+            path: Store directory.
+            nprobe: Number of IVF lists searched per query (widened
+                automatically when filters leave too few candidates).
+        """
+        self.path = Path(path)
+        self.nprobe = nprobe
+
+        manifest = json.loads((self.path / _MANIFEST).read_text())
+        if manifest.get("format_version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported vector store format in {self.path}")
+        self.manifest = manifest
+        self.dtype = manifest["dtype"]
+        self.dim = manifest["dim"]
+        self.nlist = manifest["nlist"]
+        n = manifest["count"]
+
+        self.vectors = _map_array(self.path / "vectors.bin", self.dtype, (n, self.dim))
+        self.scales = (
+            _map_array(self.path / "scales.bin", "float32", (n,)) if self.dtype == "int8" else None
+        )
+        self.ids = _StringArray.load(self.path / "ids.bin")
+        self.documents = _StringArray.load(self.path / "documents.bin")
+        self.columns = {}
+        for i, column in enumerate(manifest["columns"]):
+            dictionary_path = self.path / f"meta_{i}_dict.bin"
+            self.columns[column["key"]] = _Column(
+                key=column["key"],
+                kind=column["kind"],
+                data=np.load(self.path / f"meta_{i}.npy", mmap_mode="r"),
+                dictionary=_StringArray.load(dictionary_path) if column["kind"] == "str" else None,
+            )
+
+        if self.nlist:
+            self.centroids = np.load(self.path / "centroids.npy")
+            self.list_offsets = np.load(self.path / "list_offsets.npy")
+            self.list_rows = np.load(self.path / "list_rows.npy", mmap_mode="r")
+
+        self._id_index: Optional[dict[str, int]] = None
+        self._mask_cache: dict[str, np.ndarray] = {}
+
+    @classmethod
+    def build(
+        cls,
+        path: Path,
+        records: Iterable[Record],
+        dtype: str = "int8",
+        nlist: Optional[int] = None,
+        seed: int = 0,
+    ) -> "QuantizedVectorStore":
+        """
+        Write a store from a stream of records, replacing any existing one.
+
+        Args:
+            path: Store directory.
+            records: (id, embedding, document, metadata) tuples.
+            dtype: Vector storage type, "int8" or "float16".
+            nlist: Number of IVF lists; 0 disables IVF. Defaults to
+                sqrt(count) for collections of at least IVF_MIN_VECTORS.
+            seed: Seed for IVF training.
+
+        Returns:
+            The opened store.
+        """
+        if dtype not in VECTOR_DTYPES:
+            raise ValueError(f"dtype must be one of {VECTOR_DTYPES}, got {dtype!r}")
+
+        path = Path(path)
+        tmp_path = path.with_name(f".{path.name}.tmp")
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        tmp_path.mkdir(parents=True)
+
+        ids, documents = [], []
+        columns: dict[str, list] = {}
+        count = 0
+        dim = 0
+
+        with (
+            open(tmp_path / "vectors.bin", "wb") as vectors,
+            open(tmp_path / "scales.bin", "wb") as scales,
+        ):
+            for record_id, embedding, document, metadata in records:
+                vector = np.asarray(embedding, dtype=np.float32)
+                vector /= max(float(np.linalg.norm(vector)), 1e-12)
+                dim = dim or len(vector)
+                if len(vector) != dim:
+                    raise ValueError(
+                        f"Record {record_id} has dimension {len(vector)}, expected {dim}"
+                    )
+
+                if dtype == "int8":
+                    scale = max(float(np.abs(vector).max()), 1e-12) / 127.0
+                    vectors.write(np.round(vector / scale).astype(np.int8).tobytes())
+                    scales.write(np.float32(scale).tobytes())
+                else:
+                    vectors.write(vector.astype(np.float16).tobytes())
+
+                ids.append(record_id)
+                documents.append(document or "")
+                for key, value in (metadata or {}).items():
+                    columns.setdefault(key, [None] * count).append(value)
+                count += 1
+                for values in columns.values():
+                    if len(values) < count:
+                        values.append(None)
+
+        if dtype != "int8":
+            (tmp_path / "scales.bin").unlink()
+
+        _StringArray.write(tmp_path / "ids.bin", ids)
+        _StringArray.write(tmp_path / "documents.bin", documents)
+
+        column_specs = []
+        for i, (key, values) in enumerate(columns.items()):
+            kind = _column_kind(values)
+            column_specs.append({"key": key, "kind": kind})
+            if kind == "str":
+                dictionary: dict[str, int] = {}
+                codes = np.array(
+                    [
+                        -1 if v is None else dictionary.setdefault(str(v), len(dictionary))
+                        for v in values
+                    ],
+                    dtype=np.int32,
+                )
+                _StringArray.write(tmp_path / f"meta_{i}_dict.bin", dictionary)
+                np.save(tmp_path / f"meta_{i}.npy", codes)
+            else:
+                np.save(
+                    tmp_path / f"meta_{i}.npy",
+                    np.array([np.nan if v is None else float(v) for v in values], dtype=np.float64),
+                )
+
+        if nlist is None:
+            nlist = int(np.sqrt(count)) if count >= IVF_MIN_VECTORS else 0
+        nlist = min(nlist, count)
+
+        manifest = {
+            "format_version": FORMAT_VERSION,
+            "count": count,
+            "dim": dim,
+            "dtype": dtype,
+            "nlist": 0,
+            "columns": column_specs,
+        }
+        (tmp_path / _MANIFEST).write_text(json.dumps(manifest, indent=2))
+
+        if nlist:
+            # Train on the quantized vectors as stored, then enable IVF
+            cls(tmp_path)._write_ivf(tmp_path, nlist, seed)
+            manifest["nlist"] = nlist
+            (tmp_path / _MANIFEST).write_text(json.dumps(manifest, indent=2))
+
+        old_path = path.with_name(f".{path.name}.old")
+        shutil.rmtree(old_path, ignore_errors=True)
+        if path.exists():
+            path.rename(old_path)
+        tmp_path.rename(path)
+        shutil.rmtree(old_path, ignore_errors=True)
+
+        logger.info(
+            f"Built {dtype} vector store with {count} vectors ({nlist} IVF lists) at {path}"
+        )
+        return cls(path)
+
+    def _write_ivf(self, path: Path, nlist: int, seed: int):
+        """Train IVF centroids on a sample and write every row's list."""
+        n = self.count()
+        rng = np.random.default_rng(seed)
+        sample_size = min(n, nlist * _KMEANS_SAMPLES_PER_LIST)
+        sample = np.sort(rng.choice(n, sample_size, replace=False))
+        centroids = _spherical_kmeans(self._dequantize(sample), nlist, seed=seed)
+
+        assign = np.empty(n, dtype=np.int64)
+        for start in range(0, n, _SCORE_BLOCK):
+            rows = np.arange(start, min(n, start + _SCORE_BLOCK))
+            assign[rows] = np.argmax(self._dequantize(rows) @ centroids.T, axis=1)
+
+        offsets = np.zeros(nlist + 1, dtype=np.int64)
+        np.cumsum(np.bincount(assign, minlength=nlist), out=offsets[1:])
+        np.save(path / "centroids.npy", centroids)
+        np.save(path / "list_offsets.npy", offsets)
+        np.save(path / "list_rows.npy", np.argsort(assign, kind="stable").astype(np.uint32))
+
+    def count(self) -> int:
+        return len(self.vectors)
+
+    def _dequantize(self, rows: np.ndarray) -> np.ndarray:
+        vectors = self.vectors[rows].astype(np.float32)
+        if self.scales is not None:
+            vectors *= self.scales[rows][:, None]
+        return vectors
+
+    def _scores(self, rows: Optional[np.ndarray], query: np.ndarray) -> np.ndarray:
+        """Cosine similarity of the query with the given rows (all rows if None)."""
+        n = self.count() if rows is None else len(rows)
+        scores = np.empty(n, dtype=np.float32)
+        for start in range(0, n, _SCORE_BLOCK):
+            end = min(n, start + _SCORE_BLOCK)
+            block_rows = slice(start, end) if rows is None else rows[start:end]
+            block = self.vectors[block_rows].astype(np.float32) @ query
+            if self.scales is not None:
+                block *= self.scales[block_rows]
+            scores[start:end] = block
+        return scores
+
+    def _where_mask(self, where: dict) -> np.ndarray:
+        """Evaluate a ChromaDB-style metadata filter to a row mask (cached)."""
+        cache_key = json.dumps(where, sort_keys=True)
+        mask = self._mask_cache.get(cache_key)
+        if mask is None:
+            mask = self._evaluate_where(where)
+            if len(self._mask_cache) >= _MASK_CACHE_SIZE:
+                self._mask_cache.pop(next(iter(self._mask_cache)))
+            self._mask_cache[cache_key] = mask
+        return mask
+
+    def _evaluate_where(self, where: dict) -> np.ndarray:
+        n = self.count()
+        mask = np.ones(n, dtype=bool)
+        for key, condition in where.items():
+            if key == "$and":
+                for clause in condition:
+                    mask &= self._evaluate_where(clause)
+            elif key == "$or":
+                either = np.zeros(n, dtype=bool)
+                for clause in condition:
+                    either |= self._evaluate_where(clause)
+                mask &= either
+            else:
+                column = self.columns.get(key)
+                conditions = (
+                    condition.items() if isinstance(condition, dict) else [("$eq", condition)]
+                )
+                for op, operand in conditions:
+                    mask &= column.mask(op, operand) if column else np.zeros(n, dtype=bool)
+        return mask
+
+    @staticmethod
+    def _document_matches(document: str, where_document: dict) -> bool:
+        for op, operand in where_document.items():
+            if op == "$contains":
+                if operand not in document:
+                    return False
+            elif op == "$not_contains":
+                if operand in document:
+                    return False
+            else:
+                raise ValueError(f"Unsupported document filter: {op}")
+        return True
+
+    def _candidate_rows(
+        self, query: np.ndarray, mask: Optional[np.ndarray], n_results: int
+    ) -> Optional[np.ndarray]:
+        """Rows to score for a query (None for all rows)."""
+        allowed = None if mask is None else np.flatnonzero(mask)
+        if not self.nlist:
+            return allowed
+
+        # A selective filter is cheaper (and exact) to scan directly than
+        # the rows of nprobe lists
+        expected_scan = self.count() * min(self.nprobe, self.nlist) / self.nlist
+        if allowed is not None and len(allowed) <= expected_scan:
+            return allowed
+
+        list_order = np.argsort(-(self.centroids @ query))
+        nprobe = self.nprobe
+        while True:
+            rows = np.sort(np.concatenate([
+                self.list_rows[self.list_offsets[i]:self.list_offsets[i + 1]]
+                for i in list_order[:nprobe]
+            ]).astype(np.int64))
+            if mask is not None:
+                rows = rows[mask[rows]]
+            if len(rows) >= n_results or nprobe >= self.nlist:
+                return rows
+            nprobe *= 2
+
+    def _metadata(self, row: int) -> dict:
+        metadata = {}
+        for key, column in self.columns.items():
+            value = column.value(row)
+            if value is not None:
+                metadata[key] = value
+        return metadata
+
+    def query(
+        self,
+        query_embedding: list[float],
+        n_results: int = 10,
+        where: Optional[dict] = None,
+        where_document: Optional[dict] = None,
+    ) -> dict:
+        if not self.count():
+            return {"ids": [[]], "documents": [[]], "metadatas": [[]], "distances": [[]]}
+
+        query = np.asarray(query_embedding, dtype=np.float32)
+        if len(query) != self.dim:
+            raise ValueError(f"Query has dimension {len(query)}, store has {self.dim}")
+        query /= max(float(np.linalg.norm(query)), 1e-12)
+
+        mask = self._where_mask(where) if where else None
+        rows = self._candidate_rows(query, mask, n_results)
+        if rows is None:
+            rows = np.arange(self.count())
+        scores = self._scores(rows, query)
+
+        if where_document:
+            # Documents are decoded best-first, only until enough of them match
+            top = []
+            for i in np.argsort(-scores, kind="stable"):
+                if self._document_matches(self.documents[int(rows[i])], where_document):
+                    top.append(i)
+                    if len(top) == n_results:
+                        break
+        else:
+            top = np.argsort(-scores, kind="stable")[:n_results] if len(scores) <= n_results else (
+                np.argpartition(-scores, n_results - 1)[:n_results]
+            )
+            top = sorted(top, key=lambda i: -scores[i])
+
+        top_rows = [int(rows[i]) for i in top]
+        return {
+            "ids": [[self.ids[row] for row in top_rows]],
+            "documents": [[self.documents[row] for row in top_rows]],
+            "metadatas": [[self._metadata(row) for row in top_rows]],
+            "distances": [[1.0 - float(scores[i]) for i in top]],
+        }
+
+    def get(
+        self,
+        ids: list[str],
+        where: Optional[dict] = None,
+        include: Iterable[str] = ("documents", "metadatas"),
+    ) -> dict:
+        if self._id_index is None:
+            self._id_index = {self.ids[row]: row for row in range(self.count())}
+
+        rows = [self._id_index[i] for i in ids if i in self._id_index]
+        if where:
+            mask = self._where_mask(where)
+            rows = [row for row in rows if mask[row]]
+
+        include = set(include)
+        result = {"ids": [self.ids[row] for row in rows]}
+        if "documents" in include:
+            result["documents"] = [self.documents[row] for row in rows]
+        if "metadatas" in include:
+            result["metadatas"] = [self._metadata(row) for row in rows]
+        if "embeddings" in include:
+            vectors = self._dequantize(np.asarray(rows, dtype=np.int64))
+            result["embeddings"] = vectors.reshape(-1, self.dim)
+        return result
+
+    def get_stats(self) -> dict:
+        """Get store statistics."""
+        return {
+            "path": str(self.path),
+            "count": self.count(),
+            "dim": self.dim,
+            "dtype": self.dtype,
+            "nlist": self.nlist,
+            "vector_bytes": int(self.vectors.nbytes),
+        }
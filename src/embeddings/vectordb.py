@@ -2,20 +2,51 @@
 ChromaDB vector database management for ARBuilder.
 """
 
+import asyncio
+import itertools
 import json
+import math
 import os
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import shutil
+import threading
 from pathlib import Path
-from threading import Lock
-from typing import Optional
+from typing import Any, Iterable, Optional
 
 import chromadb
+import numpy as np
 from chromadb.config import Settings
 from dotenv import load_dotenv
 from rich.console import Console
-from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn
-
-from .embedder import EmbeddingClient, EmbeddingAPIError
+from rich.progress import BarColumn, Progress, SpinnerColumn, TextColumn
+
+from ..preprocessing.chunk_io import find_latest_chunk_file, iter_windows, read_chunks
+from .bm25_index import BM25Index
+from .cache import QueryEmbeddingCache, normalize_query
+from .embedder import (
+    AsyncEmbeddingClient,
+    EmbeddingBackend,
+    count_tokens,
+    create_embedding_client,
+    pack_batches,
+)
+from .fusion import fuse, top_indices
+from .local_embedder import AsyncLocalEmbeddingClient, LocalEmbeddingClient
+from .reduction import EmbeddingReducer, parse_reduction
+from .sparse_index import SparseIndex
+from .vector_store import (
+    ChromaVectorStore,
+    PartitionedVectorStore,
+    QuantizedVectorStore,
+    VectorStore,
+    partition_collection_name,
+)
+from .versioning import (
+    KEEP_COLLECTION_VERSIONS,
+    MANIFEST_FILENAME,
+    CollectionManifest,
+    new_build_id,
+    versioned_collection_name,
+)
 
 load_dotenv()
 
@@ -29,18 +60,89 @@ console = Console()
 _PROJECT_ROOT = Path(__file__).parent.parent.parent
 PROCESSED_DATA_DIR = Path(os.getenv("PROCESSED_DATA_DIR", _PROJECT_ROOT / "data" / "processed"))
 CHROMA_DB_DIR = _PROJECT_ROOT / "chroma_db"
+# BM25 indexes live next to the ChromaDB directory, one .npz per collection
+BM25_INDEX_DIRNAME = "bm25_index"
+# Sparse code-symbol indexes likewise
+SPARSE_INDEX_DIRNAME = "sparse_index"
+# Quantized vector stores likewise, one directory per collection
+VECTOR_STORE_DIRNAME = "vector_store"
+# Fitted embedding reducers likewise, one .npz per collection
+REDUCER_DIRNAME = "reducers"
+
+# Backend that queries are served from: "chroma" or "quantized"
+VECTOR_STORE_BACKEND = os.getenv("VECTOR_STORE", "chroma")
+VECTOR_STORE_DTYPE = os.getenv("VECTOR_STORE_DTYPE", "int8")
+
+# Whether ingestion builds the sparse code-symbol index ("true"/"false")
+BUILD_SPARSE_INDEX = os.getenv("SPARSE_INDEX", "false").lower() == "true"
+
+# How hybrid search fuses its retrievers: "rrf", "combsum" or "zscore", with
+# optional weights per retriever, e.g. "vector=1,bm25=0.5,sparse=1"
+HYBRID_FUSION = os.getenv("HYBRID_FUSION", "rrf")
+HYBRID_FUSION_WEIGHTS = {
+    name.strip(): float(weight)
+    for name, _, weight in (
+        item.partition("=")
+        for item in os.getenv("HYBRID_FUSION_WEIGHTS", "").split(",")
+        if item.strip()
+    )
+}
+
+# Adaptive candidate pool for hybrid search, in multiples of the results
+# requested: the pool starts at CANDIDATE_POOL_START and doubles, up to
+# CANDIDATE_POOL_MAX, while the vector distances across it stay within
+# CANDIDATE_POOL_GAP of the best one (a flat distribution with no clear
+# winners). Setting both multiples to 3 restores a fixed pool.
+CANDIDATE_POOL_START = float(os.getenv("CANDIDATE_POOL_START", "1"))
+CANDIDATE_POOL_MAX = float(os.getenv("CANDIDATE_POOL_MAX", "3"))
+CANDIDATE_POOL_GAP = float(os.getenv("CANDIDATE_POOL_GAP", "0.1"))
+
+# Ingest-time embedding reduction, "matryoshka:<dim>" or "pca:<dim>"
+# (unset keeps full-width vectors)
+EMBEDDING_REDUCTION = os.getenv("EMBEDDING_REDUCTION") or None
+# Chunks embedded to fit a PCA reduction
+REDUCTION_SAMPLE_SIZE = int(os.getenv("REDUCTION_SAMPLE_SIZE", "5000"))
+
+# Metadata keys whose values get their own ChromaDB collection, so filtered
+# queries (e.g. code only) search just that partition's vectors. Each key
+# stores another copy of every vector, so partitioning is off unless set.
+PARTITION_KEYS = tuple(
+    key.strip() for key in os.getenv("VECTOR_PARTITION_KEYS", "").split(",") if key.strip()
+)
+
+# Number of chunks read from disk and ingested at a time
+INGEST_WINDOW_SIZE = 5000
 
 
 class VectorDB:
     """
     ChromaDB-based vector database for ARBuilder.
+
+    Ingestion always writes to ChromaDB. Queries are served from the
+    configured vector store backend: ChromaDB itself, or a quantized
+    memory-mapped export of the collection (see build_vector_store).
+
+    With ChromaDB, every chunk is also written to one partition collection
+    per partition key (e.g. source=github), and queries filtered on a
+    partition key are routed to that partition.
+
+    A collection may have versions (see create_version); the active version
+    recorded in the manifest is opened unless another one is requested.
+
+    Stored vectors may be reduced to fewer dimensions (see fit_reducer);
+    query embeddings are then reduced the same way.
     """
 
     def __init__(
         self,
         collection_name: str = "arbbuilder",
         persist_directory: Optional[Path] = None,
-        embedding_client: Optional[EmbeddingClient] = None,
+        embedding_client: Optional[EmbeddingBackend] = None,
+        query_cache: Optional[QueryEmbeddingCache] = None,
+        use_query_cache: bool = True,
+        vector_store: Optional[str] = None,
+        partition_keys: Optional[Iterable[str]] = None,
+        version: Optional[str] = None,
     ):
         """
         Initialize the vector database.
@@ -48,62 +150,786 @@ class VectorDB:
         Args:
             collection_name: Name of the ChromaDB collection.
             persist_directory: Directory to persist the database.
-            embedding_client: Client for generating embeddings.
+            embedding_client: Client for generating embeddings. Defaults to
+                the client for the version's model, or the DEFAULT_EMBEDDING
+                model (OpenRouter or local) for unversioned collections.
+            query_cache: In-process cache of query embeddings. Defaults to a
+                new QueryEmbeddingCache.
+            use_query_cache: Whether to cache query embeddings in-process.
+            vector_store: Query backend, "chroma" or "quantized". Defaults to
+                the VECTOR_STORE environment variable.
+            partition_keys: Metadata keys to partition by. Defaults to the
+                VECTOR_PARTITION_KEYS environment variable (none).
+            version: ChromaDB collection of the version to open. Defaults to
+                the active version in the manifest, or the unversioned
+                collection_name if it has none.
         """
-        self.collection_name = collection_name
         self.persist_directory = persist_directory or CHROMA_DB_DIR
         # Ensure absolute path
         if not self.persist_directory.is_absolute():
             self.persist_directory = self.persist_directory.resolve()
         self.persist_directory.mkdir(parents=True, exist_ok=True)
 
-        # Initialize ChromaDB client
-        self.client = chromadb.PersistentClient(
-            path=str(self.persist_directory),
-            settings=Settings(anonymized_telemetry=False),
+        # collection_name is the physical collection (a version) from here on
+        self.base_name = collection_name
+        self.manifest = CollectionManifest(self.persist_directory.parent / MANIFEST_FILENAME)
+        if version is None:
+            version_info = self.manifest.active(collection_name)
+            version = version_info["name"] if version_info else collection_name
+        else:
+            version_info = next(
+                (v for v in self.manifest.versions(collection_name) if v["name"] == version), None
+            )
+        self.collection_name = version
+
+        # ChromaDB is opened on first use, so serving from the quantized
+        # store never loads it
+        self._client = None
+        self._collection = None
+
+        # Initialize embedding client, for the model the version was built with
+        self.embedding_client = embedding_client or create_embedding_client(
+            version_info["model"] if version_info else None
+        )
+        self.query_cache = (
+            (query_cache if query_cache is not None else QueryEmbeddingCache())
+            if use_query_cache else None
         )
 
-        # Initialize embedding client
-        self.embedding_client = embedding_client or EmbeddingClient()
+        self.vector_store_backend = vector_store or VECTOR_STORE_BACKEND
+        if self.vector_store_backend not in ("chroma", "quantized"):
+            raise ValueError(f"Unknown vector store backend: {self.vector_store_backend}")
+        self.vector_store_path = (
+            self.persist_directory.parent / VECTOR_STORE_DIRNAME / self.collection_name
+        )
+        self._store: Optional[VectorStore] = None
+        self.partition_keys = tuple(
+            partition_keys if partition_keys is not None else PARTITION_KEYS
+        )
+        self._partitions: Optional[dict[tuple[str, Any], Any]] = None
 
-        # Get or create collection
-        self.collection = self.client.get_or_create_collection(
-            name=collection_name,
-            metadata={"hnsw:space": "cosine"},
+        self.bm25_index_path = (
+            self.persist_directory.parent / BM25_INDEX_DIRNAME / f"{self.collection_name}.npz"
+        )
+        self._bm25_index: Optional[BM25Index] = None
+        # Background build of a missing BM25 index (see _bm25_index_or_build)
+        self._bm25_build: Optional[threading.Thread] = None
+        self._bm25_build_lock = threading.Lock()
+        self.sparse_index_path = (
+            self.persist_directory.parent / SPARSE_INDEX_DIRNAME / f"{self.collection_name}.npz"
+        )
+        self._sparse_index: Optional[SparseIndex] = None
+        self.reducer_path = (
+            self.persist_directory.parent / REDUCER_DIRNAME / f"{self.collection_name}.npz"
         )
+        self._reducer: Optional[EmbeddingReducer] = None
+        self._reducer_loaded = False
+        # Number of writes made through this instance (see revision)
+        self._writes = 0
+
+    @property
+    def client(self):
+        """ChromaDB client, created on first use."""
+        if self._client is None:
+            self._client = chromadb.PersistentClient(
+                path=str(self.persist_directory),
+                settings=Settings(anonymized_telemetry=False),
+            )
+        return self._client
+
+    @property
+    def collection(self):
+        """ChromaDB collection, created if it doesn't exist."""
+        if self._collection is None:
+            self._collection = self.client.get_or_create_collection(
+                name=self.collection_name,
+                metadata={"hnsw:space": "cosine", "embedding_model": self.embedding_client.model},
+            )
+            stored_model = (self._collection.metadata or {}).get("embedding_model")
+            if stored_model and stored_model != self.embedding_client.model:
+                logger.warning(
+                    f"Collection {self.collection_name} was embedded with {stored_model}, "
+                    f"but queries are embedded with {self.embedding_client.model}"
+                )
+        return self._collection
+
+    @property
+    def embedding_info(self) -> dict:
+        """Embedding model and dimension recorded in the collection metadata (None if unknown)."""
+        metadata = self.collection.metadata or {}
+        return {
+            "model": metadata.get("embedding_model"),
+            "dimension": metadata.get("embedding_dimension"),
+        }
 
-    def ingest_chunks(
+    def _record_embedding_info(self, dimension: int):
+        """Record the embedding model, stored dimension and reduction in the collection metadata."""
+        metadata = dict(self.collection.metadata or {})
+        info = {"embedding_model": self.embedding_client.model, "embedding_dimension": dimension}
+        if self.reducer is not None:
+            info["embedding_reduction"] = self.reducer.spec
+        if all(metadata.get(key) == value for key, value in info.items()):
+            return
+        # The distance function is fixed at creation and can't be passed again
+        metadata = {k: v for k, v in metadata.items() if not k.startswith("hnsw:")}
+        self.collection.modify(metadata={**metadata, **info})
+
+    @property
+    def partitions(self) -> dict[tuple[str, Any], Any]:
+        """Partition collections of this collection, by (key, value)."""
+        if self._partitions is None:
+            self._partitions = {}
+            for collection in self.client.list_collections():
+                metadata = collection.metadata or {}
+                if (
+                    metadata.get("partition_of") == self.collection_name
+                    and metadata.get("partition_key") in self.partition_keys
+                ):
+                    key = (metadata["partition_key"], metadata["partition_value"])
+                    self._partitions[key] = self.client.get_collection(collection.name)
+        return self._partitions
+
+    def _partition_collection(self, key: str, value: Any):
+        """Get or create the collection of one partition."""
+        partition = (key, value)
+        if partition not in self.partitions:
+            metadata = {
+                "partition_of": self.collection_name,
+                "partition_key": key,
+                "partition_value": value,
+            }
+            collection = self.client.get_or_create_collection(
+                name=partition_collection_name(self.collection_name, key, value),
+                metadata={"hnsw:space": "cosine", **metadata},
+            )
+            existing = collection.metadata or {}
+            if any(existing.get(k) != v for k, v in metadata.items()):
+                raise ValueError(
+                    f"Collection {collection.name} belongs to partition "
+                    f"{existing.get('partition_key')}={existing.get('partition_value')!r} "
+                    f"of {existing.get('partition_of')}, not {key}={value!r} of "
+                    f"{self.collection_name}"
+                )
+            self.partitions[partition] = collection
+            # Route queries to the new partition too
+            self._store = None
+        return self.partitions[partition]
+
+    def _write_partitions(
+        self,
+        ids: list[str],
+        embeddings: list,
+        documents: list[str],
+        metadatas: list[dict],
+        replace: bool = False,
+    ):
+        """
+        Copy records into their partition collections.
+
+        Args:
+            ids: Record ids.
+            embeddings: Record embeddings.
+            documents: Record documents.
+            metadatas: Record metadata (sanitized).
+            replace: Remove the ids from every partition first, for records
+                whose partition value may have changed.
+        """
+        for key in self.partition_keys:
+            if replace:
+                for (partition_key, _), collection in list(self.partitions.items()):
+                    if partition_key == key:
+                        collection.delete(ids=ids)
+
+            groups: dict[Any, list[int]] = {}
+            for i, metadata in enumerate(metadatas):
+                value = metadata.get(key)
+                if value is not None and not isinstance(value, float):
+                    groups.setdefault(value, []).append(i)
+
+            for value, rows in groups.items():
+                self._partition_collection(key, value).upsert(
+                    ids=[ids[i] for i in rows],
+                    embeddings=[embeddings[i] for i in rows],
+                    documents=[documents[i] for i in rows],
+                    metadatas=[metadatas[i] for i in rows],
+                )
+
+    def build_partitions(self, page_size: int = 1000) -> dict[str, int]:
+        """
+        Rebuild all partition collections from the main collection.
+
+        Needed once for collections ingested before partitioning was
+        enabled; ingestion keeps partitions up to date afterwards.
+
+        Args:
+            page_size: Number of records to fetch per request.
+
+        Returns:
+            Number of records per partition collection name.
+        """
+        for collection in self.partitions.values():
+            self.client.delete_collection(collection.name)
+        self._partitions = {}
+        self._store = None
+
+        offset = 0
+        while True:
+            page = self.collection.get(
+                include=["embeddings", "documents", "metadatas"],
+                limit=page_size,
+                offset=offset,
+            )
+            if len(page["ids"]):
+                self._write_partitions(
+                    page["ids"], page["embeddings"], page["documents"], page["metadatas"]
+                )
+            if len(page["ids"]) < page_size:
+                break
+            offset += page_size
+
+        self._writes += 1
+        return {collection.name: collection.count() for collection in self.partitions.values()}
+
+    @property
+    def store(self) -> VectorStore:
+        """Vector store that queries are served from."""
+        if self._store is None:
+            if (
+                self.vector_store_backend == "quantized"
+                and (self.vector_store_path / "manifest.json").exists()
+            ):
+                self._store = QuantizedVectorStore(self.vector_store_path)
+            else:
+                if self.vector_store_backend == "quantized":
+                    logger.warning(
+                        f"No quantized vector store at {self.vector_store_path}; "
+                        "serving from ChromaDB (run ingestion with --build-vector-store)"
+                    )
+                self._store = ChromaVectorStore(self.collection)
+                if self.partitions:
+                    self._store = PartitionedVectorStore(self._store, {
+                        partition: ChromaVectorStore(collection)
+                        for partition, collection in self.partitions.items()
+                    })
+        return self._store
+
+    def build_vector_store(
+        self,
+        dtype: str = VECTOR_STORE_DTYPE,
+        nlist: Optional[int] = None,
+        page_size: int = 1000,
+    ) -> QuantizedVectorStore:
+        """
+        Export the collection into a quantized memory-mapped vector store.
+
+        Args:
+            dtype: Vector storage type, "int8" or "float16".
+            nlist: Number of IVF lists (None picks one from the collection
+                size, 0 disables IVF).
+            page_size: Number of records to fetch per request.
+
+        Returns:
+            The new store.
+        """
+        def iter_records():
+            offset = 0
+            while True:
+                page = self.collection.get(
+                    include=["embeddings", "documents", "metadatas"],
+                    limit=page_size,
+                    offset=offset,
+                )
+                yield from zip(
+                    page["ids"], page["embeddings"], page["documents"], page["metadatas"]
+                )
+                if len(page["ids"]) < page_size:
+                    return
+                offset += page_size
+
+        store = QuantizedVectorStore.build(
+            self.vector_store_path, iter_records(), dtype=dtype, nlist=nlist
+        )
+        if self.vector_store_backend == "quantized":
+            self._store = store
+        self._writes += 1
+        return store
+
+    @property
+    def revision(self) -> tuple:
+        """
+        Token that changes whenever the collection contents change.
+
+        Combines writes made through this instance with the collection size
+        and the BM25 index file's mtime, which ingestion rewrites, so
+        changes made by another process are noticed as well.
+        """
+        try:
+            index_mtime = self.bm25_index_path.stat().st_mtime_ns
+        except FileNotFoundError:
+            index_mtime = 0
+        return (self.collection_name, self._writes, self.store.count(), index_mtime)
+
+    @property
+    def bm25_index(self) -> Optional[BM25Index]:
+        """Corpus BM25 index of the collection, loaded on first use (None if not built)."""
+        if self._bm25_index is None:
+            self._bm25_index = BM25Index.load_if_exists(self.bm25_index_path)
+        return self._bm25_index
+
+    @property
+    def reducer(self) -> Optional[EmbeddingReducer]:
+        """Embedding reducer of the collection, loaded on first use (None if not reduced)."""
+        if not self._reducer_loaded:
+            self._reducer = EmbeddingReducer.load_if_exists(self.reducer_path)
+            self._reducer_loaded = True
+        return self._reducer
+
+    def fit_reducer(self, spec: str, sample_texts: Optional[list[str]] = None) -> EmbeddingReducer:
+        """
+        Reduce the vectors ingested from now on, and queries, to fewer dimensions.
+
+        Must be set up before anything is ingested, since every vector of a
+        collection has to be reduced the same way.
+
+        Args:
+            spec: "matryoshka:<dim>" (truncate, for Matryoshka-trained
+                models) or "pca:<dim>" (project onto principal components).
+            sample_texts: Corpus texts to fit PCA on (at least dim). Their
+                embeddings are cached, so ingesting them later is free.
+
+        Returns:
+            The fitted reducer, saved next to the collection.
+        """
+        if self.collection.count():
+            raise ValueError(
+                f"Collection {self.collection_name} already has vectors; reduce into an "
+                f"empty collection or a new version"
+            )
+        method, _ = parse_reduction(spec)
+        sample = None
+        if method == "pca":
+            sample = np.asarray(
+                self.embedding_client.embed_batch(sample_texts or []), dtype=np.float32
+            )
+        reducer = EmbeddingReducer.fit(spec, sample)
+        reducer.save(self.reducer_path)
+        self._reducer, self._reducer_loaded = reducer, True
+        logger.info(f"Fitted {spec} embedding reduction for {self.collection_name}")
+        return reducer
+
+    def check_reduction(self, reduction: Optional[str] = None):
+        """
+        Refuse to ingest vectors reduced differently from those already stored.
+
+        A collection holds vectors of one dimension, so an ingest that adds,
+        changes or drops a reduction (or whose reducer file was lost) would
+        otherwise fail partway through with a dimension error.
+
+        Args:
+            reduction: Reduction requested for the ingest. None uses the
+                collection's own reducer, if any.
+
+        Raises:
+            ValueError: If the collection already has vectors stored another
+                way; they need a new collection version instead.
+        """
+        stored_dimension = self.embedding_info["dimension"]
+        # Collections from before embedding info was recorded can't be checked
+        if stored_dimension is None or not self.collection.count():
+            return
+        stored = self.collection.metadata.get("embedding_reduction")
+        current = self.reducer.spec if self.reducer is not None else None
+        requested = reduction or current
+        if requested != stored or current != stored:
+            def describe(spec: Optional[str]) -> str:
+                return f"{spec}-reduced" if spec else "unreduced"
+            raise ValueError(
+                f"Collection {self.collection_name} stores {describe(stored)} vectors "
+                f"({stored_dimension} dimensions), but this ingest would store "
+                f"{describe(requested)} ones. Ingest into a new collection version "
+                f"instead (--new-version)."
+            )
+
+    def _reduce(self, embeddings: list[list[float]]) -> list[list[float]]:
+        """Apply the collection's reduction to full-width embeddings, if any."""
+        if self.reducer is None:
+            return embeddings
+        return self.reducer.transform(embeddings).tolist()
+
+    @classmethod
+    def create_version(
+        cls,
+        collection_name: str = "arbbuilder",
+        embedding_client: Optional[EmbeddingBackend] = None,
+        build_id: Optional[str] = None,
+        reduction: Optional[str] = None,
+        **kwargs,
+    ) -> "VectorDB":
+        """
+        Create a new, empty version of a collection to ingest into.
+
+        The version is registered in the manifest as building; the active
+        version keeps serving queries until activate() is called.
+
+        Args:
+            collection_name: Collection to version.
+            embedding_client: Client for generating embeddings. Defaults to
+                the client for the DEFAULT_EMBEDDING model.
+            build_id: Build id. Defaults to the current UTC time.
+            reduction: Reduction the version will be built with (see
+                fit_reducer, which still has to be called); its dimension
+                goes into the version name.
+            **kwargs: Other VectorDB arguments.
+
+        Returns:
+            VectorDB opened on the new version.
+        """
+        embedding_client = embedding_client or create_embedding_client()
+        build_id = build_id or new_build_id()
+        dimension = parse_reduction(reduction)[1] if reduction else embedding_client.get_dimension()
+        name = versioned_collection_name(
+            collection_name, embedding_client.model, dimension, build_id
+        )
+
+        db = cls(
+            collection_name=collection_name,
+            embedding_client=embedding_client,
+            version=name,
+            **kwargs,
+        )
+        db.manifest.add_version(collection_name, name, embedding_client.model, dimension, build_id)
+        return db
+
+    def activate(self, keep: int = KEEP_COLLECTION_VERSIONS) -> list[str]:
+        """
+        Make this version the active one and delete old versions.
+
+        Servers switch to it on their next request.
+
+        Args:
+            keep: Number of most recent versions to keep (including this
+                one), so servers still on the previous version keep working.
+
+        Returns:
+            Names of the deleted versions.
+        """
+        self.manifest.activate(self.base_name, self.collection_name)
+        logger.info(f"Activated {self.collection_name} for {self.base_name}")
+
+        versions = [v["name"] for v in self.manifest.versions(self.base_name)]
+        removed = [
+            name for name in versions[:max(0, len(versions) - keep)]
+            if name != self.collection_name
+        ]
+        for name in removed:
+            old = VectorDB(
+                collection_name=self.base_name,
+                persist_directory=self.persist_directory,
+                embedding_client=self.embedding_client,
+                partition_keys=self.partition_keys,
+                version=name,
+            )
+            if name in {c.name for c in self.client.list_collections()}:
+                old.delete_collection()
+            old.delete_indexes()
+            self.manifest.remove_version(self.base_name, name)
+        return removed
+
+    def _iter_documents(self, page_size: int):
+        """Stream (id, document) pairs of the whole collection."""
+        offset = 0
+        while True:
+            page = self.collection.get(include=["documents"], limit=page_size, offset=offset)
+            yield from zip(page["ids"], page["documents"])
+            if len(page["ids"]) < page_size:
+                return
+            offset += page_size
+
+    def build_bm25_index(self, page_size: int = 5000) -> BM25Index:
+        """
+        Build the BM25 index over every document in the collection and save it.
+
+        Args:
+            page_size: Number of records to fetch per request.
+
+        Returns:
+            The new index.
+        """
+        index = BM25Index.build(self._iter_documents(page_size))
+        index.save(self.bm25_index_path)
+        self._bm25_index = index
+        self._writes += 1
+        return index
+
+    def _bm25_index_or_build(self) -> Optional[BM25Index]:
+        """
+        The BM25 index, or None while it is missing.
+
+        Building scans the whole collection, far longer than a query may
+        take, so a missing index is built once in a background thread and
+        queries fuse without BM25 until it is ready.
+        """
+        bm25_index = self.bm25_index
+        if bm25_index is not None:
+            return bm25_index
+        with self._bm25_build_lock:
+            if self._bm25_build is None or not self._bm25_build.is_alive():
+                logger.info(
+                    f"No BM25 index for {self.collection_name}, building one in the background"
+                )
+                self._bm25_build = threading.Thread(
+                    target=self._build_bm25_in_background, name="bm25-build", daemon=True
+                )
+                self._bm25_build.start()
+        return None
+
+    def _build_bm25_in_background(self):
+        try:
+            self.build_bm25_index()
+        except Exception as e:
+            logger.error(f"Building the BM25 index of {self.collection_name} failed: {e}")
+
+    @property
+    def sparse_index(self) -> Optional[SparseIndex]:
+        """Sparse code-symbol index of the collection, loaded on first use (None if not built)."""
+        if self._sparse_index is None:
+            self._sparse_index = SparseIndex.load_if_exists(self.sparse_index_path)
+        return self._sparse_index
+
+    def build_sparse_index(self, page_size: int = 5000) -> SparseIndex:
+        """
+        Build the sparse code-symbol index over every document in the collection and save it.
+
+        Args:
+            page_size: Number of records to fetch per request.
+
+        Returns:
+            The new index.
+        """
+        index = SparseIndex.build(self._iter_documents(page_size))
+        index.save(self.sparse_index_path)
+        self._sparse_index = index
+        self._writes += 1
+        return index
+
+    async def ingest_chunks_async(
         self,
         chunks: list[dict],
-        batch_size: int = 50,
+        batch_size: int = 100,
         max_workers: int | None = None,
     ) -> int:
         """
         Ingest processed chunks into the vector database.
 
+        Chunks are packed into batches by their token_count, up to the
+        embedding client's token budget and batch_size items. Batches are
+        embedded concurrently and written to the collection in order as they
+        complete.
+
         Args:
             chunks: List of chunk dictionaries with 'id', 'content', and metadata.
-            batch_size: Number of chunks to process per batch (default: 50).
-            max_workers: Number of parallel workers for embedding/ingest.
-                Defaults to 2 when not provided (reduced to avoid rate limits).
+            batch_size: Maximum number of chunks per batch (default: 100).
+            max_workers: Maximum number of concurrent embedding requests.
+                Defaults to 4; request pacing adapts to provider rate limits.
 
         Returns:
             Number of chunks ingested.
         """
+        return await self._ingest_chunks_async(chunks, batch_size, max_workers or 4)
+
+    def ingest_chunks(
+        self,
+        chunks: list[dict],
+        batch_size: int = 100,
+        max_workers: int | None = None,
+    ) -> int:
+        """
+        Ingest processed chunks, blocking until done.
+
+        Runs ingest_chunks_async in a new event loop, so it can't be called
+        from a running one (await ingest_chunks_async there instead).
+
+        Returns:
+            Number of chunks ingested.
+        """
+        return asyncio.run(self.ingest_chunks_async(chunks, batch_size, max_workers))
+
+    def get_content_hashes(self, page_size: int = 5000) -> dict[str, str]:
+        """
+        Get the content hash of every chunk currently in the collection.
+
+        Args:
+            page_size: Number of records to fetch per request.
+
+        Returns:
+            Mapping of chunk id to content_hash ("" if missing).
+        """
+        hashes = {}
+        offset = 0
+        while True:
+            page = self.collection.get(include=["metadatas"], limit=page_size, offset=offset)
+            for chunk_id, metadata in zip(page["ids"], page["metadatas"]):
+                hashes[chunk_id] = (metadata or {}).get("content_hash", "")
+            if len(page["ids"]) < page_size:
+                return hashes
+            offset += page_size
+
+    async def sync_chunks_async(
+        self,
+        chunks: Iterable[dict],
+        batch_size: int = 100,
+        max_workers: int | None = None,
+    ) -> dict:
+        """
+        Incrementally sync the collection with a set of processed chunks.
+
+        Diffs chunk ids and content hashes against what is already stored,
+        embeds and upserts only new or changed chunks, and deletes chunks
+        that are no longer present. Chunks are consumed as a stream.
+
+        Args:
+            chunks: All current chunk dictionaries (list or generator).
+            batch_size: Maximum number of chunks per embedding request.
+            max_workers: Maximum number of concurrent embedding requests.
+
+        Returns:
+            Dict with added, updated, deleted and unchanged counts.
+        """
+        existing = await asyncio.to_thread(self.get_content_hashes)
+        seen_ids = set()
+        added = updated = unchanged = upserted = 0
+
+        for window in iter_windows(chunks, INGEST_WINDOW_SIZE):
+            pending = []
+            for chunk in window:
+                seen_ids.add(chunk["id"])
+                stored_hash = existing.get(chunk["id"])
+                if stored_hash is None:
+                    added += 1
+                    pending.append(chunk)
+                elif stored_hash != chunk.get("content_hash", ""):
+                    updated += 1
+                    pending.append(chunk)
+                else:
+                    unchanged += 1
+
+            if pending:
+                upserted += await self._ingest_chunks_async(
+                    pending, batch_size, max_workers or 4, upsert=True
+                )
+
+        deleted = [chunk_id for chunk_id in existing if chunk_id not in seen_ids]
+        if deleted:
+            await asyncio.to_thread(self._delete_chunks, deleted)
+
+        logger.info(
+            f"Sync complete: {added} new, {updated} changed, "
+            f"{len(deleted)} removed, {unchanged} unchanged"
+        )
+
+        return {
+            "added": added,
+            "updated": updated,
+            "deleted": len(deleted),
+            "unchanged": unchanged,
+            "upserted": upserted,
+        }
+
+    def sync_chunks(
+        self,
+        chunks: Iterable[dict],
+        batch_size: int = 100,
+        max_workers: int | None = None,
+    ) -> dict:
+        """
+        Incrementally sync the collection, blocking until done.
+
+        Runs sync_chunks_async in a new event loop, so it can't be called
+        from a running one (await sync_chunks_async there instead).
+
+        Returns:
+            Dict with added, updated, deleted and unchanged counts.
+        """
+        return asyncio.run(self.sync_chunks_async(chunks, batch_size, max_workers))
+
+    def _delete_chunks(self, chunk_ids: list[str]):
+        """Delete chunks from the collection and its partitions."""
+        for i in range(0, len(chunk_ids), INGEST_WINDOW_SIZE):
+            self.collection.delete(ids=chunk_ids[i:i + INGEST_WINDOW_SIZE])
+            for collection in self.partitions.values():
+                collection.delete(ids=chunk_ids[i:i + INGEST_WINDOW_SIZE])
+            self._writes += 1
+
+    def _create_async_embedding_client(
+        self, max_concurrency: int
+    ) -> AsyncEmbeddingClient | AsyncLocalEmbeddingClient:
+        """Create an async client sharing this database's embedding config and cache."""
+        if isinstance(self.embedding_client, LocalEmbeddingClient):
+            return AsyncLocalEmbeddingClient(self.embedding_client)
+        return AsyncEmbeddingClient(
+            api_key=self.embedding_client.api_key,
+            model=self.embedding_client.model,
+            base_url=self.embedding_client.base_url,
+            cache=self.embedding_client.cache,
+            use_cache=self.embedding_client.cache is not None,
+            max_concurrency=max_concurrency,
+            max_batch_tokens=self.embedding_client.max_batch_tokens,
+        )
+
+    @staticmethod
+    def _sanitize_metadata(chunk: dict) -> dict:
+        """Sanitize metadata - ChromaDB only accepts str, int, float, bool, None."""
+        result = {}
+        for k, v in chunk.items():
+            if k in ["id", "content"]:
+                continue
+            if isinstance(v, list):
+                # Convert lists to JSON strings
+                result[k] = json.dumps(v) if v else ""
+            elif isinstance(v, dict):
+                # Convert dicts to JSON strings
+                result[k] = json.dumps(v)
+            elif v is None or isinstance(v, (str, int, float, bool)):
+                result[k] = v
+            else:
+                # Convert other types to string
+                result[k] = str(v)
+        return result
+
+    async def _ingest_chunks_async(
+        self,
+        chunks: list[dict],
+        batch_size: int,
+        max_concurrency: int,
+        upsert: bool = False,
+    ) -> int:
+        """Embed batches concurrently and stream them into the collection in order."""
         total_ingested = 0
         failed_batches = 0
-        batches = [
-            chunks[i:i + batch_size] for i in range(0, len(chunks), batch_size)
-        ]
-        # Reduced default workers from 5 to 2 to avoid rate limiting
-        worker_count = max_workers or 2
-        collection_lock = Lock()
+
+        # Use the token counts recorded by the chunker; count any that are missing
+        token_counts = [chunk.get("token_count") for chunk in chunks]
+        missing = [i for i, count in enumerate(token_counts) if not count]
+        if missing:
+            counted = count_tokens([chunks[i]["content"] for i in missing])
+            for i, count in zip(missing, counted):
+                token_counts[i] = count
+
+        max_batch_tokens = self.embedding_client.max_batch_tokens
+        ranges = pack_batches(token_counts, max_batch_tokens, batch_size)
+        batches = [chunks[start:end] for start, end in ranges]
+        batch_token_counts = [token_counts[start:end] for start, end in ranges]
 
         logger.info(
             f"Starting ingestion: {len(chunks)} chunks in {len(batches)} batches "
-            f"(batch_size={batch_size}, workers={worker_count})"
+            f"(max_tokens={max_batch_tokens}, max_items={batch_size}, "
+            f"concurrency={max_concurrency})"
         )
 
+        async_client = self._create_async_embedding_client(max_concurrency)
+        write = self.collection.upsert if upsert else self.collection.add
+        self._writes += 1
+
         with Progress(
             SpinnerColumn(),
             TextColumn("[progress.description]{task.description}"),
@@ -113,98 +939,60 @@ class VectorDB:
         ) as progress:
             task = progress.add_task("Ingesting chunks...", total=len(chunks))
 
-            def process_batch(batch: list[dict], batch_num: int) -> tuple[int, str | None]:
-                """
-                Process a single batch of chunks.
-
-                Returns:
-                    Tuple of (count ingested, error message if any)
-                """
-                # Extract data
-                ids = [chunk["id"] for chunk in batch]
-                documents = [chunk["content"] for chunk in batch]
-
-                # Sanitize metadata - ChromaDB only accepts str, int, float, bool, None
-                def sanitize_metadata(chunk: dict) -> dict:
-                    result = {}
-                    for k, v in chunk.items():
-                        if k in ["id", "content"]:
-                            continue
-                        if isinstance(v, list):
-                            # Convert lists to JSON strings
-                            result[k] = json.dumps(v) if v else ""
-                        elif isinstance(v, dict):
-                            # Convert dicts to JSON strings
-                            result[k] = json.dumps(v)
-                        elif v is None or isinstance(v, (str, int, float, bool)):
-                            result[k] = v
-                        else:
-                            # Convert other types to string
-                            result[k] = str(v)
-                    return result
-
-                metadatas = [sanitize_metadata(chunk) for chunk in batch]
-
-                # Generate embeddings with detailed error handling
-                try:
-                    embeddings = self.embedding_client.embed_batch(documents)
-                except EmbeddingAPIError as e:
-                    error_msg = f"Batch {batch_num}: Embedding API error - {e}"
-                    logger.error(error_msg)
-                    return 0, error_msg
-                except Exception as e:
-                    error_msg = f"Batch {batch_num}: Unexpected embedding error - {type(e).__name__}: {e}"
-                    logger.error(error_msg)
-                    return 0, error_msg
-
-                # Validate embeddings count
-                if len(embeddings) != len(documents):
-                    error_msg = (
-                        f"Batch {batch_num}: Embedding count mismatch - "
-                        f"expected {len(documents)}, got {len(embeddings)}"
-                    )
-                    logger.error(error_msg)
-                    return 0, error_msg
-
-                # Add to collection (guarded for thread safety)
-                try:
-                    with collection_lock:
-                        self.collection.add(
-                            ids=ids,
-                            embeddings=embeddings,
-                            documents=documents,
-                            metadatas=metadatas,
+            try:
+                document_batches = [[chunk["content"] for chunk in batch] for batch in batches]
+                async for i, embeddings in async_client.embed_batches(
+                    document_batches, batch_token_counts
+                ):
+                    batch = batches[i]
+                    batch_num = i + 1
+                    error = None
+
+                    if isinstance(embeddings, Exception):
+                        error = f"Batch {batch_num}: Embedding API error - {embeddings}"
+                    elif len(embeddings) != len(batch):
+                        error = (
+                            f"Batch {batch_num}: Embedding count mismatch - "
+                            f"expected {len(batch)}, got {len(embeddings)}"
                         )
-                except Exception as e:
-                    error_msg = f"Batch {batch_num}: ChromaDB error - {type(e).__name__}: {e}"
-                    logger.error(error_msg)
-                    return 0, error_msg
-
-                logger.debug(f"Batch {batch_num} completed: {len(batch)} chunks ingested")
-                return len(batch), None
-
-            with ThreadPoolExecutor(max_workers=worker_count) as executor:
-                # Submit batches with their index for better error reporting
-                futures = {
-                    executor.submit(process_batch, batch, i + 1): i + 1
-                    for i, batch in enumerate(batches)
-                }
-
-                for future in as_completed(futures):
-                    batch_num = futures[future]
-                    try:
-                        ingested, error = future.result()
-                        if error:
-                            console.print(f"[red]{error}[/red]")
-                            failed_batches += 1
-                        total_ingested += ingested
-                        progress.advance(task, ingested if ingested > 0 else batch_size)
-                    except Exception as e:
-                        error_msg = f"Batch {batch_num}: Future execution error - {type(e).__name__}: {e}"
-                        logger.error(error_msg)
-                        console.print(f"[red]{error_msg}[/red]")
+                    else:
+                        try:
+                            embeddings = self._reduce(embeddings)
+                            if not total_ingested:
+                                await asyncio.to_thread(
+                                    self._record_embedding_info, len(embeddings[0])
+                                )
+                            ids = [chunk["id"] for chunk in batch]
+                            metadatas = [self._sanitize_metadata(chunk) for chunk in batch]
+                            await asyncio.to_thread(
+                                write,
+                                ids=ids,
+                                embeddings=embeddings,
+                                documents=document_batches[i],
+                                metadatas=metadatas,
+                            )
+                            if self.partition_keys:
+                                await asyncio.to_thread(
+                                    self._write_partitions,
+                                    ids,
+                                    embeddings,
+                                    document_batches[i],
+                                    metadatas,
+                                    replace=upsert,
+                                )
+                        except Exception as e:
+                            error = f"Batch {batch_num}: ChromaDB error - {type(e).__name__}: {e}"
+
+                    if error:
+                        logger.error(error)
+                        console.print(f"[red]{error}[/red]")
                         failed_batches += 1
-                        progress.advance(task, batch_size)
+                    else:
+                        total_ingested += len(batch)
+                        logger.debug(f"Batch {batch_num} completed: {len(batch)} chunks ingested")
+                    progress.advance(task, len(batch))
+            finally:
+                await async_client.aclose()
 
         # Summary logging
         if failed_batches > 0:
@@ -221,6 +1009,88 @@ class VectorDB:
 
         return total_ingested
 
+    def embed_query(self, query_text: str) -> list[float]:
+        """
+        Embed a query, reusing the in-process cache for repeated queries.
+
+        Args:
+            query_text: Query text (whitespace is normalized).
+
+        Returns:
+            Query embedding.
+        """
+        query_text = normalize_query(query_text)
+        if self.query_cache is None:
+            return self._reduce([self.embedding_client.embed(query_text)])[0]
+
+        # The cache holds full-width embeddings, shared by every version of the model
+        model = self.embedding_client.model
+        embedding = self.query_cache.get(model, query_text)
+        if embedding is None:
+            embedding = self.embedding_client.embed(query_text)
+            self.query_cache.put(model, query_text, embedding)
+        return self._reduce([embedding])[0]
+
+    def embed_queries(self, query_texts: list[str]) -> list[list[float]]:
+        """
+        Embed several queries with one batch request for the uncached ones.
+
+        Args:
+            query_texts: Query texts (whitespace is normalized).
+
+        Returns:
+            Query embeddings aligned with query_texts.
+        """
+        query_texts = [normalize_query(text) for text in query_texts]
+        model = self.embedding_client.model
+        embeddings = {}
+        if self.query_cache is not None:
+            for text in dict.fromkeys(query_texts):
+                cached = self.query_cache.get(model, text)
+                if cached is not None:
+                    embeddings[text] = cached
+
+        missing = [text for text in dict.fromkeys(query_texts) if text not in embeddings]
+        if missing:
+            for text, embedding in zip(missing, self.embedding_client.embed_batch(missing)):
+                embeddings[text] = embedding
+                if self.query_cache is not None:
+                    self.query_cache.put(model, text, embedding)
+
+        return self._reduce([embeddings[text] for text in query_texts])
+
+    def query_many(
+        self,
+        query_texts: list[str],
+        n_results: int = 10,
+        where: Optional[dict] = None,
+        where_document: Optional[dict] = None,
+    ) -> list[dict]:
+        """
+        Query the vector database with several queries at once.
+
+        All queries are embedded in one batch request and searched in one
+        vector store request.
+
+        Args:
+            query_texts: Query texts.
+            n_results: Number of results per query.
+            where: Metadata filter (applied to every query).
+            where_document: Document content filter (applied to every query).
+
+        Returns:
+            One result per query, shaped like query()'s.
+        """
+        if not query_texts:
+            return []
+
+        return self.store.query_many(
+            self.embed_queries(query_texts),
+            n_results=n_results,
+            where=where,
+            where_document=where_document,
+        )
+
     def query(
         self,
         query_text: str,
@@ -241,82 +1111,259 @@ class VectorDB:
             Query results with ids, documents, metadatas, and distances.
         """
         # Generate query embedding
-        query_embedding = self.embedding_client.embed(query_text)
+        query_embedding = self.embed_query(query_text)
 
-        # Query collection
-        results = self.collection.query(
-            query_embeddings=[query_embedding],
+        return self.store.query(
+            query_embedding,
             n_results=n_results,
             where=where,
             where_document=where_document,
-            include=["documents", "metadatas", "distances"],
         )
 
-        return results
-
     def hybrid_search(
         self,
         query_text: str,
         n_results: int = 10,
         where: Optional[dict] = None,
+        rrf_k: int = 60,
+        fusion: Optional[str] = None,
+        weights: Optional[dict[str, float]] = None,
     ) -> dict:
         """
         Perform hybrid search (vector + keyword).
 
-        ChromaDB supports basic keyword filtering via where_document.
-        For more advanced hybrid search, we combine vector results
-        with keyword matching.
+        Vector search and the corpus BM25 index each retrieve candidates
+        independently and the two rankings are fused (Reciprocal Rank Fusion
+        by default), so exact-term matches the embedding missed can still surface.
+        Vector candidates are scored from the index's postings rather than
+        by scanning their text, so cost grows with query terms, not with
+        document length. A collection without an index gets one built in
+        the background, and is searched without BM25 until it is ready. If a
+        sparse code-symbol index was built, its ranking is fused in as well.
 
         Args:
             query_text: Query text.
             n_results: Number of results to return.
             where: Metadata filter.
+            rrf_k: RRF constant (higher gives lower ranks more weight).
+            fusion: "rrf", "combsum" or "zscore". Defaults to the
+                HYBRID_FUSION environment variable.
+            weights: Weight per retriever ("vector", "bm25", "sparse").
+                Defaults to HYBRID_FUSION_WEIGHTS, then 1 each.
 
         Returns:
             Query results.
         """
+        query_embedding = self.embed_query(query_text)
+
         # Get more results from vector search
-        vector_results = self.query(
-            query_text=query_text,
-            n_results=n_results * 2,
-            where=where,
+        vector_results = self.store.query(query_embedding, n_results=n_results * 2, where=where)
+
+        return self.fuse_candidates(
+            query_text, query_embedding, vector_results, n_results, where, rrf_k, fusion, weights,
         )
 
-        # Extract keywords from query (simple approach)
-        keywords = [w.lower() for w in query_text.split() if len(w) > 3]
+    def candidate_pool(
+        self,
+        query_text: str,
+        n_results: int = 5,
+        where: Optional[dict] = None,
+        min_pool: Optional[int] = None,
+        max_pool: Optional[int] = None,
+        min_gap: Optional[float] = None,
+    ) -> dict:
+        """
+        Vector search for a reranking candidate pool sized to the query.
+
+        Starts with a small pool and doubles it only while the score
+        distribution is flat: the pool grows while the vector distance of
+        its last candidate is within min_gap of the best one, since more
+        candidates of similar relevance likely lie beyond it. A query with
+        a clear winner stops at the first pool, so the reranker scores
+        fewer documents.
 
-        # Score results based on keyword presence
-        scored_results = []
-        for i in range(len(vector_results["ids"][0])):
-            doc = vector_results["documents"][0][i].lower()
-            distance = vector_results["distances"][0][i]
+        Args:
+            query_text: Query text.
+            n_results: Number of results the caller will keep after reranking.
+            where: Metadata filter.
+            min_pool: First pool size. Defaults to CANDIDATE_POOL_START x n_results.
+            max_pool: Largest pool size. Defaults to CANDIDATE_POOL_MAX x n_results.
+            min_gap: Distance gap between the best and the pool's last
+                candidate at which the pool stops growing. Defaults to
+                CANDIDATE_POOL_GAP.
 
-            # Count keyword matches
-            keyword_score = sum(1 for kw in keywords if kw in doc)
+        Returns:
+            Dict with the query "embedding", the vector "results" (twice
+            the pool size, for fusion), and the pool's size, rounds, gap
+            and outcome ("separated", "max" or "exhausted").
+        """
+        max_pool = max_pool or max(n_results, math.ceil(n_results * CANDIDATE_POOL_MAX))
+        pool = min(
+            max_pool, min_pool or max(n_results, math.ceil(n_results * CANDIDATE_POOL_START))
+        )
+        min_gap = CANDIDATE_POOL_GAP if min_gap is None else min_gap
+        query_embedding = self.embed_query(query_text)
+
+        rounds = 0
+        while True:
+            rounds += 1
+            vector_results = self.store.query(query_embedding, n_results=pool * 2, where=where)
+            distances = vector_results["distances"][0]
+            gap = distances[min(pool, len(distances)) - 1] - distances[0] if distances else 0.0
+            if len(distances) < pool * 2:
+                outcome = "exhausted"
+            elif gap >= min_gap:
+                outcome = "separated"
+            elif pool >= max_pool:
+                outcome = "max"
+            else:
+                pool = min(pool * 2, max_pool)
+                continue
+            break
 
-            # Combined score (lower distance is better, higher keyword score is better)
-            combined_score = distance - (keyword_score * 0.1)
+        logger.info(
+            f"Candidate pool for {query_text[:60]!r}: {pool} "
+            f"({outcome} after {rounds} round(s), distance gap {gap:.3f})"
+        )
+        return {
+            "embedding": query_embedding,
+            "results": vector_results,
+            "size": pool,
+            "rounds": rounds,
+            "gap": float(gap),
+            "outcome": outcome,
+        }
 
-            scored_results.append({
-                "id": vector_results["ids"][0][i],
-                "document": vector_results["documents"][0][i],
-                "metadata": vector_results["metadatas"][0][i],
-                "distance": distance,
-                "keyword_score": keyword_score,
-                "combined_score": combined_score,
-            })
+    def fuse_candidates(
+        self,
+        query_text: str,
+        query_embedding: list[float],
+        vector_results: dict,
+        n_results: int,
+        where: Optional[dict] = None,
+        rrf_k: int = 60,
+        fusion: Optional[str] = None,
+        weights: Optional[dict[str, float]] = None,
+    ) -> dict:
+        """
+        Add keyword hits to vector search results and fuse the retrievers' rankings.
 
-        # Sort by combined score and take top n
-        scored_results.sort(key=lambda x: x["combined_score"])
-        top_results = scored_results[:n_results]
+        Args:
+            query_text: Query text.
+            query_embedding: Embedding of the query.
+            vector_results: Vector search results for the query.
+            n_results: Number of results to return.
+            where: Metadata filter (applied to keyword-only hits).
+            rrf_k: RRF constant.
+            fusion: Fusion method. Defaults to HYBRID_FUSION.
+            weights: Weight per retriever. Defaults to HYBRID_FUSION_WEIGHTS.
+
+        Returns:
+            Query results in fused order, with "fused_scores" and the
+            keyword scores.
+        """
+        bm25_index = self._bm25_index_or_build()
+
+        candidates = {
+            chunk_id: {"document": document, "metadata": metadata, "distance": distance}
+            for chunk_id, document, metadata, distance in zip(
+                vector_results["ids"][0],
+                vector_results["documents"][0],
+                vector_results["metadatas"][0],
+                vector_results["distances"][0],
+            )
+        }
+        n_vector = len(candidates)
+
+        bm25_hits = bm25_index.search(query_text, top_k=n_results * 2) if bm25_index else []
+        bm25_scores = dict(bm25_hits)
+        sparse_index = self.sparse_index
+        sparse_hits = sparse_index.search(query_text, top_k=n_results * 2) if sparse_index else []
+        sparse_scores = dict(sparse_hits)
+
+        # Fetch keyword-only hits (also applying the metadata filter) and give
+        # them a vector distance so results stay comparable
+        missing = list(dict.fromkeys(
+            chunk_id for chunk_id, _ in bm25_hits + sparse_hits if chunk_id not in candidates
+        ))
+        if missing:
+            extra = self.store.get(
+                ids=missing,
+                where=where,
+                include=["documents", "metadatas", "embeddings"],
+            )
+            if len(extra["ids"]):
+                query_vector = np.asarray(query_embedding, dtype=np.float32)
+                embeddings = np.asarray(extra["embeddings"], dtype=np.float32)
+                norms = np.linalg.norm(embeddings, axis=1) * np.linalg.norm(query_vector)
+                distances = 1.0 - embeddings @ query_vector / np.maximum(norms, 1e-12)
+                for chunk_id, document, metadata, distance in zip(
+                    extra["ids"], extra["documents"], extra["metadatas"], distances
+                ):
+                    candidates[chunk_id] = {
+                        "document": document,
+                        "metadata": metadata,
+                        "distance": float(distance),
+                    }
+
+        # One score row per retriever over the candidates, NaN where it has no hit
+        candidate_ids = list(candidates)
+        distances = np.array([candidates[i]["distance"] for i in candidate_ids], dtype=np.float64)
+        vector_scores = np.full(len(candidate_ids), np.nan)
+        vector_scores[:n_vector] = -distances[:n_vector]
+        names = ["vector"]
+        signals = [vector_scores]
+        if bm25_index:
+            names.append("bm25")
+            signals.append(self._keyword_scores(query_text, bm25_index, bm25_scores, candidate_ids))
+        if sparse_index:
+            names.append("sparse")
+            signals.append(
+                self._keyword_scores(query_text, sparse_index, sparse_scores, candidate_ids)
+            )
+
+        weights = {**HYBRID_FUSION_WEIGHTS, **(weights or {})}
+        fused = fuse(
+            signals,
+            method=fusion or HYBRID_FUSION,
+            weights=[weights.get(name, 1.0) for name in names],
+            rrf_k=rrf_k,
+        )
+        order = top_indices(fused, n_results)
+        top_ids = [candidate_ids[i] for i in order.tolist()]
 
         # Format as ChromaDB-style results
-        return {
-            "ids": [[r["id"] for r in top_results]],
-            "documents": [[r["document"] for r in top_results]],
-            "metadatas": [[r["metadata"] for r in top_results]],
-            "distances": [[r["distance"] for r in top_results]],
+        results = {
+            "ids": [top_ids],
+            "documents": [[candidates[i]["document"] for i in top_ids]],
+            "metadatas": [[candidates[i]["metadata"] for i in top_ids]],
+            "distances": [[candidates[i]["distance"] for i in top_ids]],
+            "fused_scores": [fused[order].tolist()],
+            "bm25_scores": [[bm25_scores.get(i, 0.0) for i in top_ids]],
         }
+        if sparse_index:
+            results["sparse_scores"] = [[sparse_scores.get(i, 0.0) for i in top_ids]]
+        return results
+
+    @staticmethod
+    def _keyword_scores(
+        query_text: str,
+        index: BM25Index | SparseIndex,
+        scores: dict[str, float],
+        candidate_ids: list[str],
+    ) -> np.ndarray:
+        """
+        Scores of candidates in a keyword index, NaN for candidates it doesn't match.
+
+        Candidates outside the index's top hits are scored from its
+        postings; their scores are added to scores.
+        """
+        unscored = [chunk_id for chunk_id in candidate_ids if chunk_id not in scores]
+        for chunk_id, score in zip(unscored, index.score_ids(query_text, unscored)):
+            scores[chunk_id] = score
+        values = np.array([scores[chunk_id] for chunk_id in candidate_ids], dtype=np.float64)
+        values[values <= 0] = np.nan
+        return values
 
     def get_stats(self) -> dict:
         """Get collection statistics."""
@@ -324,65 +1371,232 @@ class VectorDB:
             "collection_name": self.collection_name,
             "count": self.collection.count(),
             "persist_directory": str(self.persist_directory),
+            "embedding": self.embedding_info,
+            "vector_store": self.vector_store_backend,
+            "reduction": self.reducer.spec if self.reducer is not None else None,
+            "query_cache": self.query_cache.get_stats() if self.query_cache is not None else None,
         }
 
+    def delete_indexes(self):
+        """Delete the BM25, sparse and quantized indexes and the reducer of the collection."""
+        self.bm25_index_path.unlink(missing_ok=True)
+        self.sparse_index_path.unlink(missing_ok=True)
+        self.reducer_path.unlink(missing_ok=True)
+        shutil.rmtree(self.vector_store_path, ignore_errors=True)
+        self._bm25_index = None
+        self._sparse_index = None
+        self._reducer, self._reducer_loaded = None, False
+        self._store = None
+
     def delete_collection(self):
-        """Delete the collection."""
+        """Delete the collection (and its embedding reducer)."""
+        for collection in self.partitions.values():
+            self.client.delete_collection(collection.name)
         self.client.delete_collection(self.collection_name)
+        # The reducer was fitted for the deleted vectors
+        self.reducer_path.unlink(missing_ok=True)
+        self._reducer, self._reducer_loaded = None, False
+        self._collection = None
+        self._partitions = None
+        self._store = None
+        self._writes += 1
         console.print(f"[yellow]Deleted collection: {self.collection_name}[/yellow]")
 
 
-def ingest_from_file(
+async def ingest_from_file_async(
     input_file: Optional[Path] = None,
     collection_name: str = "arbbuilder",
-    batch_size: int = 50,
+    batch_size: int = 100,
+    max_concurrency: Optional[int] = None,
+    incremental: bool = False,
+    build_vector_store: bool = False,
+    build_sparse_index: bool = False,
+    new_version: bool = False,
+    reduction: Optional[str] = None,
 ) -> dict:
     """
-    Ingest processed chunks from a JSON file.
+    Ingest processed chunks from a chunk file.
+
+    JSONL files are streamed in windows straight into ingestion, so memory
+    stays flat regardless of corpus size. Blocking index builds run in
+    worker threads, so the event loop stays responsive.
 
     Args:
-        input_file: Path to processed chunks JSON. If None, uses latest.
+        input_file: Path to processed chunks (.jsonl, .jsonl.zst or legacy
+            .json). If None, uses latest.
         collection_name: ChromaDB collection name.
-        batch_size: Batch size for ingestion.
+        batch_size: Maximum chunks per embedding request.
+        max_concurrency: Maximum concurrent embedding requests.
+        incremental: Only embed new/changed chunks and delete vanished ones,
+            instead of adding every chunk.
+        build_vector_store: Export the collection to the quantized vector
+            store afterwards (always done when VECTOR_STORE=quantized).
+        build_sparse_index: Build the sparse code-symbol index afterwards
+            (always done when SPARSE_INDEX=true or the collection already
+            has one).
+        new_version: Ingest into a new version of the collection while the
+            active one keeps serving, and activate it once every index is
+            built.
+        reduction: Store vectors reduced to fewer dimensions,
+            "matryoshka:<dim>" or "pca:<dim>" (PCA is fitted on the first
+            REDUCTION_SAMPLE_SIZE chunks). Needs an empty collection or a new
+            version, unless the collection already uses this reduction.
+            Defaults to the EMBEDDING_REDUCTION environment variable.
 
     Returns:
-        Ingestion statistics.
+        Ingestion statistics, or an empty dict if there was nothing to
+        ingest or the collection stores vectors reduced another way.
     """
     # Find input file
     if input_file is None:
-        files = list(PROCESSED_DATA_DIR.glob("processed_chunks_*.json"))
-        if not files:
+        input_file = find_latest_chunk_file(PROCESSED_DATA_DIR)
+        if input_file is None:
             console.print("[red]No processed chunks file found![/red]")
             return {}
-        input_file = max(files, key=lambda p: p.stat().st_mtime)
-
-    console.print(f"[blue]Loading chunks from: {input_file}[/blue]")
 
-    with open(input_file, "r", encoding="utf-8") as f:
-        chunks = json.load(f)
+    console.print(f"[blue]Streaming chunks from: {input_file}[/blue]")
 
-    console.print(f"[blue]Loaded {len(chunks)} chunks[/blue]")
+    chunks = read_chunks(input_file)
+    reduction = reduction or EMBEDDING_REDUCTION
 
     # Initialize database and ingest
-    db = VectorDB(collection_name=collection_name)
+    if new_version:
+        db = VectorDB.create_version(collection_name, reduction=reduction)
+        console.print(f"[blue]Building new version: {db.collection_name}[/blue]")
+    else:
+        db = VectorDB(collection_name=collection_name)
+
+    try:
+        db.check_reduction(reduction)
+    except ValueError as e:
+        console.print(f"[red]{e}[/red]")
+        return {}
+
+    if reduction and (db.reducer is None or db.reducer.spec != reduction):
+        console.print(f"[blue]Fitting {reduction} embedding reduction...[/blue]")
+        sample = [
+            chunk["content"]
+            for chunk in itertools.islice(read_chunks(input_file), REDUCTION_SAMPLE_SIZE)
+        ]
+        await asyncio.to_thread(db.fit_reducer, reduction, sample)
 
-    console.print(f"\n[bold]Ingesting into ChromaDB collection: {collection_name}[/bold]")
-    ingested = db.ingest_chunks(chunks, batch_size=batch_size)
+    if incremental:
+        console.print(f"\n[bold]Syncing ChromaDB collection: {db.collection_name}[/bold]")
+        sync_stats = await db.sync_chunks_async(
+            chunks, batch_size=batch_size, max_workers=max_concurrency
+        )
+        ingested = sync_stats["upserted"]
+
+        stats = db.get_stats()
+        stats["ingested"] = ingested
+        stats["sync"] = sync_stats
+
+        console.print(
+            f"\n[green]Synced: {sync_stats['added']} new, {sync_stats['updated']} changed, "
+            f"{sync_stats['deleted']} removed, {sync_stats['unchanged']} unchanged[/green]"
+        )
+    else:
+        console.print(f"\n[bold]Ingesting into ChromaDB collection: {db.collection_name}[/bold]")
+        ingested = 0
+        for window in iter_windows(chunks, INGEST_WINDOW_SIZE):
+            ingested += await db.ingest_chunks_async(
+                window, batch_size=batch_size, max_workers=max_concurrency
+            )
 
-    stats = db.get_stats()
-    stats["ingested"] = ingested
+        stats = db.get_stats()
+        stats["ingested"] = ingested
 
-    console.print(f"\n[green]Ingested {ingested} chunks[/green]")
+        console.print(f"\n[green]Ingested {ingested} chunks[/green]")
     console.print(f"[green]Total in collection: {stats['count']}[/green]")
 
+    console.print("[blue]Building BM25 index...[/blue]")
+    stats["bm25_index"] = (await asyncio.to_thread(db.build_bm25_index)).get_stats()
+    console.print(
+        f"[green]BM25 index: {stats['bm25_index']['terms']} terms over "
+        f"{stats['bm25_index']['documents']} chunks[/green]"
+    )
+
+    # An existing sparse index is fused into every query, so it is rebuilt
+    # rather than left describing chunks that were replaced or deleted
+    if build_sparse_index or BUILD_SPARSE_INDEX or db.sparse_index_path.exists():
+        console.print("[blue]Building sparse code-symbol index...[/blue]")
+        stats["sparse_index"] = (await asyncio.to_thread(db.build_sparse_index)).get_stats()
+        console.print(
+            f"[green]Sparse index: {stats['sparse_index']['symbols']} symbols over "
+            f"{stats['sparse_index']['documents']} chunks[/green]"
+        )
+
+    if build_vector_store or db.vector_store_backend == "quantized":
+        console.print("[blue]Building quantized vector store...[/blue]")
+        stats["vector_store"] = (await asyncio.to_thread(db.build_vector_store)).get_stats()
+        console.print(
+            f"[green]Vector store: {stats['vector_store']['count']} "
+            f"{stats['vector_store']['dtype']} vectors, "
+            f"{stats['vector_store']['nlist']} IVF lists[/green]"
+        )
+
+    if new_version:
+        removed = await asyncio.to_thread(db.activate)
+        stats["version"] = db.collection_name
+        console.print(f"[green]Activated version: {db.collection_name}[/green]")
+        for name in removed:
+            console.print(f"[yellow]Deleted old version: {name}[/yellow]")
+
+    cache_stats = db.embedding_client.get_cache_stats()
+    if cache_stats:
+        stats["embedding_cache"] = cache_stats
+        console.print(
+            f"[green]Embedding cache: {cache_stats['hits']} hits, "
+            f"{cache_stats['misses']} misses ({cache_stats['hit_rate']:.1%} hit rate)[/green]"
+        )
+
     return stats
 
 
+def ingest_from_file(
+    input_file: Optional[Path] = None,
+    collection_name: str = "arbbuilder",
+    batch_size: int = 100,
+    max_concurrency: Optional[int] = None,
+    incremental: bool = False,
+    build_vector_store: bool = False,
+    build_sparse_index: bool = False,
+    new_version: bool = False,
+    reduction: Optional[str] = None,
+) -> dict:
+    """
+    Ingest processed chunks from a chunk file, blocking until done.
+
+    Runs ingest_from_file_async (see it for the arguments) in a new event
+    loop, so it can't be called from a running one.
+
+    Returns:
+        Ingestion statistics.
+    """
+    return asyncio.run(ingest_from_file_async(
+        input_file=input_file,
+        collection_name=collection_name,
+        batch_size=batch_size,
+        max_concurrency=max_concurrency,
+        incremental=incremental,
+        build_vector_store=build_vector_store,
+        build_sparse_index=build_sparse_index,
+        new_version=new_version,
+        reduction=reduction,
+    ))
+
+
 def main():
     """Entry point for ingestion."""
     import argparse
 
     parser = argparse.ArgumentParser(description="ARBuilder Vector Database Ingestion")
+    parser.add_argument(
+        "--input",
+        type=Path,
+        default=None,
+        help="Processed chunk file (.jsonl, .jsonl.zst or .json; default: latest)",
+    )
     parser.add_argument(
         "--collection",
         type=str,
@@ -392,24 +1606,81 @@ def main():
     parser.add_argument(
         "--batch-size",
         type=int,
-        default=50,
-        help="Batch size for ingestion (default: 50)",
+        default=100,
+        help="Maximum chunks per embedding request (default: 100)",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=4,
+        help="Maximum concurrent embedding requests (default: 4)",
     )
     parser.add_argument(
         "--reset",
         action="store_true",
         help="Delete existing collection before ingesting",
     )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Only embed new/changed chunks and delete removed ones (by id and content_hash)",
+    )
+    parser.add_argument(
+        "--build-partitions",
+        action="store_true",
+        help="Rebuild the per-source (VECTOR_PARTITION_KEYS) partition collections "
+             "from the collection and exit",
+    )
+    parser.add_argument(
+        "--build-vector-store",
+        action="store_true",
+        help="Export the collection to the quantized memory-mapped vector store "
+             "(serve it with VECTOR_STORE=quantized)",
+    )
+    parser.add_argument(
+        "--new-version",
+        action="store_true",
+        help="Build a new version of the collection next to the active one and switch "
+             "to it when done (zero-downtime re-index, e.g. after changing DEFAULT_EMBEDDING)",
+    )
+    parser.add_argument(
+        "--reduce",
+        type=str,
+        default=None,
+        metavar="METHOD:DIM",
+        help="Store vectors reduced to DIM dimensions: matryoshka:DIM (truncate) or "
+             "pca:DIM (fitted on the corpus); use with --reset or --new-version "
+             "(default: EMBEDDING_REDUCTION)",
+    )
+    parser.add_argument(
+        "--build-sparse-index",
+        action="store_true",
+        help="Build the sparse code-symbol index fused into hybrid search "
+             "(always rebuilt with SPARSE_INDEX=true or once one exists)",
+    )
 
     args = parser.parse_args()
 
+    if args.build_partitions:
+        db = VectorDB(collection_name=args.collection)
+        for name, count in db.build_partitions().items():
+            console.print(f"[green]{name}: {count} chunks[/green]")
+        return
+
     if args.reset:
         db = VectorDB(collection_name=args.collection)
         db.delete_collection()
 
     ingest_from_file(
+        input_file=args.input,
         collection_name=args.collection,
         batch_size=args.batch_size,
+        max_concurrency=args.concurrency,
+        incremental=args.incremental,
+        build_vector_store=args.build_vector_store,
+        build_sparse_index=args.build_sparse_index,
+        new_version=args.new_version,
+        reduction=args.reduce,
     )
 
 
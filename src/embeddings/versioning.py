@@ -0,0 +1,154 @@
+"""
+Versioned collections for ARBuilder.
+
+Each build of a collection gets its own ChromaDB collection, named
+`<collection>__<model>__<dimension>__<build id>`, so a re-index (for example
+with a new embedding model) is built next to the version being served. A
+JSON manifest records the versions of every collection and which one is
+active; servers pick up a newly activated version on their next request.
+"""
+
+import json
+import os
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+MANIFEST_FILENAME = "collections.json"
+
+# Versions of a collection kept after activating a new one (the new one
+# included), so servers still on the previous version keep working
+KEEP_COLLECTION_VERSIONS = int(os.getenv("KEEP_COLLECTION_VERSIONS", "2"))
+
+_MODEL_SLUG_PATTERN = re.compile(r"[^A-Za-z0-9.-]+")
+
+
+def new_build_id() -> str:
+    """Build id from the current UTC time (sorts chronologically)."""
+    return time.strftime("%Y%m%dT%H%M%S", time.gmtime())
+
+
+def versioned_collection_name(collection: str, model: str, dimension: int, build_id: str) -> str:
+    """
+    Name of a collection version.
+
+    The model is slugged to ChromaDB's allowed characters without
+    underscores, so "__" only ever separates the name's parts.
+    """
+    model_slug = _MODEL_SLUG_PATTERN.sub("-", model).strip("-.") or "model"
+    return f"{collection}__{model_slug}__{dimension}__{build_id}"
+
+
+class CollectionManifest:
+    """
+    Manifest of collection versions, stored as a JSON file.
+
+    Layout: {collection: {"active": name or null, "versions": [version, ...]}}
+    where each version records name, model, dimension, build_id,
+    created_at and status ("building", "ready" or "active").
+
+    Reads are cached until the file changes, so checking the active
+    version on every request costs one stat(). Writes replace the file
+    atomically.
+    """
+
+    def __init__(self, path: Path):
+        """
+        Initialize the manifest.
+
+        Args:
+            path: Path of the manifest JSON file (created on first write).
+        """
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._data: dict = {}
+        # (inode, mtime) of the file read; replacing the file changes the inode
+        self._file_id: Optional[tuple[int, int]] = None
+
+    def _load(self) -> dict:
+        """Current manifest contents, re-read if the file changed."""
+        try:
+            stat = self.path.stat()
+        except FileNotFoundError:
+            self._data, self._file_id = {}, None
+            return self._data
+        file_id = (stat.st_ino, stat.st_mtime_ns)
+        if file_id != self._file_id:
+            with open(self.path, encoding="utf-8") as f:
+                self._data = json.load(f)
+            self._file_id = file_id
+        return self._data
+
+    def _save(self, data: dict):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(f"{self.path.name}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp_path, self.path)
+        stat = self.path.stat()
+        self._data, self._file_id = data, (stat.st_ino, stat.st_mtime_ns)
+
+    def versions(self, collection: str) -> list[dict]:
+        """All versions of a collection, oldest first."""
+        with self._lock:
+            return list(self._load().get(collection, {}).get("versions", []))
+
+    def active(self, collection: str) -> Optional[dict]:
+        """The active version of a collection, or None if it has none."""
+        with self._lock:
+            entry = self._load().get(collection, {})
+            name = entry.get("active")
+            return next((v for v in entry.get("versions", []) if v["name"] == name), None)
+
+    def add_version(
+        self, collection: str, name: str, model: str, dimension: int, build_id: str
+    ) -> dict:
+        """Register a version that is being built."""
+        version = {
+            "name": name,
+            "model": model,
+            "dimension": dimension,
+            "build_id": build_id,
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "status": "building",
+        }
+        with self._lock:
+            data = json.loads(json.dumps(self._load()))
+            entry = data.setdefault(collection, {"active": None, "versions": []})
+            entry["versions"].append(version)
+            self._save(data)
+        return version
+
+    def activate(self, collection: str, name: str) -> Optional[str]:
+        """
+        Make a built version the active one.
+
+        Returns:
+            Name of the previously active version, if any.
+        """
+        with self._lock:
+            data = json.loads(json.dumps(self._load()))
+            entry = data.get(collection, {})
+            if not any(v["name"] == name for v in entry.get("versions", [])):
+                raise ValueError(f"Unknown version of {collection}: {name}")
+            previous = entry.get("active")
+            for version in entry["versions"]:
+                if version["name"] == name:
+                    version["status"] = "active"
+                elif version["status"] == "active":
+                    version["status"] = "ready"
+            entry["active"] = name
+            self._save(data)
+        return previous
+
+    def remove_version(self, collection: str, name: str):
+        """Forget a version (its collection must be deleted separately)."""
+        with self._lock:
+            data = json.loads(json.dumps(self._load()))
+            entry = data.get(collection, {})
+            if entry.get("active") == name:
+                raise ValueError(f"Cannot remove the active version of {collection}: {name}")
+            entry["versions"] = [v for v in entry.get("versions", []) if v["name"] != name]
+            self._save(data)
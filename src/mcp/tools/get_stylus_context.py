@@ -4,7 +4,10 @@ get_stylus_context MCP Tool.
 Retrieves relevant documentation and code examples from the RAG database.
 """
 
+import copy
+import logging
 import sys
+import threading
 from pathlib import Path
 from typing import Optional
 
@@ -12,16 +15,32 @@ from typing import Optional
 project_root = Path(__file__).parent.parent.parent.parent
 sys.path.insert(0, str(project_root))
 
+from src.embeddings.cache import SemanticResultCache
+from src.embeddings.cascade import CASCADE_LLM_RERANK, RetrievalCascade
+from src.embeddings.embedder import create_embedding_client
+from src.embeddings.reranker import CROSS_ENCODER_MODEL, CrossEncoderReranker, Reranker
 from src.embeddings.vectordb import VectorDB
-from src.embeddings.reranker import HybridReranker, Reranker
 from src.mcp.tools.base import BaseTool
 
+logger = logging.getLogger(__name__)
+
+# content_type argument -> "source" metadata written by the processor
+CONTENT_TYPE_SOURCES = {"docs": "documentation", "code": "github"}
+SOURCE_CONTENT_TYPES = {
+    source: content_type for content_type, source in CONTENT_TYPE_SOURCES.items()
+}
+
 
 class GetStylusContextTool(BaseTool):
     """
     Retrieves relevant Stylus documentation and code examples.
 
-    Uses hybrid search (vector + BM25) with optional reranking.
+    With reranking, retrieval runs as a cascade of budgeted stages: vector
+    search, BM25 fusion, a local cross-encoder when CROSS_ENCODER_MODEL is
+    set, and LLM reranking when CASCADE_LLM_RERANK is set. A stage that runs
+    out of time returns the best results so far. When a new
+    version of the collection is activated, the tool switches to it on the
+    next request; requests in flight finish on the version they started on.
     """
 
     def __init__(
@@ -29,6 +48,10 @@ class GetStylusContextTool(BaseTool):
         vectordb: Optional[VectorDB] = None,
         collection_name: str = "arbbuilder",
         use_reranking: bool = True,
+        result_cache: Optional[SemanticResultCache] = None,
+        use_result_cache: bool = True,
+        cross_encoder: Optional[CrossEncoderReranker] = None,
+        llm_reranker: Optional[Reranker] = None,
         **kwargs,
     ):
         """
@@ -38,15 +61,91 @@ class GetStylusContextTool(BaseTool):
             vectordb: VectorDB instance (creates new if None).
             collection_name: ChromaDB collection name.
             use_reranking: Whether to rerank results.
+            result_cache: Semantic cache of contexts for similar queries.
+                Defaults to a new SemanticResultCache.
+            use_result_cache: Whether to reuse contexts of similar queries.
+            cross_encoder: Local cross-encoder to reorder the fused results.
+                Defaults to one for CROSS_ENCODER_MODEL, if set.
+            llm_reranker: LLM reranker ending the cascade. Defaults to a
+                Reranker if CASCADE_LLM_RERANK is set.
         """
         super().__init__(**kwargs)
-        self.vectordb = vectordb or VectorDB(collection_name=collection_name)
         self.use_reranking = use_reranking
-
-        if use_reranking:
-            self.reranker = HybridReranker(use_llm=False)  # BM25 + vector fusion
-        else:
-            self.reranker = None
+        if cross_encoder is None and use_reranking and CROSS_ENCODER_MODEL:
+            try:
+                cross_encoder = CrossEncoderReranker(CROSS_ENCODER_MODEL)
+            except (ImportError, OSError, ValueError) as e:
+                logger.error(
+                    f"Could not load cross-encoder {CROSS_ENCODER_MODEL}, reranking without it: {e}"
+                )
+        if llm_reranker is None and use_reranking and CASCADE_LLM_RERANK:
+            try:
+                llm_reranker = Reranker()
+            except ValueError as e:
+                logger.error(f"Could not create the LLM reranker, reranking without it: {e}")
+        # Shared by every collection version, so they're kept across swaps
+        self.cross_encoder = cross_encoder
+        self.llm_reranker = llm_reranker
+        vectordb = vectordb or VectorDB(collection_name=collection_name)
+        # The database and its cascade are swapped together, as one tuple
+        self._retrieval = (vectordb, self._create_cascade(vectordb))
+        self._swap_lock = threading.Lock()
+        self._failed_version: Optional[str] = None
+
+        self.result_cache = (
+            (result_cache if result_cache is not None else SemanticResultCache())
+            if use_result_cache else None
+        )
+
+    @property
+    def vectordb(self) -> VectorDB:
+        return self._retrieval[0]
+
+    @property
+    def cascade(self) -> Optional[RetrievalCascade]:
+        return self._retrieval[1]
+
+    def _create_cascade(self, vectordb: VectorDB) -> Optional[RetrievalCascade]:
+        if not self.use_reranking:
+            return None
+        return RetrievalCascade(
+            vectordb, cross_encoder=self.cross_encoder, llm_reranker=self.llm_reranker
+        )
+
+    def _refresh_version(self):
+        """Switch to the collection's active version if a newer one was activated."""
+        current = self.vectordb
+        active = current.manifest.active(current.base_name)
+        if active is None or active["name"] in (current.collection_name, self._failed_version):
+            return
+
+        with self._swap_lock:
+            current = self.vectordb
+            if active["name"] == current.collection_name:
+                return
+            try:
+                # Query vectors must come from the model the version was built with
+                embedding_client = current.embedding_client
+                if active["model"] != embedding_client.model:
+                    embedding_client = create_embedding_client(active["model"])
+                vectordb = VectorDB(
+                    collection_name=current.base_name,
+                    persist_directory=current.persist_directory,
+                    embedding_client=embedding_client,
+                    query_cache=current.query_cache,
+                    use_query_cache=current.query_cache is not None,
+                    vector_store=current.vector_store_backend,
+                    partition_keys=current.partition_keys,
+                    version=active["name"],
+                )
+                # Open it before switching, so no request waits on it
+                vectordb.store.count()
+            except Exception as e:
+                # Keep serving the current version rather than failing requests
+                logger.error(f"Could not switch to {active['name']}: {e}")
+                self._failed_version = active["name"]
+                return
+            self._retrieval = (vectordb, self._create_cascade(vectordb))
 
     def execute(
         self,
@@ -76,19 +175,24 @@ class GetStylusContextTool(BaseTool):
         n_results = max(1, min(20, n_results))
 
         try:
+            self._refresh_version()
+            vectordb, cascade = self._retrieval
+
             # Check if collection has data
-            collection_count = self.vectordb.collection.count()
-            collection_name = self.vectordb.collection_name
-            persist_dir = str(self.vectordb.persist_directory)
-            persist_dir_abs = str(self.vectordb.persist_directory.resolve())
-            
+            collection_count = vectordb.store.count()
+            collection_name = vectordb.collection_name
+            persist_dir = str(vectordb.persist_directory)
+            persist_dir_abs = str(vectordb.persist_directory.resolve())
+
             # Check if persist directory exists
-            persist_dir_exists = self.vectordb.persist_directory.exists()
+            persist_dir_exists = vectordb.persist_directory.exists()
             cwd = str(Path.cwd())
-            
+
             if collection_count == 0:
                 return {
-                    "error": "Collection is empty. Please ingest data first using the ingestion script.",
+                    "error": (
+                        "Collection is empty. Please ingest data first using the ingestion script."
+                    ),
                     "contexts": [],
                     "total_results": 0,
                     "query": query,
@@ -98,40 +202,57 @@ class GetStylusContextTool(BaseTool):
                     "persist_directory_absolute": persist_dir_abs,
                     "persist_directory_exists": persist_dir_exists,
                     "current_working_directory": cwd,
-                    "diagnostic": "If you just ingested data, you may need to restart the MCP server to pick up the new collection.",
+                    "diagnostic": (
+                        "If you just ingested data, you may need to restart the MCP server "
+                        "to pick up the new collection."
+                    ),
                 }
         except Exception as e:
             return {"error": f"Retrieval failed: {str(e)}"}
 
         # Build metadata filter
+        # Chunks record their origin in "source"; filtering on it is routed
+        # to that source's partition
         where_filter = None
-        if content_type == "docs":
-            where_filter = {"type": {"$eq": "documentation"}}
-        elif content_type == "code":
-            where_filter = {"type": {"$eq": "code"}}
+        if content_type in CONTENT_TYPE_SOURCES:
+            where_filter = {"source": CONTENT_TYPE_SOURCES[content_type]}
 
         try:
-            # Fetch more results for reranking
-            fetch_count = n_results * 3 if rerank and self.use_reranking else n_results
+            # Reuse contexts of a near-identical earlier query, unless the
+            # collection changed since
+            cache_key = (content_type, n_results, bool(rerank and self.use_reranking))
+            if self.result_cache is not None:
+                self.result_cache.validate(vectordb.revision)
+                query_embedding = vectordb.embed_query(query)
+                cached = self.result_cache.get(cache_key, query_embedding)
+                if cached is not None:
+                    return {
+                        "contexts": copy.deepcopy(cached),
+                        "total_results": len(cached),
+                        "query": query,
+                    }
 
             # Query vector database
-            if self.use_reranking and rerank:
-                # Use hybrid search
-                raw_results = self.vectordb.hybrid_search(
+            if cascade is not None and rerank:
+                # Vector search, fusion and reranking stages, within their budgets
+                raw_results = cascade.search(
                     query_text=query,
-                    n_results=fetch_count,
+                    n_results=n_results,
                     where=where_filter,
                 )
             else:
                 # Use standard vector search
-                raw_results = self.vectordb.query(
+                raw_results = vectordb.query(
                     query_text=query,
-                    n_results=fetch_count,
+                    n_results=n_results,
                     where=where_filter,
                 )
 
             # Process results
-            contexts = self._process_results(raw_results, n_results, query, rerank)
+            contexts = self._process_results(raw_results, n_results)
+
+            if self.result_cache is not None:
+                self.result_cache.put(cache_key, query_embedding, copy.deepcopy(contexts))
 
             return {
                 "contexts": contexts,
@@ -146,17 +267,14 @@ class GetStylusContextTool(BaseTool):
         self,
         raw_results: dict,
         n_results: int,
-        query: str,
-        rerank: bool,
     ) -> list[dict]:
         """
         Process raw ChromaDB results into context objects.
 
         Args:
-            raw_results: Raw query results from ChromaDB.
+            raw_results: Raw query results from ChromaDB, or ranked
+                cascade results with a "relevance" per result.
             n_results: Number of results to return.
-            query: Original query (for reranking).
-            rerank: Whether to apply reranking.
 
         Returns:
             List of context dictionaries.
@@ -164,58 +282,34 @@ class GetStylusContextTool(BaseTool):
         # Check if results are empty
         if not raw_results:
             return []
-        
+
         # ChromaDB returns results as: {"ids": [[id1, id2, ...]], ...}
         # Check if we have any results
         if not raw_results.get("ids") or len(raw_results["ids"]) == 0:
             return []
-        
+
         # Check if the first (and only) result list is empty
         if len(raw_results["ids"][0]) == 0:
             return []
 
-        ids = raw_results["ids"][0]
         documents = raw_results["documents"][0]
         metadatas = raw_results["metadatas"][0]
         distances = raw_results["distances"][0]
+        # The cascade scores results with whichever stage ranked them last
+        ranked_relevance = raw_results.get("relevance", [None])[0]
 
-        # Apply reranking if enabled
-        if rerank and self.reranker and len(documents) > 0:
-            reranked = self.reranker.rerank(
-                query=query,
-                documents=documents,
-                vector_distances=distances,
-                top_k=n_results,
-            )
-
-            # Build contexts from reranked results
-            contexts = []
-            for item in reranked:
-                idx = item["index"]
-                metadata = metadatas[idx] if idx < len(metadatas) else {}
-
-                # Calculate relevance score (normalize RRF to 0-1)
-                rrf_score = item.get("rrf_score", 0)
-                relevance = min(1.0, rrf_score * 30)  # Normalize RRF scores
-
-                contexts.append(self._build_context(
-                    content=documents[idx],
-                    metadata=metadata,
-                    distance=distances[idx],
-                    relevance_score=relevance,
-                ))
-
-            return contexts
-
-        # Without reranking, process in distance order
+        # Results are already in rank order
         contexts = []
         for i in range(min(n_results, len(documents))):
             metadata = metadatas[i] if i < len(metadatas) else {}
 
-            # Convert distance to relevance score (cosine distance)
-            # Distance of 0 = perfect match = 1.0 relevance
-            # Distance of 2 = opposite = 0.0 relevance
-            relevance = max(0.0, 1.0 - (distances[i] / 2.0))
+            if ranked_relevance is not None:
+                relevance = ranked_relevance[i]
+            else:
+                # Convert distance to relevance score (cosine distance)
+                # Distance of 0 = perfect match = 1.0 relevance
+                # Distance of 2 = opposite = 0.0 relevance
+                relevance = max(0.0, 1.0 - (distances[i] / 2.0))
 
             contexts.append(self._build_context(
                 content=documents[i],
@@ -235,7 +329,9 @@ class GetStylusContextTool(BaseTool):
     ) -> dict:
         """Build a context object from raw data."""
         # Determine content type
-        content_type = metadata.get("type", "unknown")
+        content_type = metadata.get("type") or SOURCE_CONTENT_TYPES.get(
+            metadata.get("source"), "unknown"
+        )
         if content_type == "unknown":
             # Infer from content
             if "```rust" in content.lower() or "fn " in content or "sol_storage!" in content:
@@ -0,0 +1,398 @@
+"""
+Structural code chunking for ARBuilder.
+
+Splits Rust, Solidity and TypeScript files along their tree-sitter syntax
+tree: one chunk per function, struct, impl block, contract, class, etc.
+Containers (impl blocks, traits, modules, contracts, classes) that are too
+large to keep in one chunk are split into their members, and each member
+chunk is wrapped in the header of its container (attributes, doc comments
+and signature up to the opening brace) so it still says where it belongs.
+"""
+
+import hashlib
+import importlib
+import logging
+import re
+import warnings
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+from typing import TYPE_CHECKING, Callable, Iterator, Optional
+
+# tree-sitter is optional; without it CodeChunker uses its regex patterns
+try:
+    import tree_sitter
+    HAS_TREE_SITTER = True
+except ImportError:
+    HAS_TREE_SITTER = False
+
+if TYPE_CHECKING:
+    from .chunker import CodeChunker, TokenizedText
+
+logger = logging.getLogger(__name__)
+
+Span = tuple[int, int]
+Piece = tuple[str, int, Optional[str]]
+
+_INDENT_PATTERN = re.compile(r"[ \t]*")
+
+
+@dataclass(frozen=True)
+class LanguageSpec:
+    """Node types that drive structural chunking for one grammar."""
+    module: str
+    language: str
+    # Separator between container and member in symbol names
+    separator: str
+    # Attributes, decorators and comments attached to the following item
+    prefix_types: frozenset
+    # Named items (functions, types, ...); anything else is grouped
+    symbol_types: frozenset
+    # Symbols whose members can be chunked separately under their header
+    container_types: frozenset
+    # Statements wrapping a declaration, e.g. `export class ...`
+    wrapper_types: frozenset = frozenset()
+    # Variable declarations that are symbols when they hold a function
+    function_value_types: frozenset = frozenset()
+
+
+_RUST = LanguageSpec(
+    module="tree_sitter_rust",
+    language="language",
+    separator="::",
+    prefix_types=frozenset({"attribute_item", "line_comment", "block_comment"}),
+    symbol_types=frozenset({
+        "function_item", "function_signature_item", "struct_item", "enum_item",
+        "union_item", "trait_item", "impl_item", "mod_item", "macro_definition",
+        "macro_invocation",
+    }),
+    container_types=frozenset({"impl_item", "trait_item", "mod_item"}),
+)
+
+_SOLIDITY = LanguageSpec(
+    module="tree_sitter_solidity",
+    language="language",
+    separator=".",
+    prefix_types=frozenset({"comment"}),
+    symbol_types=frozenset({
+        "contract_declaration", "interface_declaration", "library_declaration",
+        "function_definition", "constructor_definition", "fallback_receive_definition",
+        "modifier_definition", "struct_declaration", "enum_declaration",
+    }),
+    container_types=frozenset({
+        "contract_declaration", "interface_declaration", "library_declaration",
+    }),
+)
+
+_TYPESCRIPT = LanguageSpec(
+    module="tree_sitter_typescript",
+    language="language_typescript",
+    separator=".",
+    prefix_types=frozenset({"comment", "decorator"}),
+    symbol_types=frozenset({
+        "function_declaration", "generator_function_declaration", "class_declaration",
+        "abstract_class_declaration", "interface_declaration", "enum_declaration",
+        "internal_module", "method_definition", "abstract_method_signature",
+    }),
+    container_types=frozenset({
+        "class_declaration", "abstract_class_declaration", "interface_declaration",
+        "internal_module",
+    }),
+    wrapper_types=frozenset({"export_statement", "expression_statement"}),
+    function_value_types=frozenset({"lexical_declaration", "variable_declaration"}),
+)
+
+LANGUAGES: dict[str, LanguageSpec] = {
+    ".rs": _RUST,
+    ".sol": _SOLIDITY,
+    ".ts": _TYPESCRIPT,
+    ".tsx": replace(_TYPESCRIPT, language="language_tsx"),
+}
+
+
+def _load_parser(spec: LanguageSpec) -> Optional["tree_sitter.Parser"]:
+    """Create a parser for a grammar, or None if the grammar isn't installed."""
+    try:
+        grammar = importlib.import_module(spec.module)
+    except ImportError:
+        logger.debug(f"tree-sitter grammar {spec.module} not installed")
+        return None
+
+    # Some grammar packages still hand out raw pointers, which newer
+    # tree-sitter releases accept with a deprecation warning
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", DeprecationWarning)
+        language = tree_sitter.Language(getattr(grammar, spec.language)())
+    return tree_sitter.Parser(language)
+
+
+def _byte_to_char(text: str) -> Callable[[int], int]:
+    """Map UTF-8 byte offsets (as used by tree-sitter) to character offsets."""
+    if text.isascii():
+        return lambda pos: pos
+
+    char_at_byte = []
+    for i, char in enumerate(text):
+        char_at_byte.extend([i] * len(char.encode("utf-8")))
+    char_at_byte.append(len(text))
+    return char_at_byte.__getitem__
+
+
+class StructuralChunker:
+    """
+    Chunk code along its syntax tree using tree-sitter.
+
+    Parsed trees are cached by file content hash, so files that occur in
+    several repositories (forks, vendored copies) are parsed once.
+    """
+
+    def __init__(self, code_chunker: "CodeChunker", cache_size: int = 256):
+        """
+        Initialize the structural chunker.
+
+        Args:
+            code_chunker: Owning CodeChunker; provides max_tokens and the
+                line-based splitting used for oversized items.
+            cache_size: Number of parsed trees to keep.
+        """
+        self.code_chunker = code_chunker
+        self.cache_size = cache_size
+        self._parsers: dict[str, Optional["tree_sitter.Parser"]] = {}
+        self._trees: OrderedDict[str, "tree_sitter.Tree"] = OrderedDict()
+
+    def supports(self, extension: str) -> bool:
+        """Check whether a grammar is available for a file extension."""
+        return self._get_parser(extension) is not None
+
+    def _get_parser(self, extension: str) -> Optional["tree_sitter.Parser"]:
+        if not HAS_TREE_SITTER or extension not in LANGUAGES:
+            return None
+        if extension not in self._parsers:
+            self._parsers[extension] = _load_parser(LANGUAGES[extension])
+        return self._parsers[extension]
+
+    def parse(self, code: str, extension: str) -> Optional["tree_sitter.Tree"]:
+        """
+        Parse code, reusing the cached tree for identical content.
+
+        Returns:
+            Syntax tree, or None if no grammar is available.
+        """
+        parser = self._get_parser(extension)
+        if parser is None:
+            return None
+
+        key = hashlib.sha256(f"{extension}\0{code}".encode("utf-8")).hexdigest()
+        tree = self._trees.get(key)
+        if tree is not None:
+            self._trees.move_to_end(key)
+            return tree
+
+        tree = parser.parse(code.encode("utf-8"))
+        self._trees[key] = tree
+        if len(self._trees) > self.cache_size:
+            self._trees.popitem(last=False)
+        return tree
+
+    def chunk(self, code_text: "TokenizedText", extension: str) -> Optional[list[Piece]]:
+        """
+        Chunk code along its syntax tree.
+
+        Args:
+            code_text: Tokenized code.
+            extension: File extension (e.g., ".rs").
+
+        Returns:
+            List of (content, token_count, symbol) tuples, or None if the
+            file can't be chunked structurally (no grammar or syntax errors).
+        """
+        tree = self.parse(code_text.text, extension)
+        if tree is None or tree.root_node.has_error:
+            return None
+
+        spec = LANGUAGES[extension]
+        to_char = _byte_to_char(code_text.text)
+        return self._chunk_body(code_text, spec, tree.root_node, [], [], to_char)
+
+    def _chunk_body(
+        self,
+        code_text: "TokenizedText",
+        spec: LanguageSpec,
+        parent: "tree_sitter.Node",
+        headers: list[Span],
+        path: list[str],
+        to_char: Callable[[int], int],
+    ) -> list[Piece]:
+        """Chunk the items of a source file or container body."""
+        # Headers are repeated in every member chunk; keep a minimum budget
+        # for the members themselves even under very long headers
+        max_tokens = self.code_chunker.max_tokens
+        header_tokens = sum(code_text.count(*header) + 1 for header in headers)
+        budget = max(max_tokens - header_tokens, max_tokens // 4)
+        min_tokens = max_tokens // 8
+        pieces: list[Piece] = []
+
+        # Consecutive items are grouped while they fit the budget, unless both
+        # sides are symbols of a useful size on their own
+        group: Optional[Span] = None
+        group_symbols: list[str] = []
+        group_tokens = 0
+
+        def flush():
+            nonlocal group
+            if group:
+                symbol = ", ".join(group_symbols) or None
+                pieces.extend(self._emit(code_text, group, headers, symbol, budget))
+                group = None
+
+        for start, end, node in self._items(code_text.text, spec, parent, to_char):
+            tokens = code_text.count(start, end)
+            is_symbol = node is not None and self._is_symbol(spec, node)
+            symbol_path = path
+
+            if is_symbol:
+                name = self._name(code_text.text, node, to_char)
+                symbol_path = path + [name] if name else path
+                body = (
+                    node.child_by_field_name("body")
+                    if node.type in spec.container_types else None
+                )
+                if tokens > budget and body is not None and body.named_child_count:
+                    # Too large as a whole: chunk the members under the container header
+                    flush()
+                    header = (start, to_char(body.start_byte) + 1)
+                    pieces.extend(self._chunk_body(
+                        code_text, spec, body, headers + [header], symbol_path, to_char
+                    ))
+                    continue
+
+            symbol = spec.separator.join(symbol_path) if is_symbol and symbol_path else None
+            fits = group is not None and code_text.count(group[0], end) <= budget
+            small = min(group_tokens, tokens) < min_tokens
+            if fits and (not (group_symbols and is_symbol) or small):
+                group = (group[0], end)
+                group_tokens += tokens
+            else:
+                flush()
+                group = (start, end)
+                group_symbols = []
+                group_tokens = tokens
+            if symbol:
+                group_symbols.append(symbol)
+
+        flush()
+        return pieces
+
+    def _items(
+        self,
+        text: str,
+        spec: LanguageSpec,
+        parent: "tree_sitter.Node",
+        to_char: Callable[[int], int],
+    ) -> Iterator[tuple[int, int, Optional["tree_sitter.Node"]]]:
+        """
+        Yield (start, end, node) for the items of a body.
+
+        Attributes, decorators and comments are attached to the item that
+        follows them; trailing ones are yielded with node None.
+        """
+        prefix_start = None
+        last_end = None
+
+        for child in parent.named_children:
+            last_end = child.end_byte
+            if child.type in spec.prefix_types:
+                if prefix_start is None:
+                    prefix_start = child.start_byte
+                continue
+
+            start = child.start_byte if prefix_start is None else prefix_start
+            prefix_start = None
+            yield self._line_start(text, to_char(start)), to_char(child.end_byte), self._unwrap(
+                spec, child
+            )
+
+        if prefix_start is not None:
+            yield self._line_start(text, to_char(prefix_start)), to_char(last_end), None
+
+    @staticmethod
+    def _line_start(text: str, pos: int) -> int:
+        """Move pos back to the start of its line if only indentation precedes it."""
+        line_start = text.rfind("\n", 0, pos) + 1
+        return line_start if not text[line_start:pos].strip() else pos
+
+    @staticmethod
+    def _unwrap(spec: LanguageSpec, node: "tree_sitter.Node") -> "tree_sitter.Node":
+        """Return the declaration inside a wrapper statement such as `export`."""
+        if node.type in spec.wrapper_types:
+            for child in node.named_children:
+                if child.type in spec.symbol_types or child.type in spec.function_value_types:
+                    return child
+        return node
+
+    @staticmethod
+    def _is_symbol(spec: LanguageSpec, node: "tree_sitter.Node") -> bool:
+        if node.type in spec.symbol_types:
+            return True
+        if node.type in spec.function_value_types:
+            # e.g. `const handler = async () => { ... }`
+            return any(
+                (value := declarator.child_by_field_name("value")) is not None
+                and value.type in ("arrow_function", "function_expression", "function")
+                for declarator in node.named_children
+            )
+        return False
+
+    @staticmethod
+    def _name(
+        text: str,
+        node: "tree_sitter.Node",
+        to_char: Callable[[int], int],
+    ) -> Optional[str]:
+        """Get the symbol name of an item."""
+        if node.type == "impl_item":
+            name_node = node.child_by_field_name("type")
+        elif node.type == "macro_invocation":
+            name_node = node.child_by_field_name("macro")
+        elif node.type in ("lexical_declaration", "variable_declaration"):
+            name_node = node.named_children[0].child_by_field_name("name")
+        else:
+            name_node = node.child_by_field_name("name")
+
+        if name_node is None:
+            return None
+        name = text[to_char(name_node.start_byte):to_char(name_node.end_byte)]
+        return f"{name}!" if node.type == "macro_invocation" else name
+
+    def _emit(
+        self,
+        code_text: "TokenizedText",
+        span: Span,
+        headers: list[Span],
+        symbol: Optional[str],
+        budget: int,
+    ) -> list[Piece]:
+        """Create the chunk(s) for one item, line-splitting it if it exceeds the budget."""
+        start, end = span
+        token_count = code_text.count(start, end)
+
+        if token_count <= budget:
+            parts = [(code_text.text[start:end], token_count)]
+        else:
+            spans = self.code_chunker._line_split(code_text, span, max_tokens=budget)
+            parts = self.code_chunker._apply_line_overlap(code_text, spans)
+
+        if not headers:
+            return [(content, tokens, symbol) for content, tokens in parts]
+
+        # Wrap in the enclosing headers and close their braces
+        text = code_text.text
+        opening = "\n".join(text[a:b] for a, b in headers)
+        closing = "\n".join(
+            _INDENT_PATTERN.match(text, text.rfind("\n", 0, a) + 1).group() + "}"
+            for a, _ in reversed(headers)
+        )
+        header_tokens = sum(code_text.count(a, b) + 1 for a, b in headers)
+        return [
+            (f"{opening}\n{content}\n{closing}", tokens + header_tokens, symbol)
+            for content, tokens in parts
+        ]
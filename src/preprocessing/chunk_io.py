@@ -0,0 +1,102 @@
+"""
+Reading and writing processed chunk files for ARBuilder.
+
+Chunks are stored as JSON Lines (one chunk per line), optionally
+zstd-compressed (.jsonl.zst), so they can be written and read as a stream.
+Legacy single-array .json files are still readable.
+"""
+
+import io
+import json
+from itertools import islice
+from pathlib import Path
+from typing import Iterable, Iterator, TextIO
+
+# zstd support is optional
+try:
+    import zstandard
+    HAS_ZSTD = True
+except ImportError:
+    HAS_ZSTD = False
+
+CHUNK_FILE_PATTERNS = [
+    "processed_chunks_*.jsonl",
+    "processed_chunks_*.jsonl.zst",
+    "processed_chunks_*.json",
+]
+
+
+def _open_text(path: Path, mode: str) -> TextIO:
+    """Open a chunk file for text reading ("r") or writing ("w")."""
+    if path.suffix != ".zst":
+        return open(path, mode, encoding="utf-8")
+
+    if not HAS_ZSTD:
+        raise ImportError(
+            "zstandard is required for .zst chunk files (pip install zstandard)"
+        )
+    if mode == "r":
+        stream = zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), closefd=True)
+    else:
+        stream = zstandard.ZstdCompressor(level=10).stream_writer(open(path, "wb"), closefd=True)
+    return io.TextIOWrapper(stream, encoding="utf-8")
+
+
+def write_chunks(path: Path, chunks: Iterable[dict]) -> int:
+    """
+    Write chunks to a JSONL file as they are produced.
+
+    Args:
+        path: Output path (.jsonl, or .jsonl.zst for compression).
+        chunks: Chunks to write.
+
+    Returns:
+        Number of chunks written.
+    """
+    count = 0
+    with _open_text(path, "w") as f:
+        for chunk in chunks:
+            f.write(json.dumps(chunk, ensure_ascii=False))
+            f.write("\n")
+            count += 1
+    return count
+
+
+def read_chunks(path: Path) -> Iterator[dict]:
+    """
+    Read chunks from a processed chunk file.
+
+    JSONL files are streamed line by line; legacy .json arrays are loaded
+    in one go.
+
+    Args:
+        path: Path to a .jsonl, .jsonl.zst or .json chunk file.
+
+    Yields:
+        Chunk dictionaries.
+    """
+    path = Path(path)
+    if path.suffix == ".json":
+        with open(path, "r", encoding="utf-8") as f:
+            yield from json.load(f)
+        return
+
+    with _open_text(path, "r") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def iter_windows(chunks: Iterable[dict], size: int) -> Iterator[list[dict]]:
+    """Group a chunk stream into lists of at most size chunks."""
+    iterator = iter(chunks)
+    while window := list(islice(iterator, size)):
+        yield window
+
+
+def find_latest_chunk_file(directory: Path) -> Path | None:
+    """Find the most recently modified processed chunk file in a directory."""
+    files = [f for pattern in CHUNK_FILE_PATTERNS for f in Path(directory).glob(pattern)]
+    if not files:
+        return None
+    return max(files, key=lambda p: p.stat().st_mtime)
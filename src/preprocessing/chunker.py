@@ -1,12 +1,27 @@
 """
 Document and code chunking utilities for ARBuilder.
+
+Each input is encoded once; sections, paragraphs, sentences and lines are
+handled as character spans into the original text, and their token counts
+and overlaps are derived from the single token array.
 """
 
 import re
+from bisect import bisect_left
 from dataclasses import dataclass, field
-from typing import Optional
+from itertools import accumulate
+from typing import Callable, Optional
+
 import tiktoken
 
+from .ast_chunker import HAS_TREE_SITTER, StructuralChunker
+
+Span = tuple[int, int]
+
+_HEADER_PATTERN = re.compile(r"(?=^#{1,6}\s)", re.MULTILINE)
+_PARAGRAPH_PATTERN = re.compile(r"\n\n")
+_SENTENCE_PATTERN = re.compile(r"(?<=[.!?])\s+")
+
 
 @dataclass
 class Chunk:
@@ -27,6 +42,88 @@ class Chunk:
         }
 
 
+class TokenizedText:
+    """
+    Text encoded once, with the character offset of every token.
+
+    Token counts for any character span are answered by bisecting the
+    offsets instead of re-encoding the substring.
+    """
+
+    def __init__(self, text: str, encoding: tiktoken.Encoding):
+        """
+        Encode the text.
+
+        Args:
+            text: Text to encode.
+            encoding: Tiktoken encoding to use.
+        """
+        self.text = text
+        self.encoding = encoding
+        self.tokens = encoding.encode_ordinary(text)
+        self.offsets = self._token_offsets()
+
+    def _token_offsets(self) -> list[int]:
+        """Character offset at which each token starts."""
+        token_bytes = self.encoding.decode_tokens_bytes(self.tokens)
+        byte_offsets = list(accumulate(map(len, token_bytes), initial=0))[:-1]
+        if self.text.isascii():
+            return byte_offsets
+
+        # Map byte offsets to the index of the character containing that byte
+        char_at_byte = []
+        for i, char in enumerate(self.text):
+            char_at_byte.extend([i] * len(char.encode("utf-8")))
+        return [char_at_byte[b] for b in byte_offsets]
+
+    def token_index(self, pos: int) -> int:
+        """Index of the first token starting at or after character pos."""
+        return bisect_left(self.offsets, pos)
+
+    def count(self, start: int, end: int) -> int:
+        """Number of tokens starting within text[start:end]."""
+        return self.token_index(end) - self.token_index(start)
+
+    def decode(self, start: int, end: int) -> str:
+        """Decode the token range tokens[start:end]."""
+        return self.encoding.decode(self.tokens[start:end])
+
+
+def _strip_span(text: str, start: int, end: int) -> Span:
+    """Shrink a span so it excludes leading and trailing whitespace."""
+    while start < end and text[start].isspace():
+        start += 1
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    return start, end
+
+
+def _split_span(
+    text: str,
+    span: Span,
+    pattern: re.Pattern,
+    strip: bool = True,
+) -> list[Span]:
+    """
+    Split text[span] at pattern matches, dropping the separators.
+
+    With strip, pieces are stripped of surrounding whitespace and empty
+    pieces are dropped; otherwise pieces are returned as they are.
+    """
+    start, end = span
+    pieces = []
+    pos = start
+    for match in pattern.finditer(text, start, end):
+        pieces.append((pos, match.start()))
+        pos = match.end()
+    pieces.append((pos, end))
+
+    if not strip:
+        return pieces
+    pieces = [_strip_span(text, a, b) for a, b in pieces]
+    return [(a, b) for a, b in pieces if b > a]
+
+
 class DocumentChunker:
     """
     Chunk documents (markdown, text) for RAG ingestion.
@@ -74,135 +171,119 @@ class DocumentChunker:
             return []
 
         metadata = metadata or {}
-        chunks = []
+        doc = TokenizedText(text, self.encoding)
 
         # Split by headers first (semantic sections)
-        sections = self._split_by_headers(text)
-
-        current_chunk = ""
-        current_tokens = 0
-
-        for section in sections:
-            section_tokens = self.count_tokens(section)
-
-            # If section fits in current chunk
-            if current_tokens + section_tokens <= self.max_tokens:
-                current_chunk += section + "\n\n"
-                current_tokens += section_tokens
-            else:
-                # Save current chunk if not empty
-                if current_chunk.strip():
-                    chunks.append(current_chunk.strip())
-
-                # If section itself is too large, split by paragraphs
-                if section_tokens > self.max_tokens:
-                    sub_chunks = self._split_large_section(section)
-                    chunks.extend(sub_chunks)
-                    current_chunk = ""
-                    current_tokens = 0
-                else:
-                    current_chunk = section + "\n\n"
-                    current_tokens = section_tokens
-
-        # Don't forget the last chunk
-        if current_chunk.strip():
-            chunks.append(current_chunk.strip())
+        sections = self._split_by_headers(doc)
+        groups = self._pack(doc, sections, "\n\n", self._split_large_section)
 
         # Apply overlap and create Chunk objects
-        final_chunks = self._apply_overlap(chunks)
+        final_chunks = self._apply_overlap(doc, groups)
 
         return [
             Chunk(
-                content=chunk,
+                content=content,
                 chunk_index=i,
                 total_chunks=len(final_chunks),
-                token_count=self.count_tokens(chunk),
+                token_count=token_count,
                 metadata=metadata.copy(),
             )
-            for i, chunk in enumerate(final_chunks)
+            for i, (content, token_count) in enumerate(final_chunks)
         ]
 
-    def _split_by_headers(self, text: str) -> list[str]:
-        """Split text by markdown headers."""
-        # Pattern matches markdown headers
-        pattern = r"(?=^#{1,6}\s)"
-        sections = re.split(pattern, text, flags=re.MULTILINE)
-        return [s.strip() for s in sections if s.strip()]
-
-    def _split_large_section(self, section: str) -> list[str]:
-        """Split a large section by paragraphs."""
-        paragraphs = section.split("\n\n")
-        chunks = []
-        current_chunk = ""
-        current_tokens = 0
-
-        for para in paragraphs:
-            para_tokens = self.count_tokens(para)
+    def _pack(
+        self,
+        doc: TokenizedText,
+        spans: list[Span],
+        separator: str,
+        split_large: Optional[Callable[[TokenizedText, Span], list]] = None,
+    ) -> list[tuple[list[Span], str]]:
+        """
+        Greedily pack spans into groups of at most max_tokens.
 
-            if current_tokens + para_tokens <= self.max_tokens:
-                current_chunk += para + "\n\n"
-                current_tokens += para_tokens
-            else:
-                if current_chunk.strip():
-                    chunks.append(current_chunk.strip())
-
-                # If paragraph is still too large, split by sentences
-                if para_tokens > self.max_tokens:
-                    sentence_chunks = self._split_by_sentences(para)
-                    chunks.extend(sentence_chunks)
-                    current_chunk = ""
-                    current_tokens = 0
-                else:
-                    current_chunk = para + "\n\n"
-                    current_tokens = para_tokens
+        Args:
+            doc: Tokenized document.
+            spans: Spans to pack, in order.
+            separator: String joining the spans of a group.
+            split_large: Splitter for a single span larger than max_tokens.
 
-        if current_chunk.strip():
-            chunks.append(current_chunk.strip())
+        Returns:
+            List of (spans, separator) groups.
+        """
+        groups = []
+        current: list[Span] = []
+        current_tokens = 0
 
-        return chunks
+        for span in spans:
+            span_tokens = doc.count(*span)
 
-    def _split_by_sentences(self, text: str) -> list[str]:
-        """Split text by sentences."""
-        # Simple sentence splitting
-        sentences = re.split(r"(?<=[.!?])\s+", text)
-        chunks = []
-        current_chunk = ""
-        current_tokens = 0
+            if current_tokens + span_tokens <= self.max_tokens:
+                current.append(span)
+                current_tokens += span_tokens
+                continue
 
-        for sentence in sentences:
-            sentence_tokens = self.count_tokens(sentence)
+            if current:
+                groups.append((current, separator))
 
-            if current_tokens + sentence_tokens <= self.max_tokens:
-                current_chunk += sentence + " "
-                current_tokens += sentence_tokens
+            # If the span itself is too large, split it further
+            if span_tokens > self.max_tokens and split_large:
+                groups.extend(split_large(doc, span))
+                current = []
+                current_tokens = 0
             else:
-                if current_chunk.strip():
-                    chunks.append(current_chunk.strip())
-                current_chunk = sentence + " "
-                current_tokens = sentence_tokens
+                current = [span]
+                current_tokens = span_tokens
 
-        if current_chunk.strip():
-            chunks.append(current_chunk.strip())
+        if current:
+            groups.append((current, separator))
 
-        return chunks
+        return groups
 
-    def _apply_overlap(self, chunks: list[str]) -> list[str]:
-        """Apply overlap between chunks."""
-        if len(chunks) <= 1 or self.overlap_tokens == 0:
-            return chunks
+    def _split_by_headers(self, doc: TokenizedText) -> list[Span]:
+        """Split text by markdown headers."""
+        return _split_span(doc.text, (0, len(doc.text)), _HEADER_PATTERN)
 
-        result = [chunks[0]]
+    def _split_large_section(self, doc: TokenizedText, section: Span) -> list:
+        """Split a large section by paragraphs."""
+        paragraphs = _split_span(doc.text, section, _PARAGRAPH_PATTERN, strip=False)
+        return self._pack(doc, paragraphs, "\n\n", self._split_by_sentences)
 
-        for i in range(1, len(chunks)):
-            prev_chunk = chunks[i - 1]
-            current_chunk = chunks[i]
+    def _split_by_sentences(self, doc: TokenizedText, paragraph: Span) -> list:
+        """Split text by sentences."""
+        sentences = _split_span(doc.text, paragraph, _SENTENCE_PATTERN, strip=False)
+        return self._pack(doc, sentences, " ")
 
-            # Get overlap from end of previous chunk
-            prev_tokens = self.encoding.encode(prev_chunk)
-            overlap_text = self.encoding.decode(prev_tokens[-self.overlap_tokens:])
+    def _apply_overlap(
+        self,
+        doc: TokenizedText,
+        groups: list[tuple[list[Span], str]],
+    ) -> list[tuple[str, int]]:
+        """
+        Join span groups into chunk texts, applying overlap between chunks.
 
-            # Prepend overlap to current chunk
-            result.append(f"...{overlap_text}\n\n{current_chunk}")
+        Returns:
+            List of (content, token_count) tuples.
+        """
+        result = []
+        prev_end_token = None
+        prev_start_token = 0
+
+        for spans, separator in groups:
+            content = separator.join(doc.text[a:b] for a, b in spans).strip()
+            if not content:
+                continue
+            token_count = doc.count(spans[0][0], spans[-1][1])
+
+            # Get overlap from the end of the previous chunk
+            if prev_end_token is not None and self.overlap_tokens > 0:
+                overlap_start = max(prev_start_token, prev_end_token - self.overlap_tokens)
+                overlap_text = doc.decode(overlap_start, prev_end_token)
+                content = f"...{overlap_text}\n\n{content}"
+                token_count += prev_end_token - overlap_start
+
+            result.append((content, token_count))
+            prev_start_token = doc.token_index(spans[0][0])
+            prev_end_token = doc.token_index(spans[-1][1])
 
         return result
 
@@ -211,6 +292,10 @@ class CodeChunker:
     """
     Chunk code files for RAG ingestion.
     Preserves function/struct boundaries where possible.
+
+    Rust, Solidity and TypeScript files are split along their syntax tree
+    when tree-sitter is installed; other files (and files that fail to
+    parse) are split with the regex SPLIT_PATTERNS.
     """
 
     # Language-specific patterns for code splitting
@@ -239,11 +324,14 @@ class CodeChunker:
         ],
     }
 
+    OVERLAP_MARKER = "// ... continued from above"
+
     def __init__(
         self,
         max_tokens: int = 1024,
         overlap_lines: int = 5,
         model: str = "cl100k_base",
+        structural: bool = True,
     ):
         """
         Initialize the code chunker.
@@ -252,10 +340,13 @@ class CodeChunker:
             max_tokens: Maximum tokens per chunk.
             overlap_lines: Line overlap between chunks.
             model: Tiktoken encoding model.
+            structural: Use tree-sitter based chunking where available.
         """
         self.max_tokens = max_tokens
         self.overlap_lines = overlap_lines
         self.encoding = tiktoken.get_encoding(model)
+        self._marker_tokens = self.count_tokens(self.OVERLAP_MARKER + "\n")
+        self.structural = StructuralChunker(self) if structural and HAS_TREE_SITTER else None
 
     def count_tokens(self, text: str) -> int:
         """Count tokens in text."""
@@ -284,87 +375,136 @@ class CodeChunker:
         metadata = metadata or {}
         metadata["language"] = extension.lstrip(".")
 
-        # Try semantic splitting first
-        chunks = self._semantic_split(code, extension)
+        code_text = TokenizedText(code, self.encoding)
 
-        # If semantic split didn't work well, fall back to line-based
-        if len(chunks) == 1 and self.count_tokens(chunks[0]) > self.max_tokens:
-            chunks = self._line_split(code)
-
-        # Further split any chunks that are too large
-        final_chunks = []
-        for chunk in chunks:
-            if self.count_tokens(chunk) > self.max_tokens:
-                final_chunks.extend(self._line_split(chunk))
-            else:
-                final_chunks.append(chunk)
-
-        # Apply overlap
-        final_chunks = self._apply_line_overlap(final_chunks)
+        # Prefer syntax-tree chunking, fall back to pattern splitting
+        final_chunks = None
+        if self.structural:
+            final_chunks = self.structural.chunk(code_text, extension)
+        if final_chunks is None:
+            final_chunks = [
+                (content, token_count, None)
+                for content, token_count in self._pattern_chunks(code_text, extension)
+            ]
 
         return [
             Chunk(
-                content=chunk,
+                content=content,
                 chunk_index=i,
                 total_chunks=len(final_chunks),
-                token_count=self.count_tokens(chunk),
-                metadata=metadata.copy(),
+                token_count=token_count,
+                metadata={**metadata, "symbol": symbol} if symbol else metadata.copy(),
             )
-            for i, chunk in enumerate(final_chunks)
+            for i, (content, token_count, symbol) in enumerate(final_chunks)
         ]
 
-    def _semantic_split(self, code: str, extension: str) -> list[str]:
+    def _pattern_chunks(self, code_text: TokenizedText, extension: str) -> list[tuple[str, int]]:
+        """Chunk code with the regex SPLIT_PATTERNS and line-based splitting."""
+        # Try semantic splitting first, then split any sections that are too large
+        spans = []
+        for section in self._semantic_split(code_text, extension):
+            if code_text.count(*section) > self.max_tokens:
+                spans.extend(self._line_split(code_text, section))
+            else:
+                spans.append(section)
+
+        # Apply overlap
+        return self._apply_line_overlap(code_text, spans)
+
+    def _semantic_split(self, code_text: TokenizedText, extension: str) -> list[Span]:
         """Split code by semantic boundaries (functions, classes, etc.)."""
+        code = code_text.text
+        whole = [_strip_span(code, 0, len(code))]
         patterns = self.SPLIT_PATTERNS.get(extension, [])
 
         if not patterns:
-            return [code]
+            return whole
 
         # Combine patterns
         combined_pattern = "|".join(patterns)
 
         try:
-            sections = re.split(combined_pattern, code, flags=re.MULTILINE)
-            return [s.strip() for s in sections if s.strip()]
+            pattern = re.compile(combined_pattern, re.MULTILINE)
         except re.error:
-            return [code]
+            return whole
 
-    def _line_split(self, code: str) -> list[str]:
-        """Split code by lines when semantic splitting isn't possible."""
-        lines = code.splitlines()
+        return _split_span(code, (0, len(code)), pattern)
+
+    def _line_split(
+        self,
+        code_text: TokenizedText,
+        section: Span,
+        max_tokens: Optional[int] = None,
+    ) -> list[Span]:
+        """Split a section by lines when semantic splitting isn't enough."""
+        max_tokens = max_tokens or self.max_tokens
+        code = code_text.text
+        start, end = section
         chunks = []
-        current_chunk_lines = []
+        chunk_start = None
+        chunk_end = start
         current_tokens = 0
 
-        for line in lines:
-            line_tokens = self.count_tokens(line)
+        line_start = start
+        while line_start < end:
+            line_end = code.find("\n", line_start, end)
+            if line_end == -1:
+                line_end = end
+            line_tokens = code_text.count(line_start, min(line_end + 1, end))
 
-            if current_tokens + line_tokens <= self.max_tokens:
-                current_chunk_lines.append(line)
-                current_tokens += line_tokens
-            else:
-                if current_chunk_lines:
-                    chunks.append("\n".join(current_chunk_lines))
-                current_chunk_lines = [line]
-                current_tokens = line_tokens
+            if chunk_start is not None and current_tokens + line_tokens > max_tokens:
+                chunks.append((chunk_start, chunk_end))
+                chunk_start = None
+                current_tokens = 0
 
-        if current_chunk_lines:
-            chunks.append("\n".join(current_chunk_lines))
+            if chunk_start is None:
+                chunk_start = line_start
+            chunk_end = line_end
+            current_tokens += line_tokens
+            line_start = line_end + 1
+
+        if chunk_start is not None:
+            chunks.append((chunk_start, chunk_end))
 
         return chunks
 
-    def _apply_line_overlap(self, chunks: list[str]) -> list[str]:
-        """Apply line-based overlap between chunks."""
-        if len(chunks) <= 1 or self.overlap_lines == 0:
-            return chunks
+    def _apply_line_overlap(
+        self,
+        code_text: TokenizedText,
+        spans: list[Span],
+    ) -> list[tuple[str, int]]:
+        """
+        Turn spans into chunk texts, applying line-based overlap between chunks.
 
-        result = [chunks[0]]
+        Returns:
+            List of (content, token_count) tuples.
+        """
+        code = code_text.text
+        result = []
+
+        for i, (start, end) in enumerate(spans):
+            content = code[start:end]
+            token_count = code_text.count(start, end)
+
+            if i > 0 and self.overlap_lines > 0:
+                # Walk back overlap_lines line breaks from the end of the previous
+                # chunk, ignoring a trailing newline
+                prev_start, prev_end = spans[i - 1]
+                if prev_end > prev_start and code[prev_end - 1] == "\n":
+                    prev_end -= 1
+                overlap_start = prev_end
+                for _ in range(self.overlap_lines):
+                    overlap_start = code.rfind("\n", prev_start, overlap_start)
+                    if overlap_start == -1:
+                        overlap_start = prev_start
+                        break
+                else:
+                    overlap_start += 1
 
-        for i in range(1, len(chunks)):
-            prev_lines = chunks[i - 1].splitlines()
-            overlap = prev_lines[-self.overlap_lines:]
-            overlap_text = "\n".join(overlap)
+                overlap_text = code[overlap_start:prev_end]
+                content = f"{self.OVERLAP_MARKER}\n{overlap_text}\n{content}"
+                token_count += self._marker_tokens + code_text.count(overlap_start, prev_end)
 
-            result.append(f"// ... continued from above\n{overlap_text}\n{chunks[i]}")
+            result.append((content, token_count))
 
         return result
@@ -0,0 +1,190 @@
+"""
+Near-duplicate chunk elimination for ARBuilder.
+
+Forks, templates and re-crawled pages (anchors, trailing slashes) produce
+chunks whose content is almost identical. Chunks are compared by MinHash
+signatures over word shingles, and LSH banding finds candidate matches
+without comparing every pair. Each group of near-duplicates collapses into
+the first chunk seen (the canonical chunk), which lists where all copies
+came from in `sources`.
+"""
+
+import re
+import zlib
+from typing import Iterable, Iterator, Optional
+
+import numpy as np
+
+DEFAULT_THRESHOLD = 0.85
+DEFAULT_NUM_PERM = 128
+DEFAULT_BANDS = 16
+DEFAULT_SHINGLE_SIZE = 5
+
+# Mersenne prime for the permutation hashes; small enough that a * x + b
+# stays within uint64 for 31-bit a, b and x
+_PRIME = np.uint64((1 << 31) - 1)
+_SHINGLE_BASE = np.uint64(1_000_003)
+_WORD_PATTERN = re.compile(r"\w+")
+
+
+def chunk_source(chunk: dict) -> str:
+    """Describe where a chunk came from (page URL or repo file)."""
+    if chunk.get("url"):
+        return chunk["url"]
+    repo = chunk.get("repo_url") or chunk.get("repo_name", "")
+    return f"{repo}/{chunk.get('file_path', '')}"
+
+
+class MinHashDeduplicator:
+    """
+    Detect near-duplicate chunks with MinHash signatures and LSH banding.
+
+    Usage is two passes over the chunk stream: `fit` decides which chunks
+    are duplicates of an earlier canonical chunk, `apply` drops them and
+    records their sources on the canonical chunk.
+    """
+
+    def __init__(
+        self,
+        threshold: float = DEFAULT_THRESHOLD,
+        num_perm: int = DEFAULT_NUM_PERM,
+        bands: int = DEFAULT_BANDS,
+        shingle_size: int = DEFAULT_SHINGLE_SIZE,
+        seed: int = 1,
+    ):
+        """
+        Initialize the deduplicator.
+
+        Args:
+            threshold: Minimum estimated Jaccard similarity of word shingles
+                for two chunks to count as duplicates.
+            num_perm: Number of MinHash permutations (signature length).
+            bands: Number of LSH bands; num_perm must be divisible by it.
+            shingle_size: Number of consecutive words per shingle.
+            seed: Seed for the permutation parameters.
+        """
+        if num_perm % bands:
+            raise ValueError(f"num_perm ({num_perm}) must be divisible by bands ({bands})")
+
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, _PRIME, num_perm, dtype=np.uint64)[:, None]
+        self._b = rng.integers(0, _PRIME, num_perm, dtype=np.uint64)[:, None]
+
+        # Signatures of canonical chunks, and LSH buckets pointing into them
+        self._signatures: list[np.ndarray] = []
+        self._canonical_ids: list[str] = []
+        self._buckets: list[dict[bytes, list[int]]] = [{} for _ in range(bands)]
+
+        self.duplicate_of: dict[str, str] = {}
+        self.sources: dict[str, list[str]] = {}
+
+    def signature(self, text: str) -> Optional[np.ndarray]:
+        """
+        Compute the MinHash signature of a text.
+
+        Returns:
+            uint32 array of length num_perm, or None for text without words.
+        """
+        words = _WORD_PATTERN.findall(text.lower())
+        if not words:
+            return None
+
+        hashes = np.fromiter(
+            (zlib.crc32(word.encode("utf-8")) for word in words),
+            dtype=np.uint64,
+            count=len(words),
+        )
+
+        # Rolling hash over shingle_size consecutive words
+        size = min(self.shingle_size, len(hashes))
+        count = len(hashes) - size + 1
+        shingles = np.zeros(count, dtype=np.uint64)
+        for offset in range(size):
+            shingles = (shingles * _SHINGLE_BASE + hashes[offset:offset + count]) & np.uint64(
+                0xFFFFFFFF
+            )
+        shingles = np.unique(shingles % _PRIME)
+
+        return ((self._a * shingles + self._b) % _PRIME).min(axis=1).astype(np.uint32)
+
+    def add(self, chunk_id: str, text: str, source: str) -> Optional[str]:
+        """
+        Register a chunk.
+
+        Args:
+            chunk_id: Chunk id.
+            text: Chunk content.
+            source: Where the chunk came from (see chunk_source).
+
+        Returns:
+            Id of the canonical chunk this one duplicates, or None if the
+            chunk is new (and becomes canonical itself).
+        """
+        signature = self.signature(text)
+        if signature is None:
+            return None
+
+        keys = [
+            signature[band * self.rows:(band + 1) * self.rows].tobytes()
+            for band in range(self.bands)
+        ]
+
+        candidates = sorted({
+            index
+            for band, key in enumerate(keys)
+            for index in self._buckets[band].get(key, ())
+        })
+        for index in candidates:
+            similarity = np.count_nonzero(self._signatures[index] == signature) / self.num_perm
+            if similarity >= self.threshold:
+                canonical_id = self._canonical_ids[index]
+                self.duplicate_of[chunk_id] = canonical_id
+                if source not in self.sources[canonical_id]:
+                    self.sources[canonical_id].append(source)
+                return canonical_id
+
+        index = len(self._signatures)
+        self._signatures.append(signature)
+        self._canonical_ids.append(chunk_id)
+        for band, key in enumerate(keys):
+            self._buckets[band].setdefault(key, []).append(index)
+        self.sources[chunk_id] = [source]
+        return None
+
+    def fit(self, chunks: Iterable[dict]) -> "MinHashDeduplicator":
+        """Register every chunk of a stream (first pass)."""
+        for chunk in chunks:
+            self.add(chunk["id"], chunk.get("content", ""), chunk_source(chunk))
+        return self
+
+    def apply(self, chunks: Iterable[dict]) -> Iterator[dict]:
+        """
+        Drop duplicates from a chunk stream (second pass).
+
+        Canonical chunks that absorbed duplicates get a `sources` list with
+        their own source first.
+
+        Yields:
+            Canonical chunks, in their original order.
+        """
+        for chunk in chunks:
+            if chunk["id"] in self.duplicate_of:
+                continue
+            sources = self.sources.get(chunk["id"], [])
+            if len(sources) > 1:
+                chunk["sources"] = sources
+            yield chunk
+
+    def get_stats(self) -> dict:
+        """Get deduplication statistics."""
+        return {
+            "canonical_chunks": len(self._canonical_ids),
+            "duplicates": len(self.duplicate_of),
+            "threshold": self.threshold,
+        }
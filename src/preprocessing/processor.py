@@ -5,23 +5,26 @@ Main data processor for ARBuilder preprocessing pipeline.
 import hashlib
 import json
 import os
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 from pathlib import Path
-from typing import Optional
+from typing import Any, Callable, Iterable, Iterator, Optional
 
 from dotenv import load_dotenv
 from rich.console import Console
-from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn
+from rich.progress import BarColumn, Progress, SpinnerColumn, TextColumn
 
+from .chunk_io import read_chunks, write_chunks
+from .chunker import CodeChunker, DocumentChunker
 from .cleaner import TextCleaner
-from .chunker import DocumentChunker, CodeChunker, Chunk
+from .dedup import DEFAULT_THRESHOLD, MinHashDeduplicator
 
 # Import version extractor - handle import error gracefully
 try:
     from scraper.version_extractor import (
-        get_latest_sdk_version_sync,
-        extract_sdk_version_from_repo,
         detect_deprecated_patterns,
+        extract_sdk_version_from_repo,
+        get_latest_sdk_version_sync,
         is_version_current,
     )
     HAS_VERSION_EXTRACTOR = True
@@ -35,6 +38,23 @@ console = Console()
 RAW_DATA_DIR = Path(os.getenv("RAW_DATA_DIR", "data/raw"))
 PROCESSED_DATA_DIR = Path(os.getenv("PROCESSED_DATA_DIR", "data/processed"))
 
+# Per-process processor used by parallel workers (see DataProcessor._map_items)
+_worker_processor: Optional["DataProcessor"] = None
+
+
+def _init_worker(chunker_config: dict):
+    """Create the worker process's own cleaner and chunkers."""
+    global _worker_processor
+    _worker_processor = DataProcessor(**chunker_config)
+
+
+def _process_doc_item_in_worker(item: dict) -> list[dict]:
+    return _worker_processor._process_doc_item(item)
+
+
+def _process_code_item_in_worker(item: tuple[dict, dict]) -> list[dict]:
+    return _worker_processor._process_code_item(item)
+
 
 class DataProcessor:
     """
@@ -47,6 +67,7 @@ class DataProcessor:
         doc_overlap_tokens: int = 50,
         code_max_tokens: int = 1024,
         code_overlap_lines: int = 5,
+        workers: int = 1,
     ):
         """
         Initialize the data processor.
@@ -56,7 +77,16 @@ class DataProcessor:
             doc_overlap_tokens: Token overlap for documents.
             code_max_tokens: Max tokens per code chunk.
             code_overlap_lines: Line overlap for code.
+            workers: Number of processes used to clean and chunk files.
+                Each worker holds its own cleaner and chunkers.
         """
+        self.workers = workers
+        self._chunker_config = {
+            "doc_max_tokens": doc_max_tokens,
+            "doc_overlap_tokens": doc_overlap_tokens,
+            "code_max_tokens": code_max_tokens,
+            "code_overlap_lines": code_overlap_lines,
+        }
         self.text_cleaner = TextCleaner()
         self.doc_chunker = DocumentChunker(
             max_tokens=doc_max_tokens,
@@ -75,6 +105,23 @@ class DataProcessor:
         """Compute a short hash of the content for diff detection."""
         return hashlib.sha256(content.encode("utf-8")).hexdigest()[:16]
 
+    def _compute_chunk_id(self, chunk: dict) -> str:
+        """
+        Derive a chunk id that stays the same across runs.
+
+        The id is built from the source, the document location (URL or
+        repo/path) and the chunk index only. Edited content keeps its id, so
+        an incremental sync detects it through the content hash and updates
+        the chunk in place instead of deleting and re-adding it.
+        """
+        location = chunk.get("url") or f"{chunk.get('repo_name', '')}/{chunk.get('file_path', '')}"
+        key = "|".join([
+            chunk.get("source", ""),
+            location,
+            str(chunk.get("chunk_index", 0)),
+        ])
+        return f"chunk_{hashlib.sha256(key.encode('utf-8')).hexdigest()[:16]}"
+
     def _get_latest_sdk_version(self) -> Optional[str]:
         """Get the latest SDK version, with caching."""
         if self._latest_sdk_version is None and HAS_VERSION_EXTRACTOR:
@@ -97,20 +144,35 @@ class DataProcessor:
         Returns:
             List of processed chunks as dicts.
         """
+        return list(self.iter_scraped_docs(input_file))
+
+    def iter_scraped_docs(
+        self,
+        input_file: Optional[Path] = None,
+    ) -> Iterator[dict]:
+        """
+        Process scraped documentation data, yielding chunks as they are produced.
+
+        Args:
+            input_file: Path to scraped JSON file. If None, uses latest.
+
+        Yields:
+            Processed chunks as dicts.
+        """
         # Find input file
         if input_file is None:
             input_file = self._find_latest_file("scraped_data_*.json")
 
         if not input_file or not input_file.exists():
             console.print("[red]No scraped data file found![/red]")
-            return []
+            return
 
         console.print(f"[blue]Processing: {input_file}[/blue]")
 
         with open(input_file, "r", encoding="utf-8") as f:
             raw_data = json.load(f)
 
-        all_chunks = []
+        chunk_count = 0
 
         with Progress(
             SpinnerColumn(),
@@ -121,43 +183,45 @@ class DataProcessor:
         ) as progress:
             task = progress.add_task("Processing documents...", total=len(raw_data))
 
-            for item in raw_data:
-                if not item or not item.get("markdown"):
-                    progress.advance(task)
-                    continue
-
-                # Clean the content
-                content = self.text_cleaner.remove_frontmatter(item["markdown"])
-                content = self.text_cleaner.clean(content)
-
-                if not content.strip():
-                    progress.advance(task)
-                    continue
+            for chunks in self._map_items(
+                self._process_doc_item, _process_doc_item_in_worker, raw_data
+            ):
+                chunk_count += len(chunks)
+                yield from chunks
+                progress.advance(task)
 
-                # Compute content hash for diff detection
-                content_hash = self._compute_content_hash(content)
+        console.print(
+            f"[green]Processed {len(raw_data)} documents into {chunk_count} chunks[/green]"
+        )
 
-                # Extract metadata
-                metadata = {
-                    "source": "documentation",
-                    "url": item.get("url", ""),
-                    "title": item.get("title") or self.text_cleaner.extract_title(content) or "",
-                    "category": item.get("category", ""),
-                    "subcategory": item.get("subcategory", ""),
-                    "scraped_at": item.get("scraped_at", "") or datetime.utcnow().isoformat(),
-                    "content_hash": content_hash,
-                }
+    def _process_doc_item(self, item: dict) -> list[dict]:
+        """Clean and chunk a single scraped document."""
+        if not item or not item.get("markdown"):
+            return []
 
-                # Chunk the content
-                chunks = self.doc_chunker.chunk(content, metadata)
+        # Clean the content
+        content = self.text_cleaner.remove_frontmatter(item["markdown"])
+        content = self.text_cleaner.clean(content)
 
-                for chunk in chunks:
-                    all_chunks.append(chunk.to_dict())
+        if not content.strip():
+            return []
 
-                progress.advance(task)
+        # Compute content hash for diff detection
+        content_hash = self._compute_content_hash(content)
+
+        # Extract metadata
+        metadata = {
+            "source": "documentation",
+            "url": item.get("url", ""),
+            "title": item.get("title") or self.text_cleaner.extract_title(content) or "",
+            "category": item.get("category", ""),
+            "subcategory": item.get("subcategory", ""),
+            "scraped_at": item.get("scraped_at", "") or datetime.utcnow().isoformat(),
+            "content_hash": content_hash,
+        }
 
-        console.print(f"[green]Processed {len(raw_data)} documents into {len(all_chunks)} chunks[/green]")
-        return all_chunks
+        # Chunk the content
+        return [chunk.to_dict() for chunk in self.doc_chunker.chunk(content, metadata)]
 
     def process_github_repos(
         self,
@@ -172,20 +236,35 @@ class DataProcessor:
         Returns:
             List of processed chunks as dicts.
         """
+        return list(self.iter_github_repos(input_file))
+
+    def iter_github_repos(
+        self,
+        input_file: Optional[Path] = None,
+    ) -> Iterator[dict]:
+        """
+        Process GitHub repository data, yielding chunks as they are produced.
+
+        Args:
+            input_file: Path to GitHub repos JSON file. If None, uses latest.
+
+        Yields:
+            Processed chunks as dicts.
+        """
         # Find input file
         if input_file is None:
             input_file = self._find_latest_file("github_repos_*.json")
 
         if not input_file or not input_file.exists():
             console.print("[red]No GitHub repos file found![/red]")
-            return []
+            return
 
         console.print(f"[blue]Processing: {input_file}[/blue]")
 
         with open(input_file, "r", encoding="utf-8") as f:
             raw_data = json.load(f)
 
-        all_chunks = []
+        chunk_count = 0
         total_files = sum(len(repo.get("files", [])) for repo in raw_data)
 
         with Progress(
@@ -197,117 +276,202 @@ class DataProcessor:
         ) as progress:
             task = progress.add_task("Processing code files...", total=total_files)
 
-            for repo in raw_data:
-                repo_name = repo.get("repo_name", "")
-                repo_url = repo.get("repo_url", "")
-                category = repo.get("category", "")
-                subcategory = repo.get("subcategory", "")
-
-                # Try to get SDK version for this repo
-                repo_sdk_version = None
-                if HAS_VERSION_EXTRACTOR and repo_name:
-                    repo_dir = RAW_DATA_DIR / "repos" / repo_name
-                    if repo_dir.exists():
-                        repo_sdk_version = extract_sdk_version_from_repo(repo_dir)
-                        if repo_sdk_version:
-                            self._repo_sdk_versions[repo_name] = repo_sdk_version
-
-                for file_info in repo.get("files", []):
-                    content = file_info.get("content", "")
-                    file_path = file_info.get("path", "")
-                    extension = file_info.get("extension", "")
-
-                    if not content.strip():
-                        progress.advance(task)
-                        continue
-
-                    # Clean the code
-                    content = self.text_cleaner.clean_code(content, extension.lstrip("."))
-
-                    if not content.strip():
-                        progress.advance(task)
-                        continue
-
-                    # Detect deprecated patterns in Rust code
-                    deprecated_patterns = []
-                    if HAS_VERSION_EXTRACTOR and extension == ".rs":
-                        deprecated_patterns = detect_deprecated_patterns(content)
-
-                    # Compute content hash for diff detection
-                    content_hash = self._compute_content_hash(content)
-
-                    # Check if repo SDK version is current
-                    latest_sdk = self._get_latest_sdk_version()
-                    is_current = True
-                    if repo_sdk_version and latest_sdk and HAS_VERSION_EXTRACTOR:
-                        is_current = is_version_current(repo_sdk_version, latest_sdk)
-
-                    # Metadata for code files
-                    metadata = {
-                        "source": "github",
-                        "repo_name": repo_name,
-                        "repo_url": repo_url,
-                        "file_path": file_path,
-                        "extension": extension,
-                        "category": category,
-                        "subcategory": subcategory,
-                        # New metadata fields
-                        "sdk_version": repo_sdk_version or "",
-                        "is_current": is_current,
-                        "deprecated_patterns": deprecated_patterns,
-                        "content_hash": content_hash,
-                        "scraped_at": datetime.utcnow().isoformat(),
-                    }
-
-                    # Handle markdown files differently
-                    if extension in [".md", ".markdown"]:
-                        content = self.text_cleaner.remove_frontmatter(content)
-                        content = self.text_cleaner.clean(content)
-                        chunks = self.doc_chunker.chunk(content, metadata)
-                    else:
-                        chunks = self.code_chunker.chunk(content, extension, metadata)
-
-                    for chunk in chunks:
-                        all_chunks.append(chunk.to_dict())
-
-                    progress.advance(task)
-
-        console.print(f"[green]Processed {total_files} files into {len(all_chunks)} chunks[/green]")
-        return all_chunks
-
-    def process_all(self) -> dict:
+            # Repo-level metadata is resolved here once; files are then
+            # cleaned and chunked independently (in parallel when workers > 1)
+            file_items = (
+                (file_info, repo_context)
+                for repo in raw_data
+                for repo_context in [self._get_repo_context(repo)]
+                for file_info in repo.get("files", [])
+            )
+
+            for chunks in self._map_items(
+                self._process_code_item, _process_code_item_in_worker, file_items
+            ):
+                chunk_count += len(chunks)
+                yield from chunks
+                progress.advance(task)
+
+        console.print(f"[green]Processed {total_files} files into {chunk_count} chunks[/green]")
+
+    def _get_repo_context(self, repo: dict) -> dict:
+        """Resolve the metadata shared by every file of a repository."""
+        repo_name = repo.get("repo_name", "")
+
+        # Try to get SDK version for this repo
+        repo_sdk_version = None
+        if HAS_VERSION_EXTRACTOR and repo_name:
+            repo_dir = RAW_DATA_DIR / "repos" / repo_name
+            if repo_dir.exists():
+                repo_sdk_version = extract_sdk_version_from_repo(repo_dir)
+                if repo_sdk_version:
+                    self._repo_sdk_versions[repo_name] = repo_sdk_version
+
+        # Check if repo SDK version is current
+        latest_sdk = self._get_latest_sdk_version()
+        is_current = True
+        if repo_sdk_version and latest_sdk and HAS_VERSION_EXTRACTOR:
+            is_current = is_version_current(repo_sdk_version, latest_sdk)
+
+        return {
+            "repo_name": repo_name,
+            "repo_url": repo.get("repo_url", ""),
+            "category": repo.get("category", ""),
+            "subcategory": repo.get("subcategory", ""),
+            "sdk_version": repo_sdk_version or "",
+            "is_current": is_current,
+        }
+
+    def _process_code_item(self, item: tuple[dict, dict]) -> list[dict]:
+        """Clean and chunk a single repository file."""
+        file_info, repo_context = item
+        content = file_info.get("content", "")
+        file_path = file_info.get("path", "")
+        extension = file_info.get("extension", "")
+
+        if not content.strip():
+            return []
+
+        # Clean the code
+        content = self.text_cleaner.clean_code(content, extension.lstrip("."))
+
+        if not content.strip():
+            return []
+
+        # Detect deprecated patterns in Rust code
+        deprecated_patterns = []
+        if HAS_VERSION_EXTRACTOR and extension == ".rs":
+            deprecated_patterns = detect_deprecated_patterns(content)
+
+        # Compute content hash for diff detection
+        content_hash = self._compute_content_hash(content)
+
+        # Metadata for code files
+        metadata = {
+            "source": "github",
+            "repo_name": repo_context["repo_name"],
+            "repo_url": repo_context["repo_url"],
+            "file_path": file_path,
+            "extension": extension,
+            "category": repo_context["category"],
+            "subcategory": repo_context["subcategory"],
+            # New metadata fields
+            "sdk_version": repo_context["sdk_version"],
+            "is_current": repo_context["is_current"],
+            "deprecated_patterns": deprecated_patterns,
+            "content_hash": content_hash,
+            "scraped_at": datetime.utcnow().isoformat(),
+        }
+
+        # Handle markdown files differently
+        if extension in [".md", ".markdown"]:
+            content = self.text_cleaner.remove_frontmatter(content)
+            content = self.text_cleaner.clean(content)
+            chunks = self.doc_chunker.chunk(content, metadata)
+        else:
+            chunks = self.code_chunker.chunk(content, extension, metadata)
+
+        return [chunk.to_dict() for chunk in chunks]
+
+    def _map_items(
+        self,
+        process: Callable[[Any], list[dict]],
+        process_in_worker: Callable[[Any], list[dict]],
+        items: Iterable,
+    ) -> Iterator[list[dict]]:
+        """
+        Apply a per-item processing function, in worker processes if configured.
+
+        Results are yielded in input order either way, so output is
+        deterministic regardless of the number of workers.
+        """
+        if self.workers <= 1:
+            yield from map(process, items)
+            return
+
+        with ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=_init_worker,
+            initargs=(self._chunker_config,),
+        ) as executor:
+            yield from executor.map(process_in_worker, items, chunksize=8)
+
+    def process_all(
+        self,
+        output_format: str = "jsonl",
+        compress: bool = False,
+        dedup: bool = True,
+        dedup_threshold: float = DEFAULT_THRESHOLD,
+    ) -> dict:
         """
         Process all raw data and save to processed directory.
 
+        Args:
+            output_format: "jsonl" to stream chunks to disk as they are
+                produced, or "json" for a single (legacy) JSON array.
+            compress: Compress JSONL output with zstd (.jsonl.zst).
+            dedup: Collapse near-duplicate chunks (forks, templates,
+                re-crawled pages) into one canonical chunk.
+            dedup_threshold: Minimum estimated Jaccard similarity for two
+                chunks to count as near-duplicates.
+
         Returns:
             Statistics about the processing.
         """
         PROCESSED_DATA_DIR.mkdir(parents=True, exist_ok=True)
 
-        console.print("\n[bold]Step 1: Processing documentation...[/bold]")
-        doc_chunks = self.process_scraped_docs()
+        duplicates = 0
 
-        console.print("\n[bold]Step 2: Processing code repositories...[/bold]")
-        code_chunks = self.process_github_repos()
+        def iter_all_chunks() -> Iterator[dict]:
+            """Assign stable IDs, dropping exact repeats (e.g. the same page scraped twice)."""
+            nonlocal duplicates
+            seen_ids = set()
 
-        # Combine all chunks
-        all_chunks = doc_chunks + code_chunks
+            def iter_sources() -> Iterator[dict]:
+                console.print("\n[bold]Step 1: Processing documentation...[/bold]")
+                yield from self.iter_scraped_docs()
 
-        # Add unique IDs
-        for i, chunk in enumerate(all_chunks):
-            chunk["id"] = f"chunk_{i:06d}"
+                console.print("\n[bold]Step 2: Processing code repositories...[/bold]")
+                yield from self.iter_github_repos()
+
+            for chunk in iter_sources():
+                chunk["id"] = self._compute_chunk_id(chunk)
+                if chunk["id"] in seen_ids:
+                    duplicates += 1
+                    continue
+                seen_ids.add(chunk["id"])
+                yield chunk
 
         # Save processed data
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        output_file = PROCESSED_DATA_DIR / f"processed_chunks_{timestamp}.json"
-
-        with open(output_file, "w", encoding="utf-8") as f:
-            json.dump(all_chunks, f, indent=2, ensure_ascii=False)
 
-        console.print(f"\n[green]Saved {len(all_chunks)} chunks to {output_file}[/green]")
-
-        # Generate statistics
-        stats = self._generate_stats(all_chunks)
+        if output_format == "json":
+            output_file = PROCESSED_DATA_DIR / f"processed_chunks_{timestamp}.json"
+            all_chunks = list(iter_all_chunks())
+            with open(output_file, "w", encoding="utf-8") as f:
+                json.dump(all_chunks, f, indent=2, ensure_ascii=False)
+            chunk_count = len(all_chunks)
+            del all_chunks
+        else:
+            suffix = ".jsonl.zst" if compress else ".jsonl"
+            output_file = PROCESSED_DATA_DIR / f"processed_chunks_{timestamp}{suffix}"
+            chunk_count = write_chunks(output_file, iter_all_chunks())
+
+        if duplicates:
+            console.print(f"[yellow]Dropped {duplicates} duplicate chunks[/yellow]")
+
+        near_duplicates = 0
+        if dedup:
+            console.print("\n[bold]Step 3: Removing near-duplicate chunks...[/bold]")
+            near_duplicates = self._deduplicate_file(output_file, dedup_threshold)
+            chunk_count -= near_duplicates
+            console.print(f"[yellow]Collapsed {near_duplicates} near-duplicate chunks[/yellow]")
+
+        console.print(f"\n[green]Saved {chunk_count} chunks to {output_file}[/green]")
+
+        # Generate statistics (streamed back from disk to keep memory flat)
+        stats = self._generate_stats(read_chunks(output_file))
+        stats["near_duplicates_removed"] = near_duplicates
         stats_file = PROCESSED_DATA_DIR / f"processing_stats_{timestamp}.json"
 
         with open(stats_file, "w", encoding="utf-8") as f:
@@ -320,6 +484,32 @@ class DataProcessor:
 
         return stats
 
+    def _deduplicate_file(self, path: Path, threshold: float) -> int:
+        """
+        Remove near-duplicate chunks from a processed chunk file in place.
+
+        The file is read twice: once to find duplicates, once to rewrite it
+        without them. Only MinHash signatures are kept in memory.
+
+        Returns:
+            Number of chunks removed.
+        """
+        deduplicator = MinHashDeduplicator(threshold=threshold).fit(read_chunks(path))
+        removed = len(deduplicator.duplicate_of)
+        if not removed:
+            return 0
+
+        tmp_path = path.with_name(f"tmp_{path.name}")
+        if path.suffix == ".json":
+            chunks = list(deduplicator.apply(read_chunks(path)))
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(chunks, f, indent=2, ensure_ascii=False)
+        else:
+            write_chunks(tmp_path, deduplicator.apply(read_chunks(path)))
+        os.replace(tmp_path, path)
+
+        return removed
+
     def _find_latest_file(self, pattern: str) -> Optional[Path]:
         """Find the latest file matching a pattern."""
         files = list(RAW_DATA_DIR.glob(pattern))
@@ -327,9 +517,10 @@ class DataProcessor:
             return None
         return max(files, key=lambda p: p.stat().st_mtime)
 
-    def _generate_stats(self, chunks: list[dict]) -> dict:
-        """Generate statistics about processed chunks."""
-        total_tokens = sum(c.get("token_count", 0) for c in chunks)
+    def _generate_stats(self, chunks: Iterable[dict]) -> dict:
+        """Generate statistics about processed chunks in a single pass."""
+        total_chunks = 0
+        total_tokens = 0
 
         by_source = {}
         by_category = {}
@@ -340,6 +531,9 @@ class DataProcessor:
         outdated_count = 0
 
         for chunk in chunks:
+            total_chunks += 1
+            total_tokens += chunk.get("token_count", 0)
+
             # By source
             source = chunk.get("source", "unknown")
             by_source[source] = by_source.get(source, 0) + 1
@@ -369,9 +563,9 @@ class DataProcessor:
                     deprecated_count += 1
 
         return {
-            "total_chunks": len(chunks),
+            "total_chunks": total_chunks,
             "total_tokens": total_tokens,
-            "avg_tokens_per_chunk": total_tokens / len(chunks) if chunks else 0,
+            "avg_tokens_per_chunk": total_tokens / total_chunks if total_chunks else 0,
             "by_source": by_source,
             "by_category": by_category,
             "by_language": by_language,
@@ -405,11 +599,12 @@ class DataProcessor:
 
         # SDK version info
         if stats.get("latest_sdk_version"):
-            console.print(f"\n[bold]SDK Version Info:[/bold]")
+            console.print("\n[bold]SDK Version Info:[/bold]")
             console.print(f"  Latest stylus-sdk: {stats['latest_sdk_version']}")
             console.print(f"  Current chunks: {stats.get('current_chunks', 0):,}")
             console.print(f"  Outdated chunks: {stats.get('outdated_chunks', 0):,}")
-            console.print(f"  With deprecated patterns: {stats.get('deprecated_pattern_chunks', 0):,}")
+            deprecated = stats.get("deprecated_pattern_chunks", 0)
+            console.print(f"  With deprecated patterns: {deprecated:,}")
 
             if stats.get("by_sdk_version"):
                 console.print("\n[bold]By SDK Version:[/bold]")
@@ -434,15 +629,49 @@ def main():
         default=1024,
         help="Max tokens per code chunk (default: 1024)",
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of worker processes for cleaning/chunking (default: 1)",
+    )
+    parser.add_argument(
+        "--format",
+        choices=["jsonl", "json"],
+        default="jsonl",
+        help="Output format for processed chunks (default: jsonl)",
+    )
+    parser.add_argument(
+        "--compress",
+        action="store_true",
+        help="Compress JSONL output with zstd (requires zstandard)",
+    )
+    parser.add_argument(
+        "--no-dedup",
+        action="store_true",
+        help="Keep near-duplicate chunks instead of collapsing them",
+    )
+    parser.add_argument(
+        "--dedup-threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help=f"Similarity above which chunks are near-duplicates (default: {DEFAULT_THRESHOLD})",
+    )
 
     args = parser.parse_args()
 
     processor = DataProcessor(
         doc_max_tokens=args.doc_max_tokens,
         code_max_tokens=args.code_max_tokens,
+        workers=args.workers,
     )
 
-    processor.process_all()
+    processor.process_all(
+        output_format=args.format,
+        compress=args.compress,
+        dedup=not args.no_dedup,
+        dedup_threshold=args.dedup_threshold,
+    )
 
 
 if __name__ == "__main__":
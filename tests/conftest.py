@@ -6,6 +6,7 @@ import sys
 from pathlib import Path
 
 import pytest
+import tiktoken
 
 # Add project root to Python path
 project_root = Path(__file__).parent.parent
@@ -26,3 +27,28 @@ def pytest_configure(config):
 def project_root():
     """Return project root path."""
     return Path(__file__).parent.parent
+
+
+@pytest.fixture
+def byte_encoding(monkeypatch):
+    """
+    Byte-level tiktoken encoding used in place of cl100k_base.
+
+    Works offline; encode_ordinary calls are counted in `calls`.
+    """
+    enc = tiktoken.Encoding(
+        "test_bytes",
+        pat_str=r"""\s+|\S+""",
+        mergeable_ranks={bytes([i]): i for i in range(256)},
+        special_tokens={},
+    )
+    enc.calls = 0
+    original = enc.encode_ordinary
+
+    def encode_ordinary(text):
+        enc.calls += 1
+        return original(text)
+
+    enc.encode_ordinary = encode_ordinary
+    monkeypatch.setattr(tiktoken, "get_encoding", lambda name: enc)
+    return enc
@@ -0,0 +1,139 @@
+"""
+Tests for tree-sitter based structural code chunking.
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+pytest.importorskip("tree_sitter")
+
+from src.preprocessing.chunker import CodeChunker, TokenizedText
+
+RUST_CONTRACT = """\
+use stylus_sdk::prelude::*;
+
+sol_storage! {
+    #[entrypoint]
+    pub struct Counter {
+        uint256 number;
+    }
+}
+
+/// Public counter methods
+#[public]
+impl Counter {
+    /// Returns the number.
+    pub fn number(&self) -> U256 {
+        self.number.get()
+    }
+
+    pub fn increment(&mut self) {
+        let number = self.number.get();
+        self.number.set(number + U256::from(1));
+    }
+}
+"""
+
+SOLIDITY_CONTRACT = """\
+pragma solidity ^0.8.0;
+
+/// @notice Simple token
+contract Token {
+    mapping(address => uint256) balances;
+
+    /// @dev Move tokens
+    function transfer(address to, uint256 amount) public {
+        balances[msg.sender] -= amount;
+        balances[to] += amount;
+    }
+
+    function balanceOf(address who) public view returns (uint256) {
+        return balances[who];
+    }
+}
+"""
+
+
+class TestStructuralChunker:
+    """Test that chunks follow item boundaries and keep their context."""
+
+    def test_impl_methods_keep_impl_header(self, byte_encoding):
+        pytest.importorskip("tree_sitter_rust")
+        chunker = CodeChunker(max_tokens=150)
+
+        chunks = chunker.chunk(RUST_CONTRACT, ".rs", {"file_path": "src/lib.rs"})
+        by_symbol = {c.metadata.get("symbol"): c for c in chunks}
+
+        increment = by_symbol["Counter::increment"]
+        assert increment.content.startswith(
+            "/// Public counter methods\n#[public]\nimpl Counter {\n"
+        )
+        assert "    pub fn increment(&mut self) {" in increment.content
+        assert "fn number" not in increment.content
+        assert increment.content.endswith("\n}")
+        assert increment.metadata["file_path"] == "src/lib.rs"
+        assert "/// Returns the number." in by_symbol["Counter::number"].content
+        assert "use stylus_sdk::prelude::*;" in by_symbol["sol_storage!"].content
+
+    def test_small_container_stays_whole(self, byte_encoding):
+        pytest.importorskip("tree_sitter_rust")
+        chunker = CodeChunker(max_tokens=2000)
+
+        chunks = chunker.chunk(RUST_CONTRACT, ".rs")
+
+        assert [c.content for c in chunks] == [RUST_CONTRACT.strip()]
+        assert chunks[0].token_count == len(RUST_CONTRACT.strip())
+
+    def test_solidity_functions(self, byte_encoding):
+        pytest.importorskip("tree_sitter_solidity")
+        chunker = CodeChunker(max_tokens=150)
+
+        chunks = chunker.chunk(SOLIDITY_CONTRACT, ".sol")
+        symbols = [c.metadata.get("symbol") for c in chunks]
+
+        assert "Token.transfer" in symbols
+        assert "Token.balanceOf" in symbols
+        transfer = chunks[symbols.index("Token.transfer")]
+        assert transfer.content.startswith("/// @notice Simple token\ncontract Token {\n")
+        assert "/// @dev Move tokens" in transfer.content
+
+    def test_typescript_exports_and_non_ascii(self, byte_encoding):
+        pytest.importorskip("tree_sitter_typescript")
+        code = (
+            "const greeting = 'héllo';\n\n"
+            "export const greet = (name: string) => {\n"
+            "  return `${greeting} ${name}`;\n"
+            "};\n\n"
+            "export function farewell(name: string): string {\n"
+            "  return 'bye ' + name + ' ' + greeting + ' and see you again soon';\n"
+            "}\n"
+        )
+        chunker = CodeChunker(max_tokens=150)
+
+        chunks = chunker.chunk(code, ".ts")
+
+        assert chunks[0].content.startswith("const greeting = 'héllo';\n\nexport const greet")
+        assert chunks[0].metadata["symbol"] == "greet"
+        assert chunks[1].content.startswith("export function farewell")
+        assert chunks[1].metadata["symbol"] == "farewell"
+        assert len(chunks) == 2
+
+    def test_parse_cache_and_fallback(self, byte_encoding):
+        pytest.importorskip("tree_sitter_rust")
+        chunker = CodeChunker(max_tokens=150)
+
+        tree = chunker.structural.parse(RUST_CONTRACT, ".rs")
+        assert chunker.structural.parse(RUST_CONTRACT, ".rs") is tree
+
+        # Files that don't parse fall back to pattern splitting
+        broken = "fn a() {\n    let x = ;\n}\n\nfn b() {}\n"
+        assert chunker.structural.chunk(TokenizedText(broken, byte_encoding), ".rs") is None
+        assert [c.content for c in chunker.chunk(broken, ".rs")] == [
+            "fn a() {\n    let x = ;\n}",
+            "// ... continued from above\nfn a() {\n    let x = ;\n}\nfn b() {}",
+        ]
@@ -0,0 +1,257 @@
+"""
+Tests for embedding request batching and the async, rate-limited client.
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+import httpx
+import pytest
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.embeddings.cache import EmbeddingCache
+from src.embeddings.embedder import (
+    AsyncEmbeddingClient,
+    AsyncRateLimiter,
+    EmbeddingAPIError,
+    EmbeddingClient,
+    pack_batches,
+)
+
+
+def _make_client(handler, **kwargs) -> AsyncEmbeddingClient:
+    client = AsyncEmbeddingClient(
+        api_key="test",
+        model="m",
+        use_cache=False,
+        rate_limiter=AsyncRateLimiter(rate=1000.0, burst=100),
+        **kwargs,
+    )
+    client.client = httpx.AsyncClient(
+        base_url="https://example.test",
+        transport=httpx.MockTransport(handler),
+    )
+    return client
+
+
+def _embedding_response(texts: list[str]) -> httpx.Response:
+    return httpx.Response(
+        200,
+        json={"data": [{"index": i, "embedding": [float(len(t))]} for i, t in enumerate(texts)]},
+    )
+
+
+@pytest.fixture
+def sleeps(monkeypatch) -> list[float]:
+    """Make retry backoff instant, recording the requested delays."""
+    delays = []
+    sleep = asyncio.sleep
+
+    async def fast_sleep(delay):
+        delays.append(delay)
+        await sleep(0)
+
+    monkeypatch.setattr(asyncio, "sleep", fast_sleep)
+    return delays
+
+
+class TestAsyncEmbeddingClient:
+    """Test concurrency, ordering and rate-limit handling."""
+
+    def test_batches_yield_in_order(self):
+        """Test that results stream in batch order even when completion order differs."""
+
+        async def handler(request):
+            texts = __import__("json").loads(request.content)["input"]
+            # Later batches finish first
+            await asyncio.sleep(0.05 if texts[0] == "a" else 0.0)
+            return _embedding_response(texts)
+
+        async def run():
+            client = _make_client(handler, max_concurrency=3)
+            batches = [["a"], ["bb"], ["ccc"]]
+            order = [i async for i, _ in client.embed_batches(batches, [[1], [1], [1]])]
+            flat = await client.embed_batch(
+                ["a", "bb", "ccc"], batch_size=1, token_counts=[1, 1, 1]
+            )
+            await client.aclose()
+            return order, flat
+
+        order, flat = asyncio.run(run())
+
+        assert order == [0, 1, 2]
+        assert flat == [[1.0], [2.0], [3.0]]
+
+    def test_retries_after_rate_limit(self):
+        """Test that a 429 with Retry-After backs off and then succeeds."""
+        calls = []
+
+        async def handler(request):
+            calls.append(request)
+            if len(calls) == 1:
+                return httpx.Response(429, headers={"Retry-After": "0"})
+            return _embedding_response(["x"])
+
+        async def run():
+            client = _make_client(handler)
+            result = await client.embed_batch(["x"], token_counts=[1])
+            rate = client.rate_limiter.rate
+            await client.aclose()
+            return result, rate
+
+        result, rate = asyncio.run(run())
+
+        assert result == [[1.0]]
+        assert len(calls) == 2
+        assert rate < 1000.0
+
+    def test_failed_batch_does_not_stop_stream(self):
+        """Test that a non-retryable error is yielded for its batch only."""
+
+        async def handler(request):
+            texts = __import__("json").loads(request.content)["input"]
+            if texts == ["bad"]:
+                return httpx.Response(400, text="bad request")
+            return _embedding_response(texts)
+
+        async def run():
+            client = _make_client(handler)
+            batches = [["ok"], ["bad"], ["ok2"]]
+            results = [r async for r in client.embed_batches(batches, [[1], [1], [1]])]
+            await client.aclose()
+            return results
+
+        results = asyncio.run(run())
+
+        assert results[0] == (0, [[2.0]])
+        assert isinstance(results[1][1], EmbeddingAPIError)
+        assert results[2] == (2, [[3.0]])
+
+    def test_transient_connection_errors_retried(self, sleeps):
+        """Test that dropped connections are retried with backoff."""
+        calls = []
+
+        async def handler(request):
+            calls.append(request)
+            if len(calls) == 1:
+                raise httpx.ConnectError("connection refused", request=request)
+            if len(calls) == 2:
+                raise httpx.RemoteProtocolError("peer closed connection", request=request)
+            return _embedding_response(["x"])
+
+        async def run():
+            client = _make_client(handler)
+            result = await client.embed_batch(["x"], token_counts=[1])
+            await client.aclose()
+            return result
+
+        assert asyncio.run(run()) == [[1.0]]
+        assert len(calls) == 3
+        assert sleeps == [2, 4]
+
+    def test_short_response_fails_only_its_batch(self, tmp_path, sleeps):
+        """Test that a response with too few embeddings fails just that batch."""
+
+        async def handler(request):
+            texts = __import__("json").loads(request.content)["input"]
+            return _embedding_response(texts[:1])
+
+        async def run():
+            client = AsyncEmbeddingClient(
+                api_key="test",
+                model="m",
+                cache=EmbeddingCache(tmp_path / "cache.db"),
+                rate_limiter=AsyncRateLimiter(rate=1000.0, burst=100),
+                max_retries=2,
+            )
+            client.client = httpx.AsyncClient(
+                base_url="https://example.test", transport=httpx.MockTransport(handler)
+            )
+            batches = [["a"], ["b", "c"], ["d"]]
+            results = [r async for r in client.embed_batches(batches, [[1], [1, 1], [1]])]
+            stats = client.get_cache_stats()
+            await client.aclose()
+            return results, stats
+
+        results, stats = asyncio.run(run())
+
+        assert results[0] == (0, [[1.0]])
+        assert isinstance(results[1][1], EmbeddingAPIError)
+        assert results[2] == (2, [[1.0]])
+        assert stats["entries"] == 2
+
+
+class TestAsyncRateLimiter:
+    """Test adaptive rate adjustments."""
+
+    def test_backoff_and_recovery(self):
+        limiter = AsyncRateLimiter(rate=4.0, min_rate=1.0)
+
+        limiter.on_rate_limited()
+        assert limiter.rate == 2.0
+        limiter.on_rate_limited()
+        limiter.on_rate_limited()
+        assert limiter.rate == 1.0
+
+        limiter.on_success()
+        assert limiter.rate == pytest.approx(1.1)
+
+
+class TestAdaptiveBatching:
+    """Test token-budgeted packing and shrinking on oversized batches."""
+
+    def test_pack_by_tokens_and_items(self):
+        counts = [100, 100, 300, 50, 50, 50, 900]
+
+        assert pack_batches(counts, max_tokens=400, max_items=10) == [
+            (0, 2), (2, 5), (5, 6), (6, 7),
+        ]
+        assert pack_batches(counts, max_tokens=10_000, max_items=3) == [
+            (0, 3), (3, 6), (6, 7),
+        ]
+        assert pack_batches([], max_tokens=400) == []
+
+    def test_sync_client_splits_on_413(self):
+        """Test that a 413 splits the batch and shrinks the token budget."""
+        sizes = []
+
+        def handler(request):
+            texts = __import__("json").loads(request.content)["input"]
+            sizes.append(len(texts))
+            if len(texts) > 2:
+                return httpx.Response(413, text="payload too large")
+            return _embedding_response(texts)
+
+        client = EmbeddingClient(api_key="test", model="m", use_cache=False, max_batch_tokens=4000)
+        client.client = httpx.Client(
+            base_url="https://example.test",
+            transport=httpx.MockTransport(handler),
+        )
+
+        texts = ["a", "bb", "ccc", "dddd"]
+        result = client.embed_batch(texts, token_counts=[1000] * 4)
+
+        assert result == [[1.0], [2.0], [3.0], [4.0]]
+        assert sizes == [4, 2, 2]
+        assert client.max_batch_tokens == 2000
+        client.close()
+
+    def test_async_client_splits_on_413(self):
+        """Test that the async client splits rejected batches and keeps order."""
+
+        async def handler(request):
+            texts = __import__("json").loads(request.content)["input"]
+            if len(texts) > 1:
+                return httpx.Response(413)
+            return _embedding_response(texts)
+
+        async def run():
+            client = _make_client(handler)
+            result = await client.embed_batch(["a", "bb", "ccc"], token_counts=[10, 10, 10])
+            await client.aclose()
+            return result
+
+        assert asyncio.run(run()) == [[1.0], [2.0], [3.0]]
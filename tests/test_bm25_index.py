@@ -0,0 +1,166 @@
+"""
+Tests for the persistent corpus BM25 index.
+"""
+
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.embeddings.bm25_index import BM25Index, tokenize
+from src.embeddings.embedder import EmbeddingClient
+from src.embeddings.reranker import BM25Reranker
+from src.embeddings.vectordb import VectorDB
+
+DOCUMENTS = [
+    ("erc20", "sol_storage! { pub struct Erc20 { balances: StorageMap<Address, U256> } }"),
+    (
+        "vault",
+        "impl Vault { pub fn deposit(&mut self, amount: U256) { self.total_assets += amount } }",
+    ),
+    ("docs", "Stylus lets you write smart contracts in Rust that run alongside the EVM."),
+    ("nft", "pub fn balance_of(&self, owner: Address) -> U256 { self.owners.len() }"),
+]
+
+
+class TestTokenize:
+    """Test the code-aware tokenizer."""
+
+    def test_identifiers_split(self):
+        terms = tokenize("fn balanceOf(total_supply: U256) -> ERC20Token")
+
+        assert terms == [
+            "fn", "balanceof", "balance", "of", "total_supply", "total", "supply",
+            "u256", "erc20token", "erc", "20", "token",
+        ]
+        assert tokenize("0x" + "ab" * 40) == []
+
+
+class TestBM25Index:
+    """Test index construction, scoring and persistence."""
+
+    def test_search_and_score_ids(self):
+        index = BM25Index.build(DOCUMENTS)
+
+        hits = index.search("balance owner", top_k=2)
+        assert hits[0][0] == "nft"
+        assert index.search("U256", top_k=10)[0][0] in {"erc20", "vault", "nft"}
+        assert index.search("nonexistent") == []
+
+        all_scores = index.score_all("deposit amount U256")
+        ids = ["vault", "missing", "docs", "erc20"]
+        scores = index.score_ids("deposit amount U256", ids)
+        assert scores[1] == 0.0 and scores[2] == 0.0
+        assert scores[0] == pytest.approx(float(all_scores[1]))
+        assert scores[3] == pytest.approx(float(all_scores[0]))
+
+    def test_save_load_roundtrip(self, tmp_path):
+        index = BM25Index.build(DOCUMENTS, k1=1.2, b=0.5)
+        path = tmp_path / "index" / "arbbuilder.npz"
+        index.save(path)
+
+        loaded = BM25Index.load(path)
+
+        assert loaded.doc_ids == index.doc_ids
+        assert loaded.vocab == index.vocab
+        assert (loaded.k1, loaded.b) == (1.2, 0.5)
+        assert loaded.postings_docs.dtype.name == "uint32"
+        assert loaded.search("stylus rust") == index.search("stylus rust")
+        assert BM25Index.load_if_exists(tmp_path / "missing.npz") is None
+
+    def test_reranker_uses_index(self):
+        index = BM25Index.build(DOCUMENTS)
+        documents = ["unrelated text", "also unrelated"]
+
+        # Scores come from the indexed documents, not the passed text
+        results = BM25Reranker(index=index).rerank("deposit", documents, ids=["docs", "vault"])
+        assert results[0]["index"] == 1 and results[0]["score"] > 0
+
+
+class TestVectorDBHybridSearch:
+    """Test BM25 as an independent first-stage retriever in hybrid_search."""
+
+    @pytest.fixture
+    def vectordb(self, tmp_path, monkeypatch):
+        db = VectorDB(
+            collection_name="bm25_test",
+            persist_directory=tmp_path / "chroma",
+            embedding_client=EmbeddingClient(api_key="test", use_cache=False),
+        )
+        # "vault" points away from the query, so vector search never finds it
+        documents = DOCUMENTS + [(f"filler{i}", "unrelated filler text") for i in range(4)]
+        embeddings = {chunk_id: [0.2, 1.0] for chunk_id, _ in documents}
+        embeddings["docs"] = [0.0, 1.0]
+        embeddings["vault"] = [-1.0, 0.0]
+        db.collection.add(
+            ids=[chunk_id for chunk_id, _ in documents],
+            documents=[text for _, text in documents],
+            embeddings=[embeddings[chunk_id] for chunk_id, _ in documents],
+            metadatas=[{"source": "code"} for _ in documents],
+        )
+        monkeypatch.setattr(db.embedding_client, "embed", lambda text: [0.0, 1.0])
+        return db
+
+    def test_build_and_fuse(self, vectordb):
+        assert vectordb.bm25_index is None
+        vector_only = vectordb.query("deposit amount", n_results=4)
+        assert "vault" not in vector_only["ids"][0]
+
+        index = vectordb.build_bm25_index(page_size=3)
+        assert len(index) == 8
+        assert vectordb.bm25_index_path == (
+            vectordb.persist_directory.parent / "bm25_index" / "bm25_test.npz"
+        )
+        assert vectordb.bm25_index_path.exists()
+
+        results = vectordb.hybrid_search("deposit amount", n_results=2)
+        assert results["ids"][0] == ["docs", "vault"]
+        assert results["distances"][0][1] == pytest.approx(1.0)
+        assert results["bm25_scores"][0][0] == 0.0 and results["bm25_scores"][0][1] > 0
+
+        # Every candidate, not just the BM25 top hits, is scored from the index
+        results = vectordb.hybrid_search("U256", n_results=4)
+        expected = index.score_ids("U256", results["ids"][0])
+        assert results["bm25_scores"][0] == pytest.approx(expected)
+
+        # BM25-only hits still honour the metadata filter
+        filtered = vectordb.hybrid_search("deposit amount", n_results=2, where={"source": "docs"})
+        assert filtered["ids"] == [[]]
+
+    def test_index_built_in_background(self, vectordb, monkeypatch):
+        release = threading.Event()
+        build_bm25_index = vectordb.build_bm25_index
+        builds = []
+
+        def blocked_build():
+            builds.append(threading.current_thread().name)
+            release.wait(timeout=10)
+            return build_bm25_index()
+
+        monkeypatch.setattr(vectordb, "build_bm25_index", blocked_build)
+
+        # Queries don't wait for the index, and start only one build
+        for _ in range(3):
+            results = vectordb.hybrid_search("deposit amount", n_results=2)
+            assert "vault" not in results["ids"][0]
+            assert results["bm25_scores"][0] == [0.0, 0.0]
+        release.set()
+        vectordb._bm25_build.join(timeout=10)
+
+        assert builds == ["bm25-build"]
+        assert vectordb.bm25_index_path.exists()
+        results = vectordb.hybrid_search("deposit amount", n_results=2)
+        assert results["ids"][0] == ["docs", "vault"]
+
+    def test_fusion_method_and_weights(self, vectordb):
+        vectordb.build_bm25_index()
+        # Without the BM25 signal, the keyword-only hit falls out
+        vector_only = vectordb.hybrid_search("deposit amount", n_results=2, weights={"bm25": 0.0})
+        assert "vault" not in vector_only["ids"][0]
+
+        combsum = vectordb.hybrid_search("deposit amount", n_results=2, fusion="combsum")
+        assert "vault" in combsum["ids"][0]
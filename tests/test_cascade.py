@@ -0,0 +1,234 @@
+"""
+Tests for the budgeted multi-stage retrieval cascade.
+"""
+
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.embeddings.cascade import RetrievalCascade, parse_stage_settings
+from src.embeddings.embedder import EmbeddingClient
+from src.embeddings.vectordb import VectorDB
+from src.mcp.tools.get_stylus_context import GetStylusContextTool
+
+DOCUMENTS = [
+    ("erc20", "sol_storage! { pub struct Erc20 { balances: StorageMap<Address, U256> } }"),
+    (
+        "vault",
+        "impl Vault { pub fn deposit(&mut self, amount: U256) { self.total_assets += amount } }",
+    ),
+    ("docs", "Stylus lets you write smart contracts in Rust that run alongside the EVM."),
+    ("nft", "pub fn balance_of(&self, owner: Address) -> U256 { self.owners.len() }"),
+]
+
+GENEROUS = {"ann": 10000, "fusion": 10000, "cross_encoder": 10000, "llm": 10000}
+
+
+class FakeReranker:
+    """Scores documents containing a keyword high, after an optional delay."""
+
+    def __init__(self, keyword: str, scale: float = 1.0, delay: float = 0.0, fail: bool = False):
+        self.keyword = keyword
+        self.scale = scale
+        self.delay = delay
+        self.fail = fail
+        self.calls = []
+
+    def score(self, query, documents):
+        self.calls.append(documents)
+        time.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("reranker unavailable")
+        return [self.scale * (0.9 if self.keyword in doc else 0.1) for doc in documents]
+
+
+@pytest.fixture
+def vectordb(tmp_path, monkeypatch):
+    db = VectorDB(
+        collection_name="cascade_test",
+        persist_directory=tmp_path / "chroma",
+        embedding_client=EmbeddingClient(api_key="test", use_cache=False),
+    )
+    documents = DOCUMENTS + [(f"filler{i}", f"unrelated filler text {i}") for i in range(8)]
+    embeddings = {chunk_id: [0.3, 1.0] for chunk_id, _ in documents}
+    embeddings["docs"] = [0.0, 1.0]
+    embeddings["vault"] = [-1.0, 0.0]
+    db.collection.add(
+        ids=[chunk_id for chunk_id, _ in documents],
+        documents=[text for _, text in documents],
+        embeddings=[embeddings[chunk_id] for chunk_id, _ in documents],
+        metadatas=[{"source": "github"} for _ in documents],
+    )
+    db.build_bm25_index()
+    monkeypatch.setattr(db.embedding_client, "embed", lambda text: [0.0, 1.0])
+    return db
+
+
+def _statuses(results: dict) -> dict:
+    return {entry["stage"]: entry["status"] for entry in results["cascade"]}
+
+
+class TestRetrievalCascade:
+    """Test stage order, cutoffs and degrading on budget overruns."""
+
+    def test_stages_within_budget(self, vectordb):
+        cross_encoder = FakeReranker("balance_of")
+        cascade = RetrievalCascade(vectordb, cross_encoder=cross_encoder, budgets_ms=GENEROUS)
+
+        results = cascade.search("deposit amount", n_results=3)
+
+        assert _statuses(results) == {
+            "ann": "ok", "fusion": "ok", "cross_encoder": "ok", "llm": "disabled",
+        }
+        assert results["ids"][0][0] == "nft"
+        assert results["relevance"][0][0] == pytest.approx(0.9)
+        assert len(results["ids"][0]) == 3
+        # The keyword-only hit came in through fusion
+        assert DOCUMENTS[1][1] in cross_encoder.calls[0]
+        assert results["candidate_pool"]["size"] >= 3
+
+    def test_timeout_returns_best_so_far(self, vectordb):
+        fused = RetrievalCascade(vectordb, budgets_ms=GENEROUS).search(
+            "deposit amount", n_results=3
+        )
+        llm = FakeReranker("Stylus", scale=10)
+        cascade = RetrievalCascade(
+            vectordb,
+            cross_encoder=FakeReranker("balance_of", delay=0.5),
+            llm_reranker=llm,
+            budgets_ms={**GENEROUS, "cross_encoder": 20},
+        )
+
+        start = time.perf_counter()
+        results = cascade.search("deposit amount", n_results=3)
+
+        assert time.perf_counter() - start < 0.4
+        assert _statuses(results) == {
+            "ann": "ok", "fusion": "ok", "cross_encoder": "timeout", "llm": "skipped",
+        }
+        assert results["ids"] == fused["ids"]
+        assert results["relevance"] == fused["relevance"]
+        assert llm.calls == []
+
+    def test_failed_stage_is_skipped(self, vectordb):
+        llm = FakeReranker("balance_of", scale=10)
+        cascade = RetrievalCascade(
+            vectordb,
+            cross_encoder=FakeReranker("Stylus", fail=True),
+            llm_reranker=llm,
+            budgets_ms=GENEROUS,
+            cutoffs={"llm": 4},
+        )
+
+        results = cascade.search("deposit amount", n_results=2)
+
+        assert _statuses(results)["cross_encoder"] == "error"
+        assert _statuses(results)["llm"] == "ok"
+        # The LLM reorders only its cutoff, scored 0-10
+        assert len(llm.calls[0]) == 4
+        assert results["relevance"][0][0] == pytest.approx(0.9)
+
+    def test_slow_ann_stops_cascade(self, vectordb):
+        cross_encoder = FakeReranker("balance_of")
+        cascade = RetrievalCascade(
+            vectordb, cross_encoder=cross_encoder, budgets_ms={**GENEROUS, "ann": 1e-6},
+        )
+
+        results = cascade.search("deposit amount", n_results=2)
+
+        assert _statuses(results) == {
+            "ann": "over_budget",
+            "fusion": "skipped",
+            "cross_encoder": "skipped",
+            "llm": "disabled",
+        }
+        assert results["ids"][0][0] == "docs"
+        assert "vault" not in results["ids"][0]
+        assert cross_encoder.calls == []
+
+    def test_parse_stage_settings(self):
+        assert parse_stage_settings("ann=50, llm=0") == {"ann": 50.0, "llm": 0.0}
+        assert parse_stage_settings("") == {}
+        with pytest.raises(ValueError):
+            parse_stage_settings("rerank=100")
+
+    def test_tool_uses_cascade(self, vectordb):
+        tool = GetStylusContextTool(
+            vectordb=vectordb,
+            cross_encoder=FakeReranker("balance_of"),
+            use_result_cache=False,
+            api_key="test",
+        )
+        tool.cascade.stages = RetrievalCascade(vectordb, budgets_ms=GENEROUS).stages
+
+        result = tool.execute("deposit amount", n_results=2)
+
+        assert result["contexts"][0]["content"] == DOCUMENTS[3][1]
+        assert result["contexts"][0]["relevance_score"] == 0.9
+        assert len(result["contexts"]) == 2
+
+
+class TestCandidatePool:
+    """Test growing the ANN stage's candidate pool only for flat queries."""
+
+    @pytest.fixture
+    def vectordb(self, tmp_path, monkeypatch):
+        db = VectorDB(
+            collection_name="pool_test",
+            persist_directory=tmp_path / "chroma",
+            embedding_client=EmbeddingClient(api_key="test", use_cache=False),
+        )
+        # One chunk matches "winner" exactly; the rest are all about equally
+        # close to "flat"
+        ids = ["winner"] + [f"filler{i}" for i in range(39)]
+        embeddings = [[0.0, 1.0]] + [[1.0, 0.001 * i] for i in range(39)]
+        db.collection.add(
+            ids=ids,
+            documents=[f"chunk {chunk_id}" for chunk_id in ids],
+            embeddings=embeddings,
+            metadatas=[{"source": "docs" if i < 4 else "code"} for i in range(len(ids))],
+        )
+        db.build_bm25_index()
+        queries = {"winner": [0.0, 1.0], "flat": [1.0, 0.0]}
+        monkeypatch.setattr(db.embedding_client, "embed", lambda text: queries[text])
+        return db
+
+    def test_clear_winner_keeps_small_pool(self, vectordb):
+        pool = vectordb.candidate_pool("winner", n_results=5, min_pool=5, max_pool=15, min_gap=0.1)
+
+        assert (pool["size"], pool["rounds"], pool["outcome"]) == (5, 1, "separated")
+        assert pool["results"]["ids"][0][0] == "winner"
+
+    def test_flat_distribution_grows_pool(self, vectordb):
+        pool = vectordb.candidate_pool("flat", n_results=5, min_pool=5, max_pool=15, min_gap=0.1)
+
+        assert (pool["size"], pool["rounds"], pool["outcome"]) == (15, 3, "max")
+        assert pool["gap"] < 0.1
+
+    def test_small_partition_stops_growing(self, vectordb):
+        pool = vectordb.candidate_pool(
+            "flat", n_results=5, where={"source": "docs"}, min_pool=5, max_pool=15, min_gap=0.1,
+        )
+
+        assert (pool["rounds"], pool["outcome"]) == (1, "exhausted")
+        assert len(pool["results"]["ids"][0]) == 4
+
+    def test_cascade_reranks_pool(self, vectordb):
+        cross_encoder = FakeReranker("filler")
+        cascade = RetrievalCascade(
+            vectordb, cross_encoder=cross_encoder, budgets_ms=GENEROUS, cutoffs={"ann": 15},
+        )
+
+        winner = cascade.search("winner", n_results=5)
+        flat = cascade.search("flat", n_results=5)
+
+        assert winner["candidate_pool"]["outcome"] == "separated"
+        assert len(cross_encoder.calls[0]) == 5
+        assert flat["candidate_pool"]["outcome"] == "max"
+        assert len(cross_encoder.calls[1]) == 15
+        assert len(flat["ids"][0]) == 5
@@ -0,0 +1,71 @@
+"""
+Tests for streaming processed chunk files.
+"""
+
+import json
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.preprocessing.chunk_io import (
+    HAS_ZSTD,
+    find_latest_chunk_file,
+    iter_windows,
+    read_chunks,
+    write_chunks,
+)
+
+CHUNKS = [
+    {"id": f"chunk_{i}", "content": f"fn main() {{ {i} }} — ünïcode", "token_count": i}
+    for i in range(5)
+]
+
+
+class TestChunkIO:
+    """Test JSONL round trips, legacy JSON reading and windowing."""
+
+    def test_jsonl_round_trip(self, tmp_path):
+        path = tmp_path / "processed_chunks_1.jsonl"
+
+        written = write_chunks(path, iter(CHUNKS))
+
+        assert written == 5
+        assert len(path.read_text(encoding="utf-8").splitlines()) == 5
+        assert list(read_chunks(path)) == CHUNKS
+
+    @pytest.mark.skipif(not HAS_ZSTD, reason="zstandard not installed")
+    def test_zstd_round_trip(self, tmp_path):
+        path = tmp_path / "processed_chunks_1.jsonl.zst"
+
+        write_chunks(path, CHUNKS)
+
+        assert list(read_chunks(path)) == CHUNKS
+
+    def test_reads_legacy_json_array(self, tmp_path):
+        path = tmp_path / "processed_chunks_1.json"
+        path.write_text(json.dumps(CHUNKS), encoding="utf-8")
+
+        assert list(read_chunks(path)) == CHUNKS
+
+    def test_iter_windows(self):
+        windows = list(iter_windows(iter(CHUNKS), 2))
+
+        assert [len(w) for w in windows] == [2, 2, 1]
+        assert [c for w in windows for c in w] == CHUNKS
+
+    def test_find_latest_chunk_file(self, tmp_path):
+        assert find_latest_chunk_file(tmp_path) is None
+
+        older = tmp_path / "processed_chunks_1.json"
+        newer = tmp_path / "processed_chunks_2.jsonl"
+        older.write_text("[]")
+        newer.write_text("")
+        (tmp_path / "processing_stats_3.json").write_text("{}")
+        os.utime(older, (1, 1))
+
+        assert find_latest_chunk_file(tmp_path) == newer
@@ -0,0 +1,82 @@
+"""
+Tests for the single-pass document and code chunkers.
+"""
+
+import sys
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.preprocessing.chunker import CodeChunker, DocumentChunker, TokenizedText
+
+
+class TestTokenizedText:
+    """Test span token counts derived from a single encoding."""
+
+    def test_counts_match_reencoding(self, byte_encoding):
+        text = "fn main() {\n    let ü = 1;\n}"
+        doc = TokenizedText(text, byte_encoding)
+
+        for start, end in [(0, len(text)), (0, 2), (3, 20), (17, 19)]:
+            assert doc.count(start, end) == len(text[start:end].encode("utf-8"))
+
+        assert doc.decode(doc.token_index(20), doc.token_index(24)) == "ü = "
+
+
+class TestDocumentChunker:
+    """Test document splitting, overlap and token counts."""
+
+    def test_sections_are_packed(self, byte_encoding):
+        text = "# One\n\nalpha\n\n# Two\n\nbeta"
+        chunks = DocumentChunker(max_tokens=100, overlap_tokens=5).chunk(text, {"source": "doc"})
+
+        assert [c.content for c in chunks] == [text]
+        assert chunks[0].token_count == len(text)
+        assert chunks[0].metadata == {"source": "doc"}
+
+    def test_large_section_split_with_overlap(self, byte_encoding):
+        paragraphs = ["para %d. " % i + "x" * 30 + "." for i in range(4)]
+        text = "# Title\n\n" + "\n\n".join(paragraphs)
+        byte_encoding.calls = 0
+
+        chunks = DocumentChunker(max_tokens=50, overlap_tokens=6).chunk(text)
+
+        assert byte_encoding.calls == 1
+        assert len(chunks) > 1
+        assert chunks[0].content.startswith("# Title")
+        for prev, chunk in zip(chunks, chunks[1:]):
+            assert chunk.content.startswith("..." + prev.content[-6:] + "\n\n")
+            assert chunk.token_count <= 50 + 6
+        assert all(c.total_chunks == len(chunks) for c in chunks)
+
+
+class TestCodeChunker:
+    """Test pattern-based and line-based code splitting."""
+
+    def test_semantic_split(self, byte_encoding):
+        code = "pub fn a() {\n    1\n}\n\npub fn b() {\n    2\n}"
+        chunks = CodeChunker(max_tokens=100, overlap_lines=0, structural=False).chunk(code, ".rs")
+
+        assert [c.content for c in chunks] == [
+            "pub fn a() {\n    1\n}",
+            "pub fn b() {\n    2\n}",
+        ]
+        assert [c.token_count for c in chunks] == [20, 20]
+        assert chunks[0].metadata["language"] == "rs"
+
+    def test_line_split_with_overlap(self, byte_encoding):
+        lines = [f"let v{i} = {i};" for i in range(20)]
+        code = "\n".join(lines)
+        byte_encoding.calls = 0
+
+        chunks = CodeChunker(max_tokens=60, overlap_lines=2).chunk(code, ".txt")
+
+        assert byte_encoding.calls == 1
+        assert len(chunks) > 1
+        for prev, chunk in zip(chunks, chunks[1:]):
+            prev_lines = [line for line in prev.content.splitlines() if line in lines]
+            overlap = "\n".join(prev_lines[-2:])
+            assert chunk.content.startswith(f"{CodeChunker.OVERLAP_MARKER}\n{overlap}\n")
+        assert all(len(c.content.encode()) - 1 <= c.token_count <= len(c.content.encode()) + 1
+                   for c in chunks)
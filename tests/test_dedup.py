@@ -0,0 +1,96 @@
+"""
+Tests for MinHash/LSH near-duplicate chunk elimination.
+"""
+
+import json
+import sys
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.preprocessing.chunk_io import read_chunks, write_chunks
+from src.preprocessing.dedup import MinHashDeduplicator, chunk_source
+from src.preprocessing.processor import DataProcessor
+
+BASE_TEXT = " ".join(
+    f"pub fn handler_{i}(&mut self, value: U256) -> Result<U256, Vec<u8>> {{ Ok(value) }}"
+    for i in range(40)
+)
+
+
+def _doc(chunk_id: str, content: str, url: str) -> dict:
+    return {"id": chunk_id, "content": content, "url": url, "source": "documentation"}
+
+
+class TestMinHashDeduplicator:
+    """Test near-duplicate detection and collapsing."""
+
+    def test_near_duplicates_collapse(self):
+        """Test that a lightly edited copy is detected and its source recorded."""
+        dedup = MinHashDeduplicator(threshold=0.8)
+        edited = BASE_TEXT.replace("handler_7(", "handler_seven(")
+
+        assert dedup.add("a", BASE_TEXT, "repo/lib.rs") is None
+        assert dedup.add("b", edited, "fork/lib.rs") == "a"
+        assert dedup.add("c", "completely different documentation text about rollups", "x") is None
+
+        assert dedup.duplicate_of == {"b": "a"}
+        assert dedup.sources["a"] == ["repo/lib.rs", "fork/lib.rs"]
+
+    def test_similar_but_distinct_kept(self):
+        """Test that chunks sharing only part of their content are not merged."""
+        dedup = MinHashDeduplicator(threshold=0.85)
+        half = BASE_TEXT[: len(BASE_TEXT) // 2]
+
+        dedup.add("a", BASE_TEXT, "s1")
+
+        assert dedup.add("b", half + " struct Storage { owner: Address }", "s2") is None
+        assert dedup.signature("   ") is None
+
+    def test_fit_apply(self):
+        """Test that apply drops duplicates and keeps canonical chunks in order."""
+        chunks = [
+            _doc("a", BASE_TEXT, "https://docs.example/page"),
+            _doc("b", "unrelated content " * 20, "https://docs.example/other"),
+            _doc("c", BASE_TEXT, "https://docs.example/page/"),
+        ]
+
+        dedup = MinHashDeduplicator().fit(chunks)
+        result = list(dedup.apply(chunks))
+
+        assert [c["id"] for c in result] == ["a", "b"]
+        assert result[0]["sources"] == ["https://docs.example/page", "https://docs.example/page/"]
+        assert "sources" not in result[1]
+        assert dedup.get_stats()["duplicates"] == 1
+
+    def test_chunk_source(self):
+        assert chunk_source({"url": "https://x"}) == "https://x"
+        assert chunk_source({"repo_url": "https://github.com/o/r", "file_path": "src/lib.rs"}) == (
+            "https://github.com/o/r/src/lib.rs"
+        )
+
+
+class TestDeduplicateFile:
+    """Test rewriting a processed chunk file without near-duplicates."""
+
+    def test_jsonl_and_json(self, tmp_path, byte_encoding):
+        processor = DataProcessor()
+        chunks = [
+            _doc("a", BASE_TEXT, "u1"),
+            _doc("b", BASE_TEXT, "u2"),
+            _doc("c", "something else entirely " * 10, "u3"),
+        ]
+
+        jsonl_path = tmp_path / "processed_chunks_1.jsonl"
+        write_chunks(jsonl_path, chunks)
+        assert processor._deduplicate_file(jsonl_path, 0.85) == 1
+        assert [c["id"] for c in read_chunks(jsonl_path)] == ["a", "c"]
+
+        json_path = tmp_path / "processed_chunks_2.json"
+        json_path.write_text(json.dumps(chunks))
+        assert processor._deduplicate_file(json_path, 0.85) == 1
+        assert [c["id"] for c in read_chunks(json_path)] == ["a", "c"]
+        assert sorted(p.name for p in tmp_path.iterdir()) == [
+            "processed_chunks_1.jsonl", "processed_chunks_2.json",
+        ]
@@ -0,0 +1,190 @@
+"""
+Tests for the on-disk embedding cache.
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.embeddings.cache import EmbeddingCache, QueryEmbeddingCache, SemanticResultCache
+from src.embeddings.embedder import EmbeddingClient
+from src.embeddings.vectordb import VectorDB
+from src.mcp.tools.get_stylus_context import GetStylusContextTool
+
+
+class TestEmbeddingCache:
+    """Test cache storage, lookups and eviction."""
+
+    @pytest.fixture
+    def cache(self, tmp_path):
+        cache = EmbeddingCache(path=tmp_path / "cache.sqlite", max_entries=3)
+        yield cache
+        cache.close()
+
+    def test_round_trip(self, cache):
+        """Test that stored embeddings come back as float32 values."""
+        cache.put("model-a", "hello", [0.5, -1.25, 2.0])
+
+        assert cache.get("model-a", "hello") == [0.5, -1.25, 2.0]
+        assert cache.get("model-b", "hello") is None
+
+    def test_hit_miss_counters(self, cache):
+        """Test hit and miss counting across a batch lookup."""
+        cache.put_many("m", ["a", "b"], [[1.0], [2.0]])
+
+        results = cache.get_many("m", ["a", "x", "b", "a"])
+
+        assert results == [[1.0], None, [2.0], [1.0]]
+        assert cache.hits == 3
+        assert cache.misses == 1
+
+    def test_lru_eviction(self, cache):
+        """Test that the least recently used entry is evicted first."""
+        cache.put("m", "a", [1.0])
+        cache.put("m", "b", [2.0])
+        cache.put("m", "c", [3.0])
+        cache.get("m", "a")
+        cache.put("m", "d", [4.0])
+
+        assert len(cache) == 3
+        assert cache.evictions == 1
+        assert cache.get("m", "b") is None
+        assert cache.get("m", "a") == [1.0]
+
+    def test_access_times_buffered(self, cache):
+        """Test that hits record their access time in memory until flushed."""
+        cache.put("m", "a", [1.0])
+
+        def last_access():
+            return cache._conn.execute("SELECT last_access FROM embeddings").fetchone()[0]
+
+        stored = last_access()
+        cache.get("m", "a")
+        assert last_access() == stored
+
+        cache.flush()
+        assert last_access() > stored
+
+    def test_persistence(self, tmp_path):
+        """Test that entries survive reopening the cache file."""
+        path = tmp_path / "cache.sqlite"
+        with EmbeddingCache(path=path) as cache:
+            cache.put("m", "text", [1.0, 2.0])
+
+        with EmbeddingCache(path=path) as cache:
+            assert cache.get("m", "text") == [1.0, 2.0]
+
+
+class TestCachedEmbeddingClient:
+    """Test that EmbeddingClient only sends cache misses to the API."""
+
+    def test_embed_batch_sends_only_misses(self, tmp_path, monkeypatch):
+        cache = EmbeddingCache(path=tmp_path / "cache.sqlite")
+        client = EmbeddingClient(api_key="test", model="m", cache=cache)
+        sent = []
+
+        def fake_embed_uncached(texts, batch_size=100, token_counts=None):
+            sent.append(list(texts))
+            return [[float(len(t))] for t in texts]
+
+        monkeypatch.setattr(client, "_embed_uncached", fake_embed_uncached)
+
+        assert client.embed_batch(["a", "bb"]) == [[1.0], [2.0]]
+        assert client.embed_batch(["bb", "ccc", "a"]) == [[2.0], [3.0], [1.0]]
+        assert sent == [["a", "bb"], ["ccc"]]
+
+        client.close()
+
+
+class TestQueryEmbeddingCache:
+    """Test the in-process query embedding cache."""
+
+    def test_ttl_and_lru(self):
+        """Test expiry after the TTL and eviction of the least recently used query."""
+        now = [0.0]
+        cache = QueryEmbeddingCache(max_entries=2, ttl=10.0, clock=lambda: now[0])
+
+        cache.put("m", "how to  use StorageMap ", [1.0])
+        cache.put("m", "b", [2.0])
+        assert cache.get("m", "how to use StorageMap") == [1.0]
+        assert cache.get("other-model", "b") is None
+
+        cache.put("m", "c", [3.0])
+        assert cache.get("m", "b") is None
+        assert len(cache) == 2
+
+        now[0] = 10.0
+        assert cache.get("m", "c") is None
+        assert cache.get_stats()["hits"] == 1
+
+    def test_vectordb_skips_repeated_embedding(self, tmp_path, monkeypatch):
+        """Test that repeated queries are embedded once."""
+        db = VectorDB(
+            collection_name="query_cache_test",
+            persist_directory=tmp_path / "chroma",
+            embedding_client=EmbeddingClient(api_key="test", use_cache=False),
+        )
+        embedded = []
+        monkeypatch.setattr(
+            db.embedding_client, "embed", lambda text: embedded.append(text) or [1.0, 0.0]
+        )
+
+        db.query("StorageMap usage", n_results=1)
+        db.hybrid_search("  StorageMap   usage", n_results=1)
+
+        assert embedded == ["StorageMap usage"]
+        assert db.get_stats()["query_cache"]["hits"] == 1
+
+
+class TestSemanticResultCache:
+    """Test reuse of results for similar queries."""
+
+    def test_similarity_key_and_revision(self):
+        cache = SemanticResultCache(threshold=0.95, max_entries=2)
+        cache.validate(1)
+        cache.put(("all", 5), [1.0, 0.0], ["storage map contexts"])
+
+        assert cache.get(("all", 5), [0.99, 0.05]) == ["storage map contexts"]
+        assert cache.get(("all", 5), [0.7, 0.7]) is None
+        assert cache.get(("code", 5), [1.0, 0.0]) is None
+
+        cache.validate(1)
+        assert len(cache) == 1
+        cache.validate(2)
+        assert len(cache) == 0
+        assert cache.get_stats()["invalidations"] == 1
+
+    def test_tool_reuses_contexts_until_collection_changes(self, tmp_path, monkeypatch):
+        db = VectorDB(
+            collection_name="semantic_cache_test",
+            persist_directory=tmp_path / "chroma",
+            embedding_client=EmbeddingClient(api_key="test", use_cache=False),
+            use_query_cache=False,
+        )
+        db.collection.add(
+            ids=["a"],
+            documents=["StorageMap maps keys to values in contract storage"],
+            embeddings=[[1.0, 0.0]],
+            metadatas=[{"source": "documentation"}],
+        )
+        embeddings = {"how to use StorageMap": [1.0, 0.0], "StorageMap usage example": [0.98, 0.1]}
+        monkeypatch.setattr(db.embedding_client, "embed", lambda text: embeddings[text])
+        searches = []
+        original_query = db.query
+        monkeypatch.setattr(db, "query", lambda **kw: searches.append(kw) or original_query(**kw))
+
+        tool = GetStylusContextTool(vectordb=db, use_reranking=False, api_key="test")
+        first = tool.execute("how to use StorageMap", n_results=1)
+        second = tool.execute("StorageMap usage example", n_results=1)
+
+        assert len(searches) == 1
+        assert second["contexts"] == first["contexts"]
+        assert second["query"] == "StorageMap usage example"
+
+        db.collection.add(ids=["b"], documents=["new"], embeddings=[[0.0, 1.0]])
+        tool.execute("StorageMap usage example", n_results=1)
+        assert len(searches) == 2
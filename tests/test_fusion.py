@@ -0,0 +1,110 @@
+"""
+Tests for rank fusion of retrieval signals.
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.embeddings.fusion import fuse, ranking_scores, ranks, top_indices
+from src.embeddings.reranker import HybridReranker
+
+NAN = np.nan
+
+
+class TestFusion:
+    """Test RRF, CombSUM and z-score fusion."""
+
+    def test_ranks_and_ranked_lists(self):
+        assert ranks(np.array([0.5, 0.9, NAN, 0.5])).tolist() == [2, 1, 0, 3]
+        assert ranks(np.array([[1.0, 2.0], [2.0, 1.0]])).tolist() == [[2, 1], [1, 2]]
+
+        scores = ranking_scores([3, 0], n=4)
+        assert np.isnan(scores[[1, 2]]).all()
+        assert ranks(scores).tolist() == [2, 0, 0, 1]
+
+    def test_rrf(self):
+        vector = np.array([0.9, 0.8, 0.1])
+        bm25 = np.array([NAN, 5.0, 2.0])
+
+        fused = fuse([vector, bm25], rrf_k=60)
+
+        expected = [1 / 61, 1 / 62 + 1 / 61, 1 / 63 + 1 / 62]
+        assert fused == pytest.approx(expected)
+        assert top_indices(fused).tolist() == [1, 2, 0]
+
+        # A zero weight drops a signal
+        weighted = fuse([vector, bm25], weights=[1.0, 0.0], rrf_k=60)
+        assert top_indices(weighted).tolist() == [0, 1, 2]
+
+    def test_combsum_and_zscore(self):
+        vector = np.array([1.0, 0.5, 0.0, NAN])
+        bm25 = np.array([0.0, 10.0, NAN, 5.0])
+
+        combsum = fuse([vector, bm25], method="combsum")
+        assert combsum == pytest.approx([1.0, 1.5, 0.0, 0.5])
+
+        zscore = fuse([vector, bm25], method="zscore", weights=[1.0, 2.0])
+        assert zscore == pytest.approx(np.sqrt(1.5) * np.array([-1.0, 2.0, -3.0, -1.0]))
+        # A missing candidate counts as the signal's worst one; ties keep order
+        assert top_indices(zscore).tolist() == [1, 0, 3, 2]
+
+    def test_unmatched_candidates_go_last(self):
+        for method in ("rrf", "combsum", "zscore"):
+            fused = fuse([np.array([NAN, 1.0, 1.0]), np.array([NAN, NAN, 1.0])], method=method)
+            assert top_indices(fused)[-1] == 0
+
+    def test_invalid_arguments(self):
+        with pytest.raises(ValueError):
+            fuse([np.ones(3), np.ones(3)], weights=[1.0])
+        with pytest.raises(ValueError):
+            fuse([np.ones(3)], method="borda")
+
+
+class TestHybridRerankerFusion:
+    """Test the hybrid reranker on the fusion engine."""
+
+    DOCUMENTS = [
+        "ERC20 tokens implement transfer functionality.",
+        "Weather forecast for tomorrow.",
+        "Transfer tokens between accounts using ERC20.",
+        "Stock prices fluctuated today.",
+    ]
+
+    def test_matches_two_signal_rrf(self):
+        distances = [0.3, 0.9, 0.4, 0.8]
+        results = HybridReranker().rerank(
+            "ERC20 token transfer", self.DOCUMENTS, distances, top_k=4
+        )
+
+        for result in results:
+            expected = 1 / (60 + result["vector_rank"]) + 1 / (60 + result["bm25_rank"])
+            assert result["rrf_score"] == pytest.approx(expected)
+        scores = [r["rrf_score"] for r in results]
+        assert scores == sorted(scores, reverse=True)
+        assert sorted(r["vector_rank"] for r in results) == [1, 2, 3, 4]
+
+    def test_extra_signals_and_weights(self):
+        distances = [0.3, 0.2, 0.4, 0.8]
+        symbols = [NAN, NAN, NAN, 4.0]
+
+        reranker = HybridReranker(
+            fusion="combsum", weights={"vector": 0.1, "bm25": 0.1, "symbols": 5.0}
+        )
+        results = reranker.rerank(
+            "ERC20 token transfer",
+            self.DOCUMENTS,
+            distances,
+            top_k=2,
+            signals={"symbols": symbols},
+        )
+
+        assert results[0]["index"] == 3
+        assert results[0]["symbols_rank"] == 1
+        assert results[1]["symbols_rank"] == 0
+        assert "rrf_score" not in results[0]
@@ -0,0 +1,125 @@
+"""
+Tests for incremental (content_hash based) collection sync.
+"""
+
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+import httpx
+import pytest
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.embeddings.embedder import AsyncEmbeddingClient, AsyncRateLimiter, EmbeddingClient
+from src.embeddings.vectordb import VectorDB
+from src.preprocessing.processor import DataProcessor
+
+
+def _chunk(chunk_id: str, content: str, content_hash: str) -> dict:
+    return {
+        "id": chunk_id,
+        "content": content,
+        "content_hash": content_hash,
+        "token_count": 1,
+        "source": "documentation",
+    }
+
+
+@pytest.fixture
+def vectordb(tmp_path, monkeypatch):
+    """VectorDB in a temp directory whose embedding requests are answered locally."""
+    embedded = []
+
+    async def handler(request):
+        texts = json.loads(request.content)["input"]
+        embedded.extend(texts)
+        return httpx.Response(200, json={
+            "data": [{"index": i, "embedding": [float(len(t)), 1.0]} for i, t in enumerate(texts)]
+        })
+
+    def create_client(max_concurrency):
+        client = AsyncEmbeddingClient(
+            api_key="test",
+            use_cache=False,
+            rate_limiter=AsyncRateLimiter(rate=1000.0, burst=100),
+        )
+        client.client = httpx.AsyncClient(
+            base_url="https://example.test", transport=httpx.MockTransport(handler)
+        )
+        return client
+
+    db = VectorDB(
+        collection_name="sync_test",
+        persist_directory=tmp_path / "chroma",
+        embedding_client=EmbeddingClient(api_key="test", use_cache=False),
+        partition_keys=["source"],
+    )
+    monkeypatch.setattr(db, "_create_async_embedding_client", create_client)
+    db.embedded = embedded
+    return db
+
+
+class TestIncrementalSync:
+    """Test that only new/changed chunks are embedded and vanished ones deleted."""
+
+    def test_sync_diff(self, vectordb):
+        first = [_chunk("a", "alpha", "h1"), _chunk("b", "beta", "h2"), _chunk("c", "gamma", "h3")]
+        stats = asyncio.run(vectordb.sync_chunks_async(first))
+
+        assert stats["added"] == 3
+        assert vectordb.collection.count() == 3
+
+        vectordb.embedded.clear()
+        second = [
+            _chunk("a", "alpha", "h1"), _chunk("b", "beta v2", "h2b"), _chunk("d", "delta", "h4"),
+        ]
+        stats = asyncio.run(vectordb.sync_chunks_async(second))
+
+        assert stats == {"added": 1, "updated": 1, "deleted": 1, "unchanged": 1, "upserted": 2}
+        assert sorted(vectordb.embedded) == ["beta v2", "delta"]
+        assert vectordb.get_content_hashes() == {"a": "h1", "b": "h2b", "d": "h4"}
+
+    def test_edited_chunk_updated_in_place(self, vectordb, byte_encoding):
+        """Test that processed chunk ids survive a content edit, so sync updates them."""
+        processor = DataProcessor()
+
+        def processed(content: str, content_hash: str) -> dict:
+            chunk = _chunk("", content, content_hash)
+            chunk.update(url="https://docs.example/page", chunk_index=0)
+            chunk["id"] = processor._compute_chunk_id(chunk)
+            return chunk
+
+        vectordb.sync_chunks([processed("alpha", "h1")])
+        stats = vectordb.sync_chunks([processed("alpha v2", "h2")])
+
+        assert stats["updated"] == 1
+        assert stats["added"] == stats["deleted"] == 0
+        assert list(vectordb.get_content_hashes().values()) == ["h2"]
+
+    def test_sync_noop(self, vectordb):
+        chunks = [_chunk("a", "alpha", "h1")]
+        asyncio.run(vectordb.sync_chunks_async(chunks))
+        vectordb.embedded.clear()
+
+        stats = asyncio.run(vectordb.sync_chunks_async(chunks))
+
+        assert stats["unchanged"] == 1
+        assert vectordb.embedded == []
+
+    def test_sync_keeps_partitions(self, vectordb):
+        """Test that source partitions follow adds, source changes and deletes."""
+        chunks = [_chunk("a", "alpha", "h1"), _chunk("b", "beta", "h2")]
+        vectordb.sync_chunks(chunks)
+        docs = vectordb.partitions[("source", "documentation")]
+        assert sorted(docs.get()["ids"]) == ["a", "b"]
+
+        moved = {**_chunk("b", "beta", "h2b"), "source": "github"}
+        vectordb.sync_chunks([moved])
+
+        assert docs.get()["ids"] == []
+        assert vectordb.partitions[("source", "github")].get()["ids"] == ["b"]
+        results = vectordb.store.query([4.0, 1.0], n_results=5, where={"source": "github"})
+        assert results["ids"] == [["b"]]
@@ -0,0 +1,163 @@
+"""
+Tests for the local CPU embedding backends.
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.embeddings.embedder import EmbeddingClient, create_embedding_client
+from src.embeddings.local_embedder import (
+    HAS_ONNXRUNTIME,
+    AsyncLocalEmbeddingClient,
+    LocalEmbeddingClient,
+    OnnxEncoder,
+    parse_local_model,
+)
+from src.embeddings.vectordb import VectorDB
+
+
+def _hash_encoder(calls: list):
+    """Deterministic 8-dimensional bag-of-characters encoder."""
+    def encode(texts):
+        calls.append(list(texts))
+        vectors = np.zeros((len(texts), 8), dtype=np.float32)
+        for i, text in enumerate(texts):
+            for char in text:
+                vectors[i, ord(char) % 8] += 1
+        return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-9)
+    return encode
+
+
+class TestModelSelection:
+    """Test choosing the backend from the model name."""
+
+    def test_parse_and_factory(self, monkeypatch):
+        assert parse_local_model("onnx:/models/bge-small") == ("onnx", "/models/bge-small")
+        assert parse_local_model("sentence-transformers:BAAI/bge-small-en-v1.5") == (
+            "sentence-transformers", "BAAI/bge-small-en-v1.5",
+        )
+        assert parse_local_model("google/gemini-embedding-001") is None
+
+        remote = create_embedding_client(
+            "google/gemini-embedding-001", api_key="test", use_cache=False
+        )
+        assert isinstance(remote, EmbeddingClient)
+
+        monkeypatch.setattr(
+            "src.embeddings.local_embedder.SentenceTransformerEncoder",
+            lambda name: _hash_encoder([]),
+        )
+        local = create_embedding_client(
+            "sentence-transformers:tiny", api_key="ignored", use_cache=False
+        )
+        assert isinstance(local, LocalEmbeddingClient)
+        assert local.get_dimension() == 8
+
+
+class TestLocalEmbeddingClient:
+    """Test batching and caching of local embeddings."""
+
+    def test_batches_and_cache(self, tmp_path):
+        from src.embeddings.cache import EmbeddingCache
+
+        calls = []
+        cache = EmbeddingCache(tmp_path / "cache.sqlite")
+        client = LocalEmbeddingClient(
+            "onnx:unused", cache=cache, batch_size=2, encoder=_hash_encoder(calls)
+        )
+
+        embeddings = client.embed_batch(["a", "bb", "ccc"])
+        assert [len(batch) for batch in calls] == [2, 1]
+        assert client.embed("bb") == embeddings[1]
+        assert len(calls) == 2
+        assert cache.get("onnx:unused", "ccc") == pytest.approx(embeddings[2])
+
+    def test_batches_grouped_by_length(self):
+        """Test that texts of similar token counts share a forward pass."""
+        calls = []
+        client = LocalEmbeddingClient(
+            "onnx:unused", use_cache=False, batch_size=2, encoder=_hash_encoder(calls)
+        )
+        texts = ["long text", "x", "medium", "y"]
+
+        embeddings = client.embed_batch(texts, token_counts=[30, 1, 12, 2])
+
+        assert calls == [["x", "y"], ["medium", "long text"]]
+        assert embeddings == [_hash_encoder([])([text])[0].tolist() for text in texts]
+
+        # Async ingestion passes each batch's precomputed counts through
+        calls.clear()
+
+        async def collect():
+            return [result async for result in AsyncLocalEmbeddingClient(client).embed_batches(
+                [texts], token_counts=[[1, 30, 12, 2]]
+            )]
+        assert asyncio.run(collect()) == [(0, embeddings)]
+        assert calls == [["long text", "y"], ["medium", "x"]]
+
+    @pytest.mark.skipif(not HAS_ONNXRUNTIME, reason="onnxruntime/tokenizers not installed")
+    def test_onnx_mean_pooling(self):
+        from tokenizers import Tokenizer
+        from tokenizers.models import WordLevel
+        from tokenizers.pre_tokenizers import Whitespace
+
+        vocab = {"[PAD]": 0, "[UNK]": 1, "a": 2, "b": 3}
+        tokenizer = Tokenizer(WordLevel(vocab, unk_token="[UNK]"))
+        tokenizer.pre_tokenizer = Whitespace()
+
+        class Session:
+            """Stand-in returning token id one-hots as token embeddings."""
+
+            def get_inputs(self):
+                return [
+                    type("Input", (), {"name": name}) for name in ("input_ids", "attention_mask")
+                ]
+
+            def run(self, outputs, inputs):
+                assert set(inputs) == {"input_ids", "attention_mask"}
+                return [np.eye(4, dtype=np.float32)[inputs["input_ids"]]]
+
+        encoder = OnnxEncoder(Path("unused"), session=Session(), tokenizer=tokenizer)
+        vectors = encoder(["a b b", "a"])
+
+        # Padding of the shorter text is excluded from its mean
+        assert vectors[1] == pytest.approx([0, 0, 1, 0])
+        assert vectors[0] == pytest.approx(np.array([0, 0, 1, 2]) / np.sqrt(5))
+
+
+class TestVectorDBLocalBackend:
+    """Test ingesting with a local model and recording it on the collection."""
+
+    def test_ingest_records_model_and_dimension(self, tmp_path):
+        client = LocalEmbeddingClient("onnx:tiny", use_cache=False, encoder=_hash_encoder([]))
+        db = VectorDB(
+            collection_name="local_test",
+            persist_directory=tmp_path / "chroma",
+            embedding_client=client,
+            partition_keys=[],
+        )
+        chunks = [
+            {"id": f"c{i}", "content": text, "token_count": 2, "source": "documentation"}
+            for i, text in enumerate(["alpha beta", "gamma delta", "epsilon"])
+        ]
+
+        assert db.ingest_chunks(chunks, batch_size=2) == 3
+
+        assert db.embedding_info == {"model": "onnx:tiny", "dimension": 8}
+        assert db.collection.configuration["hnsw"]["space"] == "cosine"
+        results = db.query("gamma delta", n_results=1)
+        assert results["ids"] == [["c1"]]
+
+        reopened = VectorDB(
+            collection_name="local_test",
+            persist_directory=tmp_path / "chroma",
+            embedding_client=client,
+        )
+        assert reopened.get_stats()["embedding"] == {"model": "onnx:tiny", "dimension": 8}
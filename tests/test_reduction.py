@@ -0,0 +1,172 @@
+"""
+Tests for ingest-time embedding dimensionality reduction.
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import src.embeddings.vectordb as vectordb_module
+from src.embeddings.local_embedder import LocalEmbeddingClient
+from src.embeddings.reduction import EmbeddingReducer, parse_reduction, recall_by_dimension
+from src.embeddings.vectordb import VectorDB, ingest_from_file
+from src.preprocessing.chunk_io import write_chunks
+
+
+def _low_rank(n: int, rank: int, width: int, seed: int) -> np.ndarray:
+    """Vectors spanning a rank-dimensional subspace, plus a little noise."""
+    rng = np.random.default_rng(seed)
+    basis = np.random.default_rng(0).normal(size=(rank, width))
+    return rng.normal(size=(n, rank)) @ basis + rng.normal(scale=0.01, size=(n, width))
+
+
+def _client(dimension: int = 16) -> LocalEmbeddingClient:
+    """Local client with a deterministic bag-of-characters encoder."""
+    def encode(texts):
+        vectors = np.zeros((len(texts), dimension), dtype=np.float32)
+        for i, text in enumerate(texts):
+            for char in text:
+                vectors[i, ord(char) % dimension] += 1
+        return vectors
+    return LocalEmbeddingClient("onnx:chars", use_cache=False, encoder=encode)
+
+
+class TestEmbeddingReducer:
+    """Test fitting, applying and persisting reducers."""
+
+    def test_parse_reduction(self):
+        assert parse_reduction("pca:256") == ("pca", 256)
+        assert parse_reduction("matryoshka:768") == ("matryoshka", 768)
+        for spec in ("pca", "pca:0", "svd:64", "matryoshka:-1"):
+            with pytest.raises(ValueError):
+                parse_reduction(spec)
+
+    def test_matryoshka_truncates_and_normalizes(self):
+        reducer = EmbeddingReducer.fit("matryoshka:2")
+        reduced = reducer.transform([[3.0, 4.0, 12.0]])
+        assert reduced[0] == pytest.approx([0.6, 0.8])
+        with pytest.raises(ValueError):
+            EmbeddingReducer.fit("matryoshka:4").transform([[1.0, 2.0, 3.0]])
+
+    def test_pca_preserves_neighbours(self, tmp_path):
+        corpus = _low_rank(300, rank=8, width=64, seed=1)
+        queries = _low_rank(20, rank=8, width=64, seed=2)
+        reducer = EmbeddingReducer.fit("pca:16", corpus)
+
+        report = recall_by_dimension(corpus, queries, reducer, [2, 8, 16], k=10)
+
+        recalls = [row["recall@10"] for row in report]
+        assert recalls[1] > 0.9 and recalls[2] > 0.9
+        assert recalls[0] < recalls[1]
+        assert [row["bytes_per_vector"] for row in report] == [8, 32, 64]
+
+        path = tmp_path / "reducers" / "c.npz"
+        reducer.save(path)
+        loaded = EmbeddingReducer.load(path)
+        assert loaded.spec == "pca:16"
+        assert np.allclose(loaded.transform(queries), reducer.transform(queries), atol=1e-6)
+        assert EmbeddingReducer.load_if_exists(tmp_path / "missing.npz") is None
+
+    def test_pca_needs_enough_samples(self):
+        with pytest.raises(ValueError):
+            EmbeddingReducer.fit("pca:16", np.ones((4, 32)))
+        with pytest.raises(ValueError):
+            EmbeddingReducer.fit("pca:16", None)
+
+
+class TestVectorDBReduction:
+    """Test reducing stored vectors and queries in VectorDB."""
+
+    def test_ingest_and_query_reduced(self, tmp_path):
+        chunks = [
+            {"id": f"c{i}", "content": text, "token_count": 2, "source": "documentation"}
+            for i, text in enumerate([
+                "alpha beta", "gamma delta", "epsilon zeta", "eta theta", "iota kappa", "lambda mu",
+            ])
+        ]
+        db = VectorDB(
+            collection_name="reduced_test",
+            persist_directory=tmp_path / "chroma",
+            embedding_client=_client(),
+            partition_keys=[],
+        )
+        db.fit_reducer("pca:4", [chunk["content"] for chunk in chunks])
+        assert db.ingest_chunks(chunks) == 6
+
+        assert db.embedding_info == {"model": "onnx:chars", "dimension": 4}
+        assert db.collection.metadata["embedding_reduction"] == "pca:4"
+        stored = db.collection.get(ids=["c0"], include=["embeddings"])["embeddings"]
+        assert len(stored[0]) == 4
+
+        # Queries are reduced the same way; the cache keeps full-width vectors
+        assert db.query("gamma delta", n_results=1)["ids"] == [["c1"]]
+        assert len(db.query_cache.get("onnx:chars", "gamma delta")) == 16
+        assert [r["ids"] for r in db.query_many(["eta theta", "alpha beta"], n_results=1)] == [
+            [["c3"]], [["c0"]],
+        ]
+
+        reopened = VectorDB(
+            collection_name="reduced_test",
+            persist_directory=tmp_path / "chroma",
+            embedding_client=_client(),
+            partition_keys=[],
+        )
+        assert reopened.get_stats()["reduction"] == "pca:4"
+        assert reopened.query("lambda mu", n_results=1)["ids"] == [["c5"]]
+
+        # Vectors already stored can't be reduced differently
+        with pytest.raises(ValueError):
+            reopened.fit_reducer("matryoshka:8")
+
+        reopened.delete_collection()
+        assert not reopened.reducer_path.exists()
+        assert reopened.reducer is None
+
+    def test_reduced_version_name(self, tmp_path):
+        db = VectorDB.create_version(
+            "arbbuilder",
+            embedding_client=_client(),
+            build_id="b1",
+            reduction="matryoshka:8",
+            persist_directory=tmp_path / "chroma",
+        )
+        assert db.collection_name == "arbbuilder__onnx-chars__8__b1"
+        db.fit_reducer("matryoshka:8")
+        chunk = {"id": "a", "content": "Stylus", "token_count": 1, "source": "github"}
+        db.ingest_chunks([chunk])
+        assert db.embedding_info["dimension"] == 8
+
+    def test_ingest_refuses_other_reduction(self, tmp_path, monkeypatch):
+        """Test that ingest stops before embedding into a collection stored another way."""
+        def open_db(collection_name):
+            return VectorDB(
+                collection_name,
+                persist_directory=tmp_path / "chroma",
+                embedding_client=_client(),
+                partition_keys=[],
+            )
+        monkeypatch.setattr(vectordb_module, "VectorDB", open_db)
+        chunk_file = tmp_path / "chunks.jsonl"
+        write_chunks(chunk_file, [
+            {"id": "a", "content": "Stylus", "token_count": 1, "source": "github"},
+        ])
+
+        assert ingest_from_file(chunk_file, collection_name="plain")["ingested"] == 1
+        assert ingest_from_file(chunk_file, collection_name="plain", reduction="matryoshka:8") == {}
+        with pytest.raises(ValueError, match="new collection version"):
+            open_db("plain").check_reduction("matryoshka:8")
+
+        assert ingest_from_file(chunk_file, collection_name="reduced", reduction="matryoshka:8")
+        reduced = open_db("reduced")
+        reduced.check_reduction("matryoshka:8")
+        with pytest.raises(ValueError):
+            reduced.check_reduction("pca:8")
+        # Without its reducer, full-width vectors would be added to 8-dimensional ones
+        reduced.delete_indexes()
+        with pytest.raises(ValueError, match="matryoshka:8-reduced"):
+            reduced.check_reduction()
@@ -2,16 +2,22 @@
 Tests for reranking quality evaluation.
 """
 
+import asyncio
+import json
+import re
 import sys
 from pathlib import Path
 
+import httpx
+import numpy as np
 import pytest
 
 # Add src to path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
+from src.embeddings.local_embedder import HAS_ONNXRUNTIME
+from src.embeddings.reranker import BM25Reranker, CrossEncoderReranker, HybridReranker, Reranker
 from src.embeddings.vectordb import VectorDB
-from src.embeddings.reranker import Reranker, BM25Reranker, HybridReranker
 from tests.test_queries import TEST_QUERIES
 
 
@@ -88,6 +94,120 @@ class TestLLMReranker:
         assert avg_relevant > avg_irrelevant, "Relevant docs should score higher"
 
 
+# Relevance the stand-in LLM gives each document, before its per-request bias
+TRUE_SCORES = {
+    "deploy with cargo stylus deploy": 9.0,
+    "stylus contracts compile to wasm": 7.0,
+    "cooking pasta": 1.0,
+    "stock market news": 0.0,
+    "stylus sdk storage": 6.0,
+    "weather report": 2.0,
+    "erc20 in stylus": 5.0,
+}
+
+
+class RequestLog(list):
+    """Requests seen by the stand-in API, plus peak concurrency."""
+
+    max_in_flight = 0
+
+
+def _llm_reranker(
+    requests: RequestLog, bias: dict, broken: set = frozenset(), **kwargs
+) -> Reranker:
+    """Reranker whose API scores documents by TRUE_SCORES, shifted per request."""
+    in_flight = [0]
+
+    async def handler(request):
+        prompt = json.loads(request.content)["messages"][0]["content"]
+        documents = re.findall(r"\[Document \d+\]\n(.*?)\n", prompt)
+        requests.append(documents)
+        in_flight[0] += 1
+        requests.max_in_flight = max(requests.max_in_flight, in_flight[0])
+        await asyncio.sleep(0.02)
+        in_flight[0] -= 1
+
+        if broken & set(documents):
+            content = "I cannot score these."
+        else:
+            # Each request is (mis)calibrated differently, like separate LLM calls
+            shift = sum(bias.get(doc, 0.0) for doc in documents)
+            content = json.dumps([TRUE_SCORES[doc] + shift for doc in documents])
+        return httpx.Response(200, json={"choices": [{"message": {"content": content}}]})
+
+    reranker = Reranker(api_key="test", model="m", **kwargs)
+    reranker.client = httpx.AsyncClient(
+        base_url="https://example.test",
+        transport=httpx.MockTransport(handler),
+    )
+    return reranker
+
+
+class TestChunkedLLMReranker:
+    """Test grouped, concurrent LLM scoring with calibration and caching."""
+
+    QUERY = "How do I deploy a Stylus contract?"
+    DOCUMENTS = list(TRUE_SCORES)
+
+    def test_groups_scored_concurrently_and_calibrated(self):
+        requests = RequestLog()
+        # Requests containing these documents score everything higher
+        reranker = _llm_reranker(
+            requests, bias={"weather report": 2.0, "erc20 in stylus": -1.0}, group_size=3
+        )
+        try:
+            results = reranker.rerank(self.QUERY, self.DOCUMENTS, top_k=7)
+        finally:
+            reranker.close()
+
+        # Three small requests in flight together, each with the anchor
+        assert sorted(len(r) for r in requests) == [2, 3, 4]
+        assert all(self.DOCUMENTS[0] in r for r in requests)
+        assert requests.max_in_flight == 3
+
+        # Per-request shifts are removed by the anchor
+        scores = {r["document"]: r["score"] for r in results}
+        assert scores == pytest.approx(TRUE_SCORES)
+        assert [r["document"] for r in results[:2]] == self.DOCUMENTS[:2]
+
+    def test_repeated_candidates_are_cached(self):
+        requests = RequestLog()
+        reranker = _llm_reranker(requests, bias={"erc20 in stylus": 3.0}, group_size=3)
+        try:
+            reranker.rerank(self.QUERY, self.DOCUMENTS[:6], top_k=6)
+            assert len(requests) == 2
+
+            requests.clear()
+            reranker.rerank(self.QUERY, self.DOCUMENTS[:6], top_k=6)
+            assert requests == []
+
+            # A new candidate is scored with the anchor, against its cached score
+            results = reranker.rerank(self.QUERY, self.DOCUMENTS, top_k=7)
+            assert requests == [[self.DOCUMENTS[0], "erc20 in stylus"]]
+            scores = {r["document"]: r["score"] for r in results}
+            assert scores["erc20 in stylus"] == pytest.approx(5.0)
+            assert reranker.get_cache_stats()["hits"] == 6 + 6
+        finally:
+            reranker.close()
+
+    def test_unparseable_group_gets_neutral_scores(self):
+        requests = RequestLog()
+        reranker = _llm_reranker(requests, bias={}, broken={"weather report"}, group_size=3)
+        try:
+            results = reranker.rerank(self.QUERY, self.DOCUMENTS[:6], top_k=6)
+            scores = {r["document"]: r["score"] for r in results}
+            assert scores["stock market news"] == 5.0
+            assert scores["weather report"] == 5.0
+            assert scores["deploy with cargo stylus deploy"] == 9.0
+
+            # Only the parsed scores were cached
+            requests.clear()
+            reranker.rerank(self.QUERY, self.DOCUMENTS[:6], top_k=6)
+            assert len(requests) == 1
+        finally:
+            reranker.close()
+
+
 class TestHybridReranker:
     """Test hybrid reranking combining vector + BM25."""
 
@@ -119,6 +239,105 @@ class TestHybridReranker:
         assert all("ERC20" in doc or "Transfer" in doc for doc in top_2)
 
 
+def _cross_encoder(runs: list, batch_size: int = 2) -> CrossEncoderReranker:
+    """Cross-encoder over a word-level tokenizer and a stand-in ONNX session."""
+    from tokenizers import Tokenizer
+    from tokenizers.models import WordLevel
+    from tokenizers.pre_tokenizers import Whitespace
+    from tokenizers.processors import TemplateProcessing
+
+    words = "erc20 token transfer storage weather forecast stock prices today".split()
+    vocab = {
+        "[PAD]": 0, "[UNK]": 1, "[CLS]": 2, "[SEP]": 3,
+        **{w: i + 4 for i, w in enumerate(words)},
+    }
+    tokenizer = Tokenizer(WordLevel(vocab, unk_token="[UNK]"))
+    tokenizer.pre_tokenizer = Whitespace()
+    tokenizer.post_processor = TemplateProcessing(
+        single="[CLS] $A [SEP]",
+        pair="[CLS] $A [SEP] $B:1 [SEP]:1",
+        special_tokens=[("[CLS]", 2), ("[SEP]", 3)],
+    )
+
+    class Session:
+        """Stand-in scoring a pair by the query words found in the document."""
+
+        def get_inputs(self):
+            return [
+                type("Input", (), {"name": name})
+                for name in ("input_ids", "attention_mask", "token_type_ids")
+            ]
+
+        def run(self, outputs, inputs):
+            runs.append(inputs["input_ids"].shape)
+            logits = []
+            for ids, mask, types in zip(
+                inputs["input_ids"], inputs["attention_mask"], inputs["token_type_ids"]
+            ):
+                query = {i for i, m, t in zip(ids, mask, types) if m and t == 0 and i > 3}
+                document = {i for i, m, t in zip(ids, mask, types) if m and t == 1 and i > 3}
+                logits.append([len(query & document) - 1.0])
+            return [np.array(logits, dtype=np.float32)]
+
+    return CrossEncoderReranker(
+        "onnx:unused", session=Session(), tokenizer=tokenizer, batch_size=batch_size
+    )
+
+
+@pytest.mark.skipif(not HAS_ONNXRUNTIME, reason="onnxruntime/tokenizers not installed")
+class TestCrossEncoderReranker:
+    """Test local cross-encoder reranking."""
+
+    DOCUMENTS = [
+        "weather forecast today",
+        "erc20 token transfer storage",
+        "stock prices",
+        "token storage",
+    ]
+
+    def test_batched_scoring_and_reuse(self):
+        runs = []
+        reranker = _cross_encoder(runs)
+
+        results = reranker.rerank("erc20 token transfer", self.DOCUMENTS, top_k=2)
+
+        assert [r["index"] for r in results] == [1, 3]
+        assert all(0 < r["score"] < 1 for r in results)
+        # Four pairs in batches of two, similar lengths together
+        assert [shape[0] for shape in runs] == [2, 2]
+        assert runs[0][1] < runs[1][1]
+
+        # Documents are tokenized once and reused for later queries
+        reranker.rerank("weather today", self.DOCUMENTS, top_k=1)
+        assert reranker.get_cache_stats()["hits"] == 4
+        assert reranker.get_cache_stats()["misses"] == 4
+
+    def test_tokenized_documents_are_bounded(self):
+        reranker = _cross_encoder([])
+        reranker.cache_size = 2
+        reranker.score("token", self.DOCUMENTS)
+        assert reranker.get_cache_stats()["size"] == 2
+
+    def test_hybrid_reranker_hook(self):
+        reranker = HybridReranker(
+            use_llm=True,
+            llm_reranker=_cross_encoder([]),
+            rerank_candidates=4,
+        )
+        # Vector search prefers the irrelevant documents
+        results = reranker.rerank(
+            query="erc20 token transfer",
+            documents=self.DOCUMENTS,
+            vector_distances=[0.1, 0.9, 0.2, 0.8],
+            top_k=2,
+        )
+
+        assert [r["document"] for r in results] == [self.DOCUMENTS[1], self.DOCUMENTS[3]]
+        assert [r["index"] for r in results] == [1, 3]
+        assert [r["final_rank"] for r in results] == [1, 2]
+        assert results[0]["llm_score"] > results[1]["llm_score"]
+
+
 class TestRerankerIntegration:
     """Integration tests with actual vector database."""
 
@@ -6,11 +6,13 @@ import json
 import sys
 from pathlib import Path
 
+import numpy as np
 import pytest
 
 # Add src to path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
+from src.embeddings.local_embedder import LocalEmbeddingClient
 from src.embeddings.vectordb import VectorDB
 from tests.test_queries import TEST_QUERIES, get_queries_by_difficulty
 
@@ -145,7 +147,9 @@ class TestRetrievalQuality:
         avg_mrr = sum(r["mrr"] for r in results_summary) / len(results_summary)
         avg_p5 = sum(r["p@5"] for r in results_summary) / len(results_summary)
 
-        print(f"\nBasic Queries - Avg Recall: {avg_recall:.3f}, MRR: {avg_mrr:.3f}, P@5: {avg_p5:.3f}")
+        print(
+            f"\nBasic Queries - Avg Recall: {avg_recall:.3f}, MRR: {avg_mrr:.3f}, P@5: {avg_p5:.3f}"
+        )
 
         # Basic queries should have good recall
         assert avg_recall >= 0.5, f"Basic query recall too low: {avg_recall}"
@@ -293,3 +297,48 @@ class TestRetrievalBenchmark:
         print(f"\nResults saved to {output_path}")
 
         assert overall_recall >= 0.4, f"Overall recall too low: {overall_recall}"
+
+
+class TestBatchedQueries:
+    """Test that batched queries return what one query at a time does."""
+
+    @pytest.fixture
+    def vectordb(self, tmp_path):
+        """VectorDB in a temp directory with a local bag-of-characters encoder."""
+        def encode(texts):
+            vectors = np.zeros((len(texts), 32), dtype=np.float32)
+            for i, text in enumerate(texts):
+                for char in text.lower():
+                    vectors[i, ord(char) % 32] += 1
+            return vectors
+
+        db = VectorDB(
+            collection_name="batched_test",
+            persist_directory=tmp_path / "chroma",
+            embedding_client=LocalEmbeddingClient("onnx:chars", use_cache=False, encoder=encode),
+            partition_keys=[],
+        )
+        db.ingest_chunks([
+            {
+                "id": f"q{i}",
+                "content": " ".join(query_info["expected_keywords"]),
+                "token_count": 8,
+                "source": "documentation" if i % 2 else "github",
+            }
+            for i, query_info in enumerate(TEST_QUERIES)
+        ])
+        return db
+
+    def test_query_many_matches_query(self, vectordb):
+        queries = [query_info["query"] for query_info in TEST_QUERIES]
+
+        for where in (None, {"source": "github"}):
+            batch_results = vectordb.query_many(queries, n_results=5, where=where)
+
+            assert len(batch_results) == len(queries)
+            for query, results in zip(queries, batch_results):
+                single = vectordb.query(query_text=query, n_results=5, where=where)
+                assert len(single["ids"][0]) == 5
+                assert results["ids"] == single["ids"]
+                assert results["documents"] == single["documents"]
+                assert results["distances"][0] == pytest.approx(single["distances"][0])
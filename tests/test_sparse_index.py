@@ -0,0 +1,153 @@
+"""
+Tests for the sparse code-symbol index.
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import src.embeddings.vectordb as vectordb_module
+from src.embeddings.embedder import EmbeddingClient
+from src.embeddings.local_embedder import LocalEmbeddingClient
+from src.embeddings.sparse_index import SparseIndex, code_symbols
+from src.embeddings.vectordb import VectorDB, ingest_from_file
+from src.preprocessing.chunk_io import write_chunks
+
+DOCUMENTS = [
+    ("macro", "sol_storage! { pub struct Counter { count: StorageU256 } }"),
+    (
+        "storage_prose",
+        "Storage in Stylus: each storage slot holds a value. Storage layout matters.",
+    ),
+    (
+        "entry",
+        "#[entrypoint]\n#[storage]\npub struct Vault { balances: StorageMap<Address, U256> }",
+    ),
+    ("imports", "use alloy_primitives::{Address, U256};\nuse stylus_sdk::prelude::*;"),
+]
+
+
+class TestCodeSymbols:
+    """Test code symbol extraction."""
+
+    def test_symbols(self):
+        symbols = code_symbols(
+            "#[entrypoint] sol_storage! { StorageMap<Address, U256> } "
+            "use alloy_primitives::U256; fn balance_of() the Stylus docs #[derive(Debug)]"
+        )
+
+        assert symbols == [
+            "#[entrypoint]", "sol_storage!", "sol_storage", "StorageMap", "U256",
+            "alloy_primitives::U256", "U256", "balance_of", "#[derive]",
+        ]
+        assert code_symbols("how does storage work in stylus") == []
+
+
+class TestSparseIndex:
+    """Test sparse vectors, scoring and persistence."""
+
+    def test_identifier_queries(self):
+        index = SparseIndex.build(DOCUMENTS)
+
+        # Prose about storage never matches the macro
+        assert [doc_id for doc_id, _ in index.search("how do I use sol_storage!")] == ["macro"]
+        assert index.search("#[entrypoint] example")[0][0] == "entry"
+        assert index.search("storage in stylus") == []
+
+        scores = index.score_all("StorageMap U256")
+        assert scores[2] > scores[3] > 0
+        assert scores.max() <= 1.0 + 1e-6
+        assert index.score_ids("StorageMap U256", ["imports", "missing", "entry"]) == pytest.approx(
+            [float(scores[3]), 0.0, float(scores[2])]
+        )
+
+    def test_document_vectors_normalized(self):
+        index = SparseIndex.build(DOCUMENTS)
+
+        norms = np.zeros(len(index))
+        np.add.at(norms, index.postings_docs, index.postings_weights.astype(np.float64) ** 2)
+        assert np.allclose(norms[norms > 0], 1.0, atol=1e-5)
+
+    def test_save_load_roundtrip(self, tmp_path):
+        index = SparseIndex.build(DOCUMENTS)
+        path = tmp_path / "sparse" / "arbbuilder.npz"
+        index.save(path)
+
+        loaded = SparseIndex.load(path)
+
+        assert loaded.doc_ids == index.doc_ids
+        assert loaded.vocab == index.vocab
+        assert loaded.search("U256 Address") == index.search("U256 Address")
+        assert SparseIndex.load_if_exists(tmp_path / "missing.npz") is None
+
+
+class TestVectorDBSparseChannel:
+    """Test fusing the sparse channel into hybrid_search."""
+
+    def test_sparse_hits_fused(self, tmp_path, monkeypatch):
+        db = VectorDB(
+            collection_name="sparse_test",
+            persist_directory=tmp_path / "chroma",
+            embedding_client=EmbeddingClient(api_key="test", use_cache=False),
+        )
+        documents = DOCUMENTS + [
+            (f"filler{i}", f"storage macros explained, part {i}") for i in range(6)
+        ]
+        # The macro chunk points away from the query, so vector search misses it
+        embeddings = {chunk_id: [0.0, 1.0] for chunk_id, _ in documents}
+        embeddings["macro"] = [-1.0, 0.0]
+        db.collection.add(
+            ids=[chunk_id for chunk_id, _ in documents],
+            documents=[text for _, text in documents],
+            embeddings=[embeddings[chunk_id] for chunk_id, _ in documents],
+            metadatas=[{"source": "github"} for _ in documents],
+        )
+        monkeypatch.setattr(db.embedding_client, "embed", lambda text: [0.0, 1.0])
+        db.build_bm25_index()
+
+        without_sparse = db.hybrid_search("sol_storage! example", n_results=3)
+        assert "sparse_scores" not in without_sparse
+        assert without_sparse["ids"][0][0] != "macro"
+
+        index = db.build_sparse_index(page_size=4)
+        assert len(index) == 10
+        assert db.sparse_index_path == tmp_path / "sparse_index" / "sparse_test.npz"
+
+        results = db.hybrid_search("sol_storage! example", n_results=3)
+        assert results["ids"][0][0] == "macro"
+        assert results["sparse_scores"][0][0] > 0
+        assert results["sparse_scores"][0] == pytest.approx(
+            index.score_ids("sol_storage! example", results["ids"][0])
+        )
+
+    def test_ingest_rebuilds_existing_index(self, tmp_path, monkeypatch):
+        client = LocalEmbeddingClient(
+            "onnx:test", use_cache=False, encoder=lambda texts: np.ones((len(texts), 4))
+        )
+        monkeypatch.setattr(vectordb_module, "VectorDB", lambda collection_name: VectorDB(
+            collection_name,
+            persist_directory=tmp_path / "chroma",
+            embedding_client=client,
+            partition_keys=[],
+        ))
+        monkeypatch.setattr(vectordb_module, "BUILD_SPARSE_INDEX", False)
+        chunks = [
+            {"id": chunk_id, "content": text, "token_count": 8, "content_hash": chunk_id}
+            for chunk_id, text in DOCUMENTS
+        ]
+        first, second = tmp_path / "first.jsonl", tmp_path / "second.jsonl"
+        write_chunks(first, chunks)
+        write_chunks(second, chunks[1:])
+
+        ingest_from_file(first, collection_name="sparse_test", build_sparse_index=True)
+        # A plain re-ingest without the flag still refreshes the index
+        stats = ingest_from_file(second, collection_name="sparse_test", incremental=True)
+
+        assert stats["sync"]["deleted"] == 1
+        index = SparseIndex.load(tmp_path / "sparse_index" / "sparse_test.npz")
+        assert sorted(index.doc_ids) == sorted(chunk["id"] for chunk in chunks[1:])
@@ -0,0 +1,309 @@
+"""
+Tests for the quantized memory-mapped vector store.
+"""
+
+import re
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.embeddings.embedder import EmbeddingClient
+from src.embeddings.vector_store import (
+    PartitionedVectorStore,
+    QuantizedVectorStore,
+    partition_collection_name,
+    split_partition_filter,
+)
+from src.embeddings.vectordb import VectorDB
+
+
+def _records(vectors: np.ndarray) -> list:
+    return [
+        (
+            f"chunk_{i}",
+            vector.tolist(),
+            f"document {i}" + (" StorageMap" if i % 10 == 0 else ""),
+            {
+                "source": "github" if i % 3 else "documentation",
+                "chunk_index": i,
+                "is_test": i % 2 == 0,
+                **({"language": "rust"} if i % 3 else {}),
+            },
+        )
+        for i, vector in enumerate(vectors)
+    ]
+
+
+def _exact_top(vectors: np.ndarray, query: np.ndarray, k: int, rows=None) -> list[int]:
+    unit = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    scores = unit @ (query / np.linalg.norm(query))
+    candidates = np.arange(len(vectors)) if rows is None else np.asarray(rows)
+    return candidates[np.argsort(-scores[candidates])][:k].tolist()
+
+
+@pytest.fixture(scope="module")
+def vectors():
+    return np.random.default_rng(0).normal(size=(300, 32)).astype(np.float32)
+
+
+class TestQuantizedVectorStore:
+    """Test quantized storage, search and metadata filters."""
+
+    @pytest.mark.parametrize("dtype", ["int8", "float16"])
+    def test_brute_force_matches_exact(self, tmp_path, vectors, dtype):
+        store = QuantizedVectorStore.build(
+            tmp_path / "store", _records(vectors), dtype=dtype, nlist=0
+        )
+        query = vectors[7] + 0.1
+
+        results = store.query(query.tolist(), n_results=5)
+
+        # Quantization may swap near-ties, but scores stay close to exact
+        expected = _exact_top(vectors, query, 5)
+        found = [int(i.split("_")[1]) for i in results["ids"][0]]
+        assert found[0] == expected[0]
+        assert len(set(found) & set(expected)) >= 4
+        unit = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+        exact = 1 - unit[found] @ (query / np.linalg.norm(query))
+        assert np.allclose(results["distances"][0], exact, atol=0.01)
+        assert store.vectors.dtype == np.dtype(dtype)
+        assert isinstance(store.vectors, np.memmap)
+
+    def test_metadata_filters(self, tmp_path, vectors):
+        store = QuantizedVectorStore.build(tmp_path / "store", _records(vectors), nlist=0)
+        query = vectors[0].tolist()
+
+        docs = store.query(query, n_results=200, where={"source": "documentation"})
+        assert len(docs["ids"][0]) == 100
+        assert all(
+            m["source"] == "documentation" and "language" not in m for m in docs["metadatas"][0]
+        )
+
+        rust = store.query(query, n_results=300, where={"language": {"$ne": "solidity"}})
+        assert len(rust["ids"][0]) == 200
+
+        combined = store.query(query, n_results=300, where={
+            "$and": [
+                {"chunk_index": {"$gte": 100}},
+                {"$or": [{"is_test": True}, {"source": {"$in": ["documentation"]}}]},
+            ]
+        })
+        indices = sorted(m["chunk_index"] for m in combined["metadatas"][0])
+        assert indices == [i for i in range(100, 300) if i % 2 == 0 or i % 3 == 0]
+        assert store.query(query, where={"missing_key": "x"})["ids"] == [[]]
+
+        contains = store.query(query, n_results=50, where_document={"$contains": "StorageMap"})
+        assert len(contains["ids"][0]) == 30
+
+        # Matching stops once enough documents match, instead of reading all
+        reads = []
+
+        class CountingDocuments:
+            def __init__(self, documents):
+                self.documents = documents
+
+            def __getitem__(self, row):
+                reads.append(row)
+                return self.documents[row]
+
+        store.documents = CountingDocuments(store.documents)
+        first = store.query(query, n_results=3, where_document={"$contains": "StorageMap"})
+        assert len(first["ids"][0]) == 3
+        assert first["ids"][0] == contains["ids"][0][:3]
+        assert len(reads) < 60
+
+        fetched = store.get(["chunk_3", "nope", "chunk_6"], where={"is_test": True},
+                            include=["documents", "metadatas", "embeddings"])
+        assert fetched["ids"] == ["chunk_6"]
+        assert fetched["metadatas"][0] == {
+            "source": "documentation", "chunk_index": 6, "is_test": True,
+        }
+        unit = vectors[6] / np.linalg.norm(vectors[6])
+        assert np.allclose(fetched["embeddings"][0], unit, atol=0.02)
+
+    def test_ivf_recall_and_filtered_fallback(self, tmp_path):
+        rng = np.random.default_rng(1)
+        centers = rng.normal(size=(16, 32))
+        vectors = centers[rng.integers(0, 16, 2000)] + rng.normal(scale=0.3, size=(2000, 32))
+        vectors = vectors.astype(np.float32)
+        store = QuantizedVectorStore.build(tmp_path / "store", _records(vectors), nlist=16)
+        store.nprobe = 4
+        assert store.nlist == 16 and len(store.list_rows) == 2000
+
+        recalls = []
+        for query in vectors[:20] + 0.05:
+            found = store.query(query.tolist(), n_results=10)["ids"][0]
+            expected = {f"chunk_{i}" for i in _exact_top(vectors, query, 10)}
+            recalls.append(len(expected.intersection(found)) / 10)
+        assert np.mean(recalls) >= 0.9
+
+        # A selective filter is scanned exactly instead of through the probed lists
+        rows = [i for i in range(2000) if i % 3 == 0 and i % 2 == 0]
+        filtered = store.query(vectors[0].tolist(), n_results=5, where={
+            "source": "documentation", "is_test": True,
+        })
+        expected = [f"chunk_{i}" for i in _exact_top(vectors, vectors[0], 5, rows)]
+        assert filtered["ids"][0] == expected
+
+
+class TestVectorDBQuantizedBackend:
+    """Test serving VectorDB queries from the quantized store."""
+
+    def test_build_and_serve(self, tmp_path, vectors, monkeypatch):
+        embedding_client = EmbeddingClient(api_key="test", use_cache=False)
+        monkeypatch.setattr(embedding_client, "embed", lambda text: vectors[11].tolist())
+
+        chroma_db = VectorDB(
+            collection_name="store_test",
+            persist_directory=tmp_path / "chroma",
+            embedding_client=embedding_client,
+        )
+        records = _records(vectors[:50])
+        chroma_db.collection.add(
+            ids=[r[0] for r in records],
+            embeddings=[r[1] for r in records],
+            documents=[r[2] for r in records],
+            metadatas=[r[3] for r in records],
+        )
+        store = chroma_db.build_vector_store(dtype="int8", page_size=20)
+        assert store.count() == 50
+        assert chroma_db.vector_store_path == tmp_path / "vector_store" / "store_test"
+
+        db = VectorDB(
+            collection_name="store_test",
+            persist_directory=tmp_path / "chroma",
+            embedding_client=embedding_client,
+            vector_store="quantized",
+        )
+        results = db.query("anything", n_results=3, where={"source": "github"})
+
+        expected = chroma_db.query("anything", n_results=3, where={"source": "github"})
+        assert results["ids"] == expected["ids"]
+        assert results["metadatas"] == expected["metadatas"]
+        assert db._client is None
+
+
+class TestPartitions:
+    """Test routing of partition-key filters to partition collections."""
+
+    def test_split_partition_filter(self):
+        keys = ["source"]
+        assert split_partition_filter({"source": "github"}, keys) == (("source", "github"), None)
+        assert split_partition_filter(
+            {"$and": [{"language": "rust"}, {"source": {"$eq": "github"}}]}, keys
+        ) == (("source", "github"), {"language": "rust"})
+        assert split_partition_filter({"source": {"$ne": "github"}}, keys) == (
+            None, {"source": {"$ne": "github"}},
+        )
+        assert split_partition_filter({"language": "rust"}, keys) == (None, {"language": "rust"})
+        assert partition_collection_name("arbbuilder", "source", "github") == (
+            "arbbuilder--source--github"
+        )
+
+    def test_partition_names_unique(self):
+        names = {
+            partition_collection_name("arbbuilder", "category", "DeFi / Lending"),
+            partition_collection_name("arbbuilder", "category", "DeFi-Lending"),
+            partition_collection_name("arbbuilder", "category", "DeFi--Lending"),
+            partition_collection_name("arbbuilder--category", "DeFi", "Lending"),
+            partition_collection_name("arbbuilder-test", "category", "DeFi / Lending"),
+        }
+        assert len(names) == 5
+        assert all(re.fullmatch(r"[A-Za-z0-9][A-Za-z0-9._-]{1,61}[A-Za-z0-9]", n) for n in names)
+
+    def test_build_partitions_and_route(self, tmp_path, vectors, monkeypatch):
+        db = VectorDB(
+            collection_name="partition_test",
+            persist_directory=tmp_path / "chroma",
+            embedding_client=EmbeddingClient(api_key="test", use_cache=False),
+            partition_keys=["source", "language"],
+        )
+        monkeypatch.setattr(db.embedding_client, "embed", lambda text: vectors[0].tolist())
+        records = _records(vectors[:60])
+        db.collection.add(
+            ids=[r[0] for r in records],
+            embeddings=[r[1] for r in records],
+            documents=[r[2] for r in records],
+            metadatas=[r[3] for r in records],
+        )
+
+        counts = db.build_partitions(page_size=25)
+
+        assert counts == {
+            "partition_test--source--documentation": 20,
+            "partition_test--source--github": 40,
+            "partition_test--language--rust": 40,
+        }
+        store = db.store
+        assert isinstance(store, PartitionedVectorStore)
+        routed, rest = store.route({"$and": [{"source": "github"}, {"is_test": True}]})
+        assert routed is store.partitions[("source", "github")] and rest == {"is_test": True}
+
+        results = db.query(
+            "q", n_results=50, where={"$and": [{"source": "github"}, {"is_test": True}]}
+        )
+        assert len(results["ids"][0]) == 20
+        assert all(m["source"] == "github" and m["is_test"] for m in results["metadatas"][0])
+
+        # Reopening discovers the partitions from collection metadata
+        reopened = VectorDB(
+            collection_name="partition_test",
+            persist_directory=tmp_path / "chroma",
+            embedding_client=db.embedding_client,
+            partition_keys=["source"],
+        )
+        assert sorted(reopened.partitions) == [("source", "documentation"), ("source", "github")]
+
+
+class TestQueryMany:
+    """Test batched multi-query retrieval."""
+
+    def test_one_embedding_and_one_search_request(self, tmp_path, vectors, monkeypatch):
+        db = VectorDB(
+            collection_name="query_many_test",
+            persist_directory=tmp_path / "chroma",
+            embedding_client=EmbeddingClient(api_key="test", use_cache=False),
+        )
+        records = _records(vectors[:40])
+        db.collection.add(
+            ids=[r[0] for r in records],
+            embeddings=[r[1] for r in records],
+            documents=[r[2] for r in records],
+            metadatas=[r[3] for r in records],
+        )
+        query_vectors = {
+            "a": vectors[3].tolist(), "b": vectors[17].tolist(), "c": vectors[25].tolist(),
+        }
+        monkeypatch.setattr(db.embedding_client, "embed", lambda text: query_vectors[text])
+        batches = []
+
+        def embed_batch(texts, **kwargs):
+            batches.append(list(texts))
+            return [query_vectors[text] for text in texts]
+
+        monkeypatch.setattr(db.embedding_client, "embed_batch", embed_batch)
+        expected = [db.query(text, n_results=4, where={"source": "github"}) for text in "abc"]
+        db.query_cache.clear()
+
+        calls = []
+        collection_query = db.collection.query
+        monkeypatch.setattr(
+            db.collection,
+            "query",
+            lambda **kwargs: calls.append(kwargs) or collection_query(**kwargs),
+        )
+        results = db.query_many(["a", " b ", "c", "a"], n_results=4, where={"source": "github"})
+
+        assert batches == [["a", "b", "c"]]
+        assert len(calls) == 1 and len(calls[0]["query_embeddings"]) == 4
+        assert results[:3] == expected and results[3] == expected[0]
+
+        # Cached embeddings skip the embedding request entirely
+        db.query_many(["c", "b"])
+        assert len(batches) == 1
+        assert db.query_many([]) == []
@@ -0,0 +1,218 @@
+"""
+Tests for versioned collections and hot swapping the served version.
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.embeddings.local_embedder import LocalEmbeddingClient
+from src.embeddings.vectordb import VectorDB
+from src.embeddings.versioning import CollectionManifest, versioned_collection_name
+from src.mcp.tools.get_stylus_context import GetStylusContextTool
+
+CHUNKS = [
+    {
+        "id": "docs",
+        "content": "Stylus contracts are written in Rust",
+        "token_count": 6,
+        "source": "documentation",
+    },
+    {
+        "id": "code",
+        "content": "sol_storage! { pub struct Counter {} }",
+        "token_count": 8,
+        "source": "github",
+    },
+]
+
+
+def _client(model: str, dimension: int) -> LocalEmbeddingClient:
+    """Local client with a deterministic bag-of-characters encoder."""
+    def encode(texts):
+        vectors = np.zeros((len(texts), dimension), dtype=np.float32)
+        for i, text in enumerate(texts):
+            for char in text:
+                vectors[i, ord(char) % dimension] += 1
+        return vectors
+    return LocalEmbeddingClient(model, use_cache=False, encoder=encode)
+
+
+def _build(persist_directory: Path, client: LocalEmbeddingClient, build_id: str) -> VectorDB:
+    db = VectorDB.create_version(
+        "arbbuilder",
+        embedding_client=client,
+        build_id=build_id,
+        persist_directory=persist_directory,
+    )
+    db.ingest_chunks(CHUNKS)
+    db.build_bm25_index()
+    return db
+
+
+class TestCollectionManifest:
+    """Test manifest bookkeeping."""
+
+    def test_versions_and_activation(self, tmp_path):
+        name = versioned_collection_name("arbbuilder", "google/gemini-embedding-001", 3072, "b1")
+        assert name == "arbbuilder__google-gemini-embedding-001__3072__b1"
+
+        manifest = CollectionManifest(tmp_path / "collections.json")
+        manifest.add_version("arbbuilder", "v1", "m", 8, "b1")
+        manifest.add_version("arbbuilder", "v2", "m", 8, "b2")
+        assert manifest.active("arbbuilder") is None
+
+        assert manifest.activate("arbbuilder", "v1") is None
+        assert manifest.activate("arbbuilder", "v2") == "v1"
+
+        # Another process sees the change
+        other = CollectionManifest(tmp_path / "collections.json")
+        assert other.active("arbbuilder")["name"] == "v2"
+        assert [v["status"] for v in other.versions("arbbuilder")] == ["ready", "active"]
+        with pytest.raises(ValueError):
+            other.remove_version("arbbuilder", "v2")
+        with pytest.raises(ValueError):
+            other.activate("arbbuilder", "missing")
+        other.remove_version("arbbuilder", "v1")
+        assert [v["name"] for v in manifest.versions("arbbuilder")] == ["v2"]
+
+
+class TestVersionedVectorDB:
+    """Test building versions next to the served one."""
+
+    def test_build_activate_and_prune(self, tmp_path):
+        persist_directory = tmp_path / "chroma"
+        legacy = VectorDB(
+            "arbbuilder",
+            persist_directory=persist_directory,
+            embedding_client=_client("onnx:a", 8),
+        )
+        assert legacy.collection_name == "arbbuilder"
+
+        first = _build(persist_directory, _client("onnx:a", 8), "b1")
+        assert first.collection_name == "arbbuilder__onnx-a__8__b1"
+        # Not served until activated
+        assert legacy.manifest.active("arbbuilder") is None
+
+        assert first.activate() == []
+        second = _build(persist_directory, _client("onnx:a", 8), "b2")
+        second.activate()
+        third = _build(persist_directory, _client("onnx:b", 16), "b3")
+        removed = third.activate(keep=2)
+
+        assert removed == ["arbbuilder__onnx-a__8__b1"]
+        assert not first.bm25_index_path.exists()
+        assert second.bm25_index_path.exists() and third.bm25_index_path.exists()
+        names = {c.name for c in third.client.list_collections()}
+        assert "arbbuilder__onnx-a__8__b1" not in names
+        assert {second.collection_name, third.collection_name} <= names
+
+        served = VectorDB(
+            "arbbuilder",
+            persist_directory=persist_directory,
+            embedding_client=third.embedding_client,
+        )
+        assert served.collection_name == "arbbuilder__onnx-b__16__b3"
+        assert served.embedding_info == {"model": "onnx:b", "dimension": 16}
+        assert served.query("Rust", n_results=1)["ids"] == [["docs"]]
+
+    def test_versions_keep_separate_partitions(self, tmp_path):
+        # Long enough that partition names are hashed
+        model = "onnx:/models/paraphrase-multilingual-minilm-l12-v2"
+        persist_directory = tmp_path / "chroma"
+        versions = []
+        for dimension, build_id in ((8, "b1"), (16, "b2")):
+            db = VectorDB.create_version(
+                "arbbuilder",
+                embedding_client=_client(model, dimension),
+                build_id=build_id,
+                persist_directory=persist_directory,
+                partition_keys=["source"],
+            )
+            assert db.ingest_chunks(CHUNKS) == 2
+            db.build_bm25_index()
+            db.activate(keep=1)
+            versions.append(db)
+
+        first, second = versions
+        assert len(second.collection_name) > 63
+        assert not set(p.name for p in first.partitions.values()) & set(
+            p.name for p in second.partitions.values()
+        )
+        served = VectorDB(
+            "arbbuilder",
+            persist_directory=persist_directory,
+            embedding_client=second.embedding_client,
+            partition_keys=["source"],
+        )
+        assert served.collection_name == second.collection_name
+        results = served.query("Rust", n_results=2, where={"source": "documentation"})
+        assert results["ids"] == [["docs"]]
+
+
+class TestHotSwap:
+    """Test that the context tool switches to a newly activated version."""
+
+    def test_tool_switches_version(self, tmp_path, monkeypatch):
+        persist_directory = tmp_path / "chroma"
+        first = _build(persist_directory, _client("onnx:a", 8), "b1")
+        first.activate()
+        tool = GetStylusContextTool(
+            vectordb=VectorDB(
+                "arbbuilder",
+                persist_directory=persist_directory,
+                embedding_client=first.embedding_client,
+            ),
+            use_reranking=False,
+            api_key="test",
+        )
+        before = tool.execute("Stylus Rust", n_results=1)
+        assert before["contexts"][0]["content"] == CHUNKS[0]["content"]
+
+        # A re-index with another model, built while the tool keeps serving
+        new_client = _client("onnx:b", 16)
+        second = _build(persist_directory, new_client, "b2")
+        assert tool.execute("Stylus Rust", n_results=1)["contexts"] == before["contexts"]
+        assert tool.vectordb.collection_name == first.collection_name
+
+        created = []
+        monkeypatch.setattr(
+            "src.mcp.tools.get_stylus_context.create_embedding_client",
+            lambda model: created.append(model) or new_client,
+        )
+        second.activate()
+        after = tool.execute("sol_storage Counter", n_results=1)
+
+        assert tool.vectordb.collection_name == second.collection_name
+        assert created == ["onnx:b"]
+        assert after["contexts"][0]["content"] == CHUNKS[1]["content"]
+
+    def test_failed_switch_keeps_serving(self, tmp_path, monkeypatch):
+        persist_directory = tmp_path / "chroma"
+        first = _build(persist_directory, _client("onnx:a", 8), "b1")
+        first.activate()
+        tool = GetStylusContextTool(
+            vectordb=VectorDB(
+                "arbbuilder",
+                persist_directory=persist_directory,
+                embedding_client=first.embedding_client,
+            ),
+            use_reranking=False,
+            use_result_cache=False,
+            api_key="test",
+        )
+        _build(persist_directory, _client("onnx:b", 16), "b2").activate()
+
+        def fail(model):
+            raise ImportError("onnxruntime is required")
+
+        monkeypatch.setattr("src.mcp.tools.get_stylus_context.create_embedding_client", fail)
+        result = tool.execute("Stylus Rust", n_results=1)
+
+        assert "error" not in result
+        assert tool.vectordb.collection_name == first.collection_name